@@ -5,12 +5,15 @@ Point d'entrée de l'application Streamlit.
 """
 
 import streamlit as st
-import pandas as pd
-from services.db import init_db
-from services.assets import get_assets
+from services.db import init_db, enable_query_trace, disable_query_trace, begin_query_trace_run
+from services.profiler import enable_profiler, disable_profiler, begin_profile_run, set_profile_label, span
 from services.asset_manager import refresh_prices
-from services.historique import init_historique, load_historique, build_total_evolution, build_category_evolution, build_asset_evolution
-from services.positions import init_positions, load_positions
+from services.backup import schedule_snapshot
+from services.repository import begin_request
+from services.cache_deps import invalidate
+from services.historique import init_historique
+from services.positions import init_positions
+from services.session_data import get_table, apply_assets
 from ui.tab_synthese import render as render_synthese
 from ui.tab_actifs import render as render_actifs
 from ui.tab_emprunts import render as render_emprunts
@@ -19,42 +22,68 @@ from ui.asset_form import render_active_dialog, set_dialog_create
 from ui.forms.form_emprunt import set_emprunt_dialog_create, render_emprunt_dialog
 from constants import CATEGORIES_AUTO
 from datetime import datetime
+from importlib.machinery import ModuleSpec
 
+# Streamlit exécute ce script comme module __main__ : les processus "spawn" du pool
+# de la projection le réexécuteraient en entier. Un __spec__ nommé "__main__" leur
+# indique qu'il n'y a rien à réimporter (multiprocessing.spawn).
+__spec__ = ModuleSpec("__main__", None)
 
 
 st.set_page_config(page_title="Suivi de patrimoine", layout="wide", page_icon=":material/finance_mode:", initial_sidebar_state="collapsed")
 
 
+# ── Traçage SQL (activable dans Paramètres > Outils développeur) ─────────────
+# Les interrupteurs sont recopiés dans des clés hors widget (_dev_*) : ils restent
+# actifs sur les autres pages, où le widget n'est pas affiché.
+
+if st.session_state.get("_dev_trace_sql"):
+    enable_query_trace()
+    begin_query_trace_run()
+else:
+    disable_query_trace()
+
+# ── Profilage du rendu (activable dans Paramètres > Outils développeur) ──────
+
+if st.session_state.get("_dev_profiler"):
+    enable_profiler()
+    begin_profile_run()
+else:
+    disable_profiler()
+
+
 init_db()
+begin_request()
 init_historique()
 init_positions()
+schedule_snapshot()
+
+
+# ── Utilitaires UI ────────────────────────────────────────────────────────────
 
-# ── Cache des lectures ────────────────────────────────────────────────────────
+def flash(msg: str, type: str = "success"):
+    st.session_state["_flash"] = {"msg": msg, "type": type}
 
-@st.cache_data(show_spinner=False)
-def cached_load_assets() -> pd.DataFrame:
-    return get_assets()
+def show_flash():
+    if "_flash" in st.session_state:
+        f = st.session_state.pop("_flash")
+        icons = {"success": "✅", "warning": "⚠️", "error": "❌", "info": "ℹ️"}
+        st.toast(f["msg"], icon=icons.get(f["type"], "ℹ️"))
 
-@st.cache_data(show_spinner=False)
-def cached_load_historique() -> pd.DataFrame:
-    return load_historique()
 
-@st.cache_data(show_spinner=False)
-def cached_load_positions() -> pd.DataFrame:
-    return load_positions()
+# ── Données de la session ─────────────────────────────────────────────────────
+# Lues une fois par session puis mises à jour en mémoire après chaque écriture
+# (services/session_data.py) ; relues seulement en cas de conflit.
 
-def invalidate_data_cache():
-    cached_load_assets.clear()
-    cached_load_historique.clear()
-    cached_load_positions.clear()
-    build_total_evolution.clear()
-    build_category_evolution.clear()
-    build_asset_evolution.clear()
+def invalidate_data_cache(*tables: str):
+    """Vide les caches dérivés de `tables` (tous si aucune : restauration, réinitialisation)."""
+    invalidate(*tables)
 
 
-df           = cached_load_assets()
-df_hist      = cached_load_historique()
-df_positions = cached_load_positions()
+# Les actifs servent à toutes les pages (modales, rafraîchissement des prix) ;
+# historique et positions ne sont lus que par la page Synthèse.
+with span("donnees.actifs"):
+    df = get_table("actifs")
 
 
 # ── Refresh automatique des prix au démarrage de session ─────────────────────
@@ -67,8 +96,9 @@ _has_auto = (
 )
 
 if "prices_refreshed" not in st.session_state and _has_auto:
-    with st.spinner("Actualisation des prix en cours…"):
+    with st.spinner("Actualisation des prix en cours…"), span("refresh_prices"):
         df, _msg, _msg_type = refresh_prices(df)
+        apply_assets(df)
     st.session_state["prices_refreshed"] = True
     st.session_state["sync_time"] = datetime.now().strftime("%H:%M")
     st.session_state["sync_error_tickers"] = (
@@ -77,26 +107,14 @@ if "prices_refreshed" not in st.session_state and _has_auto:
     )
     if _msg_type != "success":
         flash(_msg, _msg_type)
-    invalidate_data_cache()
     st.rerun()
 
 
-# ── Utilitaires UI ────────────────────────────────────────────────────────────
-
-def flash(msg: str, type: str = "success"):
-    st.session_state["_flash"] = {"msg": msg, "type": type}
-
-def show_flash():
-    if "_flash" in st.session_state:
-        f = st.session_state.pop("_flash")
-        icons = {"success": "✅", "warning": "⚠️", "error": "❌", "info": "ℹ️"}
-        st.toast(f["msg"], icon=icons.get(f["type"], "ℹ️"))
-
-
 # ── Modales ───────────────────────────────────────────────────────────────────
 
-render_active_dialog(df, invalidate_data_cache, flash)
-render_emprunt_dialog(flash)
+with span("modales"):
+    render_active_dialog(df, flash)
+    render_emprunt_dialog(flash)
 
 
 # ── Page principale ───────────────────────────────────────────────────────────
@@ -123,18 +141,42 @@ with st.container(horizontal=True, vertical_alignment="bottom", horizontal_align
             st.rerun()
 
 
-tab_synthese, tab_actifs, tab_passifs, tab_params = st.tabs([
-    "Synthèse", "Actifs", "Passifs", "Paramètres"
-])
-
-with tab_synthese:
-    render_synthese(df, df_hist, df_positions)
-
-with tab_actifs:
-    render_actifs(df, invalidate_data_cache, flash)
-
-with tab_passifs:
-    render_emprunts(flash)
-
-with tab_params:
-    render_parametres(df, invalidate_data_cache, flash)
\ No newline at end of file
+# ── Pages ─────────────────────────────────────────────────────────────────────
+# Seule la page active est exécutée : ses données sont chargées à ce moment-là.
+# Chaque page est un fragment : un widget de la page ne réexécute qu'elle.
+# Les écritures appellent st.rerun() et rechargent donc toute l'application.
+
+@st.fragment
+def page_synthese():
+    with span("donnees.historique"):
+        df_hist, df_positions = get_table("historique"), get_table("positions")
+    with span("page.synthese"):
+        render_synthese(df, df_hist, df_positions)
+
+@st.fragment
+def page_actifs():
+    with span("page.actifs"):
+        render_actifs(df, flash)
+
+@st.fragment
+def page_passifs():
+    with span("page.passifs"):
+        render_emprunts(flash)
+
+@st.fragment
+def page_parametres():
+    with span("page.parametres"):
+        render_parametres(df, invalidate_data_cache, flash)
+
+
+page = st.navigation(
+    [
+        st.Page(page_synthese,   title="Synthèse",   icon=":material/dashboard:",   url_path="synthese", default=True),
+        st.Page(page_actifs,     title="Actifs",     icon=":material/account_balance_wallet:", url_path="actifs"),
+        st.Page(page_passifs,    title="Passifs",    icon=":material/credit_card:", url_path="passifs"),
+        st.Page(page_parametres, title="Paramètres", icon=":material/settings:",    url_path="parametres"),
+    ],
+    position="top",
+)
+set_profile_label(page.title)
+page.run()
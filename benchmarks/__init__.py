@@ -0,0 +1,3 @@
+"""
+Benchmarks sur portefeuilles synthétiques (python -m benchmarks).
+"""
@@ -0,0 +1,42 @@
+"""
+Lance la suite de benchmarks :
+
+    python -m benchmarks                                  # échelles petite et moyenne
+    python -m benchmarks --echelles grande -r 3 -o bench_output.json
+"""
+
+import argparse
+
+from .suite import DEFAULT_REPETITIONS, run_benchmarks, write_results
+from .synthetic import DEFAULT_SEED, ECHELLES
+
+DEFAULT_ECHELLES = ("petite", "moyenne")  # "grande" : environ une minute par répétition
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks sur portefeuilles synthétiques.")
+    parser.add_argument("--echelles", default=",".join(DEFAULT_ECHELLES),
+                        help=f"échelles à mesurer, séparées par des virgules ({', '.join(ECHELLES)})")
+    parser.add_argument("--cas", default=None, help="cas à mesurer, séparés par des virgules (tous par défaut)")
+    parser.add_argument("-r", "--repetitions", type=int, default=DEFAULT_REPETITIONS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("-o", "--output", default="bench_output.json", help="fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    noms = [n.strip() for n in args.echelles.split(",") if n.strip()]
+    inconnues = [n for n in noms if n not in ECHELLES]
+    if inconnues:
+        parser.error(f"échelle inconnue : {', '.join(inconnues)}")
+    cas = [c.strip() for c in args.cas.split(",")] if args.cas else None
+
+    resultats = run_benchmarks({n: ECHELLES[n] for n in noms}, args.seed, args.repetitions, cas)
+    write_results(resultats, args.output)
+    for nom, echelle in resultats["echelles"].items():
+        print(f"── {nom} ({echelle['taille']})")
+        for cas_nom, mesure in echelle["cas"].items():
+            print(f"   {cas_nom:<40} {mesure['mediane_ms']:>10.1f} ms")
+    print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+suite.py
+────────
+Mesure des chemins critiques sur des portefeuilles synthétiques de plusieurs tailles.
+
+Pour chaque échelle, une base neuve est créée dans un dossier temporaire et
+remplie par seed_database ; chaque cas est ensuite exécuté `repetitions` fois.
+La préparation d'un cas (vider un cache, préparer une copie) n'est pas chronométrée.
+Les cas "froid" partent de caches vides, les cas "chaud" les retrouvent remplis.
+
+Le pricer est servi par un LocalPriceProvider sur les cours synthétiques
+(aucun appel réseau) ; ses cas avec latence ou pannes simulées ajoutent à
+leurs mesures les compteurs du fournisseur de la dernière répétition.
+
+Le résultat est un dict sérialisable en JSON :
+    { "meta": {...}, "echelles": { nom: { "taille": {...}, "lignes": {...}, "cas": { cas: mesures } } } }
+mesures = { repetitions, min_ms, mediane_ms, moyenne_ms, max_ms[, fournisseur] }.
+"""
+
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import constants
+from constants import CATEGORIES_AUTO
+from .synthetic import DEFAULT_SEED, ECHELLES, Taille, generate_portfolio, seed_database, write_price_directory
+
+DEFAULT_REPETITIONS = 5
+
+
+# ── Exécution ─────────────────────────────────────────────────────────────────
+
+def run_benchmarks(echelles: dict[str, Taille] | None = None, seed: int = DEFAULT_SEED,
+                   repetitions: int = DEFAULT_REPETITIONS, cas: list[str] | None = None) -> dict:
+    """Exécute les cas (tous par défaut) à chaque échelle (ECHELLES par défaut)."""
+    echelles = echelles if echelles is not None else ECHELLES
+    resultats = {}
+    for nom, taille in echelles.items():
+        resultats[nom] = _run_scale(taille, seed, repetitions, cas)
+    return {"meta": _meta(seed, repetitions), "echelles": resultats}
+
+
+def write_results(resultats: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+
+
+def _run_scale(taille: Taille, seed: int, repetitions: int, cas: list[str] | None) -> dict:
+    portfolio = generate_portfolio(taille, seed)
+    with _temporary_database() as tmp:
+        seed_database(portfolio)
+        prices_dir = os.path.join(tmp, "cours")
+        write_price_directory(portfolio, prices_dir)
+        mesures = {}
+        for nom, (setup, fn, *stats) in _cases(portfolio, prices_dir).items():
+            if cas is None or nom in cas:
+                mesures[nom] = _measure(setup, fn, repetitions)
+                if stats:
+                    mesures[nom]["fournisseur"] = stats[0]()
+    return {
+        "taille": asdict(taille),
+        "lignes": {table: len(portfolio[table]) for table in ("assets", "historique", "positions", "emprunts")}
+                  | {"cours": int(portfolio["prices"].size)},
+        "cas": mesures,
+    }
+
+
+def _measure(setup: Callable[[], object] | None, fn: Callable, repetitions: int) -> dict:
+    durees = []
+    for _ in range(repetitions):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg)
+        durees.append((time.perf_counter() - start) * 1000)
+    return {
+        "repetitions": repetitions,
+        "min_ms": round(min(durees), 3),
+        "mediane_ms": round(statistics.median(durees), 3),
+        "moyenne_ms": round(statistics.fmean(durees), 3),
+        "max_ms": round(max(durees), 3),
+    }
+
+
+@contextmanager
+def _temporary_database():
+    """Base neuve dans un dossier temporaire, le temps d'une échelle ; rend le dossier."""
+    from services.db import init_db
+    from services.db_emprunts import _load_emprunts_cached
+    from services.historique import evict_asset_evolution, _clear_evolutions
+    from services.price_providers import get_provider, set_provider
+
+    with tempfile.TemporaryDirectory(prefix="bench-patrimoine-") as tmp, \
+            patch.object(constants, "DB_PATH", os.path.join(tmp, "patrimoine.db")):
+        init_db()
+        provider = get_provider()
+        try:
+            yield tmp
+        finally:
+            set_provider(provider)
+            evict_asset_evolution()
+            _clear_evolutions()
+            _load_emprunts_cached.cache_clear()
+
+
+def _meta(seed: int, repetitions: int) -> dict:
+    import sqlite3
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "graine": seed,
+        "repetitions": repetitions,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+# ── Cas mesurés ───────────────────────────────────────────────────────────────
+
+def _cases(portfolio: dict, prices_dir: str) -> dict[str, tuple]:
+    """
+    Cas → (préparation, fonction[, compteurs]). La préparation renvoie l'argument
+    passé à la fonction ; compteurs() est lu après la dernière répétition.
+    Les entrées des évolutions sont lues en base comme dans graphe_historique.
+    """
+    from services import historique
+    from services.db_actifs import load_assets, save_assets
+    from services.db_emprunts import load_emprunts, _load_emprunts_cached
+    from services.db_historique import load_historique
+    from services.db_positions import load_positions
+    from services.price_providers import LocalPriceProvider, get_provider, set_provider
+    from services.pricer import fetch_historical_prices, refresh_auto_assets
+    from ui.tab_emprunts import _build_crd_evolution
+
+    df_assets = load_assets()
+    df_evo = df_assets[historique.EVOLUTION_COLUMNS]
+    df_hist = load_historique()
+    df_positions = load_positions()
+    df_prices = portfolio["prices"]
+    df_emprunts = load_emprunts()
+    auto = tuple(CATEGORIES_AUTO)
+    evolution_args = (df_evo, df_hist, df_positions, df_prices, auto)
+
+    def cold():
+        historique.evict_asset_evolution()
+        historique._clear_evolutions()
+
+    def modified_assets():
+        df = df_assets.copy()
+        df["montant"] = (df["montant"] * 1.01).round(2)
+        return df
+
+    def cold_emprunts():
+        _load_emprunts_cached.cache_clear()
+
+    tickers = tuple(df_prices.columns)
+    set_provider(LocalPriceProvider(prices_dir))
+
+    def provider(**options):
+        """Préparation d'un cas pricer : fournisseur neuf (compteurs à zéro), actifs à rafraîchir."""
+        def setup():
+            set_provider(LocalPriceProvider(prices_dir, seed=0, **options))
+            return df_assets.copy()
+        return setup
+
+    def stats():
+        return get_provider().stats
+
+    return {
+        "load_assets": (None, lambda _: load_assets()),
+        "save_assets": (modified_assets, save_assets),
+        "load_historique": (None, lambda _: load_historique()),
+        "load_positions": (None, lambda _: load_positions()),
+        "_compute_raw_evolution (froid)": (cold, lambda _: historique._compute_raw_evolution(*evolution_args)),
+        "_compute_raw_evolution (chaud)": (None, lambda _: historique._compute_raw_evolution(*evolution_args)),
+        "build_total_evolution (froid)": (cold, lambda _: historique.build_total_evolution(*evolution_args)),
+        "build_category_evolution (froid)": (cold, lambda _: historique.build_category_evolution(*evolution_args)),
+        "build_category_evolution (chaud)": (None, lambda _: historique.build_category_evolution(*evolution_args)),
+        "build_asset_evolution (froid)": (cold, lambda _: historique.build_asset_evolution(*evolution_args)),
+        "build_net_worth_evolution (froid)": (
+            cold, lambda _: historique.build_net_worth_evolution(*evolution_args, df_emprunts)),
+        "build_property_equity_evolution": (
+            None, lambda _: historique.build_property_equity_evolution(df_assets, df_hist, df_emprunts)),
+        "load_emprunts (froid)": (cold_emprunts, lambda _: load_emprunts()),
+        "load_emprunts (chaud)": (None, lambda _: load_emprunts()),
+        "_build_crd_evolution": (None, lambda _: _build_crd_evolution(df_emprunts)),
+        "fetch_historical_prices (froid)": (
+            fetch_historical_prices.clear, lambda _: fetch_historical_prices(tickers, "max")),
+        "refresh_auto_assets": (provider(), lambda df: refresh_auto_assets(df, CATEGORIES_AUTO), stats),
+        "refresh_auto_assets (latence 2 ms)": (
+            provider(latency=0.002), lambda df: refresh_auto_assets(df, CATEGORIES_AUTO), stats),
+        "refresh_auto_assets (20 % de pannes)": (
+            provider(failure_rate=0.2), lambda df: refresh_auto_assets(df, CATEGORIES_AUTO), stats),
+    }
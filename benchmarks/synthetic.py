@@ -0,0 +1,238 @@
+"""
+synthetic.py
+────────────
+Génération déterministe de portefeuilles synthétiques pour les benchmarks.
+
+Un même (taille, graine) donne toujours les mêmes données : actifs répartis
+sur CATEGORIES_ASSETS, historique (actifs manuels) et positions (actifs cotés)
+quotidiens sur M années, emprunts, et cours de clôture en EUR (jours ouvrés,
+marche aléatoire géométrique) au format pivot date × ticker renvoyé par
+fetch_historical_prices. Les cryptos sont cotées en USD : write_price_directory
+écrit leurs cours en dollars et la paire USDEUR=X pour le fournisseur local.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from constants import CATEGORIES_ASSETS, CATEGORIES_AUTO
+from services.db import db_connection, bump_generation, datetime_to_epoch_days
+
+DEFAULT_SEED = 42
+
+# Ordre de grandeur des montants par catégorie (actifs manuels) et des cours (actifs cotés)
+_MONTANTS = {
+    "Livrets": 10_000.0,
+    "Immobilier": 250_000.0,
+    "Fonds euros": 30_000.0,
+}
+_COURS = {
+    "Actions & Fonds": 100.0,
+    "Crypto": 5_000.0,
+}
+_VOLATILITE = {  # écart-type journalier des rendements
+    "Actions & Fonds": 0.012,
+    "Crypto": 0.04,
+}
+_DEVISES = {
+    "Actions & Fonds": "EUR",
+    "Crypto": "USD",
+}
+
+
+@dataclass(frozen=True)
+class Taille:
+    """Dimensions d'un portefeuille : actifs, années d'historique, emprunts."""
+    actifs: int
+    annees: int
+    emprunts: int
+
+
+ECHELLES = {
+    "petite":  Taille(actifs=20,  annees=1,  emprunts=1),
+    "moyenne": Taille(actifs=100, annees=5,  emprunts=3),
+    "grande":  Taille(actifs=500, annees=10, emprunts=5),
+}
+
+
+def generate_portfolio(taille: Taille, seed: int = DEFAULT_SEED, end: date | None = None) -> dict:
+    """
+    Construit un portefeuille synthétique.
+    Retourne un dict de DataFrames :
+        assets     → colonnes de load_assets (plus le détail immobilier)
+        historique → asset_id | date | montant   (un relevé par jour et actif manuel)
+        positions  → asset_id | date | quantite  (un relevé par jour et actif coté)
+        prices     → pivot date × ticker (jours ouvrés, en EUR)
+        emprunts   → nom | montant_emprunte | taux_annuel | mensualite | duree_mois | date_debut
+        devises    → { ticker: devise de cotation }
+        fx         → pivot date × paire (USDEUR=X), taux vers l'EUR
+    `end` fixe le dernier jour (aujourd'hui par défaut) ; à `end` égal, le résultat est identique.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or date.today()).normalize()
+    start = end - pd.DateOffset(years=taille.annees) + pd.Timedelta(days=1)
+    days = pd.date_range(start, end, freq="D").as_unit("ns")  # même résolution que les dates lues en base
+    business_days = pd.bdate_range(start, end).as_unit("ns")
+
+    assets = _generate_assets(rng, taille.actifs)
+    emprunts = _generate_emprunts(rng, taille.emprunts, end)
+    _link_properties(assets, emprunts)
+
+    auto = assets[assets["categorie"].isin(CATEGORIES_AUTO)]
+    manual = assets[~assets["categorie"].isin(CATEGORIES_AUTO)]
+
+    prices = pd.DataFrame(
+        {row.ticker: _random_walk(rng, _COURS[row.categorie], _VOLATILITE[row.categorie], len(business_days))
+         for row in auto.itertuples()},
+        index=business_days,
+    ).round(4)
+
+    historique = _daily_series(
+        rng, manual["id"], days, manual["montant"].to_numpy(), volatility=0.002, column="montant", decimals=2,
+    )
+    # Quantités : achats progressifs, une variation un jour sur vingt environ
+    positions = _daily_series(
+        rng, auto["id"], days, auto["quantite"].to_numpy(), volatility=0.02, column="quantite", decimals=6,
+        step_probability=0.05,
+    )
+
+    last_prices = prices.iloc[-1] if not prices.empty else pd.Series(dtype=float)
+    is_auto = assets["categorie"].isin(CATEGORIES_AUTO)
+    assets.loc[is_auto, "montant"] = (assets.loc[is_auto, "ticker"].map(last_prices) * assets.loc[is_auto, "quantite"]).round(2)
+
+    fx = pd.DataFrame({"USDEUR=X": _random_walk(rng, 0.92, 0.004, len(business_days))}, index=business_days).round(6)
+
+    return {
+        "assets": assets,
+        "historique": historique,
+        "positions": positions,
+        "prices": prices,
+        "emprunts": emprunts,
+        "devises": dict(zip(auto["ticker"], auto["categorie"].map(_DEVISES))),
+        "fx": fx,
+    }
+
+
+def _generate_assets(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    """N actifs, catégories tirées en rotation pour que chacune soit représentée."""
+    categories = [CATEGORIES_ASSETS[i % len(CATEGORIES_ASSETS)] for i in range(n)]
+    rows = []
+    for i, categorie in enumerate(categories):
+        auto = categorie in CATEGORIES_AUTO
+        cours = _COURS.get(categorie, 0.0)
+        quantite = round(float(rng.uniform(1, 50) * (100.0 / cours if auto else 0.0)), 6)
+        rows.append({
+            "id": f"bench-{i:05d}",
+            "nom": f"{categorie} {i:05d}",
+            "categorie": categorie,
+            "montant": round(float(_MONTANTS.get(categorie, 0.0) * rng.uniform(0.5, 1.5)), 2),
+            "ticker": f"SYN{i:05d}" if auto else "",
+            "quantite": quantite,
+            "pru": round(float(cours * rng.uniform(0.6, 1.1)), 4) if auto else 0.0,
+            "contrat_id": "",
+        })
+    df = pd.DataFrame(rows)
+    immo = df["categorie"] == "Immobilier"
+    df["prix_achat"] = np.where(immo, (df["montant"] * 0.8).round(2), np.nan)
+    df["type_bien"] = np.where(immo, "appartement", None)
+    df["usage"] = np.where(immo, "locatif", None)
+    df["loyer_mensuel"] = np.where(immo, (df["montant"] * 0.004).round(0), np.nan)
+    df["emprunt_id"] = None
+    return df
+
+
+def _generate_emprunts(rng: np.random.Generator, n: int, end: pd.Timestamp) -> pd.DataFrame:
+    rows = []
+    for i in range(n):
+        montant = round(float(rng.uniform(50_000, 300_000)), 2)
+        taux = round(float(rng.uniform(0.8, 4.5)), 2)
+        duree = int(rng.choice([180, 240, 300]))
+        r = taux / 100 / 12
+        mensualite = round(montant * r / (1 - (1 + r) ** -duree), 2)
+        debut = end - pd.DateOffset(months=int(rng.integers(0, 120)))
+        rows.append({
+            "nom": f"Emprunt {i:03d}",
+            "montant_emprunte": montant,
+            "taux_annuel": taux,
+            "mensualite": mensualite,
+            "duree_mois": duree,
+            "date_debut": debut.replace(day=1).strftime("%Y-%m-%d"),
+        })
+    return pd.DataFrame(rows, columns=["nom", "montant_emprunte", "taux_annuel", "mensualite", "duree_mois", "date_debut"])
+
+
+def _link_properties(assets: pd.DataFrame, emprunts: pd.DataFrame) -> None:
+    """Chaque emprunt finance un bien (dans l'ordre), lien résolu après insertion (seed_database)."""
+    immo = assets.index[assets["categorie"] == "Immobilier"]
+    for idx, numero in zip(immo, range(len(emprunts))):
+        assets.at[idx, "emprunt_id"] = numero
+
+
+def _random_walk(rng: np.random.Generator, start: float, volatility: float, n: int) -> np.ndarray:
+    returns = rng.normal(0.0002, volatility, n)
+    return start * np.exp(np.cumsum(returns))
+
+
+def _daily_series(rng: np.random.Generator, asset_ids: pd.Series, days: pd.DatetimeIndex, last_values: np.ndarray,
+                  volatility: float, column: str, decimals: int, step_probability: float = 1.0) -> pd.DataFrame:
+    """
+    Un relevé par jour et par actif, finissant à la valeur courante de l'actif.
+    Les variations (multiplicatives) n'ont lieu qu'avec la probabilité step_probability.
+    """
+    n_assets, n_days = len(asset_ids), len(days)
+    if n_assets == 0 or n_days == 0:
+        return pd.DataFrame(columns=["asset_id", "date", column])
+    steps = rng.normal(0.0003, volatility, (n_assets, n_days))
+    steps *= rng.random((n_assets, n_days)) < step_probability
+    # Cumul inversé : le dernier jour vaut exactement last_values
+    growth = np.exp(np.cumsum(steps[:, ::-1], axis=1)[:, ::-1] - steps)
+    values = np.round(np.asarray(last_values, dtype=float)[:, None] / growth, decimals)
+    return pd.DataFrame({
+        "asset_id": np.repeat(asset_ids.to_numpy(dtype=object), n_days),
+        "date": np.tile(days.to_numpy(), n_assets),
+        column: values.ravel(),
+    })
+
+
+# ── Écriture en base ──────────────────────────────────────────────────────────
+
+def seed_database(portfolio: dict) -> pd.DataFrame:
+    """
+    Écrit le portefeuille dans la base courante (initialisée et vide) :
+    emprunts, actifs (save_assets), historique et positions en executemany.
+    Retourne le DataFrame d'actifs tel qu'enregistré (emprunt_id résolus).
+    """
+    from services.db_actifs import save_assets
+    from services.db_emprunts import create_emprunt
+
+    emprunt_ids = [create_emprunt(**row) for row in portfolio["emprunts"].to_dict("records")]
+    assets = portfolio["assets"].copy()
+    assets["emprunt_id"] = assets["emprunt_id"].map(lambda n: emprunt_ids[int(n)] if pd.notna(n) else None)
+    save_assets(assets)
+
+    for table, column in (("historique", "montant"), ("positions", "quantite")):
+        df = portfolio[table]
+        rows = zip(df["asset_id"], datetime_to_epoch_days(df["date"]).tolist(), df[column].tolist())
+        with db_connection() as conn:
+            conn.executemany(f"INSERT INTO {table} (asset_id, date, {column}) VALUES (?, ?, ?)", rows)
+        bump_generation(table)
+    return assets
+
+
+def write_price_directory(portfolio: dict, directory: str) -> None:
+    """
+    Écrit les cours du portefeuille dans un dossier lisible par LocalPriceProvider :
+    chaque ticker dans sa devise de cotation, plus les paires de change vers l'EUR.
+    """
+    from services.price_providers import write_price_files
+
+    fx = portfolio["fx"]
+    closes = portfolio["prices"].copy()
+    for ticker, devise in portfolio["devises"].items():
+        if devise != "EUR":
+            closes[ticker] = (closes[ticker] / fx[f"{devise}EUR=X"]).round(4)
+    meta = {ticker: {"currency": devise, "longName": ticker} for ticker, devise in portfolio["devises"].items()}
+    meta.update({pair: {"currency": "EUR", "longName": pair} for pair in fx.columns})
+    write_price_files(directory, pd.concat([closes, fx], axis=1), meta)
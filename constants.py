@@ -22,6 +22,20 @@ ENVELOPPES = [
     "Compte courant",
 ]
 
+# Catégories que chaque enveloppe peut détenir (contraintes du rééquilibrage).
+# Un actif sans contrat peut être de n'importe quelle catégorie.
+ENVELOPPE_CATEGORIES = {
+    "PEA":                      {"Actions & Fonds"},
+    "CTO":                      {"Actions & Fonds"},
+    "Assurance vie":            {"Actions & Fonds", "Fonds euros"},
+    "Livret réglementé":        {"Livrets"},
+    "Crypto (wallet/exchange)": {"Crypto"},
+    "Compte courant":           {"Livrets"},
+}
+
+# Catégories exclues du rééquilibrage (ni achetables ni vendables par fractions)
+CATEGORIES_NON_REEQUILIBRABLES = {"Immobilier"}
+
 # Types de biens immobiliers (pour le détail immobilier)
 TYPE_BIEN_OPTIONS = {
     "appartement": "Appartement",
@@ -32,6 +46,13 @@ TYPE_BIEN_OPTIONS = {
     "autre": "Autre"
 }
 
+# Événements d'emprunt (table emprunt_evenements)
+EVENEMENT_EMPRUNT_TYPES = {
+    "remboursement_anticipe": "Remboursement anticipé",
+    "differe": "Différé (intérêts seuls)",
+    "revision_taux": "Révision de taux",
+}
+
 # Couleur fixe par catégorie
 CATEGORY_COLOR_MAP = {
     "Actions & Fonds": "#85357d",
@@ -62,19 +83,74 @@ PLOTLY_LAYOUT = dict(
     hovermode=False,
 )
 
+# Graphiques interactifs (zoom, survol et période choisis dans le navigateur)
+CHART_MAX_POINTS = 2000        # points envoyés par courbe, au-delà la série est réduite (LTTB)
+CHART_WEBGL_MIN_POINTS = 500   # à partir de ce nombre de points, tracé WebGL (Scattergl)
+
 # ── Chemins des fichiers de données ──────────────────────────────────────────
 
 DB_PATH = "data/patrimoine.db"
 
-# Chemins CSV (utilisés par le script de migration uniquement)
+# Chemins CSV (anciens exports, sources par défaut de l'import en masse)
 DATA_PATH       = "data/patrimoine.csv"
 HISTORIQUE_PATH = "data/historique.csv"
 POSITIONS_PATH  = "data/positions.csv"
 
+# Nombre de lignes lues et écrites par transaction lors d'un import en masse
+IMPORT_CHUNK_SIZE = 5000
+
+# ── Sauvegardes de la base ────────────────────────────────────────────────────
+
+BACKUP_DIRNAME        = "backups"   # sous-dossier du dossier de la base
+BACKUP_RETENTION      = 10          # nombre de snapshots conservés
+BACKUP_INTERVAL_HOURS = 24          # snapshot automatique au plus une fois par période
+BACKUP_PAGES_PER_STEP = 256         # pages copiées avant de rendre la main aux autres connexions
+BACKUP_STEP_SLEEP_SECONDS = 0.005
+
+# ── Profilage du rendu ────────────────────────────────────────────────────────
+
+PROFILER_FILENAME = "profils_rendu.json"  # dans le dossier de la base
+PROFILER_RUNS     = 20                    # exécutions conservées (mémoire et fichier)
+
+# ── Projection Monte Carlo ────────────────────────────────────────────────────
+
+PROJECTION_HORIZONS      = (5, 10, 15, 20, 25, 30)  # années proposées dans la Synthèse
+PROJECTION_HORIZON_DEFAULT = 20
+PROJECTION_PATHS         = 100_000   # trajectoires simulées
+PROJECTION_CHUNK_PATHS   = 10_000    # trajectoires par tâche du pool de processus
+PROJECTION_PERCENTILES   = (5, 25, 50, 75, 95)
+PROJECTION_SEED          = 42
+PROJECTION_HISTORY_PERIOD = "max"    # historique yfinance utilisé pour le tirage des rendements
+PROJECTION_MIN_MONTHS    = 12        # rendements mensuels minimum pour simuler un ticker
+PROJECTION_TAUX_EPARGNE_DEFAUT = 10.0  # % du revenu mensuel net épargné chaque mois
+
+# Rendement annuel déterministe des catégories sans cotation
+PROJECTION_TAUX_ANNUELS = {
+    "Livrets":     0.03,
+    "Fonds euros": 0.025,
+    "Immobilier":  0.01,
+}
+
+# ── Rééquilibrage ─────────────────────────────────────────────────────────────
+
+REEQUILIBRAGE_MAX_ITER   = 200     # itérations maximum de l'ajustement proportionnel
+REEQUILIBRAGE_TOLERANCE  = 0.01    # écart (€) toléré sur les totaux cibles
+REEQUILIBRAGE_SEUIL      = 1.0     # mouvements inférieurs (€) ignorés
+
+# ── Liste des actifs ──────────────────────────────────────────────────────────
+
+ACTIFS_PAGE_SIZE = 25  # lignes rendues par page et par catégorie dans l'onglet Actifs
+
 # ── Cache yfinance ────────────────────────────────────────────────────────────
 
 CACHE_TTL_SECONDS = 3 * 3600  # 3 heures
 
+# ── Source des cours (services/price_providers.py) ────────────────────────────
+
+PRIX_LOCAUX_ENV = "PATRIMOINE_PRIX_LOCAUX"  # dossier de cours locaux à utiliser à la place de yfinance
+PRICER_RETRIES = 2                          # nouvelles tentatives d'un téléchargement de cours en erreur
+PRICER_RETRY_DELAY_SECONDS = 0.5            # attente avant la 1re nouvelle tentative, doublée ensuite
+
 # ── Périodes disponibles dans le tab Historique ───────────────────────────────
 # Format : label → (période yfinance, nb jours de filtre — None = pas de filtre)
 
@@ -1,5 +1,7 @@
 -- Schéma SQLite — Suivi de patrimoine
 -- Exécutable avec: sqlite3 data/patrimoine.db < schema/schema.sql
+-- Reflète la dernière version du schéma (services/db.py::SCHEMA_VERSION) :
+-- toute modification doit aussi faire l'objet d'une migration numérotée.
 
 -- =============================================================================
 -- CONTRATS (établissement + enveloppe)
@@ -13,6 +15,28 @@ CREATE TABLE IF NOT EXISTS contrats (
 );
 
 
+-- =============================================================================
+-- ALLOCATIONS CIBLES (rééquilibrage, cf. services/allocation.py)
+-- type = 'categorie' (cle = catégorie) ou 'contrat' (cle = contrats.id)
+-- poids = % de la partie rééquilibrable du patrimoine
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS allocations_cibles (
+  type TEXT NOT NULL CHECK(type IN ('categorie', 'contrat')),
+  cle TEXT NOT NULL,
+  poids REAL NOT NULL CHECK(poids >= 0),
+  PRIMARY KEY (type, cle)
+);
+
+
+-- =============================================================================
+-- PARAMETRES (clé/valeur : revenu mensuel net, préférences…)
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS parametres (
+  cle TEXT PRIMARY KEY,
+  valeur TEXT NOT NULL
+);
+
+
 -- =============================================================================
 -- ACTIFS (table centrale)
 -- =============================================================================
@@ -57,6 +81,29 @@ CREATE TABLE IF NOT EXISTS emprunts (
 );
 
 
+-- =============================================================================
+-- Événements d'emprunt (modifient l'échéancier à partir de leur date)
+--   remboursement_anticipe : montant = capital remboursé,
+--                            mensualite = nouvelle mensualité (NULL = inchangée, durée réduite)
+--   differe               : duree_mois = mois d'intérêts seuls (la fin du prêt est décalée)
+--   revision_taux         : taux_annuel = nouveau taux,
+--                            mensualite = nouvelle mensualité (NULL = recalculée sur la durée restante)
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS emprunt_evenements (
+  id TEXT PRIMARY KEY,
+  emprunt_id TEXT NOT NULL REFERENCES emprunts(id) ON DELETE CASCADE,
+  type TEXT NOT NULL CHECK(type IN ('remboursement_anticipe', 'differe', 'revision_taux')),
+  date TEXT NOT NULL,
+  montant REAL,
+  duree_mois INTEGER,
+  taux_annuel REAL,
+  mensualite REAL,
+  created_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_emprunt_evenements_emprunt ON emprunt_evenements(emprunt_id, date);
+
+
 -- =============================================================================
 -- Détail des actifs immobiliers
 -- =============================================================================
@@ -68,7 +115,7 @@ CREATE TABLE IF NOT EXISTS actifs_immobilier (
   type_bien TEXT NOT NULL,
   adresse TEXT,
   superficie_m2 REAL,
-  notes TEXT
+  notes TEXT,
   frais_notaire REAL DEFAULT 0,
   montant_travaux REAL DEFAULT 0,
   usage TEXT DEFAULT 'locatif' CHECK(usage IN ('residence_principale', 'locatif')),
@@ -82,27 +129,150 @@ CREATE INDEX IF NOT EXISTS idx_actifs_immobilier_emprunt ON actifs_immobilier(em
 
 -- =============================================================================
 -- HISTORIQUE (valeurs passées par actif)
+-- date = nombre de jours depuis le 1970-01-01 ; lignes groupées par actif
 -- =============================================================================
 CREATE TABLE IF NOT EXISTS historique (
   asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
-  date TEXT NOT NULL,
+  date INTEGER NOT NULL,
   montant REAL NOT NULL,
   PRIMARY KEY (asset_id, date)
-);
-
-CREATE INDEX IF NOT EXISTS idx_historique_date ON historique(date);
-CREATE INDEX IF NOT EXISTS idx_historique_asset ON historique(asset_id);
+) WITHOUT ROWID;
 
 
 -- =============================================================================
 -- POSITIONS (quantités passées pour actifs ticker)
+-- date = nombre de jours depuis le 1970-01-01 ; lignes groupées par actif
+-- prix_unitaire = prix du mouvement à cette date (achat ou vente), NULL si inconnu
 -- =============================================================================
 CREATE TABLE IF NOT EXISTS positions (
   asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
-  date TEXT NOT NULL,
+  date INTEGER NOT NULL,
   quantite REAL NOT NULL,
+  prix_unitaire REAL,
   PRIMARY KEY (asset_id, date)
+) WITHOUT ROWID;
+
+-- =============================================================================
+-- LOTS FIFO (dérivés de la chronologie des positions, cf. services/lots.py)
+-- Une hausse de quantité ouvre un lot ; une baisse consomme les lots les plus
+-- anciens et enregistre une cession par lot touché.
+-- date = nombre de jours depuis le 1970-01-01
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS lots (
+  id INTEGER PRIMARY KEY,
+  asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
+  date INTEGER NOT NULL,
+  quantite REAL NOT NULL,
+  quantite_restante REAL NOT NULL,
+  prix_unitaire REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_lots_asset ON lots(asset_id, date, id);
+
+CREATE TABLE IF NOT EXISTS cessions (
+  id INTEGER PRIMARY KEY,
+  asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
+  lot_id INTEGER NOT NULL REFERENCES lots(id) ON DELETE CASCADE,
+  date INTEGER NOT NULL,
+  quantite REAL NOT NULL,
+  prix_achat REAL NOT NULL,
+  prix_vente REAL NOT NULL,
+  plus_value REAL NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_positions_date ON positions(date);
-CREATE INDEX IF NOT EXISTS idx_positions_asset ON positions(asset_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_cessions_asset ON cessions(asset_id, date);
+
+
+-- =============================================================================
+-- AGRÉGATS DES ACTIFS (totaux de la Synthèse, cf. services/db_actifs.py)
+-- Par (type, contrat) : nombre d'actifs, montant, et pour ceux qui ont un coût
+-- d'acquisition (quantite > 0 et pru > 0) leur montant (montant_cote) et ce coût.
+-- contrat_id = '' pour les actifs sans contrat.
+-- Tenue à jour ligne à ligne par les triggers ci-dessous.
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS agregats_actifs (
+  type TEXT NOT NULL,
+  contrat_id TEXT NOT NULL DEFAULT '',
+  nb INTEGER NOT NULL DEFAULT 0,
+  montant REAL NOT NULL DEFAULT 0,
+  montant_cote REAL NOT NULL DEFAULT 0,
+  valeur_achat REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (type, contrat_id)
+) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS actifs_ticker_cout AS
+SELECT actif_id,
+       quantite > 0 AND pru > 0 AS cote,
+       CASE WHEN quantite > 0 AND pru > 0 THEN quantite * pru ELSE 0 END AS valeur_achat
+FROM actifs_ticker;
+
+CREATE TRIGGER IF NOT EXISTS agregats_actifs_insert AFTER INSERT ON actifs
+BEGIN
+  INSERT INTO agregats_actifs (type, contrat_id, nb, montant)
+  VALUES (NEW.type, COALESCE(NEW.contrat_id, ''), 1, NEW.montant_actuel)
+  ON CONFLICT(type, contrat_id) DO UPDATE SET nb = nb + 1, montant = montant + excluded.montant;
+END;
+
+-- BEFORE : la ligne actifs_ticker, supprimée ensuite en cascade, donne encore le coût
+CREATE TRIGGER IF NOT EXISTS agregats_actifs_delete BEFORE DELETE ON actifs
+BEGIN
+  UPDATE agregats_actifs SET
+    nb = nb - 1,
+    montant = montant - OLD.montant_actuel,
+    montant_cote = montant_cote - OLD.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0),
+    valeur_achat = valeur_achat - COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0)
+  WHERE type = OLD.type AND contrat_id = COALESCE(OLD.contrat_id, '');
+  DELETE FROM agregats_actifs WHERE nb <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS agregats_actifs_update AFTER UPDATE OF type, contrat_id, montant_actuel ON actifs
+WHEN OLD.type IS NOT NEW.type OR OLD.contrat_id IS NOT NEW.contrat_id OR OLD.montant_actuel IS NOT NEW.montant_actuel
+BEGIN
+  UPDATE agregats_actifs SET
+    nb = nb - 1,
+    montant = montant - OLD.montant_actuel,
+    montant_cote = montant_cote - OLD.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0),
+    valeur_achat = valeur_achat - COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0)
+  WHERE type = OLD.type AND contrat_id = COALESCE(OLD.contrat_id, '');
+  INSERT INTO agregats_actifs (type, contrat_id, nb, montant, montant_cote, valeur_achat)
+  VALUES (NEW.type, COALESCE(NEW.contrat_id, ''), 1, NEW.montant_actuel,
+          NEW.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = NEW.id), 0),
+          COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = NEW.id), 0))
+  ON CONFLICT(type, contrat_id) DO UPDATE SET
+    nb = nb + 1,
+    montant = montant + excluded.montant,
+    montant_cote = montant_cote + excluded.montant_cote,
+    valeur_achat = valeur_achat + excluded.valeur_achat;
+  DELETE FROM agregats_actifs WHERE nb <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS agregats_ticker_insert AFTER INSERT ON actifs_ticker
+WHEN NEW.quantite > 0 AND NEW.pru > 0
+BEGIN
+  UPDATE agregats_actifs SET
+    montant_cote = montant_cote + (SELECT montant_actuel FROM actifs WHERE id = NEW.actif_id),
+    valeur_achat = valeur_achat + NEW.quantite * NEW.pru
+  WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = NEW.actif_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS agregats_ticker_update AFTER UPDATE OF quantite, pru ON actifs_ticker
+WHEN OLD.quantite IS NOT NEW.quantite OR OLD.pru IS NOT NEW.pru
+BEGIN
+  UPDATE agregats_actifs SET
+    montant_cote = montant_cote + (SELECT montant_actuel FROM actifs WHERE id = NEW.actif_id)
+                   * ((NEW.quantite > 0 AND NEW.pru > 0) - (OLD.quantite > 0 AND OLD.pru > 0)),
+    valeur_achat = valeur_achat
+                   + CASE WHEN NEW.quantite > 0 AND NEW.pru > 0 THEN NEW.quantite * NEW.pru ELSE 0 END
+                   - CASE WHEN OLD.quantite > 0 AND OLD.pru > 0 THEN OLD.quantite * OLD.pru ELSE 0 END
+  WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = NEW.actif_id);
+END;
+
+-- Après la suppression d'un actif, la cascade ne trouve plus le parent : rien à retirer
+CREATE TRIGGER IF NOT EXISTS agregats_ticker_delete AFTER DELETE ON actifs_ticker
+WHEN OLD.quantite > 0 AND OLD.pru > 0
+BEGIN
+  UPDATE agregats_actifs SET
+    montant_cote = montant_cote - (SELECT montant_actuel FROM actifs WHERE id = OLD.actif_id),
+    valeur_achat = valeur_achat - OLD.quantite * OLD.pru
+  WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = OLD.actif_id);
+END;
@@ -0,0 +1,162 @@
+"""
+allocation.py
+─────────────
+Rééquilibrage vers une allocation cible.
+
+Le patrimoine rééquilibrable (hors CATEGORIES_NON_REEQUILIBRABLES) est vu comme
+une matrice contrat × catégorie. Une case n'est autorisée que si l'enveloppe du
+contrat peut détenir la catégorie (ENVELOPPE_CATEGORIES : un PEA ne détient pas
+de fonds euros) ; une case déjà détenue reste autorisée.
+
+Totaux visés :
+    - par catégorie : poids cibles × (patrimoine rééquilibrable + apport)
+    - par contrat   : poids cible du contrat s'il est fixé ; sinon le reste est
+                      partagé entre les contrats au prorata de leur montant actuel
+
+La répartition proposée est obtenue par ajustement proportionnel itératif
+(IPF) à partir des montants actuels : lignes puis colonnes sont remises à
+l'échelle jusqu'à atteindre les deux jeux de totaux. C'est la répartition la
+plus proche de l'existante (au sens de l'entropie relative) : la composition de
+chaque contrat est conservée autant que possible, ce qui limite les mouvements.
+Chaque itération est une opération vectorisée sur une petite matrice : le
+calcul est instantané et peut suivre le déplacement des curseurs.
+"""
+
+import numpy as np
+import pandas as pd
+
+from constants import (
+    CATEGORIES_ASSETS, CATEGORIES_NON_REEQUILIBRABLES, ENVELOPPE_CATEGORIES,
+    REEQUILIBRAGE_MAX_ITER, REEQUILIBRAGE_TOLERANCE, REEQUILIBRAGE_SEUIL,
+)
+
+HORS_CONTRAT = ""
+
+
+def rebalancing_categories() -> list[str]:
+    """Catégories concernées par le rééquilibrage, dans l'ordre d'affichage."""
+    return [c for c in CATEGORIES_ASSETS if c not in CATEGORIES_NON_REEQUILIBRABLES]
+
+
+# ── Matrice des montants ──────────────────────────────────────────────────────
+
+def holdings_matrix(df_assets: pd.DataFrame, df_contrats: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (montants, cases autorisées) : DataFrames contrat_id × catégorie.
+    Les lignes sont les contrats existants, plus HORS_CONTRAT si des actifs n'ont pas de contrat.
+    """
+    categories = rebalancing_categories()
+    df = df_assets[df_assets["categorie"].isin(categories)]
+    contrat = df["contrat_id"].fillna(HORS_CONTRAT).astype(str).str.strip()
+
+    rows = list(df_contrats["id"]) if not df_contrats.empty else []
+    rows += sorted(set(contrat) - set(rows))
+
+    montants = (
+        pd.DataFrame({"contrat_id": contrat, "categorie": df["categorie"], "montant": df["montant"].astype(float)})
+        .pivot_table(index="contrat_id", columns="categorie", values="montant", aggfunc="sum")
+        .reindex(index=rows, columns=categories)
+        .fillna(0.0)
+    )
+
+    enveloppes = df_contrats.set_index("id")["enveloppe"] if not df_contrats.empty else pd.Series(dtype=str)
+    # Hors contrat ou enveloppe sans contrainte connue : toutes les catégories
+    permises = [ENVELOPPE_CATEGORIES.get(enveloppes.get(r), set(categories)) for r in rows]
+    allowed = np.array([[c in p for c in categories] for p in permises], dtype=bool).reshape(len(rows), len(categories))
+    allowed |= montants.to_numpy() > 0
+    return montants, pd.DataFrame(allowed, index=montants.index, columns=categories)
+
+
+# ── Ajustement proportionnel itératif ─────────────────────────────────────────
+
+def solve_allocation(current: np.ndarray, allowed: np.ndarray, row_totals: np.ndarray, col_totals: np.ndarray,
+                     max_iter: int = REEQUILIBRAGE_MAX_ITER,
+                     tol: float = REEQUILIBRAGE_TOLERANCE) -> tuple[np.ndarray, bool]:
+    """
+    Répartition ≥ 0, nulle hors des cases autorisées, de totaux row_totals (lignes)
+    et col_totals (colonnes). Retourne (répartition, convergé).
+    Sans solution (contraintes incompatibles), la dernière itération est renvoyée
+    avec convergé = False : les totaux par catégorie sont respectés, pas ceux par contrat.
+    """
+    total = max(float(col_totals.sum()), 1.0)
+    # Une case autorisée mais vide doit pouvoir être remplie : graine minime
+    y = np.where(allowed, current + total * 1e-6, 0.0)
+
+    for _ in range(max_iter):
+        sums = y.sum(axis=1)
+        y *= np.divide(row_totals, sums, out=np.zeros_like(sums), where=sums > 0)[:, None]
+        sums = y.sum(axis=0)
+        y *= np.divide(col_totals, sums, out=np.zeros_like(sums), where=sums > 0)[None, :]
+        if np.abs(y.sum(axis=1) - row_totals).max(initial=0.0) <= tol:
+            return y, True
+    return y, False
+
+
+# ── Point d'entrée public ─────────────────────────────────────────────────────
+
+def propose_rebalancing(
+    df_assets: pd.DataFrame,
+    df_contrats: pd.DataFrame,
+    cibles_categories: dict[str, float],
+    cibles_contrats: dict[str, float] | None = None,
+    apport: float = 0.0,
+) -> dict:
+    """
+    Propose les achats / ventes pour atteindre les poids cibles (en %).
+
+    cibles_categories : { catégorie: poids } — normalisés si leur somme n'est pas 100
+    cibles_contrats   : { contrat_id: poids } — part du total visée pour ces contrats
+    apport            : somme nouvelle à investir (s'ajoute au total)
+
+    Retourne un dict :
+        mouvements    : DataFrame contrat_id | categorie | actuel | cible | mouvement
+                        (mouvement > 0 = achat, < 0 = vente ; |mouvement| ≥ REEQUILIBRAGE_SEUIL)
+        par_categorie : DataFrame categorie | actuel | cible | propose
+        total         : total après rééquilibrage
+        converge      : False si les contraintes des contrats ne permettent pas d'atteindre les cibles
+    """
+    montants, allowed = holdings_matrix(df_assets, df_contrats)
+    categories = list(montants.columns)
+    current = montants.to_numpy()
+    total = float(current.sum()) + float(apport)
+
+    poids = np.array([max(float(cibles_categories.get(c, 0.0)), 0.0) for c in categories])
+    if poids.sum() == 0:
+        # Aucune cible : les poids actuels sont conservés (seul l'apport est réparti)
+        poids = current.sum(axis=0)
+    col_totals = poids / poids.sum() * total if poids.sum() > 0 else np.zeros(len(categories))
+    row_totals = _row_totals(montants, cibles_contrats or {}, total)
+
+    proposed, converge = solve_allocation(current, allowed.to_numpy(), row_totals, col_totals)
+
+    mouvements = pd.DataFrame({
+        "contrat_id": np.repeat(montants.index.to_numpy(), len(categories)),
+        "categorie": np.tile(categories, len(montants)),
+        "actuel": current.ravel(),
+        "cible": proposed.ravel(),
+    })
+    mouvements["mouvement"] = mouvements["cible"] - mouvements["actuel"]
+    mouvements = mouvements[mouvements["mouvement"].abs() >= REEQUILIBRAGE_SEUIL].reset_index(drop=True)
+
+    par_categorie = pd.DataFrame({
+        "categorie": categories,
+        "actuel": current.sum(axis=0),
+        "cible": col_totals,
+        "propose": proposed.sum(axis=0),
+    })
+    return {"mouvements": mouvements, "par_categorie": par_categorie, "total": total, "converge": converge}
+
+
+def _row_totals(montants: pd.DataFrame, cibles_contrats: dict[str, float], total: float) -> np.ndarray:
+    """Total visé par contrat : cible fixée, sinon part du reste au prorata du montant actuel."""
+    fixes = np.array([cibles_contrats.get(c) for c in montants.index], dtype=float)  # NaN si pas de cible
+    is_fixed = ~np.isnan(fixes)
+    rows = np.where(is_fixed, fixes / 100 * total, 0.0)
+
+    reste = max(total - rows.sum(), 0.0)
+    libres = montants.to_numpy().sum(axis=1) * ~is_fixed
+    if libres.sum() > 0:
+        rows += reste * libres / libres.sum()
+    elif (~is_fixed).any():
+        rows += reste * ~is_fixed / (~is_fixed).sum()
+    return rows
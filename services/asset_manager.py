@@ -8,6 +8,9 @@ et retourne un tuple (df_mis_à_jour, message, type_message).
 L'UI (app.py) ne fait qu'appeler ces fonctions et afficher le résultat —
 elle ne contient plus aucune logique métier.
 
+Chaque écriture évince elle-même les caches qui en dépendent, limités aux
+tables et à l'actif touchés (services/cache_deps.py) : l'UI n'a rien à vider.
+
 Types de message : "success" | "warning" | "error"
 """
 
@@ -15,9 +18,10 @@ import pandas as pd
 from datetime import datetime
 from services.assets import add_asset, update_asset, delete_asset
 from services.historique import record_montant, delete_asset_history
-from services.positions import record_position, delete_asset_positions
-from services.pricer import get_name, refresh_auto_assets, validate_ticker
+from services.positions import get_position_before, record_position, delete_asset_positions
+from services.pricer import get_name, get_price_at, refresh_auto_assets, validate_ticker
 from services.db_actifs import save_assets
+from services.cache_deps import invalidate
 from constants import CATEGORIES_AUTO
 
 
@@ -39,9 +43,10 @@ def create_auto_asset(
     df = add_asset(df, nom, categorie, montant=0.0, ticker=ticker, quantite=quantite, pru=pru,
                    contrat_id=contrat_id)
     asset_id = df.iloc[-1]["id"]
-    record_position(asset_id, quantite)
+    record_position(asset_id, quantite, prix_unitaire=pru if pru > 0 else None)
     df, errors = refresh_auto_assets(df, CATEGORIES_AUTO)
     save_assets(df)
+    invalidate("actifs", "positions", asset_ids=[asset_id])
 
     if errors:
         return df, f"Actif ajouté ({nom}), mais ticker introuvable : {', '.join(errors)}", "warning"
@@ -71,6 +76,7 @@ def create_manual_asset(
         record_date = datetime.strptime(immo_params["date_achat"], "%Y-%m-%d").date()
     
     record_montant(asset_id, montant, record_date)
+    invalidate("actifs", "historique", asset_ids=[asset_id])
 
     return df, "Actif ajouté", "success"
 
@@ -95,13 +101,17 @@ def edit_auto_asset(
 
     nom = get_name(ticker) if ticker != ticker_current else df.loc[idx, "nom"]
     montant = float(df.loc[idx, "montant"])
+    prix = _prix_mouvement(df.loc[idx], quantite, pru)
 
     df = update_asset(df, idx, nom, categorie, montant, ticker, quantite, pru,
                       contrat_id=contrat_id)
+    touched = ["actifs"]
     if quantite != quantite_current:
-        record_position(asset_id, quantite)
+        record_position(asset_id, quantite, prix_unitaire=prix)
+        touched.append("positions")
     df, errors = refresh_auto_assets(df, CATEGORIES_AUTO)
     save_assets(df)
+    invalidate(*touched, asset_ids=[asset_id])
 
     if errors:
         return df, f"Actif modifié, mais ticker introuvable : {', '.join(errors)}", "warning"
@@ -134,6 +144,7 @@ def edit_manual_asset(
             df.loc[idx, k] = v
     
     # Mettre à jour l'historique si le montant change OU si la date d'achat change (pour l'immobilier)
+    touched = ["actifs"]
     if montant != montant_actuel or date_achat_changee:
         # Utiliser la date d'achat pour l'historique si disponible
         record_date = None
@@ -141,8 +152,10 @@ def edit_manual_asset(
             record_date = datetime.strptime(immo_params["date_achat"], "%Y-%m-%d").date()
         
         record_montant(asset_id, montant, record_date)
+        touched.append("historique")
 
     save_assets(df)
+    invalidate(*touched, asset_ids=[asset_id])
 
     return df, "Actif modifié", "success"
 
@@ -158,6 +171,7 @@ def remove_asset(
     delete_asset_positions(asset_id)
     df = delete_asset(df, idx)
     save_assets(df)
+    invalidate("actifs", "historique", "positions", asset_ids=[asset_id])
 
     return df, "Actif supprimé", "success"
 
@@ -167,6 +181,7 @@ def remove_asset(
 def refresh_prices(df: pd.DataFrame) -> tuple[pd.DataFrame, str, str]:
     df, errors = refresh_auto_assets(df, CATEGORIES_AUTO)
     save_assets(df)
+    invalidate("actifs")
 
     if errors:
         return df, f"Tickers introuvables : {', '.join(errors)}", "warning"
@@ -203,12 +218,14 @@ def update_at_date(
         if quantite is None or pru is None:
             return df, "Quantité et PRU requis.", "error"
 
-        record_position(asset_id, quantite, op_date)
+        prix = _prix_mouvement(df.loc[idx], quantite, pru, op_date)
+        record_position(asset_id, quantite, op_date, prix_unitaire=prix)
         df.loc[idx, "quantite"] = quantite
         df.loc[idx, "pru"] = pru
 
         df, errors = refresh_auto_assets(df, CATEGORIES_AUTO)
         save_assets(df)
+        invalidate("actifs", "positions", asset_ids=[asset_id])
 
         if errors:
             return df, f"Mise à jour enregistrée, mais prix introuvable : {', '.join(errors)}", "warning"
@@ -221,4 +238,40 @@ def update_at_date(
         record_montant(asset_id, montant, op_date)
         df.loc[idx, "montant"] = montant
         save_assets(df)
-        return df, "Mise à jour enregistrée", "success"
\ No newline at end of file
+        invalidate("actifs", "historique", asset_ids=[asset_id])
+        return df, "Mise à jour enregistrée", "success"
+
+
+# ── Prix des mouvements (lots FIFO) ───────────────────────────────────────────
+
+def _prix_mouvement(row: pd.Series, quantite: float, pru: float, op_date=None) -> float | None:
+    """
+    Prix unitaire du passage à `quantite`, depuis la quantité de `row` ou, pour
+    un mouvement daté (op_date), depuis la quantité en vigueur à cette date
+    dans les positions.
+
+    - Achat avec PRU saisi : prix déduit de l'évolution du PRU
+      (pru × quantite − ancien pru × ancienne quantité) / quantité achetée.
+      L'historique du PRU n'étant pas conservé, l'ancien PRU est celui de `row` :
+      pour un mouvement antérieur à d'autres positions, on passe au cours.
+    - Sinon : cours à la date du mouvement (cours actuel de l'actif si aucune date)
+    Retourne None si la quantité ne change pas ou si le prix est introuvable
+    (les lots retiennent alors le PRU).
+    """
+    quantite_avant = float(row.get("quantite") or 0)
+    pru_avant = float(row.get("pru") or 0)
+    pru_connu = True
+    if op_date is not None:
+        quantite_avant, mouvements_apres = get_position_before(row["id"], op_date)
+        pru_connu = not mouvements_apres
+    delta = quantite - quantite_avant
+    if delta == 0:
+        return None
+    if delta > 0 and pru and pru_connu:
+        prix = (pru * quantite - pru_avant * quantite_avant) / delta
+        if prix > 0:
+            return round(prix, 4)
+
+    if op_date is None and quantite_avant > 0 and float(row.get("montant") or 0) > 0:
+        return round(float(row["montant"]) / quantite_avant, 4)
+    return get_price_at(row["ticker"], op_date or datetime.today())
@@ -59,4 +59,43 @@ def compute_by_category(df: pd.DataFrame) -> pd.DataFrame:
     result.columns = ["categorie", "montant"]
     result["pourcentage"] = (result["montant"] / total * 100).round(2)
 
-    return result.sort_values("montant", ascending=False).reset_index(drop=True)
\ No newline at end of file
+    return result.sort_values("montant", ascending=False).reset_index(drop=True)
+
+# ── Totaux depuis les agrégats SQL (repository.get_agregats) ─────────────────
+
+def _with_pnl(grouped: pd.DataFrame) -> pd.DataFrame:
+    """PnL des actifs ayant un coût d'acquisition (NaN sans coût)."""
+    cout = grouped["valeur_achat"].where(grouped["valeur_achat"] > 0)
+    grouped["pnl"] = grouped["montant_cote"] - cout
+    grouped["pnl_pct"] = grouped["pnl"] / cout * 100
+    return grouped
+
+
+def totals_by_category(df_agg: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totaux par catégorie, même forme que compute_by_category complétée du PnL :
+    categorie | montant | pourcentage | valeur_achat | montant_cote | pnl | pnl_pct
+    """
+    columns = ["categorie", "montant", "pourcentage", "valeur_achat", "montant_cote", "pnl", "pnl_pct"]
+    if df_agg.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = df_agg.groupby("categorie")[["montant", "valeur_achat", "montant_cote"]].sum().reset_index()
+    total = grouped["montant"].sum()
+    grouped["pourcentage"] = (grouped["montant"] / total * 100).round(2) if total else 0.0
+    return _with_pnl(grouped)[columns].sort_values("montant", ascending=False).reset_index(drop=True)
+
+
+def totals_by_contrat(df_agg: pd.DataFrame, df_contrats: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totaux par contrat (actifs sans contrat exclus), libellé « établissement — enveloppe » :
+    contrat_id | contrat | montant | valeur_achat | montant_cote | pnl | pnl_pct, par montant décroissant.
+    """
+    columns = ["contrat_id", "contrat", "montant", "valeur_achat", "montant_cote", "pnl", "pnl_pct"]
+    lignes = df_agg[df_agg["contrat_id"] != ""] if not df_agg.empty else df_agg
+    if lignes.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = lignes.groupby("contrat_id")[["montant", "valeur_achat", "montant_cote"]].sum().reset_index()
+    libelles = df_contrats.set_index("id")
+    libelles = libelles["etablissement"] + " — " + libelles["enveloppe"]
+    grouped["contrat"] = grouped["contrat_id"].map(libelles)
+    return _with_pnl(grouped)[columns].sort_values("montant", ascending=False).reset_index(drop=True)
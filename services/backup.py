@@ -0,0 +1,198 @@
+"""
+backup.py
+─────────
+Sauvegardes (snapshots) de la base SQLite.
+
+Les snapshots utilisent l'API de sauvegarde en ligne de SQLite, page par page :
+entre deux blocs de BACKUP_PAGES_PER_STEP pages, le verrou est relâché et les
+autres connexions (rendu Streamlit, écritures) continuent de travailler.
+Le mode compact passe par VACUUM INTO : fichier défragmenté et plus petit,
+mais copié en une seule lecture.
+
+Les fichiers sont rangés dans <dossier de la base>/BACKUP_DIRNAME et seuls les
+BACKUP_RETENTION plus récents sont conservés.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from constants import (
+    BACKUP_DIRNAME, BACKUP_RETENTION, BACKUP_INTERVAL_HOURS,
+    BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_SECONDS,
+)
+from .db import get_conn, get_db_path, init_db, bump_generation
+
+_SNAPSHOT_PREFIX = "patrimoine-"
+_SNAPSHOT_SUFFIX = ".db"
+
+_scheduled_lock = threading.Lock()
+
+
+def get_backup_dir() -> str:
+    return os.path.join(os.path.dirname(get_db_path()) or ".", BACKUP_DIRNAME)
+
+
+# ── Création ──────────────────────────────────────────────────────────────────
+
+def create_snapshot(compact: bool = False, label: str = "") -> str:
+    """
+    Crée un snapshot de la base et applique la rotation.
+    Retourne le chemin du fichier créé.
+    """
+    backup_dir = get_backup_dir()
+    os.makedirs(backup_dir, exist_ok=True)
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    name = _SNAPSHOT_PREFIX + stamp + (f"-{label}" if label else "") + _SNAPSHOT_SUFFIX
+    path = os.path.join(backup_dir, name)
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    src = get_conn()
+    try:
+        if compact:
+            src.execute("VACUUM INTO ?", (tmp_path,))
+        else:
+            dst = sqlite3.connect(tmp_path)
+            try:
+                src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP_SECONDS)
+            finally:
+                dst.close()
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+
+    # Renommage final : un snapshot listé est toujours complet
+    os.replace(tmp_path, path)
+    rotate_snapshots()
+    return path
+
+
+def list_snapshots() -> list[dict]:
+    """Snapshots disponibles, du plus récent au plus ancien : nom, chemin, date, taille."""
+    backup_dir = get_backup_dir()
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(_SNAPSHOT_PREFIX) and name.endswith(_SNAPSHOT_SUFFIX)):
+            continue
+        path = os.path.join(backup_dir, name)
+        stat = os.stat(path)
+        snapshots.append({
+            "nom": name,
+            "chemin": path,
+            "date": datetime.fromtimestamp(stat.st_mtime),
+            "taille": stat.st_size,
+        })
+    return sorted(snapshots, key=lambda s: (s["date"], s["nom"]), reverse=True)
+
+
+def rotate_snapshots(retention: int = BACKUP_RETENTION) -> list[str]:
+    """Supprime les snapshots au-delà des `retention` plus récents. Retourne les fichiers supprimés."""
+    removed = []
+    for snapshot in list_snapshots()[retention:]:
+        os.remove(snapshot["chemin"])
+        removed.append(snapshot["nom"])
+    return removed
+
+
+# ── Planification ─────────────────────────────────────────────────────────────
+
+def is_snapshot_due() -> bool:
+    """Vrai si la base existe et que le dernier snapshot date de plus de BACKUP_INTERVAL_HOURS."""
+    if not os.path.exists(get_db_path()):
+        return False
+    snapshots = list_snapshots()
+    if not snapshots:
+        return True
+    age = datetime.now() - snapshots[0]["date"]
+    return age.total_seconds() >= BACKUP_INTERVAL_HOURS * 3600
+
+
+def schedule_snapshot() -> bool:
+    """
+    Lance un snapshot en arrière-plan s'il est dû (thread démon, sans attendre).
+    Retourne True si un snapshot a été lancé.
+    """
+    if not is_snapshot_due() or _scheduled_lock.locked():
+        return False
+    thread = threading.Thread(target=_run_scheduled_snapshot, name="snapshot-auto", daemon=True)
+    thread.start()
+    return True
+
+
+def _run_scheduled_snapshot() -> None:
+    if not _scheduled_lock.acquire(blocking=False):
+        return
+    try:
+        create_snapshot(label="auto")
+    except (sqlite3.Error, OSError):
+        # Une sauvegarde automatique ratée sera retentée au prochain démarrage de session
+        pass
+    finally:
+        _scheduled_lock.release()
+
+
+# ── Restauration ──────────────────────────────────────────────────────────────
+
+def verify_snapshot(path: str) -> tuple[bool, str]:
+    """Contrôle PRAGMA integrity_check d'un snapshot. Retourne (ok, message)."""
+    if not os.path.exists(path):
+        return False, "Sauvegarde introuvable."
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return False, f"Fichier illisible : {e}"
+    if rows != [("ok",)]:
+        return False, "Sauvegarde corrompue : " + "; ".join(r[0] for r in rows[:3])
+    return True, ""
+
+
+def restore_snapshot(path: str) -> tuple[bool, str]:
+    """
+    Restaure un snapshot à la place de la base courante.
+    Le snapshot est vérifié (integrity_check) et copié à côté de la base,
+    la base courante est elle-même sauvegardée, puis le fichier est remplacé
+    en une opération atomique. La copie précède la sauvegarde de sécurité :
+    la rotation de celle-ci peut supprimer le snapshot restauré s'il est le
+    plus ancien. Les migrations en attente sont appliquées si le snapshot est ancien.
+    """
+    ok, err = verify_snapshot(path)
+    if not ok:
+        return False, err
+
+    db_path = get_db_path()
+    tmp_path = db_path + ".restore"
+    try:
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            dst = sqlite3.connect(tmp_path)
+            try:
+                src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP_SECONDS)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+    except sqlite3.Error as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False, f"Restauration impossible : {e}"
+
+    if os.path.exists(db_path):
+        create_snapshot(label="avant-restauration")
+
+    os.replace(tmp_path, db_path)
+    init_db()
+    bump_generation()
+    return True, f"Sauvegarde « {os.path.basename(path)} » restaurée."
@@ -0,0 +1,70 @@
+"""
+cache_deps.py
+─────────────
+Invalidation ciblée des caches dérivés.
+
+Chaque cache déclare les tables dont il dépend (register_cache). Après une
+écriture, invalidate(tables, asset_ids) ne vide que les caches qui dépendent
+d'une des tables touchées :
+
+    - un cache qui sait évincer un actif (evict) ne perd que les entrées des
+      actifs concernés quand les asset_ids sont connus ;
+    - les autres sont vidés entièrement.
+
+Modifier un contrat ou un emprunt ne vide donc plus l'historique, et
+enregistrer le montant d'un livret ne recalcule l'évolution que de ce livret.
+
+Les tables emprunts et contrats sont servies par services/repository.py,
+validé par les générations de services/db.py : aucun cache à vider ici.
+Les caches de cours dépendent de la source "cours", invalidée au changement
+de fournisseur (services/price_providers.py::set_provider).
+"""
+
+import threading
+from typing import Callable, Iterable
+
+_lock = threading.Lock()
+_registry: dict[str, dict] = {}
+
+
+def register_cache(
+    name: str,
+    tables: Iterable[str],
+    clear: Callable[[], None],
+    evict: Callable[[set[str]], None] | None = None,
+) -> None:
+    """
+    Déclare un cache dérivé de `tables`.
+    clear : vide tout le cache
+    evict : (optionnel) retire seulement les entrées des actifs donnés
+    Réenregistrer un nom remplace l'entrée précédente.
+    """
+    with _lock:
+        _registry[name] = {"tables": frozenset(tables), "clear": clear, "evict": evict}
+
+
+def dependent_caches(*tables: str) -> list[str]:
+    """Noms des caches qui dépendent d'au moins une des tables (tous si aucune)."""
+    with _lock:
+        return [
+            name for name, entry in _registry.items()
+            if not tables or entry["tables"] & set(tables)
+        ]
+
+
+def invalidate(*tables: str, asset_ids: Iterable[str] | None = None) -> list[str]:
+    """
+    Vide les caches qui dépendent de `tables` (tous les caches si aucune table).
+    Avec asset_ids, les caches qui le permettent n'évincent que ces actifs.
+    Retourne les noms des caches touchés.
+    """
+    ids = {str(a) for a in asset_ids} if asset_ids is not None else None
+    names = dependent_caches(*tables)
+    with _lock:
+        entries = [_registry[name] for name in names if name in _registry]
+    for entry in entries:
+        if ids is not None and entry["evict"] is not None:
+            entry["evict"](ids)
+        else:
+            entry["clear"]()
+    return names
@@ -0,0 +1,99 @@
+"""
+compaction.py
+─────────────
+Compaction de l'historique et des positions.
+
+Les valeurs sont lues « à date » (dernière valeur connue avant ou à une date,
+cf. get_montant_at / get_quantity_at / merge_asof). Une ligne dont la valeur
+est identique à celle de la ligne précédente du même actif n'apporte donc
+aucune information : elle est supprimée.
+
+Règle commune avec l'écriture (record_montant / record_position, qui n'écrivent
+rien quand la valeur ne change pas) : une ligne n'existe qu'aux dates où la
+valeur change. Ces tables ne gardent donc pas la date du dernier relevé.
+
+Effet sur les évolutions : leur axe de dates est construit à partir des dates
+de l'historique et des cours (_compute_raw_evolution). Après compaction, il ne
+contient plus les dates de relevés sans changement. Les valeurs aux dates
+restantes sont inchangées, mais les courbes comptent moins de points.
+"""
+
+from .db import db_connection, db_readonly, bump_generation, get_conn
+
+# table → colonne de valeur
+_TABLES = {
+    "historique": "montant",
+    "positions": "quantite",
+}
+
+
+def compact_history(vacuum: bool = True) -> dict:
+    """
+    Supprime les lignes redondantes de historique et positions.
+
+    Retourne un dict :
+        { "historique": {"avant": n, "apres": n},
+          "positions":  {"avant": n, "apres": n},
+          "lignes_supprimees": n,
+          "octets_avant": n, "octets_apres": n, "octets_gagnes": n }
+    Avec vacuum=True, la base est reconstruite pour rendre l'espace libéré au disque.
+    """
+    report = {"octets_avant": _db_size()}
+    removed = 0
+    with db_connection() as conn:
+        for table, value_col in _TABLES.items():
+            before = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            conn.execute(_redundant_rows_delete_sql(table, value_col))
+            after = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            report[table] = {"avant": before, "apres": after}
+            removed += before - after
+
+    if vacuum and removed:
+        _vacuum()
+
+    report["lignes_supprimees"] = removed
+    report["octets_apres"] = _db_size()
+    report["octets_gagnes"] = report["octets_avant"] - report["octets_apres"]
+    if removed:
+        _invalidate_derived_caches()
+    return report
+
+
+def _redundant_rows_delete_sql(table: str, value_col: str) -> str:
+    """Lignes dont la valeur est égale à celle de la ligne précédente du même actif."""
+    return f"""
+        DELETE FROM {table}
+        WHERE (asset_id, date) IN (
+            SELECT asset_id, date FROM (
+                SELECT asset_id, date, {value_col},
+                       LAG({value_col}) OVER (PARTITION BY asset_id ORDER BY date) AS valeur_precedente
+                FROM {table}
+            )
+            WHERE valeur_precedente = {value_col}
+        )
+    """
+
+
+def _db_size() -> int:
+    """Taille utile de la base en octets (pages × taille de page)."""
+    with db_readonly() as conn:
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return int(page_count * page_size)
+
+
+def _vacuum() -> None:
+    # VACUUM ne peut pas s'exécuter dans une transaction
+    conn = get_conn()
+    try:
+        conn.isolation_level = None
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def _invalidate_derived_caches() -> None:
+    """Les dates de l'historique servent d'axe aux évolutions : on les recalcule."""
+    from services.cache_deps import invalidate
+    bump_generation("historique", "positions")
+    invalidate("historique", "positions")
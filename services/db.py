@@ -4,22 +4,65 @@ db.py
 Utilitaires core de la base SQLite.
 """
 
+import json
 import os
+import re
 import sqlite3
+import sys
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
+from datetime import date, datetime
 from pathlib import Path
 from typing import Generator
 
-from constants import DB_PATH
+import numpy as np
+
+import constants
 
 
 def _schema_path() -> str:
     return str(Path(__file__).resolve().parent.parent / "schema" / "schema.sql")
 
 
+def get_db_path() -> str:
+    """Chemin de la base SQLite (lu à chaque appel pour rester patchable en test)."""
+    return constants.DB_PATH
+
+
+# ── Dates stockées en jours ───────────────────────────────────────────────────
+# historique.date et positions.date sont des entiers : nombre de jours depuis
+# le 1970-01-01. Le chargement devient un simple cast vers datetime64.
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_epoch_day(d) -> int:
+    """Convertit une date (date, datetime, Timestamp ou chaîne ISO) en numéro de jour."""
+    if isinstance(d, str):
+        d = date.fromisoformat(d[:10])
+    elif hasattr(d, "date") and callable(d.date):
+        d = d.date()
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def epoch_days_to_datetime(days) -> np.ndarray:
+    """Numéros de jour (entiers) → tableau datetime64[ns], sans parsing de texte."""
+    return np.asarray(days, dtype="int64").astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def datetime_to_epoch_days(values) -> np.ndarray:
+    """Tableau / Series de dates → numéros de jour (tronqués au jour)."""
+    return np.asarray(values, dtype="datetime64[D]").astype("int64")
+
+
 def get_conn() -> sqlite3.Connection:
     """Retourne une connexion à la base SQLite."""
-    conn = sqlite3.connect(DB_PATH)
+    if is_query_trace_enabled():
+        conn = sqlite3.connect(get_db_path(), factory=_TracedConnection)
+    else:
+        conn = sqlite3.connect(get_db_path())
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
@@ -64,68 +107,604 @@ def db_readonly() -> Generator[sqlite3.Connection, None, None]:
         conn.close()
 
 
-def init_db() -> None:
+_migration_report: list[dict] = []
+
+
+def init_db() -> list[dict]:
     """Crée le fichier DB et les tables s'ils n'existent pas.
-    Applique aussi les migrations nécessaires sur une base existante."""
-    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    Applique aussi les migrations en attente sur une base existante.
+
+    La version du schéma est lue une seule fois dans PRAGMA user_version :
+    si la base est à jour, la fonction retourne immédiatement.
+    Retourne le rapport des migrations appliquées (voir get_migration_report)."""
+    os.makedirs(os.path.dirname(get_db_path()) or ".", exist_ok=True)
+    with db_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return []
+        if version == 0 and not _has_table(conn, "actifs"):
+            report = [_create_schema(conn)]
+        else:
+            report = _apply_migrations(conn, version)
+    _migration_report[:] = report
+    return report
+
+
+def get_migration_report() -> list[dict]:
+    """Migrations appliquées lors du dernier init_db() : version, nom, duree_ms."""
+    return list(_migration_report)
+
+
+def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_schema(conn: sqlite3.Connection) -> dict:
+    """Base neuve : schema.sql est déjà à la dernière version, aucune migration à rejouer."""
     schema_path = _schema_path()
     if not os.path.exists(schema_path):
         raise FileNotFoundError(f"Schéma introuvable : {schema_path}")
     with open(schema_path, encoding="utf-8") as f:
         sql = f.read()
-    with db_connection() as conn:
-        conn.executescript(sql)
-        _migrate(conn)
+    start = time.perf_counter()
+    conn.executescript(f"BEGIN;\n{sql}\nPRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;")
+    return {"version": SCHEMA_VERSION, "nom": "Création du schéma", "duree_ms": _elapsed_ms(start)}
 
 
-def _migrate(conn: sqlite3.Connection) -> None:
-    """Applique les migrations incrémentales sur une base existante."""
-    # Migration 1 — contrat_id dans actifs
-    cols = [row[1] for row in conn.execute("PRAGMA table_info(actifs)").fetchall()]
-    if "contrat_id" not in cols:
-        conn.execute("ALTER TABLE actifs ADD COLUMN contrat_id TEXT REFERENCES contrats(id) ON DELETE SET NULL")
+def _apply_migrations(conn: sqlite3.Connection, version: int) -> list[dict]:
+    """Applique chaque migration en attente dans sa propre transaction."""
+    report = []
+    for numero, nom, migration in MIGRATIONS:
+        if numero <= version:
+            continue
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {numero}")
         conn.commit()
+        report.append({"version": numero, "nom": nom, "duree_ms": _elapsed_ms(start)})
+    return report
 
-    # Migration 2 — table parametres (clé/valeur)
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+# ── Agrégats des actifs ───────────────────────────────────────────────────────
+# agregats_actifs garde, par (type, contrat), le nombre d'actifs et leur montant,
+# ainsi que le montant et le coût d'acquisition (quantite × pru) de ceux qui en
+# ont un. Les triggers la corrigent ligne à ligne à chaque écriture d'actifs ou
+# d'actifs_ticker : les totaux de la Synthèse se lisent en O(types × contrats).
+# Ces instructions sont reprises telles quelles dans schema.sql.
+
+AGREGATS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS agregats_actifs (
+      type TEXT NOT NULL,
+      contrat_id TEXT NOT NULL DEFAULT '',
+      nb INTEGER NOT NULL DEFAULT 0,
+      montant REAL NOT NULL DEFAULT 0,
+      montant_cote REAL NOT NULL DEFAULT 0,
+      valeur_achat REAL NOT NULL DEFAULT 0,
+      PRIMARY KEY (type, contrat_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE VIEW IF NOT EXISTS actifs_ticker_cout AS
+    SELECT actif_id,
+           quantite > 0 AND pru > 0 AS cote,
+           CASE WHEN quantite > 0 AND pru > 0 THEN quantite * pru ELSE 0 END AS valeur_achat
+    FROM actifs_ticker
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_actifs_insert AFTER INSERT ON actifs
+    BEGIN
+      INSERT INTO agregats_actifs (type, contrat_id, nb, montant)
+      VALUES (NEW.type, COALESCE(NEW.contrat_id, ''), 1, NEW.montant_actuel)
+      ON CONFLICT(type, contrat_id) DO UPDATE SET nb = nb + 1, montant = montant + excluded.montant;
+    END
+    """,
+    # BEFORE : la ligne actifs_ticker, supprimée ensuite en cascade, donne encore le coût
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_actifs_delete BEFORE DELETE ON actifs
+    BEGIN
+      UPDATE agregats_actifs SET
+        nb = nb - 1,
+        montant = montant - OLD.montant_actuel,
+        montant_cote = montant_cote - OLD.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0),
+        valeur_achat = valeur_achat - COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0)
+      WHERE type = OLD.type AND contrat_id = COALESCE(OLD.contrat_id, '');
+      DELETE FROM agregats_actifs WHERE nb <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_actifs_update AFTER UPDATE OF type, contrat_id, montant_actuel ON actifs
+    WHEN OLD.type IS NOT NEW.type OR OLD.contrat_id IS NOT NEW.contrat_id OR OLD.montant_actuel IS NOT NEW.montant_actuel
+    BEGIN
+      UPDATE agregats_actifs SET
+        nb = nb - 1,
+        montant = montant - OLD.montant_actuel,
+        montant_cote = montant_cote - OLD.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0),
+        valeur_achat = valeur_achat - COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = OLD.id), 0)
+      WHERE type = OLD.type AND contrat_id = COALESCE(OLD.contrat_id, '');
+      INSERT INTO agregats_actifs (type, contrat_id, nb, montant, montant_cote, valeur_achat)
+      VALUES (NEW.type, COALESCE(NEW.contrat_id, ''), 1, NEW.montant_actuel,
+              NEW.montant_actuel * COALESCE((SELECT cote FROM actifs_ticker_cout WHERE actif_id = NEW.id), 0),
+              COALESCE((SELECT valeur_achat FROM actifs_ticker_cout WHERE actif_id = NEW.id), 0))
+      ON CONFLICT(type, contrat_id) DO UPDATE SET
+        nb = nb + 1,
+        montant = montant + excluded.montant,
+        montant_cote = montant_cote + excluded.montant_cote,
+        valeur_achat = valeur_achat + excluded.valeur_achat;
+      DELETE FROM agregats_actifs WHERE nb <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_ticker_insert AFTER INSERT ON actifs_ticker
+    WHEN NEW.quantite > 0 AND NEW.pru > 0
+    BEGIN
+      UPDATE agregats_actifs SET
+        montant_cote = montant_cote + (SELECT montant_actuel FROM actifs WHERE id = NEW.actif_id),
+        valeur_achat = valeur_achat + NEW.quantite * NEW.pru
+      WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = NEW.actif_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_ticker_update AFTER UPDATE OF quantite, pru ON actifs_ticker
+    WHEN OLD.quantite IS NOT NEW.quantite OR OLD.pru IS NOT NEW.pru
+    BEGIN
+      UPDATE agregats_actifs SET
+        montant_cote = montant_cote + (SELECT montant_actuel FROM actifs WHERE id = NEW.actif_id)
+                       * ((NEW.quantite > 0 AND NEW.pru > 0) - (OLD.quantite > 0 AND OLD.pru > 0)),
+        valeur_achat = valeur_achat
+                       + CASE WHEN NEW.quantite > 0 AND NEW.pru > 0 THEN NEW.quantite * NEW.pru ELSE 0 END
+                       - CASE WHEN OLD.quantite > 0 AND OLD.pru > 0 THEN OLD.quantite * OLD.pru ELSE 0 END
+      WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = NEW.actif_id);
+    END
+    """,
+    # Après la suppression d'un actif, la cascade ne trouve plus le parent : rien à retirer
+    """
+    CREATE TRIGGER IF NOT EXISTS agregats_ticker_delete AFTER DELETE ON actifs_ticker
+    WHEN OLD.quantite > 0 AND OLD.pru > 0
+    BEGIN
+      UPDATE agregats_actifs SET
+        montant_cote = montant_cote - (SELECT montant_actuel FROM actifs WHERE id = OLD.actif_id),
+        valeur_achat = valeur_achat - OLD.quantite * OLD.pru
+      WHERE (type, contrat_id) = (SELECT type, COALESCE(contrat_id, '') FROM actifs WHERE id = OLD.actif_id);
+    END
+    """,
+]
+
+
+def rebuild_agregats(conn: sqlite3.Connection) -> None:
+    """Recalcule entièrement agregats_actifs depuis actifs et actifs_ticker."""
+    conn.execute("DELETE FROM agregats_actifs")
+    conn.execute("""
+        INSERT INTO agregats_actifs (type, contrat_id, nb, montant, montant_cote, valeur_achat)
+        SELECT a.type, COALESCE(a.contrat_id, ''), COUNT(*), SUM(a.montant_actuel),
+               SUM(a.montant_actuel * COALESCE(c.cote, 0)), SUM(COALESCE(c.valeur_achat, 0))
+        FROM actifs a
+        LEFT JOIN actifs_ticker_cout c ON c.actif_id = a.id
+        GROUP BY a.type, COALESCE(a.contrat_id, '')
+    """)
+
+
+# ── Migrations numérotées ─────────────────────────────────────────────────────
+# Chaque migration amène la base de la version N-1 à la version N.
+# Une base neuve est créée directement depuis schema.sql à SCHEMA_VERSION :
+# toute modification de schéma doit donc être reportée dans schema.sql
+# ET ajoutée ici comme nouvelle migration.
+
+def _migration_1_colonnes_historiques(conn: sqlite3.Connection) -> None:
+    """Rattrapage des bases créées avant le versionnement (anciennes sondes _migrate)."""
+    # contrat_id dans actifs
+    _add_column_if_missing(conn, "actifs", "contrat_id", "TEXT REFERENCES contrats(id) ON DELETE SET NULL")
+
+    # table parametres (clé/valeur)
     conn.execute("""
         CREATE TABLE IF NOT EXISTS parametres (
             cle   TEXT PRIMARY KEY,
             valeur TEXT NOT NULL
         )
     """)
-    conn.commit()
-
-    # Migration 3 — nouveaux champs immobilier (coût réel + usage)
-    immo_cols = [row[1] for row in conn.execute("PRAGMA table_info(actifs_immobilier)").fetchall()]
-    if "frais_notaire" not in immo_cols:
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN frais_notaire REAL DEFAULT 0")
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN montant_travaux REAL DEFAULT 0")
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN usage TEXT DEFAULT 'locatif'")
-        conn.commit()
 
-    # Migration 4 — suivi locatif
-    immo_cols = [row[1] for row in conn.execute("PRAGMA table_info(actifs_immobilier)").fetchall()]
-    if "loyer_mensuel" not in immo_cols:
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN loyer_mensuel REAL DEFAULT 0")
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN charges_mensuelles REAL DEFAULT 0")
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN taxe_fonciere_annuelle REAL DEFAULT 0")
-        conn.commit()
+    # champs immobilier : coût réel, usage, suivi locatif, date d'achat
+    for column, definition in [
+        ("frais_notaire", "REAL DEFAULT 0"),
+        ("montant_travaux", "REAL DEFAULT 0"),
+        ("usage", "TEXT DEFAULT 'locatif'"),
+        ("loyer_mensuel", "REAL DEFAULT 0"),
+        ("charges_mensuelles", "REAL DEFAULT 0"),
+        ("taxe_fonciere_annuelle", "REAL DEFAULT 0"),
+        ("date_achat", "TEXT"),
+    ]:
+        _add_column_if_missing(conn, "actifs_immobilier", column, definition)
 
-    # Migration 5 — suppression date_fin (redondante avec date_debut + duree_mois)
-    emprunt_cols = [row[1] for row in conn.execute("PRAGMA table_info(emprunts)").fetchall()]
-    if "date_fin" in emprunt_cols:
+    # suppression date_fin (redondante avec date_debut + duree_mois)
+    if "date_fin" in _columns(conn, "emprunts"):
         conn.execute("ALTER TABLE emprunts DROP COLUMN date_fin")
-        conn.commit()
 
-    # Migration 6 — date_achat dans actifs_immobilier
-    immo_cols = [row[1] for row in conn.execute("PRAGMA table_info(actifs_immobilier)").fetchall()]
-    if "date_achat" not in immo_cols:
-        conn.execute("ALTER TABLE actifs_immobilier ADD COLUMN date_achat TEXT")
-        conn.commit()
+
+def _migration_2_dates_entieres(conn: sqlite3.Connection) -> None:
+    """historique / positions : dates ISO TEXT → jours entiers, tables WITHOUT ROWID
+    groupées sur (asset_id, date). Les index séparés date / asset_id disparaissent."""
+    for table, value_col in (("historique", "montant"), ("positions", "quantite")):
+        conn.execute(f"""
+            CREATE TABLE {table}_v2 (
+              asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
+              date INTEGER NOT NULL,
+              {value_col} REAL NOT NULL,
+              PRIMARY KEY (asset_id, date)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {table}_v2 (asset_id, date, {value_col})
+            SELECT asset_id, CAST(julianday(substr(date, 1, 10)) - 2440587.5 AS INTEGER), {value_col}
+            FROM {table}
+            WHERE julianday(substr(date, 1, 10)) IS NOT NULL
+            ORDER BY asset_id, date
+        """)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_v2 RENAME TO {table}")
+
+
+def _migration_3_evenements_emprunt(conn: sqlite3.Connection) -> None:
+    """Table des événements d'emprunt (remboursement anticipé, différé, révision de taux)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS emprunt_evenements (
+          id TEXT PRIMARY KEY,
+          emprunt_id TEXT NOT NULL REFERENCES emprunts(id) ON DELETE CASCADE,
+          type TEXT NOT NULL CHECK(type IN ('remboursement_anticipe', 'differe', 'revision_taux')),
+          date TEXT NOT NULL,
+          montant REAL,
+          duree_mois INTEGER,
+          taux_annuel REAL,
+          mensualite REAL,
+          created_at TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emprunt_evenements_emprunt ON emprunt_evenements(emprunt_id, date)"
+    )
+
+
+def _migration_4_lots_fifo(conn: sqlite3.Connection) -> None:
+    """Prix des mouvements de positions + tables des lots FIFO et des cessions.
+    Les lots des positions existantes sont reconstruits à la première lecture (cf. services/lots.py)."""
+    _add_column_if_missing(conn, "positions", "prix_unitaire", "REAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lots (
+          id INTEGER PRIMARY KEY,
+          asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
+          date INTEGER NOT NULL,
+          quantite REAL NOT NULL,
+          quantite_restante REAL NOT NULL,
+          prix_unitaire REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_asset ON lots(asset_id, date, id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cessions (
+          id INTEGER PRIMARY KEY,
+          asset_id TEXT NOT NULL REFERENCES actifs(id) ON DELETE CASCADE,
+          lot_id INTEGER NOT NULL REFERENCES lots(id) ON DELETE CASCADE,
+          date INTEGER NOT NULL,
+          quantite REAL NOT NULL,
+          prix_achat REAL NOT NULL,
+          prix_vente REAL NOT NULL,
+          plus_value REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cessions_asset ON cessions(asset_id, date)")
+
+
+def _migration_5_allocations_cibles(conn: sqlite3.Connection) -> None:
+    """Allocations cibles par catégorie et par contrat (rééquilibrage)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS allocations_cibles (
+          type TEXT NOT NULL CHECK(type IN ('categorie', 'contrat')),
+          cle TEXT NOT NULL,
+          poids REAL NOT NULL CHECK(poids >= 0),
+          PRIMARY KEY (type, cle)
+        )
+    """)
+
+
+def _migration_6_agregats_actifs(conn: sqlite3.Connection) -> None:
+    """Totaux par type d'actif et par contrat, tenus à jour par des triggers (cf. schema.sql)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS actifs_ticker (
+          actif_id TEXT PRIMARY KEY REFERENCES actifs(id) ON DELETE CASCADE,
+          ticker TEXT NOT NULL,
+          quantite REAL NOT NULL DEFAULT 0,
+          pru REAL NOT NULL DEFAULT 0
+        )
+    """)
+    for sql in AGREGATS_SQL:
+        conn.execute(sql)
+    rebuild_agregats(conn)
+
+
+MIGRATIONS = [
+    (1, "Colonnes ajoutées avant le versionnement", _migration_1_colonnes_historiques),
+    (2, "Dates entières pour historique et positions", _migration_2_dates_entieres),
+    (3, "Événements d'emprunt", _migration_3_evenements_emprunt),
+    (4, "Lots FIFO et prix des mouvements", _migration_4_lots_fifo),
+    (5, "Allocations cibles", _migration_5_allocations_cibles),
+    (6, "Agrégats des actifs", _migration_6_agregats_actifs),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
 
 
 def reset_all_data() -> str:
     """Supprime la base locale pour repartir de zéro."""
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-    return "Toutes les données ont été supprimées."
\ No newline at end of file
+    db_path = get_db_path()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    bump_generation()
+    return "Toutes les données ont été supprimées."
+
+
+# ── Générations des tables ────────────────────────────────────────────────────
+# Compteur par table, incrémenté à chaque écriture : une valeur calculée à
+# partir d'une table reste valable tant que sa génération n'a pas changé.
+# Le compteur global (sans table) invalide tout (réinitialisation, restauration).
+# Chaque thread compte aussi ses propres écritures (own_generation) : l'écart
+# entre les deux révèle une écriture venue d'une autre session.
+
+_generation_lock = threading.Lock()
+_generations: dict[str, int] = {}
+_own_generations = threading.local()
+
+
+def bump_generation(*tables: str) -> None:
+    """Signale une écriture sur `tables` (toutes les tables si aucune n'est précisée)."""
+    own = getattr(_own_generations, "counts", None)
+    if own is None:
+        own = _own_generations.counts = {}
+    with _generation_lock:
+        for table in tables or ("*",):
+            _generations[table] = _generations.get(table, 0) + 1
+            own[table] = own.get(table, 0) + 1
+
+
+def get_generation(table: str) -> int:
+    """Génération courante de `table` (croît à chaque écriture sur la table ou la base)."""
+    return _generations.get(table, 0) + _generations.get("*", 0)
+
+
+def own_generation(table: str) -> int:
+    """Part de la génération de `table` due aux écritures du thread courant."""
+    own = getattr(_own_generations, "counts", None) or {}
+    return own.get(table, 0) + own.get("*", 0)
+
+
+# ── Traçage des requêtes ──────────────────────────────────────────────────────
+# Quand le traçage est actif, get_conn() ouvre des connexions instrumentées :
+# chaque exécution enregistre le texte SQL, sa durée (exécution + lecture des
+# lignes), le nombre de lignes renvoyées ou modifiées, et l'appelant dans le code
+# de l'application. Les requêtes sont regroupées par exécution du script Streamlit
+# (begin_query_trace_run), les QUERY_TRACE_RUNS dernières sont conservées.
+# Le traçage est activé par session Streamlit : les autres sessions du processus
+# gardent des connexions ordinaires, et chaque session ne voit, n'exporte et
+# n'efface que ses propres exécutions.
+
+QUERY_TRACE_RUNS = 10
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+_THIS_FILE = str(Path(__file__).resolve())
+
+_trace_lock = threading.Lock()
+_trace_sessions: set = set()  # sessions tracées (None hors Streamlit)
+_trace_runs: dict[str | None, deque] = {}  # exécutions conservées, par session
+_trace_local = threading.local()  # exécution en cours, par thread de script
+
+
+def current_session_id() -> str | None:
+    """Identifiant de la session Streamlit du thread courant (None hors Streamlit : tests, scripts)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def ended_sessions(session_ids) -> list:
+    """Sessions de `session_ids` que Streamlit a fermées (aucune hors de `streamlit run`)."""
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return []
+    runtime = Runtime.instance()
+    return [s for s in session_ids if s is not None and not runtime.is_active_session(s)]
+
+
+def enable_query_trace() -> None:
+    """Active l'instrumentation des connexions ouvertes par get_conn() dans la session courante."""
+    _forget_ended_trace_sessions()
+    _trace_sessions.add(current_session_id())
+
+
+def disable_query_trace() -> None:
+    _forget_ended_trace_sessions()
+    _trace_sessions.discard(current_session_id())
+    _trace_local.run = None
+
+
+def is_query_trace_enabled() -> bool:
+    return bool(_trace_sessions) and current_session_id() in _trace_sessions
+
+
+def _forget_ended_trace_sessions() -> None:
+    """Retire les sessions fermées et leurs exécutions (onglet refermé en cours de traçage)."""
+    if not _trace_sessions and not _trace_runs:
+        return
+    with _trace_lock:
+        for session_id in ended_sessions(set(_trace_sessions) | set(_trace_runs)):
+            _trace_sessions.discard(session_id)
+            _trace_runs.pop(session_id, None)
+
+
+def begin_query_trace_run(label: str = "") -> None:
+    """Démarre un nouveau groupe de requêtes de la session courante (typiquement : un rerun Streamlit)."""
+    run = {"debut": datetime.now().isoformat(timespec="seconds"), "label": label, "requetes": []}
+    _trace_local.run = run
+    session_id = current_session_id()
+    with _trace_lock:
+        _trace_runs.setdefault(session_id, deque(maxlen=QUERY_TRACE_RUNS)).append(run)
+
+
+def reset_query_trace() -> None:
+    """Efface les exécutions de la session courante."""
+    _trace_local.run = None
+    session_id = current_session_id()
+    with _trace_lock:
+        _trace_runs.pop(session_id, None)
+
+
+def get_query_trace_runs() -> list[dict]:
+    """Groupes de requêtes de la session courante, du plus ancien au plus récent."""
+    session_id = current_session_id()
+    with _trace_lock:
+        return [dict(run, requetes=list(run["requetes"])) for run in _trace_runs.get(session_id, ())]
+
+
+def summarize_query_trace(requetes: list[dict]):
+    """
+    Agrège une liste de requêtes tracées par (texte SQL, appelant).
+    Retourne un DataFrame : sql, appelant, executions, duree_totale_ms,
+    duree_moyenne_ms, lignes — trié par durée totale décroissante.
+    Un nombre d'exécutions élevé pour une même requête signale un motif N+1.
+    """
+    import pandas as pd
+
+    columns = ["sql", "appelant", "executions", "duree_totale_ms", "duree_moyenne_ms", "lignes"]
+    if not requetes:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(requetes)
+    summary = (
+        df.groupby(["sql", "appelant"], sort=False)
+        .agg(executions=("sql", "size"), duree_totale_ms=("duree_ms", "sum"), lignes=("lignes", "sum"))
+        .reset_index()
+    )
+    summary["duree_totale_ms"] = summary["duree_totale_ms"].round(2)
+    summary["duree_moyenne_ms"] = (summary["duree_totale_ms"] / summary["executions"]).round(3)
+    return summary[columns].sort_values("duree_totale_ms", ascending=False).reset_index(drop=True)
+
+
+def export_query_trace_json() -> str:
+    """Export JSON des groupes de requêtes conservés pour la session courante."""
+    return json.dumps(get_query_trace_runs(), ensure_ascii=False, indent=2)
+
+
+def _normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _call_site() -> str:
+    """Première frame appartenant à l'application, hors services/db.py."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE:
+            rel = os.path.relpath(filename, _PROJECT_ROOT)
+            return f"{rel}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+
+def _record_query(sql: str) -> dict:
+    entry = {"sql": _normalize_sql(sql), "appelant": _call_site(), "duree_ms": 0.0, "lignes": 0}
+    if getattr(_trace_local, "run", None) is None:
+        # Rerun de fragment (nouveau thread, sans passage par app.py) : sa propre exécution
+        begin_query_trace_run("fragment")
+    with _trace_lock:
+        _trace_local.run["requetes"].append(entry)
+    return entry
+
+
+class _TracedCursor(sqlite3.Cursor):
+    """Curseur qui chronomètre l'exécution et la lecture des lignes."""
+
+    _entry: dict | None = None
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._entry is not None:
+                self._entry["duree_ms"] += (time.perf_counter() - start) * 1000
+
+    def _count_written(self) -> None:
+        if self._entry is not None and self.rowcount > 0:
+            self._entry["lignes"] += self.rowcount
+
+    def execute(self, sql, parameters=()):
+        self._entry = _record_query(sql)
+        self._timed(super().execute, sql, parameters)
+        self._count_written()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._entry = _record_query(sql)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._count_written()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None and self._entry is not None:
+            self._entry["lignes"] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if self._entry is not None:
+            self._entry["lignes"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._entry is not None:
+            self._entry["lignes"] += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(super().__next__)
+        if self._entry is not None:
+            self._entry["lignes"] += 1
+        return row
+
+
+class _TracedConnection(sqlite3.Connection):
+    """Connexion dont tous les curseurs (y compris ceux de pandas) sont tracés."""
+
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        entry = _record_query(script)
+        start = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            entry["duree_ms"] += (time.perf_counter() - start) * 1000
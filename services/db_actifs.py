@@ -5,7 +5,7 @@ Gestion des actifs et leurs spécificités (ticker, immobilier).
 """
 
 import pandas as pd
-from .db import db_readonly, db_connection
+from .db import db_readonly, db_connection, bump_generation
 
 # Mapping catégorie (UI / CSV) <-> type (DB)
 CATEGORY_TO_TYPE = {
@@ -80,6 +80,7 @@ def save_assets(df: pd.DataFrame) -> None:
             conn.execute("DELETE FROM actifs_ticker")
             conn.execute("DELETE FROM actifs_immobilier")
             conn.execute("DELETE FROM actifs")
+        bump_generation("actifs")
         return
 
     with db_connection() as conn:
@@ -179,13 +180,30 @@ def save_assets(df: pd.DataFrame) -> None:
                 )
             else:
                 conn.execute("DELETE FROM actifs_immobilier WHERE actif_id = ?", (aid,))
+    bump_generation("actifs")
 
 
 
+# ── Agrégats (table agregats_actifs, tenue à jour par triggers) ───────────────
+
+def load_agregats() -> pd.DataFrame:
+    """
+    Totaux par catégorie et par contrat, lus dans agregats_actifs (une ligne par couple).
+    Retourne : categorie, contrat_id ('' = sans contrat), nb, montant,
+    montant_cote, valeur_achat (montant et coût d'acquisition des actifs qui en ont un).
+    """
+    with db_readonly() as conn:
+        df = pd.read_sql_query(
+            "SELECT type, contrat_id, nb, montant, montant_cote, valeur_achat FROM agregats_actifs", conn,
+        )
+    df["categorie"] = df["type"].map(TYPE_TO_CATEGORY)
+    return df[["categorie", "contrat_id", "nb", "montant", "montant_cote", "valeur_achat"]]
+
+
 def get_total_by_type() -> pd.DataFrame:
     with db_readonly() as conn:
         df = pd.read_sql_query(
-            "SELECT type, SUM(montant_actuel) AS total FROM actifs GROUP BY type", conn,
+            "SELECT type, SUM(montant) AS total FROM agregats_actifs GROUP BY type", conn,
         )
         df["categorie"] = df["type"].map(TYPE_TO_CATEGORY)
         return df[["categorie", "total"]].rename(columns={"total": "montant"})
@@ -193,5 +211,5 @@ def get_total_by_type() -> pd.DataFrame:
 
 def get_total() -> float:
     with db_readonly() as conn:
-        cur = conn.execute("SELECT COALESCE(SUM(montant_actuel), 0) FROM actifs")
+        cur = conn.execute("SELECT COALESCE(SUM(montant), 0) FROM agregats_actifs")
         return float(cur.fetchone()[0])
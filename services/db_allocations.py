@@ -0,0 +1,34 @@
+"""
+db_allocations.py
+─────────────────
+Stockage des allocations cibles (par catégorie et par contrat).
+"""
+
+from .db import db_readonly, db_connection
+
+ALLOCATION_TYPES = ("categorie", "contrat")
+
+
+def load_allocation_targets(type: str) -> dict[str, float]:
+    """Poids cibles (%) d'un type d'allocation : { catégorie ou contrat_id: poids }."""
+    if type not in ALLOCATION_TYPES:
+        raise ValueError(f"Type d'allocation inconnu : {type}")
+    with db_readonly() as conn:
+        rows = conn.execute(
+            "SELECT cle, poids FROM allocations_cibles WHERE type = ? ORDER BY cle", (type,)
+        ).fetchall()
+    return {cle: float(poids) for cle, poids in rows}
+
+
+def save_allocation_targets(type: str, poids: dict[str, float]) -> None:
+    """Remplace toutes les cibles d'un type (une cible absente du dict est supprimée)."""
+    if type not in ALLOCATION_TYPES:
+        raise ValueError(f"Type d'allocation inconnu : {type}")
+    if any(p < 0 for p in poids.values()):
+        raise ValueError("Un poids cible ne peut pas être négatif.")
+    with db_connection() as conn:
+        conn.execute("DELETE FROM allocations_cibles WHERE type = ?", (type,))
+        conn.executemany(
+            "INSERT INTO allocations_cibles (type, cle, poids) VALUES (?, ?, ?)",
+            [(type, cle, float(p)) for cle, p in poids.items()],
+        )
@@ -6,7 +6,7 @@ Gestion des contrats (établissement + enveloppe).
 
 import sqlite3
 import uuid
-from .db import db_readonly, db_connection
+from .db import db_readonly, db_connection, bump_generation
 
 
 def load_contrats():
@@ -39,7 +39,8 @@ def get_or_create_contrat(etablissement: str, enveloppe: str) -> str:
             "INSERT INTO contrats (id, etablissement, enveloppe) VALUES (?, ?, ?)",
             (contrat_id, etablissement, enveloppe),
         )
-        return contrat_id
+    bump_generation("contrats")
+    return contrat_id
 
 
 def add_contrat(etablissement: str, enveloppe: str) -> tuple[bool, str, str | None]:
@@ -58,9 +59,10 @@ def add_contrat(etablissement: str, enveloppe: str) -> tuple[bool, str, str | No
                 "INSERT INTO contrats (id, etablissement, enveloppe) VALUES (?, ?, ?)",
                 (contrat_id, etablissement, enveloppe),
             )
-            return True, f"Contrat « {etablissement} — {enveloppe} » ajouté.", contrat_id
     except sqlite3.IntegrityError:
         return False, f"« {etablissement} — {enveloppe} » existe déjà.", None
+    bump_generation("contrats")
+    return True, f"Contrat « {etablissement} — {enveloppe} » ajouté.", contrat_id
 
 
 def update_contrat(contrat_id: str, etablissement: str, enveloppe: str) -> tuple[bool, str]:
@@ -81,7 +83,8 @@ def update_contrat(contrat_id: str, etablissement: str, enveloppe: str) -> tuple
             "UPDATE contrats SET etablissement = ?, enveloppe = ? WHERE id = ?",
             (etablissement, enveloppe, contrat_id),
         )
-        return True, f"Contrat mis à jour : « {etablissement} — {enveloppe} »."
+    bump_generation("contrats")
+    return True, f"Contrat mis à jour : « {etablissement} — {enveloppe} »."
 
 
 def delete_contrat(contrat_id: str) -> tuple[bool, str]:
@@ -95,4 +98,6 @@ def delete_contrat(contrat_id: str) -> tuple[bool, str]:
         if count > 0:
             return False, f"Ce contrat est utilisé par {count} actif(s) — modifie-les d'abord."
         conn.execute("DELETE FROM contrats WHERE id = ?", (contrat_id,))
-        return True, "Contrat supprimé."
+        conn.execute("DELETE FROM allocations_cibles WHERE type = 'contrat' AND cle = ?", (contrat_id,))
+    bump_generation("contrats")
+    return True, "Contrat supprimé."
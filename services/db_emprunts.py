@@ -5,9 +5,12 @@ Gestion des emprunts et calcul du capital restant dû.
 """
 
 import uuid
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from datetime import date
-from .db import db_readonly, db_connection
+from constants import EVENEMENT_EMPRUNT_TYPES
+from .db import db_readonly, db_connection, get_db_path, get_generation, bump_generation
 
 
 def _compute_capital_restant_du(
@@ -18,7 +21,7 @@ def _compute_capital_restant_du(
     duree_mois: int,
     as_of_date: date | None = None,
 ) -> float:
-    """Calcule le capital restant dû à une date donnée."""
+    """Calcule le capital restant dû à une date donnée (formule fermée, sans événements)."""
     if as_of_date is None:
         as_of_date = date.today()
     if isinstance(date_debut, str):
@@ -48,35 +51,242 @@ def _compute_capital_restant_du(
     return round(max(0.0, balance), 2)
 
 
+# ── Moteur d'amortissement ───────────────────────────────────────────────────
+# L'échéancier d'un emprunt est découpé en segments aux dates de ses événements
+# (remboursement anticipé, différé, révision de taux). Sur chaque segment, le
+# capital suit la formule fermée d'une annuité constante évaluée d'un bloc avec
+# NumPy : on boucle sur les événements, jamais sur les mois. Les échéanciers sont
+# mis en cache par version de l'emprunt (paramètres + événements), puis
+# échantillonnés aux dates demandées en matrices (emprunts × dates).
+
+def _to_day_array(values) -> np.ndarray:
+    """Dates quelconques (str, Timestamp, date) → datetime64[D], NaT si invalide."""
+    return pd.to_datetime(pd.Series(values), errors="coerce").to_numpy(dtype="datetime64[D]")
+
+
+def _months_elapsed(debut: np.ndarray, as_of: np.ndarray) -> np.ndarray:
+    """Nombre de mensualités échues entre debut et as_of (tableaux datetime64[D] diffusables)."""
+    debut_m = debut.astype("datetime64[M]")
+    as_of_m = as_of.astype("datetime64[M]")
+    months = (as_of_m - debut_m).astype(np.int64)
+    debut_day = (debut - debut_m.astype("datetime64[D]")).astype(np.int64)
+    as_of_day = (as_of - as_of_m.astype("datetime64[D]")).astype(np.int64)
+    return months - (debut_day > as_of_day)
+
+
+def _annuity(balance: float, r: float, n: int) -> float:
+    """Mensualité constante qui amortit `balance` en n mois au taux mensuel r."""
+    if n <= 0:
+        return balance
+    if abs(r) < 1e-12:
+        return balance / n
+    return balance * r / (1 - (1 + r) ** -n)
+
+
+@lru_cache(maxsize=512)
+def _loan_schedule(montant_emprunte: float, taux_annuel: float, mensualite: float,
+                   duree_mois: int, evenements: tuple = ()) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Échéancier d'un emprunt indexé par le nombre k de mensualités échues (0..K).
+
+    evenements : tuples (k, type, montant, duree_mois, taux_annuel, mensualite)
+    triés par k ; un événement en k s'applique juste après la k-ième mensualité.
+    Retourne (capital restant dû, intérêts cumulés, k d'extinction).
+    Les tableaux sont partagés par le cache et en lecture seule.
+    """
+    K = int(duree_mois) + sum(int(e[3] or 0) for e in evenements if e[1] == "differe")
+    balance = np.zeros(K + 1)
+    interets = np.zeros(K + 1)
+
+    r = float(taux_annuel) / 100.0 / 12.0
+    pay = float(mensualite)
+    B = float(montant_emprunte)
+    interets_seuls_jusqu_a = 0
+
+    by_k: dict[int, list] = {}
+    for e in evenements:
+        by_k.setdefault(min(max(int(e[0]), 0), K), []).append(e)
+    bornes = set(by_k) | {0, K}
+    for e in evenements:
+        if e[1] == "differe":
+            bornes.add(min(max(int(e[0]), 0) + int(e[3] or 0), K))
+    bornes = sorted(bornes)
+
+    for a, b in zip(bornes, bornes[1:] + [K]):
+        for _, type_, montant, duree, taux, nouvelle_mensualite in by_k.get(a, ()):
+            if type_ == "remboursement_anticipe":
+                B = max(0.0, B - float(montant or 0))
+                if nouvelle_mensualite is not None:
+                    pay = float(nouvelle_mensualite)
+            elif type_ == "differe":
+                interets_seuls_jusqu_a = max(interets_seuls_jusqu_a, a + int(duree or 0))
+            elif type_ == "revision_taux":
+                r = float(taux or 0) / 100.0 / 12.0
+                restants = K - max(a, interets_seuls_jusqu_a)
+                pay = float(nouvelle_mensualite) if nouvelle_mensualite is not None else _annuity(B, r, restants)
+        balance[a] = B
+        if b <= a:
+            continue
+
+        j = np.arange(1, b - a + 1)
+        if a < interets_seuls_jusqu_a:
+            segment = np.full(len(j), B)
+        else:
+            growth = (1 + r) ** j
+            annuite = j if abs(r) < 1e-12 else (growth - 1) / r
+            segment = np.maximum(0.0, B * growth - pay * annuite)
+        balance[a + 1:b + 1] = segment
+        interets[a + 1:b + 1] = r * np.concatenate(([B], segment[:-1]))
+        B = float(segment[-1])
+
+    balance[K] = 0.0
+    balance = np.round(balance, 2)
+    cumul = np.cumsum(interets)
+    fin = int(np.argmax(balance <= 0))
+    balance.setflags(write=False)
+    cumul.setflags(write=False)
+    return balance, cumul, fin
+
+
+def _loan_schedules(df: pd.DataFrame) -> list[tuple]:
+    """(date de début datetime64[D], échéancier) de chaque emprunt ; None si la date est invalide."""
+    debuts = _to_day_array(df["date_debut"])
+    evenements = df["evenements"] if "evenements" in df else [()] * len(df)
+    result = []
+    for debut, P, taux, M, duree, evts in zip(
+        debuts,
+        df["montant_emprunte"].to_numpy(dtype=float),
+        df["taux_annuel"].to_numpy(dtype=float),
+        df["mensualite"].to_numpy(dtype=float),
+        df["duree_mois"].to_numpy(dtype=np.int64),
+        evenements,
+    ):
+        if np.isnat(debut):
+            result.append((debut, None))
+            continue
+        if evts:
+            ks = _months_elapsed(debut, _to_day_array([e[0] for e in evts]))
+            evts = tuple(sorted(((int(k),) + tuple(e[1:]) for k, e in zip(ks, evts)), key=lambda e: e[0]))
+        result.append((debut, _loan_schedule(float(P), float(taux), float(M), int(duree), tuple(evts))))
+    return result
+
+
+def _sample_schedules(schedules: list[tuple], dates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(CRD, intérêts cumulés) de chaque emprunt (lignes) à chaque date (colonnes)."""
+    crd = np.zeros((len(schedules), len(dates)))
+    cumul = np.zeros((len(schedules), len(dates)))
+    for i, (debut, schedule) in enumerate(schedules):
+        if schedule is None:
+            continue
+        balance, interets_cumules, _ = schedule
+        k = np.clip(_months_elapsed(debut, dates), 0, len(balance) - 1)
+        crd[i] = balance[k]
+        cumul[i] = interets_cumules[k]
+    return crd, cumul
+
+
+def _add_months(days: np.ndarray, months) -> np.ndarray:
+    """days + months mois (jour ramené au dernier jour du mois si besoin, comme pd.DateOffset)."""
+    days_m = days.astype("datetime64[M]")
+    day = (days - days_m.astype("datetime64[D]")).astype(np.int64)
+    target = days_m + months
+    month_len = ((target + 1).astype("datetime64[D]") - target.astype("datetime64[D]")).astype(np.int64)
+    return target.astype("datetime64[D]") + np.minimum(day, month_len - 1)
+
+
+def monthly_dates(start, n_months: int, first: int = 0) -> np.ndarray:
+    """start + first mois, …, start + n_months mois (jour ramené à la fin du mois si besoin)."""
+    start = np.datetime64(pd.Timestamp(start).date(), "D")
+    return _add_months(start, np.arange(first, n_months + 1))
+
+
+def capital_restant_du_matrix(df: pd.DataFrame, dates) -> np.ndarray:
+    """CRD de chaque emprunt (lignes) à chaque date (colonnes), événements compris."""
+    if df.empty:
+        return np.zeros((0, len(dates)))
+    return _sample_schedules(_loan_schedules(df), np.asarray(dates, dtype="datetime64[D]"))[0]
+
+
+def amortization_schedule(df: pd.DataFrame, start: date | None = None, n_months: int | None = None) -> dict:
+    """
+    Échéancier mensuel de tous les emprunts, calculé en une fois.
+
+    Les dates vont de start (aujourd'hui par défaut) à l'extinction du dernier
+    emprunt, de mois en mois (ou sur n_months mois). Retourne un dict :
+        { "ids": (n,), "dates": (d,) datetime64[D],
+          "capital_restant_du": (n, d),
+          "capital":  (n, d)  capital remboursé depuis la date précédente,
+          "interets": (n, d)  intérêts payés depuis la date précédente }
+    La première colonne de capital / interets couvre le mois précédant start.
+    Les événements de la colonne « evenements » (cf. load_emprunts) sont pris en compte.
+    """
+    start = start or date.today()
+    if df.empty:
+        dates = monthly_dates(start, n_months or 0)
+        empty = np.zeros((0, len(dates)))
+        return {"ids": np.array([], dtype=object), "dates": dates,
+                "capital_restant_du": empty, "capital": empty, "interets": empty}
+
+    schedules = _loan_schedules(df)
+    if n_months is None:
+        start_d = np.datetime64(pd.Timestamp(start).date(), "D")
+        remaining = [
+            schedule[2] - max(0, int(_months_elapsed(debut, start_d)))
+            for debut, schedule in schedules if schedule is not None
+        ]
+        n_months = max([0] + remaining)
+
+    # Une date de plus en tête pour les flux du premier mois
+    dates = monthly_dates(start, n_months, first=-1)
+    crd, cumul = _sample_schedules(schedules, dates)
+    return {
+        "ids": df["id"].to_numpy(dtype=object) if "id" in df else np.arange(len(df)),
+        "dates": dates[1:],
+        "capital_restant_du": crd[:, 1:],
+        "capital": crd[:, :-1] - crd[:, 1:],
+        "interets": np.diff(cumul, axis=1),
+    }
+
+
 def load_emprunts(as_of_date: date | None = None) -> pd.DataFrame:
-    """Charge tous les emprunts avec calcul du capital restant dû."""
+    """
+    Charge tous les emprunts avec calcul du capital restant dû.
+    Mémoïsé par (base, jour, génération de la table emprunts) : les appels
+    répétés dans un rendu, et entre sessions le même jour, ne relisent rien.
+    """
+    as_of = as_of_date or date.today()
+    if isinstance(as_of, pd.Timestamp):
+        as_of = as_of.date()
+    df = _load_emprunts_cached(get_db_path(), as_of, get_generation("emprunts"))
+    return df.copy()
+
+
+@lru_cache(maxsize=8)
+def _load_emprunts_cached(db_path: str, as_of: date, generation: int) -> pd.DataFrame:
     with db_readonly() as conn:
         df = pd.read_sql_query(
             """SELECT id, nom, montant_emprunte, taux_annuel, mensualite, duree_mois, date_debut
                FROM emprunts ORDER BY nom""",
             conn,
         )
-        if not df.empty:
-            df["date_debut"] = pd.to_datetime(df["date_debut"], errors="coerce")
-            df["date_fin"] = df.apply(
-                lambda r: r["date_debut"] + pd.DateOffset(months=int(r["duree_mois"]))
-                if pd.notna(r["date_debut"]) else pd.NaT,
-                axis=1,
-            )
-            as_of = as_of_date or date.today()
-            for i in df.index:
-                try:
-                    df.loc[i, "capital_restant_du"] = _compute_capital_restant_du(
-                        float(df.loc[i, "montant_emprunte"]),
-                        float(df.loc[i, "taux_annuel"]),
-                        float(df.loc[i, "mensualite"]),
-                        df.loc[i, "date_debut"],
-                        int(df.loc[i, "duree_mois"]),
-                        as_of,
-                    )
-                except (TypeError, ValueError):
-                    df.loc[i, "capital_restant_du"] = 0.0
-        return df
+        evenements = conn.execute(
+            """SELECT emprunt_id, date, type, montant, duree_mois, taux_annuel, mensualite
+               FROM emprunt_evenements ORDER BY date, created_at, id"""
+        ).fetchall()
+    if not df.empty:
+        par_emprunt: dict[str, list] = {}
+        for emprunt_id, *evenement in evenements:
+            par_emprunt.setdefault(emprunt_id, []).append(tuple(evenement))
+        df["evenements"] = [tuple(par_emprunt.get(i, ())) for i in df["id"]]
+        df["date_debut"] = pd.to_datetime(df["date_debut"], errors="coerce")
+
+        schedules = _loan_schedules(df)
+        fin = np.array([s[2] if s is not None else d for (_, s), d in zip(schedules, df["duree_mois"])])
+        debut = df["date_debut"].to_numpy(dtype="datetime64[D]")
+        df["date_fin"] = _add_months(debut, fin.astype(np.int64)).astype("datetime64[ns]")
+        df["interets_totaux"] = [float(s[1][-1]) if s is not None else 0.0 for _, s in schedules]
+        df["capital_restant_du"] = _sample_schedules(schedules, np.array([as_of], dtype="datetime64[D]"))[0][:, 0]
+    return df
 
 
 def create_emprunt(nom, montant_emprunte, taux_annuel, mensualite, duree_mois, date_debut) -> str:
@@ -89,6 +299,7 @@ def create_emprunt(nom, montant_emprunte, taux_annuel, mensualite, duree_mois, d
             (emprunt_id, nom.strip(), float(montant_emprunte), float(taux_annuel), float(mensualite), int(duree_mois),
              date_debut if isinstance(date_debut, str) else pd.Timestamp(date_debut).strftime("%Y-%m-%d")),
         )
+    bump_generation("emprunts")
     return emprunt_id
 
 
@@ -102,12 +313,70 @@ def update_emprunt(emprunt_id, nom, montant_emprunte, taux_annuel, mensualite, d
              date_debut if isinstance(date_debut, str) else pd.Timestamp(date_debut).strftime("%Y-%m-%d"),
              emprunt_id),
         )
+    bump_generation("emprunts")
 
 
 def delete_emprunt(emprunt_id: str) -> None:
     """Supprime un emprunt."""
     with db_connection() as conn:
         conn.execute("DELETE FROM emprunts WHERE id = ?", (emprunt_id,))
+    bump_generation("emprunts")
+
+
+# ── Événements d'emprunt ──────────────────────────────────────────────────────
+
+def load_evenements(emprunt_id: str) -> pd.DataFrame:
+    """Événements d'un emprunt, du plus ancien au plus récent."""
+    with db_readonly() as conn:
+        df = pd.read_sql_query(
+            """SELECT id, type, date, montant, duree_mois, taux_annuel, mensualite
+               FROM emprunt_evenements WHERE emprunt_id = ? ORDER BY date, created_at, id""",
+            conn,
+            params=(emprunt_id,),
+        )
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df
+
+
+def add_evenement(emprunt_id: str, type: str, date_evenement, montant: float | None = None,
+                  duree_mois: int | None = None, taux_annuel: float | None = None,
+                  mensualite: float | None = None) -> str:
+    """
+    Ajoute un événement à un emprunt. Champs utilisés selon le type :
+        remboursement_anticipe : montant (obligatoire), mensualite (optionnelle, sinon durée réduite)
+        differe               : duree_mois (obligatoire)
+        revision_taux         : taux_annuel (obligatoire), mensualite (optionnelle, sinon recalculée)
+    Lève ValueError si le type est inconnu ou un champ obligatoire manquant.
+    """
+    if type not in EVENEMENT_EMPRUNT_TYPES:
+        raise ValueError(f"Type d'événement inconnu : {type}")
+    if type == "remboursement_anticipe" and not montant:
+        raise ValueError("Le montant remboursé est obligatoire.")
+    if type == "differe" and not duree_mois:
+        raise ValueError("La durée du différé est obligatoire.")
+    if type == "revision_taux" and taux_annuel is None:
+        raise ValueError("Le nouveau taux est obligatoire.")
+
+    evenement_id = str(uuid.uuid4())
+    with db_connection() as conn:
+        conn.execute(
+            """INSERT INTO emprunt_evenements (id, emprunt_id, type, date, montant, duree_mois, taux_annuel, mensualite)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (evenement_id, emprunt_id, type, pd.Timestamp(date_evenement).strftime("%Y-%m-%d"),
+             float(montant) if montant else None,
+             int(duree_mois) if duree_mois else None,
+             float(taux_annuel) if taux_annuel is not None else None,
+             float(mensualite) if mensualite else None),
+        )
+    bump_generation("emprunts")
+    return evenement_id
+
+
+def delete_evenement(evenement_id: str) -> None:
+    """Supprime un événement d'emprunt."""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM emprunt_evenements WHERE id = ?", (evenement_id,))
+    bump_generation("emprunts")
 
 
 def get_total_emprunts(as_of_date: date | None = None) -> float:
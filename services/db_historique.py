@@ -6,35 +6,53 @@ Gestion de l'historique des valeurs des actifs.
 
 import pandas as pd
 from datetime import date
-from .db import db_readonly, db_connection
+from .db import db_readonly, db_connection, bump_generation, to_epoch_day, epoch_days_to_datetime
 
 
-def load_historique() -> pd.DataFrame:
-    """Charge l'historique des montants par actif."""
+def load_historique(asset_ids: list[str] | None = None) -> pd.DataFrame:
+    """Charge l'historique des montants par actif (seulement `asset_ids` si précisé)."""
+    where, params = "", ()
+    if asset_ids is not None:
+        where = f"WHERE asset_id IN ({','.join('?' * len(asset_ids))})"
+        params = tuple(asset_ids)
     with db_readonly() as conn:
         df = pd.read_sql_query(
-            "SELECT asset_id, date, montant FROM historique ORDER BY asset_id, date",
+            f"SELECT asset_id, date, montant FROM historique {where} ORDER BY asset_id, date",
             conn,
+            params=params,
         )
         if not df.empty:
-            df["date"] = pd.to_datetime(df["date"])
+            df["date"] = epoch_days_to_datetime(df["date"])
         return df
 
 
-def record_montant(asset_id: str, montant: float, record_date: date | None = None) -> None:
+def record_montant(asset_id: str, montant: float, record_date: date | None = None) -> bool:
     """
     Enregistre le montant d'un actif à une date donnée.
     Si un enregistrement existe déjà pour ce jour et cet actif, il est écrasé.
+    Si le montant connu à cette date est déjà le même, rien n'est écrit
+    (la ligne serait redondante pour une lecture à date).
+    Retourne True si une ligne a été écrite.
     """
-    d = (record_date or date.today()).isoformat()
+    d = to_epoch_day(record_date or date.today())
+    valeur = float(montant)
     with db_connection() as conn:
+        row = conn.execute(
+            "SELECT montant FROM historique WHERE asset_id = ? AND date <= ? ORDER BY date DESC LIMIT 1",
+            (asset_id, d),
+        ).fetchone()
+        if row is not None and row[0] == valeur:
+            return False
         conn.execute(
             "INSERT OR REPLACE INTO historique (asset_id, date, montant) VALUES (?, ?, ?)",
-            (asset_id, d, float(montant)),
+            (asset_id, d, valeur),
         )
+    bump_generation("historique")
+    return True
 
 
 def delete_asset_history(asset_id: str) -> None:
     """Supprime tout l'historique d'un actif (utile à la suppression d'un actif)."""
     with db_connection() as conn:
         conn.execute("DELETE FROM historique WHERE asset_id = ?", (asset_id,))
+    bump_generation("historique")
@@ -0,0 +1,151 @@
+"""
+db_lots.py
+──────────
+Stockage des lots FIFO et des cessions (cf. services/lots.py pour le calcul).
+"""
+
+import pandas as pd
+from .db import db_readonly, db_connection, epoch_days_to_datetime
+
+
+def load_lots(asset_id: str | None = None) -> pd.DataFrame:
+    """Lots (ouverts et soldés) d'un actif ou de tous les actifs, du plus ancien au plus récent."""
+    where, params = ("WHERE asset_id = ?", (asset_id,)) if asset_id else ("", ())
+    with db_readonly() as conn:
+        df = pd.read_sql_query(
+            f"""SELECT id, asset_id, date, quantite, quantite_restante, prix_unitaire
+                FROM lots {where} ORDER BY asset_id, date, id""",
+            conn, params=params,
+        )
+    df["date"] = epoch_days_to_datetime(df["date"])
+    return df
+
+
+def load_cessions(asset_id: str | None = None) -> pd.DataFrame:
+    """Cessions (une ligne par lot consommé) d'un actif ou de tous les actifs."""
+    where, params = ("WHERE asset_id = ?", (asset_id,)) if asset_id else ("", ())
+    with db_readonly() as conn:
+        df = pd.read_sql_query(
+            f"""SELECT id, asset_id, lot_id, date, quantite, prix_achat, prix_vente, plus_value
+                FROM cessions {where} ORDER BY asset_id, date, id""",
+            conn, params=params,
+        )
+    df["date"] = epoch_days_to_datetime(df["date"])
+    return df
+
+
+def load_lot_state(asset_id: str, day: int) -> dict:
+    """
+    État nécessaire à la mise à jour incrémentale après l'écriture de la position du jour `day` :
+        lots_ouverts      : lots avec quantité restante (dicts), du plus ancien au plus récent
+        dernier_mouvement : jour du dernier lot ou de la dernière cession (None si aucun)
+        quantite_avant    : quantité de la dernière position antérieure à `day` (0 si aucune)
+        quantite, prix    : position enregistrée au jour `day` (None si absente)
+        positions_apres   : vrai si des positions sont datées après `day`
+    """
+    with db_readonly() as conn:
+        lots = conn.execute(
+            """SELECT id, date, quantite, quantite_restante, prix_unitaire FROM lots
+               WHERE asset_id = ? AND quantite_restante > 0 ORDER BY date, id""",
+            (asset_id,),
+        ).fetchall()
+        dernier = conn.execute(
+            """SELECT MAX(d) FROM (
+                   SELECT MAX(date) AS d FROM lots WHERE asset_id = ?
+                   UNION ALL SELECT MAX(date) FROM cessions WHERE asset_id = ?)""",
+            (asset_id, asset_id),
+        ).fetchone()[0]
+        avant = conn.execute(
+            "SELECT quantite FROM positions WHERE asset_id = ? AND date < ? ORDER BY date DESC LIMIT 1",
+            (asset_id, day),
+        ).fetchone()
+        jour = conn.execute(
+            "SELECT quantite, prix_unitaire FROM positions WHERE asset_id = ? AND date = ?",
+            (asset_id, day),
+        ).fetchone()
+        apres = conn.execute(
+            "SELECT 1 FROM positions WHERE asset_id = ? AND date > ? LIMIT 1",
+            (asset_id, day),
+        ).fetchone()
+    columns = ("id", "date", "quantite", "quantite_restante", "prix_unitaire")
+    return {
+        "lots_ouverts": [dict(zip(columns, row)) for row in lots],
+        "dernier_mouvement": dernier,
+        "quantite_avant": avant[0] if avant else 0.0,
+        "quantite": jour[0] if jour else None,
+        "prix": jour[1] if jour else None,
+        "positions_apres": apres is not None,
+    }
+
+
+def load_movements(asset_id: str) -> list[tuple]:
+    """Chronologie des positions d'un actif : (jour, quantité, prix unitaire ou None)."""
+    with db_readonly() as conn:
+        return conn.execute(
+            "SELECT date, quantite, prix_unitaire FROM positions WHERE asset_id = ? ORDER BY date",
+            (asset_id,),
+        ).fetchall()
+
+
+def get_prix_defaut(asset_id: str) -> float:
+    """PRU saisi pour l'actif : prix retenu pour un mouvement dont le cours est inconnu."""
+    with db_readonly() as conn:
+        row = conn.execute("SELECT pru FROM actifs_ticker WHERE actif_id = ?", (asset_id,)).fetchone()
+    return float(row[0]) if row and row[0] is not None else 0.0
+
+
+def has_lots(asset_id: str) -> bool:
+    """Vrai si des lots existent déjà pour l'actif (toute cession se rattache à un lot)."""
+    with db_readonly() as conn:
+        return conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM lots WHERE asset_id = ?)", (asset_id,)
+        ).fetchone()[0] == 1
+
+
+def save_movement(asset_id: str, lot: dict | None, cessions: list[dict]) -> None:
+    """Enregistre un mouvement calculé incrémentalement : nouveau lot ou cessions."""
+    with db_connection() as conn:
+        if lot is not None:
+            _insert_lot(conn, asset_id, lot)
+        for cession in cessions:
+            conn.execute(
+                "UPDATE lots SET quantite_restante = ? WHERE id = ?",
+                (cession["lot"]["quantite_restante"], cession["lot"]["id"]),
+            )
+            _insert_cession(conn, asset_id, cession)
+
+
+def replace_lots(asset_id: str, lots: list[dict], cessions: list[dict]) -> None:
+    """Remplace tous les lots et cessions d'un actif (reconstruction complète)."""
+    with db_connection() as conn:
+        conn.execute("DELETE FROM cessions WHERE asset_id = ?", (asset_id,))
+        conn.execute("DELETE FROM lots WHERE asset_id = ?", (asset_id,))
+        for lot in lots:
+            _insert_lot(conn, asset_id, lot)
+        for cession in cessions:
+            _insert_cession(conn, asset_id, cession)
+
+
+def delete_asset_lots(asset_id: str) -> None:
+    with db_connection() as conn:
+        conn.execute("DELETE FROM cessions WHERE asset_id = ?", (asset_id,))
+        conn.execute("DELETE FROM lots WHERE asset_id = ?", (asset_id,))
+
+
+def _insert_lot(conn, asset_id: str, lot: dict) -> None:
+    cursor = conn.execute(
+        """INSERT INTO lots (asset_id, date, quantite, quantite_restante, prix_unitaire)
+           VALUES (?, ?, ?, ?, ?)""",
+        (asset_id, lot["date"], lot["quantite"], lot["quantite_restante"], lot["prix_unitaire"]),
+    )
+    # Les cessions calculées dans le même passage référencent ce lot
+    lot["id"] = cursor.lastrowid
+
+
+def _insert_cession(conn, asset_id: str, cession: dict) -> None:
+    conn.execute(
+        """INSERT INTO cessions (asset_id, lot_id, date, quantite, prix_achat, prix_vente, plus_value)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (asset_id, cession["lot"]["id"], cession["date"], cession["quantite"],
+         cession["prix_achat"], cession["prix_vente"], cession["plus_value"]),
+    )
@@ -6,35 +6,73 @@ Gestion des positions (quantités) des actifs à prix de marché.
 
 import pandas as pd
 from datetime import date
-from .db import db_readonly, db_connection
+from .db import db_readonly, db_connection, bump_generation, to_epoch_day, epoch_days_to_datetime
 
 
-def load_positions() -> pd.DataFrame:
-    """Charge l'historique des positions par actif."""
+def load_positions(asset_ids: list[str] | None = None) -> pd.DataFrame:
+    """Charge l'historique des positions par actif (seulement `asset_ids` si précisé)."""
+    where, params = "", ()
+    if asset_ids is not None:
+        where = f"WHERE asset_id IN ({','.join('?' * len(asset_ids))})"
+        params = tuple(asset_ids)
     with db_readonly() as conn:
         df = pd.read_sql_query(
-            "SELECT asset_id, date, quantite FROM positions ORDER BY asset_id, date",
+            f"SELECT asset_id, date, quantite FROM positions {where} ORDER BY asset_id, date",
             conn,
+            params=params,
         )
         if not df.empty:
-            df["date"] = pd.to_datetime(df["date"])
+            df["date"] = epoch_days_to_datetime(df["date"])
         return df
 
 
-def record_position(asset_id: str, quantite: float, record_date: date | None = None) -> None:
+def get_position_before(asset_id: str, record_date: date) -> tuple[float, bool]:
+    """
+    Situation d'un actif juste avant un mouvement daté de `record_date` :
+    (quantité en vigueur la veille — 0 si aucune —, vrai si des positions sont
+    enregistrées après cette date).
+    """
+    d = to_epoch_day(record_date)
+    with db_readonly() as conn:
+        row = conn.execute(
+            "SELECT quantite FROM positions WHERE asset_id = ? AND date < ? ORDER BY date DESC LIMIT 1",
+            (asset_id, d),
+        ).fetchone()
+        later = conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM positions WHERE asset_id = ? AND date > ?)", (asset_id, d),
+        ).fetchone()[0]
+    return (float(row[0]) if row is not None else 0.0), later == 1
+
+
+def record_position(asset_id: str, quantite: float, record_date: date | None = None,
+                    prix_unitaire: float | None = None) -> bool:
     """
     Enregistre la quantité détenue pour un actif à une date donnée.
     Si un enregistrement existe déjà pour ce jour, il est écrasé.
+    Si la quantité connue à cette date est déjà la même, rien n'est écrit
+    (la ligne serait redondante pour une lecture à date).
+    prix_unitaire : prix de l'achat ou de la vente correspondant (lots FIFO).
+    Retourne True si une ligne a été écrite.
     """
-    d = (record_date or date.today()).isoformat()
+    d = to_epoch_day(record_date or date.today())
+    valeur = float(quantite)
     with db_connection() as conn:
+        row = conn.execute(
+            "SELECT quantite FROM positions WHERE asset_id = ? AND date <= ? ORDER BY date DESC LIMIT 1",
+            (asset_id, d),
+        ).fetchone()
+        if row is not None and row[0] == valeur:
+            return False
         conn.execute(
-            "INSERT OR REPLACE INTO positions (asset_id, date, quantite) VALUES (?, ?, ?)",
-            (asset_id, d, float(quantite)),
+            "INSERT OR REPLACE INTO positions (asset_id, date, quantite, prix_unitaire) VALUES (?, ?, ?, ?)",
+            (asset_id, d, valeur, prix_unitaire),
         )
+    bump_generation("positions")
+    return True
 
 
 def delete_asset_positions(asset_id: str) -> None:
     """Supprime toutes les positions d'un actif (utile à la suppression d'un actif)."""
     with db_connection() as conn:
         conn.execute("DELETE FROM positions WHERE asset_id = ?", (asset_id,))
+    bump_generation("positions")
@@ -0,0 +1,64 @@
+"""
+downsampling.py
+───────────────
+Réduction du nombre de points d'une série avant affichage.
+
+Les graphiques interactifs reçoivent tout l'historique en une fois (le zoom et
+le choix de la période se font dans le navigateur) : au-delà de quelques
+milliers de points, le tracé n'apporte plus rien à l'écran et alourdit la page.
+
+L'algorithme retenu est LTTB (Largest Triangle Three Buckets) : il garde, dans
+chaque tranche, le point qui préserve le mieux la forme de la courbe (pics,
+creux), là où un simple pas régulier les lisserait.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Positions des points à conserver (triées, premier et dernier inclus).
+    x : abscisses croissantes (numériques), y : ordonnées, même longueur.
+    Retourne toutes les positions si la série tient déjà dans max_points.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    # Tranches intérieures : le premier et le dernier point sont toujours gardés
+    bornes = np.linspace(1, n - 1, max_points - 1).astype(int)
+    kept = np.empty(max_points, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(max_points - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        # Moyenne de la tranche suivante : troisième sommet du triangle
+        suiv_debut, suiv_fin = fin, bornes[i + 2] if i + 2 < len(bornes) else n
+        x_moy = x[suiv_debut:suiv_fin].mean()
+        y_moy = y[suiv_debut:suiv_fin].mean()
+
+        aires = np.abs(
+            (x[a] - x_moy) * (y[debut:fin] - y[a])
+            - (x[a] - x[debut:fin]) * (y_moy - y[a])
+        )
+        a = debut + int(aires.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(data: pd.Series | pd.DataFrame, max_points: int) -> pd.Series | pd.DataFrame:
+    """
+    Réduit une série (ou un DataFrame) indexée par date à max_points lignes au plus.
+    Pour un DataFrame, les lignes sont choisies sur la somme des colonnes : toutes
+    les colonnes gardent le même axe de dates (nécessaire aux aires empilées).
+    """
+    if len(data) <= max_points:
+        return data
+    y = data.sum(axis=1) if isinstance(data, pd.DataFrame) else data
+    x = pd.to_datetime(data.index).asi8 if isinstance(data.index, pd.DatetimeIndex) else np.arange(len(data))
+    return data.iloc[lttb_indices(x, y.to_numpy(), max_points)]
@@ -6,8 +6,14 @@ Module utilitaire pour les calculs financiers communs.
 """
 
 import pandas as pd
+import streamlit as st
 from typing import Dict, Tuple, Optional
-from services.db_emprunts import load_emprunts
+from constants import CATEGORIES_AUTO
+from services.repository import get_emprunt, get_emprunts
+from services.profiler import note_cache_miss
+
+# Colonnes d'actifs lues par summarize_pnl (clé de son cache)
+PNL_COLUMNS = ["categorie", "contrat_id", "montant", "quantite", "pru"]
 
 
 def calculate_immo_real_cost(prix_achat: float, frais_notaire: float, montant_travaux: float) -> float:
@@ -72,15 +78,8 @@ def get_loan_monthly_payment(emprunt_id: str) -> float:
     if not emprunt_id or pd.isna(emprunt_id):
         return 0.0
     
-    try:
-        df_emprunts = load_emprunts()
-        emp = df_emprunts[df_emprunts["id"] == str(emprunt_id)]
-        if not emp.empty:
-            return float(emp.iloc[0]["mensualite"])
-    except Exception:
-        pass
-    
-    return 0.0
+    emp = get_emprunt(emprunt_id)
+    return float(emp["mensualite"]) if emp is not None else 0.0
 
 
 def calculate_rental_metrics(asset: pd.Series) -> Dict[str, float]:
@@ -93,31 +92,48 @@ def calculate_rental_metrics(asset: pd.Series) -> Dict[str, float]:
     Returns:
         Dictionnaire avec les métriques calculées
     """
-    # Extraire les données de l'actif
-    loyer = float(asset.get("loyer_mensuel") or 0)
-    charges = float(asset.get("charges_mensuelles") or 0)
-    taxe = float(asset.get("taxe_fonciere_annuelle") or 0)
-    prix_achat = float(asset.get("prix_achat") or 0)
-    frais_notaire = float(asset.get("frais_notaire") or 0)
-    montant_travaux = float(asset.get("montant_travaux") or 0)
-    
-    # Calculer le coût réel
-    cout_reel = calculate_immo_real_cost(prix_achat, frais_notaire, montant_travaux)
-    
-    # Récupérer la mensualité d'emprunt si applicable
-    emprunt_id = asset.get("emprunt_id")
-    mensualite = get_loan_monthly_payment(emprunt_id) if emprunt_id else 0.0
-    
-    # Calculer les métriques
-    rendement_brut = calculate_rental_yield(loyer, charges, cout_reel)
-    cashflow = calculate_monthly_cashflow(loyer, charges, taxe, mensualite)
+    return calculate_rental_metrics_batch(asset.to_frame().T).iloc[0].to_dict()
+
+
+def calculate_rental_metrics_batch(df_assets: pd.DataFrame, df_emprunts: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Calcule les métriques locatives de tous les biens d'un coup.
+    Les emprunts sont joints une seule fois sur emprunt_id.
     
-    return {
+    Args:
+        df_assets: DataFrame d'actifs immobiliers (colonnes de actifs_immobilier)
+        df_emprunts: DataFrame des emprunts (par défaut : ceux du rerun courant)
+        
+    Returns:
+        DataFrame de même index avec cout_reel, rendement_brut, cashflow_mensuel, mensualite_emprunt
+    """
+    def col(name: str) -> pd.Series:
+        if name not in df_assets:
+            return pd.Series(0.0, index=df_assets.index)
+        return pd.to_numeric(df_assets[name], errors="coerce").fillna(0.0).astype(float)
+
+    if df_emprunts is None:
+        df_emprunts = get_emprunts()
+
+    loyer = col("loyer_mensuel")
+    charges = col("charges_mensuelles")
+    cout_reel = calculate_immo_real_cost(col("prix_achat"), col("frais_notaire"), col("montant_travaux"))
+
+    mensualite = pd.Series(0.0, index=df_assets.index)
+    if "emprunt_id" in df_assets and not df_emprunts.empty:
+        mensualites = df_emprunts.set_index("id")["mensualite"].astype(float)
+        mensualite = df_assets["emprunt_id"].map(mensualites).fillna(0.0).astype(float)
+
+    rentable = (loyer > 0) & (cout_reel > 0)
+    rendement_brut = ((loyer - charges) * 12 / cout_reel.where(rentable) * 100).where(rentable, 0.0)
+    cashflow = calculate_monthly_cashflow(loyer, charges, col("taxe_fonciere_annuelle"), mensualite)
+
+    return pd.DataFrame({
         "cout_reel": cout_reel,
         "rendement_brut": rendement_brut,
         "cashflow_mensuel": cashflow,
-        "mensualite_emprunt": mensualite
-    }
+        "mensualite_emprunt": mensualite,
+    }, index=df_assets.index)
 
 
 def calculate_investment_performance(prix_achat: float, frais_notaire: float, 
@@ -169,3 +185,68 @@ def calculate_auto_asset_pnl(montant_actuel: float, pru: float, quantite: float)
         "pnl_absolu": pnl,
         "pnl_pct": pnl_pct
     }
+
+
+def summarize_pnl(df_assets: pd.DataFrame) -> Dict:
+    """
+    Coût d'acquisition et PnL des actifs cotés, calculés en une passe vectorisée.
+    Seuls les actifs cotés avec quantité et PRU renseignés ont un coût d'acquisition.
+    Le résultat est mis en cache sur les seules colonnes lues (PNL_COLUMNS) :
+    il n'est recalculé que si l'une d'elles change.
+
+    Returns:
+        Dictionnaire :
+            par_actif     : DataFrame de même index que df_assets :
+                            valeur_achat | pnl | pnl_pct (NaN sans coût d'acquisition)
+            par_categorie : DataFrame indexé par catégorie :
+                            montant | valeur_achat | pnl | pnl_pct
+            par_contrat   : idem, indexé par contrat_id (actifs sans contrat exclus)
+            global        : dict montant | valeur_achat | pnl | pnl_pct
+        Les agrégats ne portent que sur les actifs ayant un coût d'acquisition.
+    """
+    return _summarize_pnl(df_assets[PNL_COLUMNS])
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _summarize_pnl(df: pd.DataFrame) -> Dict:
+    note_cache_miss("summarize_pnl")
+    montant = pd.to_numeric(df["montant"], errors="coerce").fillna(0.0).astype(float)
+    quantite = pd.to_numeric(df["quantite"], errors="coerce").fillna(0.0).astype(float)
+    pru = pd.to_numeric(df["pru"], errors="coerce").fillna(0.0).astype(float)
+    avec_cout = df["categorie"].isin(CATEGORIES_AUTO) & (quantite > 0) & (pru > 0)
+
+    valeur_achat = (pru * quantite).where(avec_cout)
+    pnl = montant - valeur_achat
+    par_actif = pd.DataFrame({
+        "valeur_achat": valeur_achat,
+        "pnl": pnl,
+        "pnl_pct": pnl / valeur_achat * 100,
+    }, index=df.index)
+
+    lignes = pd.DataFrame({
+        "categorie": df["categorie"],
+        "contrat_id": df["contrat_id"].fillna("").astype(str).str.strip(),
+        "montant": montant,
+        "valeur_achat": valeur_achat,
+        "pnl": pnl,
+    })[avec_cout]
+
+    def aggregate(by: str) -> pd.DataFrame:
+        groupes = lignes[lignes[by] != ""] if by == "contrat_id" else lignes
+        agg = groupes.groupby(by)[["montant", "valeur_achat", "pnl"]].sum()
+        agg["pnl_pct"] = agg["pnl"] / agg["valeur_achat"] * 100
+        return agg
+
+    total_achat = float(lignes["valeur_achat"].sum())
+    total_pnl = float(lignes["pnl"].sum())
+    return {
+        "par_actif": par_actif,
+        "par_categorie": aggregate("categorie"),
+        "par_contrat": aggregate("contrat_id"),
+        "global": {
+            "montant": float(lignes["montant"].sum()),
+            "valeur_achat": total_achat,
+            "pnl": total_pnl,
+            "pnl_pct": total_pnl / total_achat * 100 if total_achat > 0 else 0.0,
+        },
+    }
@@ -1,9 +1,13 @@
+import threading
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import date
 
 from constants import CACHE_TTL_SECONDS
-from services import db
+from services import cache_deps, db
+from services.profiler import note_cache_miss
 
 
 def init_historique():
@@ -11,18 +15,19 @@ def init_historique():
     pass
 
 
-def load_historique() -> pd.DataFrame:
+def load_historique(asset_ids: list[str] | None = None) -> pd.DataFrame:
     from services.db_historique import load_historique
-    return load_historique()
+    return load_historique(asset_ids)
 
 
-def record_montant(asset_id: str, montant: float, record_date: date | None = None):
+def record_montant(asset_id: str, montant: float, record_date: date | None = None) -> bool:
     """
     Enregistre le montant d'un actif manuel à une date donnée.
     Si un enregistrement existe déjà pour ce jour et cet actif, il est écrasé.
+    Retourne False si le montant était déjà connu à cette date (rien n'est écrit).
     """
     from services.db_historique import record_montant
-    record_montant(asset_id, montant, record_date)
+    return record_montant(asset_id, montant, record_date)
 
 
 def delete_asset_history(asset_id: str):
@@ -57,6 +62,7 @@ def build_total_evolution(
     Retourne un DataFrame { date, total } avec la valeur totale du patrimoine
     pour chaque date disponible dans l'historique.
     """
+    note_cache_miss("build_total_evolution")
     raw = _compute_raw_evolution(df_assets, df_hist, df_positions, df_prices, categories_auto)
     if raw.empty:
         return pd.DataFrame(columns=["date", "total"])
@@ -78,6 +84,7 @@ def build_category_evolution(
     Retourne un DataFrame pivot date × catégorie avec la valeur de chaque catégorie
     pour chaque date disponible dans l'historique.
     """
+    note_cache_miss("build_category_evolution")
     raw = _compute_raw_evolution(df_assets, df_hist, df_positions, df_prices, categories_auto)
     if raw.empty:
         return pd.DataFrame()
@@ -99,6 +106,7 @@ def build_asset_evolution(
     Retourne un DataFrame pivot date × nom d'actif avec la valeur de chaque actif
     pour chaque date disponible dans l'historique.
     """
+    note_cache_miss("build_asset_evolution")
     raw = _compute_raw_evolution(df_assets, df_hist, df_positions, df_prices, categories_auto)
     if raw.empty:
         return pd.DataFrame()
@@ -108,6 +116,129 @@ def build_asset_evolution(
     return pivot.sort_index()
 
 
+def build_net_worth_evolution(
+    df_assets: pd.DataFrame,
+    df_hist: pd.DataFrame,
+    df_positions: pd.DataFrame,
+    df_prices: pd.DataFrame,
+    categories_auto: tuple,
+    df_emprunts: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Retourne un DataFrame { date, actifs, passifs, net } : valeur totale des actifs
+    moins le capital restant dû de tous les emprunts, à chaque date de l'évolution.
+    """
+    total = build_total_evolution(df_assets, df_hist, df_positions, df_prices, categories_auto)
+    if total.empty:
+        return pd.DataFrame(columns=["date", "actifs", "passifs", "net"])
+
+    passifs = _crd_at_dates(df_emprunts, total["date"]).sum(axis=0)
+    return pd.DataFrame({
+        "date": total["date"],
+        "actifs": total["total"],
+        "passifs": passifs,
+        "net": total["total"].to_numpy() - passifs,
+    })
+
+
+def build_property_equity_evolution(
+    df_assets: pd.DataFrame,
+    df_hist: pd.DataFrame,
+    df_emprunts: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    Valeur nette de chaque bien immobilier : valeur estimée moins le capital
+    restant dû de son emprunt lié (emprunt_id), à chaque date de son historique.
+    Retourne un DataFrame long : date | asset_id | nom | valeur | crd | equity
+    """
+    columns = ["date", "asset_id", "nom", "valeur", "crd", "equity"]
+    if df_assets.empty:
+        return pd.DataFrame(columns=columns)
+    immo = df_assets[df_assets["categorie"] == "Immobilier"]
+    raw = _compute_raw_evolution(immo, df_hist, pd.DataFrame(), pd.DataFrame(), ())
+    if raw.empty:
+        return pd.DataFrame(columns=columns)
+
+    # CRD (emprunts × dates) + une ligne de zéros pour les biens sans emprunt (indice -1)
+    dates, date_idx = np.unique(raw["date"].to_numpy(), return_inverse=True)
+    crd = np.vstack([_crd_at_dates(df_emprunts, dates), np.zeros(len(dates))])
+    emprunt_ids = raw["asset_id"].map(immo.set_index("id")["emprunt_id"]) if "emprunt_id" in immo else None
+    loan_idx = (
+        pd.Index(df_emprunts["id"]).get_indexer(emprunt_ids.astype(object))
+        if emprunt_ids is not None and not df_emprunts.empty
+        else np.full(len(raw), -1)
+    )
+
+    raw["crd"] = crd[loan_idx, date_idx]
+    raw["equity"] = raw["valeur"] - raw["crd"]
+    return raw[columns].sort_values(["date", "nom"]).reset_index(drop=True)
+
+
+def _crd_at_dates(df_emprunts: pd.DataFrame, dates) -> np.ndarray:
+    """CRD (emprunts × dates) ; un emprunt ne compte qu'à partir de sa date de début."""
+    from services.db_emprunts import capital_restant_du_matrix
+    days = pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[D]")
+    if df_emprunts.empty:
+        return np.zeros((0, len(days)))
+    crd = capital_restant_du_matrix(df_emprunts, days)
+    debut = pd.to_datetime(df_emprunts["date_debut"], errors="coerce").to_numpy(dtype="datetime64[D]")
+    return np.where(days[None, :] >= debut[:, None], crd, 0.0)
+
+
+# ── Cache par actif ───────────────────────────────────────────────────────────
+# La valeur d'un actif dans le temps ne dépend que de ses propres relevés, de
+# l'axe des dates et de ses cours : elle est gardée par actif, sous une clé qui
+# contient une empreinte de chacun. Seuls les actifs dont un relevé a changé
+# sont recalculés ; les écritures évincent en plus leurs actifs
+# (cf. services/cache_deps.py) pour ne pas garder de variantes périmées.
+
+EVOLUTION_COLUMNS = ["id", "nom", "categorie", "ticker"]  # colonnes d'actifs lues par les évolutions
+_PARTS_PER_ASSET = 4  # variantes gardées par actif (périodes, axes différents)
+
+_parts_lock = threading.Lock()
+_parts: dict[tuple[str, str], dict[tuple, pd.DataFrame | None]] = {}
+
+
+def evict_asset_evolution(asset_ids: set[str] | None = None) -> None:
+    """Oublie les évolutions par actif de `asset_ids` (de tous les actifs si None)."""
+    with _parts_lock:
+        if asset_ids is None:
+            _parts.clear()
+            return
+        for key in [k for k in _parts if k[1] in asset_ids]:
+            del _parts[key]
+
+
+def _clear_evolutions() -> None:
+    build_total_evolution.clear()
+    build_category_evolution.clear()
+    build_asset_evolution.clear()
+
+
+def _cached_part(asset_id: str, key: tuple, compute) -> pd.DataFrame | None:
+    slot = (db.get_db_path(), str(asset_id))
+    key = (db.get_generation("*"),) + key
+    with _parts_lock:
+        variants = _parts.get(slot, {})
+        if key in variants:
+            return variants[key]
+    note_cache_miss("evolution_par_actif")
+    part = compute()
+    with _parts_lock:
+        variants = _parts.setdefault(slot, {})
+        variants[key] = part
+        while len(variants) > _PARTS_PER_ASSET:
+            del variants[next(iter(variants))]
+    return part
+
+
+cache_deps.register_cache("evolution_par_actif", ("historique", "positions"),
+                          clear=evict_asset_evolution, evict=evict_asset_evolution)
+# Les évolutions agrégées sont indexées sur le contenu de leurs entrées : les
+# vider libère la mémoire, le recalcul réutilise le cache par actif.
+cache_deps.register_cache("evolutions", ("historique", "positions"), clear=_clear_evolutions)
+
+
 def _compute_raw_evolution(
     df_assets: pd.DataFrame,
     df_hist: pd.DataFrame,
@@ -131,74 +262,114 @@ def _compute_raw_evolution(
         all_dates = all_dates[all_dates >= earliest]
 
     dates_df = pd.DataFrame({"date": all_dates})
+    axis_key = hash(all_dates.asi8.tobytes())
     parts = []
 
     auto_mask = df_assets["categorie"].isin(categories_auto) & (df_assets["ticker"] != "")
     manual_assets = df_assets[~auto_mask]
     auto_assets = df_assets[auto_mask]
 
+    def _get(asset, key, compute):
+        return _cached_part(asset["id"], (axis_key, asset["nom"], asset["categorie"]) + key, compute)
+
     if not manual_assets.empty and not df_hist.empty:
         hist_sorted = df_hist.sort_values("date")
+        hist_keys = _fingerprints(df_hist, "montant")
         for _, asset in manual_assets.iterrows():
-            asset_hist = hist_sorted[hist_sorted["asset_id"] == asset["id"]]
-            if asset_hist.empty:
-                continue
-            merged = pd.merge_asof(
-                dates_df,
-                asset_hist[["date", "montant"]],
-                on="date",
-                direction="backward",
-            )
-            merged = merged.dropna(subset=["montant"])
-            if merged.empty:
-                continue
-            merged["asset_id"] = asset["id"]
-            merged["nom"] = asset["nom"]
-            merged["categorie"] = asset["categorie"]
-            merged = merged.rename(columns={"montant": "valeur"})
-            parts.append(merged[["date", "asset_id", "nom", "categorie", "valeur"]])
+            part = _get(asset, ("manuel", hist_keys.get(asset["id"])),
+                        lambda: _manual_part(asset, hist_sorted, dates_df))
+            if part is not None:
+                parts.append(part)
 
     if not auto_assets.empty and not df_prices.empty and not df_positions.empty:
-        prices_long = df_prices.ffill().bfill().stack().reset_index()
-        prices_long.columns = ["date", "ticker", "price"]
-        prices_long["date"] = pd.to_datetime(prices_long["date"]).dt.normalize()
-        prices_long = prices_long.sort_values("date")
+        prices = {}  # cours au format long, construits au premier actif à recalculer
+        prices_index = pd.to_datetime(df_prices.index).asi8.tobytes()
         positions_sorted = df_positions.sort_values("date")
+        positions_keys = _fingerprints(df_positions, "quantite")
 
         for _, asset in auto_assets.iterrows():
             ticker = asset["ticker"]
             if ticker not in df_prices.columns:
                 continue
-            asset_prices = prices_long[prices_long["ticker"] == ticker]
-            asset_positions = positions_sorted[positions_sorted["asset_id"] == asset["id"]]
-            if asset_positions.empty:
-                continue
-            merged = pd.merge_asof(
-                dates_df,
-                asset_prices[["date", "price"]],
-                on="date",
-                direction="backward",
-            )
-            merged = pd.merge_asof(
-                merged,
-                asset_positions[["date", "quantite"]],
-                on="date",
-                direction="backward",
-            )
-            merged = merged.dropna(subset=["quantite", "price"])
-            if merged.empty:
-                continue
-            merged["valeur"] = (merged["price"] * merged["quantite"]).round(2)
-            merged["asset_id"] = asset["id"]
-            merged["nom"] = asset["nom"]
-            merged["categorie"] = asset["categorie"]
-            parts.append(merged[["date", "asset_id", "nom", "categorie", "valeur"]])
+            prices_key = hash((prices_index, df_prices[ticker].to_numpy().tobytes()))
+            part = _get(asset, (ticker, prices_key, positions_keys.get(asset["id"])),
+                        lambda: _auto_part(asset, _prices_long(df_prices, prices), positions_sorted, dates_df))
+            if part is not None:
+                parts.append(part)
 
     if not parts:
         return pd.DataFrame()
     return pd.concat(parts, ignore_index=True)
 
 
+def _fingerprints(df: pd.DataFrame, value_col: str) -> dict:
+    """Empreinte des relevés (date, valeur) de chaque actif, calculée en une passe."""
+    if df.empty:
+        return {}
+    hashes = pd.util.hash_pandas_object(df[["asset_id", "date", value_col]], index=False)
+    return hashes.groupby(df["asset_id"].to_numpy()).sum().to_dict()
+
+
+def _prices_long(df_prices: pd.DataFrame, memo: dict) -> pd.DataFrame:
+    """Cours au format long date | ticker | price (calculés une fois par appel)."""
+    if "long" not in memo:
+        prices_long = df_prices.ffill().bfill().stack().reset_index()
+        prices_long.columns = ["date", "ticker", "price"]
+        prices_long["date"] = pd.to_datetime(prices_long["date"]).dt.normalize()
+        memo["long"] = prices_long.sort_values("date")
+    return memo["long"]
+
+
+def _manual_part(asset: pd.Series, hist_sorted: pd.DataFrame, dates_df: pd.DataFrame) -> pd.DataFrame | None:
+    """Valeur d'un actif manuel à chaque date : dernier montant relevé."""
+    asset_hist = hist_sorted[hist_sorted["asset_id"] == asset["id"]]
+    if asset_hist.empty:
+        return None
+    merged = pd.merge_asof(
+        dates_df,
+        asset_hist[["date", "montant"]],
+        on="date",
+        direction="backward",
+    )
+    merged = merged.dropna(subset=["montant"])
+    if merged.empty:
+        return None
+    merged["asset_id"] = asset["id"]
+    merged["nom"] = asset["nom"]
+    merged["categorie"] = asset["categorie"]
+    merged = merged.rename(columns={"montant": "valeur"})
+    return merged[["date", "asset_id", "nom", "categorie", "valeur"]]
+
+
+def _auto_part(asset: pd.Series, prices_long: pd.DataFrame, positions_sorted: pd.DataFrame,
+               dates_df: pd.DataFrame) -> pd.DataFrame | None:
+    """Valeur d'un actif coté à chaque date : dernier cours × dernière quantité connue."""
+    asset_prices = prices_long[prices_long["ticker"] == asset["ticker"]]
+    asset_positions = positions_sorted[positions_sorted["asset_id"] == asset["id"]]
+    if asset_positions.empty:
+        return None
+    merged = pd.merge_asof(
+        dates_df,
+        asset_prices[["date", "price"]],
+        on="date",
+        direction="backward",
+    )
+    merged = pd.merge_asof(
+        merged,
+        asset_positions[["date", "quantite"]],
+        on="date",
+        direction="backward",
+    )
+    merged = merged.dropna(subset=["quantite", "price"])
+    if merged.empty:
+        return None
+    merged["valeur"] = (merged["price"] * merged["quantite"]).round(2)
+    merged["asset_id"] = asset["id"]
+    merged["nom"] = asset["nom"]
+    merged["categorie"] = asset["categorie"]
+    return merged[["date", "asset_id", "nom", "categorie", "valeur"]]
+
+
 def _collect_all_dates(df_hist: pd.DataFrame, df_prices: pd.DataFrame) -> pd.DatetimeIndex:
     """Collecte toutes les dates disponibles dans les deux sources."""
     dates = set()
@@ -0,0 +1,197 @@
+"""
+import_historique.py
+────────────────────
+Import en masse de l'historique (montants) et des positions (quantités)
+depuis des exports CSV / JSON (relevés de courtier, anciens fichiers CSV).
+
+Le fichier est lu par blocs : chaque bloc est validé, ses dates normalisées,
+puis écrit via executemany dans sa propre transaction. Les caches dérivés
+(évolutions) ne sont vidés qu'une seule fois, à la fin de l'import.
+
+Format attendu (une ligne par actif et par date) :
+    asset_id, date, montant     → historique
+    asset_id, date, quantite    → positions
+"""
+
+import os
+from typing import Iterator
+
+import pandas as pd
+
+from constants import HISTORIQUE_PATH, POSITIONS_PATH, IMPORT_CHUNK_SIZE
+from .db import db_readonly, db_connection, bump_generation, datetime_to_epoch_days
+
+
+# table → colonne de valeur
+_VALUE_COLUMN = {
+    "historique": "montant",
+    "positions": "quantite",
+}
+
+CONFLICT_MODES = ("replace", "ignore")
+
+
+# ── Points d'entrée publics ───────────────────────────────────────────────────
+
+def import_historique(source=HISTORIQUE_PATH, on_conflict: str = "replace",
+                      chunksize: int = IMPORT_CHUNK_SIZE, format: str | None = None) -> dict:
+    """Importe un export de montants dans la table historique."""
+    return import_table("historique", source, on_conflict, chunksize, format)
+
+
+def import_positions(source=POSITIONS_PATH, on_conflict: str = "replace",
+                     chunksize: int = IMPORT_CHUNK_SIZE, format: str | None = None) -> dict:
+    """Importe un export de quantités dans la table positions."""
+    return import_table("positions", source, on_conflict, chunksize, format)
+
+
+def import_table(table: str, source, on_conflict: str = "replace",
+                 chunksize: int = IMPORT_CHUNK_SIZE, format: str | None = None) -> dict:
+    """
+    Importe un fichier (chemin ou objet fichier) dans historique ou positions.
+
+    on_conflict :
+        "replace" → une ligne existante (même actif, même date) est écrasée
+        "ignore"  → la ligne existante est conservée
+
+    Retourne un dict { lues, importees, ignorees, rejetees }.
+    Les lignes rejetées sont celles dont la date, la valeur ou l'actif est invalide.
+    """
+    if table not in _VALUE_COLUMN:
+        raise ValueError(f"Table inconnue : {table}")
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"Mode de conflit inconnu : {on_conflict}")
+
+    value_col = _VALUE_COLUMN[table]
+    known_ids = _load_asset_ids()
+    sql = _insert_sql(table, value_col, on_conflict)
+
+    report = {"lues": 0, "importees": 0, "ignorees": 0, "rejetees": 0}
+    touched: set[str] = set()
+    for chunk in _iter_chunks(source, chunksize, format):
+        rows, rejected = _normalize_chunk(chunk, value_col, known_ids)
+        report["lues"] += len(chunk)
+        report["rejetees"] += rejected
+        if not rows:
+            continue
+        with db_connection() as conn:
+            before = conn.total_changes
+            conn.executemany(sql, rows)
+            written = conn.total_changes - before
+        report["importees"] += written
+        report["ignorees"] += len(rows) - written
+        if written:
+            touched.update(r[0] for r in rows)
+
+    if report["importees"]:
+        _invalidate_derived_caches(table, touched)
+        if table == "positions":
+            _rebuild_lots(touched)
+    return report
+
+
+# ── Lecture par blocs ─────────────────────────────────────────────────────────
+
+def _detect_format(source, format: str | None) -> str:
+    if format:
+        return format.lower()
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".json":
+        return "json"
+    return "csv"
+
+
+def _iter_chunks(source, chunksize: int, format: str | None) -> Iterator[pd.DataFrame]:
+    """
+    Itère sur le fichier par blocs de `chunksize` lignes.
+    Les dates restent du texte : elles sont interprétées par _parse_dates.
+    """
+    fmt = _detect_format(source, format)
+    dtype = {"asset_id": str, "date": str}
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=dtype, skipinitialspace=True)
+    elif fmt == "jsonl":
+        yield from pd.read_json(source, lines=True, chunksize=chunksize, dtype=dtype, convert_dates=False)
+    elif fmt == "json":
+        # Un tableau JSON ne se lit pas en flux : on le découpe après lecture
+        df = pd.read_json(source, dtype=dtype, convert_dates=False)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError(f"Format non supporté : {fmt}")
+
+
+# ── Validation / normalisation ────────────────────────────────────────────────
+
+def _normalize_chunk(chunk: pd.DataFrame, value_col: str, known_ids: set[str]) -> tuple[list[tuple], int]:
+    """
+    Valide un bloc et retourne (lignes prêtes pour executemany, nb de lignes rejetées).
+    Dates acceptées : ISO (2024-01-31), française (31/01/2024) ou horodatage.
+    """
+    missing = {"asset_id", "date", value_col} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(sorted(missing))}")
+
+    asset_ids = chunk["asset_id"].astype("string").str.strip()
+    dates = _parse_dates(chunk["date"])
+    values = pd.to_numeric(chunk[value_col], errors="coerce")
+
+    valid = (
+        asset_ids.notna()
+        & asset_ids.isin(known_ids)
+        & dates.notna()
+        & values.notna()
+    )
+    clean = pd.DataFrame({
+        "asset_id": asset_ids[valid].astype(str),
+        "date": datetime_to_epoch_days(dates[valid]),
+        "valeur": values[valid].astype(float),
+    })
+    # Doublons dans le même bloc : la dernière ligne l'emporte
+    clean = clean.drop_duplicates(subset=["asset_id", "date"], keep="last")
+    return list(clean.itertuples(index=False, name=None)), int((~valid).sum())
+
+
+def _parse_dates(raw: pd.Series) -> pd.Series:
+    """
+    ISO d'abord (2024-01-02 reste le 2 janvier), puis format français pour les
+    seules dates restées invalides : un parsing "mixed" avec dayfirst inverserait
+    jour et mois des dates ISO dont le jour est ≤ 12.
+    """
+    text = raw.astype("string").str.strip()
+    dates = pd.to_datetime(text, errors="coerce", format="ISO8601")
+    missing = dates.isna() & text.notna()
+    if missing.any():
+        dates[missing] = pd.to_datetime(text[missing], errors="coerce", format="%d/%m/%Y")
+    return dates
+
+
+def _load_asset_ids() -> set[str]:
+    with db_readonly() as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM actifs").fetchall()}
+
+
+def _insert_sql(table: str, value_col: str, on_conflict: str) -> str:
+    if on_conflict == "ignore":
+        return f"INSERT OR IGNORE INTO {table} (asset_id, date, {value_col}) VALUES (?, ?, ?)"
+    return (
+        f"INSERT INTO {table} (asset_id, date, {value_col}) VALUES (?, ?, ?) "
+        f"ON CONFLICT(asset_id, date) DO UPDATE SET {value_col} = excluded.{value_col}"
+    )
+
+
+def _rebuild_lots(asset_ids: set[str]) -> None:
+    """Les lots FIFO dérivent des positions : une fois par actif importé, pas par ligne."""
+    from services.lots import rebuild_lots
+    for asset_id in sorted(asset_ids):
+        rebuild_lots(asset_id)
+
+
+def _invalidate_derived_caches(table: str, asset_ids: set[str]) -> None:
+    """Évince la table importée et les évolutions des seuls actifs importés."""
+    from services.cache_deps import invalidate
+    bump_generation(table)
+    invalidate(table, asset_ids=asset_ids)
@@ -0,0 +1,148 @@
+"""
+lots.py
+───────
+Lots FIFO des actifs à prix de marché, dérivés de la chronologie des positions.
+
+Chaque position est une quantité totale à une date. Entre deux positions :
+    - une hausse ouvre un lot (quantité, prix unitaire du mouvement)
+    - une baisse consomme les lots les plus anciens d'abord ; chaque lot touché
+      donne une cession avec sa plus-value réalisée
+
+Le prix d'un mouvement est celui enregistré avec la position (positions.prix_unitaire,
+cf. asset_manager). À défaut, le PRU saisi pour l'actif est retenu.
+
+Les lots sont maintenus incrémentalement : l'écriture d'une position postérieure
+à tous les mouvements connus n'applique que sa variation (update_lots). Une
+position rétroactive, réécrite le même jour ou un état incohérent déclenche la
+reconstruction des lots de ce seul actif (rebuild_lots).
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from .db import to_epoch_day
+from . import db_lots
+
+# Quantités en dessous de ce seuil considérées comme nulles (arrondis sur les cryptos)
+_EPS = 1e-9
+
+
+# ── Moteur FIFO ───────────────────────────────────────────────────────────────
+
+def apply_movement(lots: list[dict], day: int, delta: float, prix: float) -> tuple[dict | None, list[dict]]:
+    """
+    Applique une variation de quantité aux lots (modifiés en place, du plus ancien au plus récent).
+    Retourne (lot ouvert ou None, cessions). Chaque cession référence son lot (clé "lot").
+    """
+    if delta > _EPS:
+        lot = {"date": day, "quantite": delta, "quantite_restante": delta, "prix_unitaire": prix}
+        lots.append(lot)
+        return lot, []
+
+    cessions = []
+    a_vendre = -delta
+    for lot in lots:
+        if a_vendre <= _EPS:
+            break
+        if lot["quantite_restante"] <= _EPS:
+            continue
+        quantite = min(lot["quantite_restante"], a_vendre)
+        restante = lot["quantite_restante"] - quantite
+        lot["quantite_restante"] = restante if restante > _EPS else 0.0
+        a_vendre -= quantite
+        cessions.append({
+            "lot": lot,
+            "date": day,
+            "quantite": quantite,
+            "prix_achat": lot["prix_unitaire"],
+            "prix_vente": prix,
+            "plus_value": (prix - lot["prix_unitaire"]) * quantite,
+        })
+    return None, cessions
+
+
+def fifo_lots(movements: list[tuple], prix_defaut: float = 0.0) -> tuple[list[dict], list[dict]]:
+    """
+    Rejoue une chronologie (jour, quantité totale, prix unitaire ou None) triée par jour.
+    Retourne (tous les lots, soldés compris ; cessions).
+    """
+    lots, cessions = [], []
+    precedente = 0.0
+    for day, quantite, prix in movements:
+        delta = float(quantite) - precedente
+        precedente = float(quantite)
+        if abs(delta) <= _EPS:
+            continue
+        _, nouvelles = apply_movement(lots, int(day), delta, prix_defaut if prix is None else float(prix))
+        cessions.extend(nouvelles)
+    return lots, cessions
+
+
+# ── Maintien en base ──────────────────────────────────────────────────────────
+
+def update_lots(asset_id: str, record_date: date | None = None) -> None:
+    """Met à jour les lots après l'écriture de la position de `record_date` (aujourd'hui par défaut)."""
+    day = to_epoch_day(record_date or date.today())
+    state = db_lots.load_lot_state(asset_id, day)
+
+    ouverte = sum(lot["quantite_restante"] for lot in state["lots_ouverts"])
+    incremental = (
+        state["quantite"] is not None
+        and not state["positions_apres"]
+        and (state["dernier_mouvement"] is None or state["dernier_mouvement"] < day)
+        and abs(ouverte - state["quantite_avant"]) <= _EPS
+    )
+    if not incremental:
+        rebuild_lots(asset_id)
+        return
+
+    delta = state["quantite"] - state["quantite_avant"]
+    if abs(delta) <= _EPS:
+        return
+    prix = state["prix"] if state["prix"] is not None else db_lots.get_prix_defaut(asset_id)
+    lot, cessions = apply_movement(state["lots_ouverts"], day, delta, prix)
+    db_lots.save_movement(asset_id, lot, cessions)
+
+
+def rebuild_lots(asset_id: str) -> None:
+    """Reconstruit les lots et cessions d'un actif depuis toutes ses positions."""
+    lots, cessions = fifo_lots(db_lots.load_movements(asset_id), db_lots.get_prix_defaut(asset_id))
+    db_lots.replace_lots(asset_id, lots, cessions)
+
+
+def delete_asset_lots(asset_id: str) -> None:
+    db_lots.delete_asset_lots(asset_id)
+
+
+# ── Lecture ───────────────────────────────────────────────────────────────────
+
+def get_lots(asset_id: str, prix_actuel: float | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (lots, cessions) d'un actif. Les lots des positions antérieures au suivi
+    par lots sont construits à la première lecture.
+
+    Avec prix_actuel, les lots reçoivent les colonnes valeur_actuelle et
+    plus_value_latente (sur la quantité restante).
+    """
+    if not db_lots.has_lots(asset_id) and db_lots.load_movements(asset_id):
+        rebuild_lots(asset_id)
+
+    lots = db_lots.load_lots(asset_id)
+    if prix_actuel is not None:
+        lots["valeur_actuelle"] = lots["quantite_restante"] * prix_actuel
+        lots["plus_value_latente"] = (prix_actuel - lots["prix_unitaire"]) * lots["quantite_restante"]
+    return lots, db_lots.load_cessions(asset_id)
+
+
+def summarize_lots(lots: pd.DataFrame, cessions: pd.DataFrame) -> dict:
+    """
+    Totaux d'un actif : quantite_restante, cout_restant (base FIFO des lots ouverts),
+    plus_value_realisee, plus_value_latente (si les lots ont un prix actuel).
+    """
+    return {
+        "quantite_restante": float(lots["quantite_restante"].sum()),
+        "cout_restant": float((lots["quantite_restante"] * lots["prix_unitaire"]).sum()),
+        "plus_value_realisee": float(cessions["plus_value"].sum()),
+        "plus_value_latente": float(lots["plus_value_latente"].sum()) if "plus_value_latente" in lots else 0.0,
+    }
@@ -8,23 +8,37 @@ def init_positions():
     pass
 
 
-def load_positions() -> pd.DataFrame:
+def load_positions(asset_ids: list[str] | None = None) -> pd.DataFrame:
     from services.db_positions import load_positions
-    return load_positions()
+    return load_positions(asset_ids)
 
 
-def record_position(asset_id: str, quantite: float, record_date=None):
+def get_position_before(asset_id: str, record_date) -> tuple[float, bool]:
+    """(quantité en vigueur la veille de record_date, vrai si des positions suivent cette date)."""
+    from services.db_positions import get_position_before
+    return get_position_before(asset_id, record_date)
+
+
+def record_position(asset_id: str, quantite: float, record_date=None, prix_unitaire: float | None = None) -> bool:
     """
     Enregistre la quantité détenue pour un actif à une date donnée.
     Si un enregistrement existe déjà pour ce jour, il est écrasé.
+    prix_unitaire : prix du mouvement (achat ou vente), utilisé par les lots FIFO.
+    Retourne False si la quantité était déjà connue à cette date (rien n'est écrit).
     """
     from services.db_positions import record_position
-    record_position(asset_id, quantite, record_date)
+    from services.lots import update_lots
+    written = record_position(asset_id, quantite, record_date, prix_unitaire)
+    if written:
+        update_lots(asset_id, record_date)
+    return written
 
 
 def delete_asset_positions(asset_id: str):
-    """Supprime toutes les positions d'un actif (utile à la suppression d'un actif)."""
+    """Supprime toutes les positions d'un actif et les lots qui en dérivent."""
     from services.db_positions import delete_asset_positions
+    from services.lots import delete_asset_lots
+    delete_asset_lots(asset_id)
     delete_asset_positions(asset_id)
 
 
@@ -0,0 +1,289 @@
+"""
+price_providers.py
+──────────────────
+Sources de cours du pricer (services/pricer.py).
+
+Le pricer n'appelle jamais yfinance directement : il passe par le fournisseur
+courant (get_provider), qui expose quatre opérations :
+
+    history(tickers, period) → clôtures ajustées, pivot date × ticker (devise du ticker)
+    currency(ticker)         → devise de cotation (None si inconnue)
+    last_price(ticker)       → dernier cours (None si inconnu)
+    info(ticker)             → métadonnées (longName, shortName, currency, marketCap…)
+
+Les erreurs réseau remontent en exceptions ; un ticker inconnu est simplement
+absent du résultat (colonne manquante, None).
+
+    - YFinanceProvider   : Yahoo Finance, fournisseur par défaut ;
+    - LocalPriceProvider : fichiers OHLC enregistrés (record_prices) ou générés
+      (write_price_files), avec latence et pannes simulées, pour travailler et
+      mesurer le pricer sans réseau.
+
+La variable d'environnement PRIX_LOCAUX_ENV, si elle désigne un dossier, fait
+du fournisseur local le fournisseur par défaut.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from constants import PRIX_LOCAUX_ENV
+
+OHLC_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+TICKERS_FILENAME = "tickers.json"  # métadonnées par ticker (devise, nom…) du dossier local
+
+
+# ── Yahoo Finance ─────────────────────────────────────────────────────────────
+
+class YFinanceProvider:
+    """Cours et métadonnées Yahoo Finance (yf.download pour l'historique, yf.Ticker pour le reste)."""
+
+    def history(self, tickers: list[str], period: str) -> pd.DataFrame:
+        import yfinance as yf
+
+        data = yf.download(list(tickers), period=period, progress=False, auto_adjust=True)
+        if data.empty:
+            return pd.DataFrame()
+        close = data["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(name=tickers[0])
+        return close
+
+    def currency(self, ticker: str) -> str | None:
+        import yfinance as yf
+        return yf.Ticker(ticker).fast_info.currency
+
+    def last_price(self, ticker: str) -> float | None:
+        import yfinance as yf
+        return yf.Ticker(ticker).fast_info.last_price
+
+    def info(self, ticker: str) -> dict:
+        import yfinance as yf
+        return yf.Ticker(ticker).info
+
+
+# ── Fichiers locaux ───────────────────────────────────────────────────────────
+
+class LocalPriceProvider:
+    """
+    Cours lus dans un dossier : un fichier <ticker>.csv par ticker (colonnes
+    Date, Open, High, Low, Close, Volume — le format de yf.Ticker.history)
+    et TICKERS_FILENAME pour les devises et les noms.
+
+    latency           : secondes d'attente par appel
+    latency_per_ticker: secondes supplémentaires par ticker demandé
+    failure_rate      : probabilité qu'un appel échoue (ConnectionError), tirée avec `seed`
+    failing_tickers   : tickers toujours introuvables
+    as_of             : dernier jour servi (les périodes en sont comptées) ; par défaut,
+                        la dernière date de chaque fichier
+
+    stats compte les appels par opération, les tickers demandés et les pannes.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0, latency_per_ticker: float = 0.0,
+                 failure_rate: float = 0.0, failing_tickers=(), seed: int = 0, as_of=None):
+        self.directory = directory
+        self.latency = latency
+        self.latency_per_ticker = latency_per_ticker
+        self.failure_rate = failure_rate
+        self.failing_tickers = set(failing_tickers)
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of is not None else None
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._frames: dict[str, pd.DataFrame | None] = {}
+        self._meta: dict | None = None
+        self.stats = {"appels": {}, "tickers": 0, "pannes": 0}
+
+    def history(self, tickers: list[str], period: str) -> pd.DataFrame:
+        self._call("history", len(tickers))
+        closes = {}
+        for ticker in tickers:
+            frame = self._frame(ticker)
+            if frame is not None:
+                closes[ticker] = _slice_period(frame, period)["Close"]
+        if not closes:
+            return pd.DataFrame()
+        return pd.DataFrame(closes).sort_index()
+
+    def currency(self, ticker: str) -> str | None:
+        self._call("currency", 1)
+        return self._ticker_meta(ticker).get("currency")
+
+    def last_price(self, ticker: str) -> float | None:
+        self._call("last_price", 1)
+        frame = self._frame(ticker)
+        if frame is None or frame.empty:
+            return None
+        return float(frame["Close"].iloc[-1])
+
+    def info(self, ticker: str) -> dict:
+        self._call("info", 1)
+        return dict(self._ticker_meta(ticker))
+
+    # ── Internes ──
+
+    def _call(self, operation: str, n_tickers: int) -> None:
+        """Compte l'appel, simule la latence réseau puis, selon failure_rate, une panne."""
+        with self._lock:
+            self.stats["appels"][operation] = self.stats["appels"].get(operation, 0) + 1
+            self.stats["tickers"] += n_tickers
+            failed = self.failure_rate > 0 and self._rng.random() < self.failure_rate
+            if failed:
+                self.stats["pannes"] += 1
+        delay = self.latency + self.latency_per_ticker * n_tickers
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Panne simulée ({operation})")
+
+    def _frame(self, ticker: str) -> pd.DataFrame | None:
+        if ticker in self.failing_tickers:
+            return None
+        with self._lock:
+            if ticker in self._frames:
+                return self._frames[ticker]
+        frame = _read_ohlc(os.path.join(self.directory, f"{ticker}.csv"))
+        if frame is not None and self.as_of is not None:
+            frame = frame[frame.index <= self.as_of]
+        with self._lock:
+            self._frames[ticker] = frame
+        return frame
+
+    def _ticker_meta(self, ticker: str) -> dict:
+        if ticker in self.failing_tickers:
+            return {}
+        with self._lock:
+            if self._meta is None:
+                try:
+                    with open(os.path.join(self.directory, TICKERS_FILENAME), encoding="utf-8") as f:
+                        self._meta = json.load(f)
+                except (OSError, ValueError):
+                    self._meta = {}
+            return self._meta.get(ticker) or {}
+
+
+def _read_ohlc(path: str) -> pd.DataFrame | None:
+    """Fichier OHLC → DataFrame indexé par jour (None si absent ou illisible)."""
+    try:
+        df = pd.read_csv(path)
+    except (OSError, ValueError):
+        return None
+    if "Date" not in df.columns or "Close" not in df.columns:
+        return None
+    # Dates de yf.Ticker.history avec fuseau (2024-01-02 00:00:00-05:00) : seul le jour compte
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("Date").astype(str).str[:10])).as_unit("ns")
+    df.index.name = "Date"
+    return df.dropna(subset=["Close"]).sort_index()
+
+
+def _slice_period(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Lignes d'une période yfinance ("5d", "1mo", "1y", "ytd", "max"…) finissant à la dernière date."""
+    if frame.empty or period == "max":
+        return frame
+    end = frame.index[-1]
+    if period == "ytd":
+        start = end.replace(month=1, day=1) - pd.Timedelta(days=1)
+    elif period.endswith("d"):
+        return frame.iloc[-int(period[:-1]):]
+    elif period.endswith("mo"):
+        start = end - pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith("y"):
+        start = end - pd.DateOffset(years=int(period[:-1]))
+    else:
+        raise ValueError(f"Période inconnue : {period}")
+    return frame[frame.index > start]
+
+
+# ── Écriture des fichiers locaux ──────────────────────────────────────────────
+
+def write_price_files(directory: str, closes: pd.DataFrame, meta: dict | None = None) -> None:
+    """
+    Écrit un dossier lisible par LocalPriceProvider à partir de clôtures (pivot date × ticker).
+    Ouverture = clôture précédente, plus haut / plus bas = extrêmes des deux, volume nul.
+    meta : { ticker: { "currency": "USD", "longName": … } } (devise EUR par défaut).
+    """
+    os.makedirs(directory, exist_ok=True)
+    for ticker in closes.columns:
+        close = closes[ticker].dropna()
+        open_ = close.shift(1).fillna(close)
+        frame = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close),
+            "Low": np.minimum(open_, close),
+            "Close": close,
+            "Volume": 0,
+        })
+        frame.index = pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d")
+        frame.to_csv(os.path.join(directory, f"{ticker}.csv"), index_label="Date")
+    meta = dict(meta or {})
+    for ticker in closes.columns:
+        meta.setdefault(ticker, {"currency": "EUR", "longName": ticker})
+    with open(os.path.join(directory, TICKERS_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def record_prices(directory: str, tickers: list[str], period: str = "max") -> list[str]:
+    """
+    Enregistre depuis Yahoo Finance l'historique OHLC, la devise et le nom de chaque
+    ticker (et des paires de change vers l'EUR nécessaires) dans `directory`.
+    Retourne les tickers introuvables.
+    """
+    import yfinance as yf
+
+    os.makedirs(directory, exist_ok=True)
+    meta, missing = {}, []
+    queue = list(dict.fromkeys(tickers))
+    for ticker in queue:
+        t = yf.Ticker(ticker)
+        frame = t.history(period=period, auto_adjust=True)
+        if frame.empty:
+            missing.append(ticker)
+            continue
+        frame = frame[[c for c in OHLC_COLUMNS if c in frame.columns]]
+        frame.to_csv(os.path.join(directory, f"{ticker}.csv"), index_label="Date")
+        info = t.info
+        currency = t.fast_info.currency or info.get("currency")
+        meta[ticker] = {
+            k: v for k, v in {
+                "currency": currency,
+                "longName": info.get("longName"),
+                "shortName": info.get("shortName"),
+            }.items() if v
+        }
+        if currency and currency != "EUR" and f"{currency}EUR=X" not in queue:
+            queue.append(f"{currency}EUR=X")
+    with open(os.path.join(directory, TICKERS_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return missing
+
+
+# ── Fournisseur courant ───────────────────────────────────────────────────────
+
+_state: dict = {"provider": None}
+
+
+def get_provider():
+    """Fournisseur courant : celui de set_provider, sinon local si PRIX_LOCAUX_ENV désigne un dossier, sinon yfinance."""
+    provider = _state["provider"]
+    if provider is None:
+        directory = os.environ.get(PRIX_LOCAUX_ENV, "")
+        provider = LocalPriceProvider(directory) if directory and os.path.isdir(directory) else YFinanceProvider()
+        _state["provider"] = provider
+    return provider
+
+
+def set_provider(provider) -> object:
+    """
+    Remplace le fournisseur courant (None → retour au choix par défaut) et vide
+    les caches de cours. Retourne le fournisseur précédent.
+    """
+    from services.cache_deps import invalidate
+
+    previous = _state["provider"]
+    _state["provider"] = provider
+    invalidate("cours")
+    return previous
@@ -1,8 +1,11 @@
 import re
-import yfinance as yf
+import time
 import pandas as pd
 import streamlit as st
-from constants import CACHE_TTL_SECONDS, PERIOD_OPTIONS, PERIOD_DEFAULT
+from constants import CACHE_TTL_SECONDS, PERIOD_OPTIONS, PERIOD_DEFAULT, PRICER_RETRIES, PRICER_RETRY_DELAY_SECONDS
+from services import cache_deps
+from services.price_providers import get_provider
+from services.profiler import note_cache_miss
 
 # Ticker valide : lettres, chiffres, tirets, points, carets — 1 à 20 caractères
 # Exemples valides : AAPL, BTC-USD, CW8.PA, ^FCHI
@@ -23,15 +26,15 @@ def validate_ticker(ticker: str) -> tuple[bool, str]:
 
 def lookup_ticker(ticker: str) -> dict | None:
     """
-    Interroge yfinance pour valider l'existence d'un ticker et récupérer ses infos.
+    Interroge le fournisseur de cours pour valider l'existence d'un ticker et récupérer ses infos.
     Retourne un dict {ticker, name, price, currency} ou None si introuvable.
     """
     try:
-        t = yf.Ticker(ticker)
-        price = t.fast_info.last_price
+        provider = get_provider()
+        price = provider.last_price(ticker)
         if not price or price <= 0:
             return None
-        info = t.info
+        info = provider.info(ticker)
         name = info.get("longName") or info.get("shortName") or ticker
         currency = info.get("currency") or ""
         return {
@@ -46,12 +49,11 @@ def lookup_ticker(ticker: str) -> dict | None:
 
 def get_price(ticker: str) -> float | None:
     """
-    Retourne le dernier prix connu pour un ticker yfinance.
+    Retourne le dernier prix connu pour un ticker.
     Retourne None si le ticker est invalide ou introuvable.
     """
     try:
-        data = yf.Ticker(ticker)
-        price = data.fast_info.last_price
+        price = get_provider().last_price(ticker)
         if price and price > 0:
             return round(price, 4)
         return None
@@ -65,12 +67,43 @@ def get_name(ticker: str) -> str:
     Fallback sur le ticker lui-même si introuvable.
     """
     try:
-        info = yf.Ticker(ticker).info
+        info = get_provider().info(ticker)
         return info.get("longName") or info.get("shortName") or ticker
     except Exception:
         return ticker
 
 
+def _download_closes(tickers: list[str], period: str) -> pd.DataFrame:
+    """
+    Clôtures (pivot date × ticker, dates normalisées) d'un lot de tickers en un appel.
+    Un appel en erreur est retenté PRICER_RETRIES fois, avec une attente doublée à chaque fois.
+    """
+    for attempt in range(PRICER_RETRIES + 1):
+        try:
+            close = get_provider().history(tickers, period)
+            break
+        except Exception:
+            if attempt == PRICER_RETRIES:
+                raise
+            time.sleep(PRICER_RETRY_DELAY_SECONDS * 2 ** attempt)
+    if close.empty:
+        return pd.DataFrame()
+    close.index = pd.to_datetime(close.index).normalize()
+    return close
+
+
+def _fetch_currencies(tickers: list[str]) -> dict[str, str]:
+    """Devise de chaque ticker (EUR si inconnue ou en erreur)."""
+    provider = get_provider()
+    currencies = {}
+    for ticker in tickers:
+        try:
+            currencies[ticker] = provider.currency(ticker) or "EUR"
+        except Exception:
+            currencies[ticker] = "EUR"
+    return currencies
+
+
 def _fetch_exchange_rates(currencies: set[str]) -> dict[str, float]:
     """
     Récupère les taux de change vers EUR pour un ensemble de devises.
@@ -86,19 +119,11 @@ def _fetch_exchange_rates(currencies: set[str]) -> dict[str, float]:
 
     fx_tickers = [f"{c}EUR=X" for c in non_eur]
     try:
-        data = yf.download(fx_tickers, period="1d", progress=False, auto_adjust=True)
-        close = data["Close"]
-        if isinstance(close, pd.Series):
-            # Un seul ticker FX
-            fx_ticker = fx_tickers[0]
+        close = _download_closes(fx_tickers, "1d")
+        for fx_ticker in fx_tickers:
             currency = fx_ticker.replace("EUR=X", "")
-            if not close.dropna().empty:
-                rates[currency] = round(float(close.dropna().iloc[-1]), 6)
-        else:
-            for fx_ticker in fx_tickers:
-                currency = fx_ticker.replace("EUR=X", "")
-                if fx_ticker in close.columns and not close[fx_ticker].dropna().empty:
-                    rates[currency] = round(float(close[fx_ticker].dropna().iloc[-1]), 6)
+            if fx_ticker in close.columns and not close[fx_ticker].dropna().empty:
+                rates[currency] = round(float(close[fx_ticker].dropna().iloc[-1]), 6)
     except Exception:
         pass
 
@@ -115,18 +140,8 @@ def get_prices_bulk(tickers: list[str]) -> dict[str, dict | None]:
 
     results = {}
     try:
-        data = yf.download(tickers, period="1d", progress=False, auto_adjust=True)
-        close = data["Close"]
-        if isinstance(close, pd.Series):
-            close = close.to_frame(name=tickers[0])
-
-        # Récupération des devises via fast_info (appel léger)
-        currencies = {}
-        for ticker in tickers:
-            try:
-                currencies[ticker] = yf.Ticker(ticker).fast_info.currency or "EUR"
-            except Exception:
-                currencies[ticker] = "EUR"
+        close = _download_closes(tickers, "1d")
+        currencies = _fetch_currencies(tickers)
 
         for ticker in tickers:
             if ticker in close.columns and not close[ticker].dropna().empty:
@@ -152,23 +167,14 @@ def fetch_historical_prices(tickers: tuple, period: str = PERIOD_OPTIONS[PERIOD_
     """
     if not tickers:
         return pd.DataFrame()
+    note_cache_miss("fetch_historical_prices")
     tickers_list = list(tickers)
     try:
-        data = yf.download(tickers_list, period=period, progress=False, auto_adjust=True)
-        if data.empty:
+        close = _download_closes(tickers_list, period)
+        if close.empty:
             return pd.DataFrame()
-        close = data["Close"]
-        if isinstance(close, pd.Series):
-            close = close.to_frame(name=tickers_list[0])
-        close.index = pd.to_datetime(close.index).normalize()
 
-        # Récupération des devises
-        currencies = {}
-        for ticker in tickers_list:
-            try:
-                currencies[ticker] = yf.Ticker(ticker).fast_info.currency or "EUR"
-            except Exception:
-                currencies[ticker] = "EUR"
+        currencies = _fetch_currencies(tickers_list)
 
         # Récupération des taux de change historiques
         non_eur_currencies = {c for c in currencies.values() if c and c != "EUR"}
@@ -177,21 +183,10 @@ def fetch_historical_prices(tickers: tuple, period: str = PERIOD_OPTIONS[PERIOD_
         if non_eur_currencies:
             fx_tickers = [f"{c}EUR=X" for c in non_eur_currencies]
             try:
-                fx_data = yf.download(fx_tickers, period=period, progress=False, auto_adjust=True)
-                if not fx_data.empty:
-                    fx_close = fx_data["Close"]
-                    if isinstance(fx_close, pd.Series):
-                        fx_ticker = fx_tickers[0]
-                        currency = fx_ticker.replace("EUR=X", "")
-                        fx_close.index = pd.to_datetime(fx_close.index).normalize()
-                        fx_rates_hist[currency] = fx_close
-                    else:
-                        for fx_ticker in fx_tickers:
-                            currency = fx_ticker.replace("EUR=X", "")
-                            if fx_ticker in fx_close.columns:
-                                s = fx_close[fx_ticker].copy()
-                                s.index = pd.to_datetime(s.index).normalize()
-                                fx_rates_hist[currency] = s
+                fx_close = _download_closes(fx_tickers, period)
+                for fx_ticker in fx_tickers:
+                    if fx_ticker in fx_close.columns:
+                        fx_rates_hist[fx_ticker.replace("EUR=X", "")] = fx_close[fx_ticker]
             except Exception:
                 pass
 
@@ -208,6 +203,32 @@ def fetch_historical_prices(tickers: tuple, period: str = PERIOD_OPTIONS[PERIOD_
         return pd.DataFrame()
 
 
+# Les cours dépendent du fournisseur, pas de la base : vidés par set_provider
+cache_deps.register_cache("cours_historiques", ("cours",), clear=fetch_historical_prices.clear)
+
+
+def get_price_at(ticker: str, at_date) -> float | None:
+    """
+    Cours de clôture en EUR d'un ticker à une date (dernier cours connu avant ou à cette date).
+    La plus courte période yfinance couvrant la date est téléchargée (résultat mis en cache).
+    Retourne None si aucun cours n'est disponible.
+    """
+    at = pd.Timestamp(at_date).normalize()
+    age = (pd.Timestamp.today().normalize() - at).days
+    period = next(
+        (p for p, jours in PERIOD_OPTIONS.values() if jours is not None and jours > age + 7),
+        "max",
+    )
+    prices = fetch_historical_prices((ticker,), period)
+    if prices.empty or ticker not in prices.columns:
+        return None
+    serie = prices[ticker].dropna()
+    if serie.index.tz is not None:
+        serie.index = serie.index.tz_localize(None)
+    serie = serie[serie.index <= at]
+    return round(float(serie.iloc[-1]), 4) if not serie.empty else None
+
+
 def refresh_auto_assets(df: pd.DataFrame, categories_auto: set) -> tuple[pd.DataFrame, list[str]]:
     """
     Met à jour le montant des actifs automatiques (ticker + quantité).
@@ -0,0 +1,210 @@
+"""
+profiler.py
+───────────
+Profilage du rendu, section par section (activable dans Paramètres > Outils développeur).
+
+Chaque section instrumentée (décorateur profiled ou bloc span) enregistre son
+début et sa durée par rapport au début de l'exécution du script, sa profondeur
+d'imbrication, et l'état des caches qu'elle a traversés :
+
+    - "hit"   : aucun calcul mis en cache n'a été refait pendant la section ;
+    - "miss"  : au moins un l'a été (liste dans "calculs") — les fonctions
+                en cache le signalent par note_cache_miss() depuis leur corps,
+                qui n'est exécuté qu'en cas d'absence du cache.
+
+Les exécutions sont regroupées par rerun (begin_profile_run) ; un rerun limité à
+un fragment, qui ne repasse pas par app.py, ouvre sa propre exécution à sa
+première section. Le profilage est activé par session Streamlit, comme le
+traçage SQL (services/db.py). Les PROFILER_RUNS dernières sont gardées en mémoire et écrites
+dans PROFILER_FILENAME, à côté de la base, pour comparer d'un démarrage à l'autre.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable
+
+from constants import PROFILER_FILENAME, PROFILER_RUNS
+from .db import current_session_id, ended_sessions, get_db_path
+
+_lock = threading.Lock()
+_state = {"sessions": set(), "charge": False}  # sessions profilées (None hors Streamlit)
+_runs: deque = deque(maxlen=PROFILER_RUNS)
+_local = threading.local()  # exécution en cours et sections ouvertes, par thread de script
+
+
+def _profile_path() -> str:
+    return os.path.join(os.path.dirname(get_db_path()) or ".", PROFILER_FILENAME)
+
+
+# ── Activation ────────────────────────────────────────────────────────────────
+
+def enable_profiler() -> None:
+    """Active le profilage de la session courante ; au premier appel, recharge les exécutions enregistrées."""
+    _forget_ended_sessions()
+    _state["sessions"].add(current_session_id())
+    if not _state["charge"]:
+        _state["charge"] = True
+        for run in load_profile_runs():
+            _runs.append(run)
+
+
+def disable_profiler() -> None:
+    _forget_ended_sessions()
+    _state["sessions"].discard(current_session_id())
+    _local.run = None
+
+
+def is_profiler_enabled() -> bool:
+    return bool(_state["sessions"]) and current_session_id() in _state["sessions"]
+
+
+def _forget_ended_sessions() -> None:
+    """Retire les sessions fermées (onglet refermé sans désactiver le profilage)."""
+    if _state["sessions"]:
+        _state["sessions"].difference_update(ended_sessions(list(_state["sessions"])))
+
+
+# ── Enregistrement ────────────────────────────────────────────────────────────
+
+def begin_profile_run(label: str = "") -> None:
+    """Démarre une nouvelle exécution ; la précédente, terminée, est écrite sur disque."""
+    if not is_profiler_enabled():
+        return
+    save_profile_runs()
+    run = {"debut": datetime.now().isoformat(timespec="seconds"), "label": label, "sections": []}
+    _local.run = run
+    _local.t0 = time.perf_counter()
+    _local.stack = []
+    with _lock:
+        _runs.append(run)
+
+
+def set_profile_label(label: str) -> None:
+    """Nomme l'exécution en cours (la page affichée, connue après st.navigation)."""
+    run = getattr(_local, "run", None)
+    if run is not None and is_profiler_enabled():
+        run["label"] = label
+
+
+@contextmanager
+def span(name: str):
+    """Chronomètre le bloc comme une section de l'exécution en cours (sans effet hors profilage)."""
+    if not is_profiler_enabled():
+        yield
+        return
+    if getattr(_local, "run", None) is None:
+        begin_profile_run("fragment")
+    run = _local.run
+    section = {
+        "section": name,
+        "debut_ms": round((time.perf_counter() - _local.t0) * 1000, 2),
+        "duree_ms": 0.0,
+        "profondeur": len(_local.stack),
+        "cache": "hit",
+        "calculs": [],
+    }
+    _local.stack.append(section)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        section["duree_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _local.stack.pop()
+        with _lock:
+            run["sections"].append(section)
+
+
+def profiled(name: str | None = None) -> Callable:
+    """Décorateur : chaque appel de la fonction est une section (nom par défaut : module.fonction)."""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def note_cache_miss(name: str) -> None:
+    """À appeler dans le corps d'une fonction en cache : marque les sections ouvertes en miss."""
+    for section in getattr(_local, "stack", None) or []:
+        section["cache"] = "miss"
+        if name not in section["calculs"]:
+            section["calculs"].append(name)
+
+
+# ── Lecture et persistance ────────────────────────────────────────────────────
+
+def get_profile_runs() -> list[dict]:
+    """Exécutions conservées, de la plus ancienne à la plus récente."""
+    with _lock:
+        return [dict(run, sections=list(run["sections"])) for run in _runs]
+
+
+def reset_profile_runs() -> None:
+    with _lock:
+        _runs.clear()
+    _local.run = None
+    save_profile_runs()
+
+
+def save_profile_runs() -> None:
+    """Écrit les exécutions conservées dans PROFILER_FILENAME (dossier de la base)."""
+    path = _profile_path()
+    if not os.path.isdir(os.path.dirname(path) or "."):
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(get_profile_runs(), f, ensure_ascii=False, indent=2)
+
+
+def load_profile_runs() -> list[dict]:
+    """Exécutions enregistrées sur disque ([] si aucun fichier ou fichier illisible)."""
+    try:
+        with open(_profile_path(), encoding="utf-8") as f:
+            runs = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return runs[-PROFILER_RUNS:] if isinstance(runs, list) else []
+
+
+def summarize_profile_run(run: dict):
+    """
+    Sections d'une exécution, dans l'ordre de leur début.
+    Retourne un DataFrame : section, debut_ms, duree_ms, profondeur, cache, calculs.
+    """
+    import pandas as pd
+
+    columns = ["section", "debut_ms", "duree_ms", "profondeur", "cache", "calculs"]
+    if not run["sections"]:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(run["sections"])[columns]
+    df["calculs"] = df["calculs"].map(", ".join)
+    return df.sort_values(["debut_ms", "profondeur"]).reset_index(drop=True)
+
+
+def compare_profile_runs(runs: list[dict]):
+    """
+    Durée totale de chaque section dans chacune des exécutions données.
+    Retourne un DataFrame indexé par section, une colonne par exécution
+    ("<début> · <label>"), NaN quand la section n'a pas été rendue.
+    """
+    import pandas as pd
+
+    colonnes = {}
+    for run in runs:
+        nom = f"{run['debut']} · {run['label']}" if run["label"] else run["debut"]
+        while nom in colonnes:
+            nom += "'"
+        durees: dict[str, float] = {}
+        for section in run["sections"]:
+            durees[section["section"]] = durees.get(section["section"], 0.0) + section["duree_ms"]
+        colonnes[nom] = pd.Series(durees, dtype=float)
+    return pd.DataFrame(colonnes).rename_axis("section")
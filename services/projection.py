@@ -0,0 +1,216 @@
+"""
+projection.py
+─────────────
+Projection Monte Carlo du patrimoine net sur plusieurs années.
+
+Chaque trajectoire tire, mois par mois, un mois de l'historique des cours
+(bootstrap) : tous les tickers reçoivent le rendement de ce même mois, ce qui
+conserve leurs corrélations. Un ticker sans cotation ce mois-là (historique
+plus court que celui des autres) reçoit à la place un mois tiré parmi les siens :
+ses rendements ne sont jamais complétés par des zéros. S'y ajoutent des composantes déterministes :
+    - livrets, fonds euros, immobilier : rendement annuel fixe (PROJECTION_TAUX_ANNUELS)
+    - épargne mensuelle, placée au taux des livrets
+    - capital restant dû des emprunts (échéancier, événements compris)
+
+Le calcul est vectorisé sur les trajectoires et découpé en blocs de
+PROJECTION_CHUNK_PATHS, répartis sur un pool de processus partagé, créé au
+premier calcul en mode "spawn" (un fork du serveur Streamlit, multi-thread,
+peut bloquer les processus fils sur des verrous hérités). Chaque bloc a sa
+propre graine (SeedSequence.spawn) : le résultat ne dépend pas du nombre de
+processus. Seuls les points annuels sont renvoyés par les processus.
+
+Comme la partie déterministe est identique pour toutes les trajectoires, les
+percentiles du patrimoine net sont ceux de la partie marché, décalés : seuls
+ceux-ci sont simulés et mis en cache (st.cache_data, clé = données d'entrée).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from constants import (
+    CATEGORIES_AUTO, PROJECTION_PATHS, PROJECTION_CHUNK_PATHS, PROJECTION_PERCENTILES,
+    PROJECTION_SEED, PROJECTION_MIN_MONTHS, PROJECTION_TAUX_ANNUELS,
+)
+from .db_emprunts import capital_restant_du_matrix, monthly_dates
+from .profiler import note_cache_miss
+
+
+# ── Rendements historiques ────────────────────────────────────────────────────
+
+def monthly_returns(df_prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rendements mensuels (fin de mois à fin de mois) de chaque ticker.
+    Les tickers ayant moins de PROJECTION_MIN_MONTHS rendements sont écartés ;
+    un mois sans cotation pour un ticker reste NaN (exclu de ses tirages).
+    """
+    if df_prices.empty:
+        return pd.DataFrame()
+    prices = df_prices.copy()
+    prices.index = pd.to_datetime(prices.index)
+    monthly = prices.sort_index().resample("ME").last()
+    returns = monthly.pct_change(fill_method=None).iloc[1:]
+    return returns.loc[:, returns.notna().sum() >= PROJECTION_MIN_MONTHS]
+
+
+# ── Simulation (exécutée dans les processus du pool) ─────────────────────────
+
+def _simulate_chunk(log_returns: np.ndarray, valeurs: np.ndarray, checkpoints: np.ndarray,
+                    n_paths: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """
+    Valeur de la partie marché aux mois `checkpoints` pour n_paths trajectoires.
+    log_returns : (mois historiques, tickers), NaN sans cotation ; valeurs : valeur actuelle par ticker.
+    Retourne un tableau (n_paths, len(checkpoints)).
+    """
+    rng = np.random.default_rng(seed)
+    n_months = int(checkpoints.max())
+    # Même mois tiré pour tous les tickers d'une trajectoire
+    idx = rng.integers(0, log_returns.shape[0], size=(n_paths, n_months))
+
+    total = np.zeros((n_paths, len(checkpoints)))
+    # Colonne m de la somme cumulée = croissance après m+1 mois ; le mois 0 vaut 1
+    cols = checkpoints - 1
+    at_start = cols < 0
+    for j, valeur in enumerate(valeurs):
+        tirages = log_returns[idx, j]
+        manquants = np.isnan(tirages)
+        if manquants.any():
+            # Mois hors de l'historique du ticker : remplacé par un de ses mois cotés
+            cotes = log_returns[~np.isnan(log_returns[:, j]), j]
+            tirages[manquants] = cotes[rng.integers(0, len(cotes), size=int(manquants.sum()))]
+        croissance = np.exp(np.cumsum(tirages, axis=1))
+        total[:, ~at_start] += valeur * croissance[:, cols[~at_start]]
+        total[:, at_start] += valeur
+    return total
+
+
+_pool_lock = threading.Lock()
+_pool_state: dict = {"pool": None}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool de processus de la simulation, créé au premier appel puis réutilisé."""
+    with _pool_lock:
+        if _pool_state["pool"] is None:
+            _pool_state["pool"] = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool_state["pool"]
+
+
+def _discard_pool() -> None:
+    """Abandonne un pool défaillant ; le prochain calcul en recrée un."""
+    with _pool_lock:
+        pool, _pool_state["pool"] = _pool_state["pool"], None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _market_percentiles(log_returns: np.ndarray, valeurs: np.ndarray, n_months: int,
+                        n_paths: int, seed: int) -> np.ndarray:
+    """
+    Percentiles PROJECTION_PERCENTILES de la partie marché, un point par an.
+    Retourne un tableau (len(PROJECTION_PERCENTILES), n_months // 12 + 1).
+    """
+    note_cache_miss("projection_monte_carlo")
+    checkpoints = np.arange(0, n_months + 1, 12)
+    if len(valeurs) == 0 or log_returns.shape[0] == 0:
+        return np.zeros((len(PROJECTION_PERCENTILES), len(checkpoints)))
+
+    sizes = [min(PROJECTION_CHUNK_PATHS, n_paths - start) for start in range(0, n_paths, PROJECTION_CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(log_returns, valeurs, checkpoints, size, s) for size, s in zip(sizes, seeds)]
+
+    results = None
+    if len(args) > 1:
+        try:
+            results = list(_get_pool().map(_simulate_chunk, *zip(*args)))
+        except (BrokenProcessPool, OSError):
+            # Pool indisponible (environnement restreint) : même calcul dans le processus courant
+            _discard_pool()
+            results = None
+    if results is None:
+        results = [_simulate_chunk(*a) for a in args]
+
+    return np.percentile(np.vstack(results), PROJECTION_PERCENTILES, axis=0)
+
+
+# ── Composantes déterministes ─────────────────────────────────────────────────
+
+def _deterministic_path(df_manual: pd.DataFrame, df_emprunts: pd.DataFrame,
+                        dates: np.ndarray, epargne_mensuelle: float) -> np.ndarray:
+    """Actifs sans cotation + épargne accumulée − capital restant dû, à chaque date."""
+    months = np.arange(len(dates))
+    path = np.zeros(len(dates))
+
+    for categorie, montant in df_manual.groupby("categorie")["montant"].sum().items():
+        taux = PROJECTION_TAUX_ANNUELS.get(categorie, 0.0)
+        path += float(montant) * (1 + taux) ** (months / 12)
+
+    if epargne_mensuelle:
+        r = (1 + PROJECTION_TAUX_ANNUELS.get("Livrets", 0.0)) ** (1 / 12) - 1
+        cumul = epargne_mensuelle * (((1 + r) ** months - 1) / r if r else months)
+        path += cumul
+
+    if df_emprunts is not None and not df_emprunts.empty:
+        path -= capital_restant_du_matrix(df_emprunts, dates).sum(axis=0)
+    return path
+
+
+# ── Point d'entrée public ─────────────────────────────────────────────────────
+
+def project_net_worth(
+    df_assets: pd.DataFrame,
+    df_prices: pd.DataFrame,
+    df_emprunts: pd.DataFrame | None = None,
+    annees: int = 20,
+    epargne_mensuelle: float = 0.0,
+    n_paths: int = PROJECTION_PATHS,
+    seed: int = PROJECTION_SEED,
+    start: date | None = None,
+) -> pd.DataFrame:
+    """
+    Projette le patrimoine net sur `annees` ans.
+
+    df_prices : cours historiques date × ticker (cf. fetch_historical_prices).
+    Les actifs cotés dont le ticker n'a pas assez d'historique restent à valeur constante.
+
+    Retourne un DataFrame, une ligne par an :
+        date | p5 | p25 | p50 | p75 | p95 | deterministe
+    « deterministe » est la trajectoire sans aléa de marché (rendement nul).
+    """
+    n_months = int(annees) * 12
+    all_dates = monthly_dates(start or date.today(), n_months)
+    yearly = np.arange(0, n_months + 1, 12)
+
+    if df_assets.empty:
+        df_assets = pd.DataFrame(columns=["categorie", "ticker", "montant"])
+    montants = pd.to_numeric(df_assets["montant"], errors="coerce").fillna(0.0)
+    df_assets = df_assets.assign(montant=montants)
+
+    returns = monthly_returns(df_prices)
+    is_auto = df_assets["categorie"].isin(CATEGORIES_AUTO)
+    simulated = is_auto & df_assets["ticker"].isin(returns.columns)
+
+    par_ticker = df_assets[simulated].groupby("ticker")["montant"].sum()
+    par_ticker = par_ticker[par_ticker != 0]
+    log_returns = np.ascontiguousarray(np.log1p(returns[par_ticker.index].to_numpy(dtype=float)))
+    valeurs = par_ticker.to_numpy(dtype=float)
+
+    marche = _market_percentiles(log_returns, valeurs, n_months, int(n_paths), int(seed))
+    deterministe = _deterministic_path(df_assets[~simulated], df_emprunts, all_dates, epargne_mensuelle)[yearly]
+
+    result = pd.DataFrame({"date": pd.to_datetime(all_dates[yearly])})
+    for p, values in zip(PROJECTION_PERCENTILES, marche):
+        result[f"p{p}"] = values + deterministe
+    result["deterministe"] = deterministe + valeurs.sum()
+    return result
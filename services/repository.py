@@ -0,0 +1,94 @@
+"""
+repository.py
+─────────────
+Tables de référence (emprunts, contrats, agrégats des actifs) chargées une
+seule fois par rerun.
+
+Un rendu lit ces tables depuis de nombreux endroits (synthèse, liste des
+actifs, formulaires, calculs locatifs). Le dépôt garde, pour le rerun en cours,
+le DataFrame de chaque table et un index id → ligne pour les recherches.
+
+Streamlit exécute le script de chaque session dans son propre thread : le
+cache est local au thread et vidé par begin_request() au début de app.py.
+Chaque entrée est aussi validée par la génération de sa table (cf.
+services/db.bump_generation) : une écriture pendant le rerun la recharge.
+
+Les DataFrames renvoyés sont partagés : ne pas les modifier en place.
+"""
+
+import threading
+from typing import Callable
+
+import pandas as pd
+
+from .db import get_db_path, get_generation
+from .db_actifs import load_agregats
+from .db_contrats import load_contrats
+from .db_emprunts import load_emprunts
+from .profiler import note_cache_miss
+
+_local = threading.local()
+
+
+def begin_request() -> None:
+    """Démarre un nouveau rerun : les tables seront relues au premier accès."""
+    _local.entries = {}
+
+
+def _get(table: str, loader: Callable[[], pd.DataFrame],
+         generation: str | None = None) -> tuple[pd.DataFrame, dict[str, dict]]:
+    """generation : table dont la génération valide l'entrée (par défaut `table`)."""
+    entries = getattr(_local, "entries", None)
+    if entries is None:
+        entries = _local.entries = {}
+    key = (get_db_path(), get_generation(generation or table))
+    entry = entries.get(table)
+    if entry is None or entry[0] != key:
+        note_cache_miss(f"sqlite:{table}")
+        df = loader()
+        by_id = {str(r["id"]): r for r in df.to_dict("records")} if "id" in df.columns else {}
+        entry = entries[table] = (key, df, by_id)
+    return entry[1], entry[2]
+
+
+# ── Emprunts ──────────────────────────────────────────────────────────────────
+
+def get_emprunts() -> pd.DataFrame:
+    """Emprunts avec capital restant dû à aujourd'hui (cf. load_emprunts)."""
+    return _get("emprunts", load_emprunts)[0]
+
+
+def get_emprunt(emprunt_id) -> dict | None:
+    """Ligne d'un emprunt (dict) ou None si l'id est vide ou inconnu."""
+    if emprunt_id is None or pd.isna(emprunt_id) or emprunt_id == "":
+        return None
+    return _get("emprunts", load_emprunts)[1].get(str(emprunt_id))
+
+
+def get_total_emprunts() -> float:
+    """Total des capitaux restant dus à aujourd'hui."""
+    df = get_emprunts()
+    if df.empty:
+        return 0.0
+    return float(df["capital_restant_du"].fillna(0).sum())
+
+
+# ── Contrats ──────────────────────────────────────────────────────────────────
+
+def get_contrats() -> pd.DataFrame:
+    """Contrats : id, etablissement, enveloppe."""
+    return _get("contrats", load_contrats)[0]
+
+
+def get_contrat(contrat_id) -> dict | None:
+    """Ligne d'un contrat (dict) ou None si l'id est vide ou inconnu."""
+    if contrat_id is None or pd.isna(contrat_id) or str(contrat_id).strip() == "":
+        return None
+    return _get("contrats", load_contrats)[1].get(str(contrat_id).strip())
+
+
+# ── Agrégats des actifs ───────────────────────────────────────────────────────
+
+def get_agregats() -> pd.DataFrame:
+    """Totaux par catégorie et par contrat (cf. db_actifs.load_agregats), validés par la génération des actifs."""
+    return _get("agregats_actifs", load_agregats, generation="actifs")[0]
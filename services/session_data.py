@@ -0,0 +1,118 @@
+"""
+session_data.py
+───────────────
+Données de travail de la session : actifs, historique et positions.
+
+Chaque table est lue une fois, puis gardée dans st.session_state avec la
+génération (services/db.bump_generation) à laquelle elle a été lue. Après une
+écriture de la session, le résultat est appliqué en mémoire au lieu de tout
+relire :
+
+    - actifs      : le DataFrame renvoyé par asset_manager (apply_assets) ;
+    - historique,
+      positions   : les lignes des seuls actifs touchés, relues par asset_id
+                    quand l'écriture les évince (services/cache_deps.py).
+
+La table n'est relue entièrement qu'en cas de conflit : sa génération a avancé
+plus que les écritures de la session ne l'expliquent (autre onglet, autre
+session), ou l'écriture ne précise pas ses actifs (compaction, restauration).
+
+Les DataFrames renvoyés sont partagés par les reruns de la session : ne pas
+les modifier en place hors d'une séquence d'asset_manager suivie d'apply_assets.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from services import cache_deps
+from services.db import get_db_path, get_generation, own_generation
+from services.profiler import note_cache_miss
+
+_STATE_KEY = "_session_data"
+_MAX_IDS_RELUS = 500  # au-delà (gros import), la table est relue entièrement
+
+
+def _loader(table: str):
+    if table == "actifs":
+        from services.assets import get_assets
+        return lambda asset_ids=None: get_assets()
+    if table == "historique":
+        from services.historique import load_historique
+        return load_historique
+    from services.positions import load_positions
+    return load_positions
+
+
+def _entries() -> dict:
+    return st.session_state.setdefault(_STATE_KEY, {})
+
+
+def _snapshot(table: str, df: pd.DataFrame) -> dict:
+    return {"df": df, "path": get_db_path(), "gen": get_generation(table), "own": own_generation(table)}
+
+
+# ── Lecture ───────────────────────────────────────────────────────────────────
+
+def get_table(table: str) -> pd.DataFrame:
+    """Table de travail ("actifs", "historique" ou "positions"), relue seulement si elle a changé."""
+    entries = _entries()
+    entry = entries.get(table)
+    if entry is None or entry["path"] != get_db_path() or entry["gen"] != get_generation(table):
+        note_cache_miss(f"sqlite:{table}")
+        entry = entries[table] = _snapshot(table, _loader(table)())
+    else:
+        # Un rerun peut changer de thread : les écritures propres se comptent à partir d'ici
+        entry["own"] = own_generation(table)
+    return entry["df"]
+
+
+# ── Écritures de la session ───────────────────────────────────────────────────
+
+def _commit(table: str, df: pd.DataFrame) -> bool:
+    """Remplace la table de travail par `df`, sauf si une autre session a écrit entre-temps."""
+    entries = _entries()
+    entry = entries.get(table)
+    if entry is None:
+        return False
+    foreign = (get_generation(table) - entry["gen"]) - (own_generation(table) - entry["own"])
+    if foreign or entry["path"] != get_db_path():
+        del entries[table]  # conflit : relue au prochain accès
+        return False
+    entries[table] = _snapshot(table, df)
+    return True
+
+
+def apply_assets(df: pd.DataFrame) -> bool:
+    """Applique le DataFrame d'actifs renvoyé par asset_manager. False si la table sera relue."""
+    return _commit("actifs", df.reset_index(drop=True))
+
+
+def _apply_rows(table: str, asset_ids: set[str]) -> None:
+    """Remplace, dans la table de travail, les lignes des actifs touchés par leur état en base."""
+    entry = _entries().get(table)
+    if entry is None:
+        return
+    if len(asset_ids) > _MAX_IDS_RELUS:
+        _drop(table)
+        return
+    ids = sorted(asset_ids)
+    df = entry["df"]
+    fresh = _loader(table)(ids)
+    kept = df[~df["asset_id"].isin(ids)] if not df.empty else df
+    parts = [p for p in (kept, fresh) if not p.empty]
+    merged = pd.concat(parts, ignore_index=True) if parts else fresh
+    _commit(table, merged)
+
+
+def _drop(table: str) -> None:
+    _entries().pop(table, None)
+
+
+for _table in ("historique", "positions"):
+    cache_deps.register_cache(
+        f"session_{_table}", (_table,),
+        clear=lambda t=_table: _drop(t),
+        evict=lambda ids, t=_table: _apply_rows(t, ids),
+    )
+# Les actifs ne sont pas déclarés : l'UI applique le DataFrame renvoyé, et une
+# écriture non appliquée fait avancer la génération, donc relire la table.
@@ -0,0 +1,149 @@
+"""
+tests/test_allocation.py
+────────────────────────
+Tests du rééquilibrage vers une allocation cible (services/allocation.py).
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.allocation import holdings_matrix, propose_rebalancing, solve_allocation
+
+
+@pytest.fixture
+def df_contrats():
+    return pd.DataFrame([
+        {"id": "pea", "etablissement": "Banque", "enveloppe": "PEA"},
+        {"id": "av", "etablissement": "Assureur", "enveloppe": "Assurance vie"},
+        {"id": "livret", "etablissement": "Banque", "enveloppe": "Livret réglementé"},
+    ])
+
+
+@pytest.fixture
+def df_actifs():
+    return pd.DataFrame([
+        {"categorie": "Actions & Fonds", "montant": 6000.0, "contrat_id": "pea"},
+        {"categorie": "Fonds euros", "montant": 2000.0, "contrat_id": "av"},
+        {"categorie": "Livrets", "montant": 2000.0, "contrat_id": "livret"},
+        {"categorie": "Immobilier", "montant": 300000.0, "contrat_id": ""},
+    ])
+
+
+def _mouvements(result) -> dict:
+    m = result["mouvements"]
+    return {(r.contrat_id, r.categorie): round(r.mouvement, 2) for r in m.itertuples()}
+
+
+class TestHoldingsMatrix:
+
+    def test_contraintes_des_enveloppes(self, df_actifs, df_contrats):
+        montants, allowed = holdings_matrix(df_actifs, df_contrats)
+
+        assert list(montants.index) == ["pea", "av", "livret"]
+        assert "Immobilier" not in montants.columns
+        assert montants.loc["pea", "Actions & Fonds"] == 6000.0
+        assert allowed.loc["pea"].sum() == 1
+        assert allowed.loc["av", "Actions & Fonds"] and allowed.loc["av", "Fonds euros"]
+        assert not allowed.loc["livret", "Crypto"]
+
+    def test_case_deja_detenue_reste_autorisee(self, df_contrats):
+        df = pd.DataFrame([{"categorie": "Crypto", "montant": 100.0, "contrat_id": "pea"}])
+        _, allowed = holdings_matrix(df, df_contrats)
+        assert allowed.loc["pea", "Crypto"]
+
+
+class TestSolveAllocation:
+
+    def test_atteint_les_totaux(self):
+        current = np.array([[10.0, 0.0], [5.0, 5.0]])
+        allowed = np.ones((2, 2), dtype=bool)
+        y, converge = solve_allocation(current, allowed, np.array([10.0, 10.0]), np.array([8.0, 12.0]))
+
+        assert converge
+        assert np.allclose(y.sum(axis=1), [10.0, 10.0], atol=0.01)
+        assert np.allclose(y.sum(axis=0), [8.0, 12.0], atol=0.01)
+
+    def test_cases_interdites_restent_vides(self):
+        current = np.array([[10.0, 0.0], [0.0, 10.0]])
+        allowed = np.array([[True, False], [True, True]])
+        y, converge = solve_allocation(current, allowed, np.array([10.0, 10.0]), np.array([15.0, 5.0]))
+
+        assert converge
+        assert y[0, 1] == 0.0
+        assert y[1].tolist() == pytest.approx([5.0, 5.0], abs=0.01)
+
+    def test_contraintes_incompatibles(self):
+        # Le contrat 0 ne peut détenir que la catégorie 0, dont la cible est nulle
+        current = np.array([[10.0, 0.0], [0.0, 10.0]])
+        allowed = np.array([[True, False], [True, True]])
+        _, converge = solve_allocation(current, allowed, np.array([10.0, 10.0]), np.array([0.0, 20.0]))
+        assert not converge
+
+
+class TestProposeRebalancing:
+
+    def test_cibles_deja_atteintes(self, df_actifs, df_contrats):
+        result = propose_rebalancing(df_actifs, df_contrats, {"Actions & Fonds": 60, "Fonds euros": 20, "Livrets": 20})
+        assert result["converge"]
+        assert result["mouvements"].empty
+
+    def test_pea_ne_peut_pas_vendre_pour_des_fonds_euros(self, df_actifs, df_contrats):
+        # 50 % d'actions : le PEA (6 000 €) ne peut détenir que des actions et les contrats gardent leur taille
+        result = propose_rebalancing(df_actifs, df_contrats, {"Actions & Fonds": 50, "Fonds euros": 30, "Livrets": 20})
+        assert not result["converge"]
+
+    def test_apport_reparti_selon_les_cibles(self, df_actifs, df_contrats):
+        cibles = {"Actions & Fonds": 60, "Fonds euros": 20, "Livrets": 20}
+        result = propose_rebalancing(df_actifs, df_contrats, cibles, apport=1000.0)
+
+        assert result["total"] == 11000.0
+        par_cat = result["par_categorie"].set_index("categorie")
+        assert par_cat.loc["Actions & Fonds", "propose"] == pytest.approx(6600.0, abs=0.05)
+        assert par_cat.loc["Livrets", "propose"] == pytest.approx(2200.0, abs=0.05)
+        assert _mouvements(result) == pytest.approx(
+            {("pea", "Actions & Fonds"): 600.0, ("av", "Fonds euros"): 200.0, ("livret", "Livrets"): 200.0},
+            abs=0.05,
+        )
+
+    def test_cible_par_contrat(self, df_actifs, df_contrats):
+        # L'assurance vie doit peser 40 % : elle reçoit des actions, le PEA en vend
+        cibles = {"Actions & Fonds": 60, "Fonds euros": 20, "Livrets": 20}
+        result = propose_rebalancing(df_actifs, df_contrats, cibles, {"av": 40, "livret": 20})
+
+        assert result["converge"]
+        assert _mouvements(result) == pytest.approx(
+            {("pea", "Actions & Fonds"): -2000.0, ("av", "Actions & Fonds"): 2000.0}, abs=0.05,
+        )
+
+    def test_sans_cible_conserve_les_poids(self, df_actifs, df_contrats):
+        result = propose_rebalancing(df_actifs, df_contrats, {})
+        assert result["mouvements"].empty
+
+
+class TestCiblesEnBase:
+
+    def test_enregistrement_et_suppression_du_contrat(self, tmp_path):
+        with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+            from services.db import init_db
+            from services.db_allocations import load_allocation_targets, save_allocation_targets
+            from services.db_contrats import add_contrat, delete_contrat
+            init_db()
+            _, _, contrat_id = add_contrat("Banque", "PEA")
+
+            save_allocation_targets("categorie", {"Actions & Fonds": 70, "Livrets": 30})
+            save_allocation_targets("contrat", {contrat_id: 50})
+            assert load_allocation_targets("categorie") == {"Actions & Fonds": 70.0, "Livrets": 30.0}
+
+            delete_contrat(contrat_id)
+            assert load_allocation_targets("contrat") == {}
+
+    def test_poids_negatif_refuse(self, tmp_path):
+        with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+            from services.db import init_db
+            from services.db_allocations import save_allocation_targets
+            init_db()
+            with pytest.raises(ValueError):
+                save_allocation_targets("categorie", {"Crypto": -5})
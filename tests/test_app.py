@@ -0,0 +1,70 @@
+"""
+tests/test_app.py
+─────────────────
+Tests de l'application complète (app.py) avec streamlit.testing : navigation
+entre les pages et outils développeur.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from services import db, profiler
+
+
+@pytest.fixture
+def app(tmp_path):
+    with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")), \
+            patch.dict(profiler._state, {"sessions": set(), "charge": False}):
+        profiler._runs.clear()
+        db.reset_query_trace()
+        yield AppTest.from_file("../app.py", default_timeout=60).run()
+        db._trace_sessions.clear()
+        db._trace_runs.clear()
+        profiler._runs.clear()
+
+
+def _goto(at: AppTest, url_path: str) -> AppTest:
+    """Affiche une page de st.navigation (pages sans fichier, hors de portée de AppTest.switch_page)."""
+    at._page_hash = next(h for h, page in at._registered_pages.items() if page["url_pathname"] == url_path)
+    return at.run()
+
+
+class TestOutilsDeveloppeur:
+
+    def test_interrupteurs_conserves_hors_de_parametres(self, app):
+        _goto(app, "parametres")
+        app.toggle(key="dev_trace_sql").set_value(True).run()
+        app.toggle(key="dev_profiler").set_value(True).run()
+        assert not app.exception
+
+        # Deux reruns de Synthèse : l'état des widgets de Paramètres est supprimé entre-temps
+        _goto(app, "")
+        app.run()
+        assert app.session_state["_dev_trace_sql"] and app.session_state["_dev_profiler"]
+        assert db._trace_sessions
+        assert [run["label"] for run in profiler.get_profile_runs()][-2:] == ["Synthèse", "Synthèse"]
+
+        _goto(app, "parametres")
+        assert app.toggle(key="dev_trace_sql").value and app.toggle(key="dev_profiler").value
+
+
+class TestReequilibrage:
+
+    def test_sans_cible_aucun_mouvement_propose(self, tmp_path):
+        with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+            from services.asset_manager import create_manual_asset
+            from services.db import init_db
+            from services.db_actifs import load_assets
+            init_db()
+            df, _, _ = create_manual_asset(load_assets(), "Livret A", "Livrets", 50400.0)
+            create_manual_asset(df, "Fonds euros", "Fonds euros", 49600.0)
+
+            at = AppTest.from_file("../app.py", default_timeout=60).run()
+
+        # 50,4 / 49,6 % affichés 50 / 50 : l'allocation actuelle reste la référence
+        assert [s.value for s in at.slider if s.key.startswith("alloc_cat_")] == [0, 0, 50, 50]
+        captions = [c.value for c in at.caption]
+        assert "Aucun mouvement nécessaire." in captions
+        assert not any("Somme des cibles" in c for c in captions)
@@ -7,7 +7,7 @@ Ces fonctions sont pures (pas d'I/O) : faciles à tester, zéro mock nécessaire
 
 import pytest
 import pandas as pd
-from services.assets import compute_total, compute_by_category
+from services.assets import compute_total, compute_by_category, totals_by_category, totals_by_contrat
 
 
 class TestComputeTotal:
@@ -79,4 +79,39 @@ class TestComputeByCategory:
         livrets = result[result["categorie"] == "Livrets"].iloc[0]
         immo = result[result["categorie"] == "Immobilier"].iloc[0]
         assert livrets["pourcentage"] == pytest.approx(75.0)
-        assert immo["pourcentage"] == pytest.approx(25.0)
\ No newline at end of file
+        assert immo["pourcentage"] == pytest.approx(25.0)
+
+class TestTotauxAgreges:
+
+    @pytest.fixture
+    def df_agg(self):
+        return pd.DataFrame([
+            {"categorie": "Actions & Fonds", "contrat_id": "pea", "nb": 2, "montant": 1500.0,
+             "montant_cote": 1200.0, "valeur_achat": 1000.0},
+            {"categorie": "Actions & Fonds", "contrat_id": "", "nb": 1, "montant": 500.0,
+             "montant_cote": 0.0, "valeur_achat": 0.0},
+            {"categorie": "Livrets", "contrat_id": "", "nb": 1, "montant": 2000.0,
+             "montant_cote": 0.0, "valeur_achat": 0.0},
+        ])
+
+    def test_par_categorie(self, df_agg):
+        result = totals_by_category(df_agg)
+        assert result["categorie"].tolist() == ["Actions & Fonds", "Livrets"]
+        actions = result.iloc[0]
+        assert actions["montant"] == 2000.0
+        assert actions["pourcentage"] == pytest.approx(50.0)
+        assert actions["pnl"] == pytest.approx(200.0)
+        assert actions["pnl_pct"] == pytest.approx(20.0)
+        assert pd.isna(result.iloc[1]["pnl"])
+
+    def test_par_contrat(self, df_agg):
+        contrats = pd.DataFrame([{"id": "pea", "etablissement": "Bourse", "enveloppe": "PEA"}])
+        result = totals_by_contrat(df_agg, contrats)
+        assert result[["contrat", "montant", "pnl"]].to_dict("records") == [
+            {"contrat": "Bourse — PEA", "montant": 1500.0, "pnl": 200.0},
+        ]
+
+    def test_vides(self):
+        vide = pd.DataFrame(columns=["categorie", "contrat_id", "nb", "montant", "montant_cote", "valeur_achat"])
+        assert totals_by_category(vide).empty
+        assert totals_by_contrat(vide, pd.DataFrame(columns=["id", "etablissement", "enveloppe"])).empty
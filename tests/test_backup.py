@@ -0,0 +1,118 @@
+"""
+tests/test_backup.py
+─────────────────────
+Tests des snapshots de la base (services/backup.py).
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def db(tmp_path):
+    with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+        from services.db import init_db
+        from services.db_contrats import add_contrat
+        init_db()
+        add_contrat("Boursorama", "PEA")
+        yield tmp_path
+
+
+def _count_contrats(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM contrats").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestSnapshots:
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_snapshot_complet_et_verifie(self, db, compact):
+        from services.backup import create_snapshot, list_snapshots, verify_snapshot
+        path = create_snapshot(compact=compact)
+
+        assert os.path.dirname(path) == str(db / "backups")
+        assert _count_contrats(path) == 1
+        assert verify_snapshot(path) == (True, "")
+        assert [s["chemin"] for s in list_snapshots()] == [path]
+        assert not any(name.endswith(".tmp") for name in os.listdir(db / "backups"))
+
+    def test_rotation(self, db):
+        from services.backup import create_snapshot, list_snapshots, rotate_snapshots
+        base = datetime.now().timestamp()
+        for i, label in enumerate(("a", "b", "c")):
+            path = create_snapshot(label=label)
+            # dates de modification distinctes pour un ordre déterministe
+            os.utime(path, (base + i, base + i))
+
+        removed = rotate_snapshots(2)
+
+        assert [s["nom"][-4:] for s in list_snapshots()] == ["c.db", "b.db"]
+        assert removed[0].endswith("-a.db")
+
+    def test_snapshot_corrompu_refuse(self, db):
+        from services.backup import restore_snapshot
+        bad = db / "backups" / "patrimoine-corrompu.db"
+        bad.parent.mkdir(exist_ok=True)
+        bad.write_bytes(b"pas une base sqlite" * 100)
+
+        ok, msg = restore_snapshot(str(bad))
+
+        assert not ok
+        assert _count_contrats(db / "patrimoine.db") == 1
+
+    def test_restauration_apres_reinitialisation(self, db):
+        from services.backup import create_snapshot, restore_snapshot
+        from services.db import reset_all_data
+        from services.db_contrats import load_contrats
+        path = create_snapshot()
+        reset_all_data()
+
+        ok, _ = restore_snapshot(path)
+
+        assert ok
+        assert load_contrats()["etablissement"].tolist() == ["Boursorama"]
+
+    def test_restauration_sauvegarde_la_base_courante(self, db):
+        from services.backup import create_snapshot, restore_snapshot, list_snapshots
+        from services.db_contrats import add_contrat
+        path = create_snapshot(label="ancienne")
+        add_contrat("Degiro", "CTO")
+
+        ok, _ = restore_snapshot(path)
+
+        assert ok
+        assert _count_contrats(db / "patrimoine.db") == 1
+        safety = [s for s in list_snapshots() if "avant-restauration" in s["nom"]]
+        assert len(safety) == 1 and _count_contrats(safety[0]["chemin"]) == 2
+
+    def test_restauration_du_plus_ancien_retention_pleine(self, db):
+        # La sauvegarde de sécurité fait tourner les snapshots : le plus ancien
+        # doit avoir été copié avant d'être supprimé par la rotation.
+        from constants import BACKUP_RETENTION
+        from services.backup import create_snapshot, restore_snapshot
+        from services.db_contrats import add_contrat
+        base = datetime.now().timestamp() - 3600
+        paths = []
+        for i in range(BACKUP_RETENTION):
+            paths.append(create_snapshot(label=f"s{i}"))
+            os.utime(paths[-1], (base + i, base + i))
+        add_contrat("Degiro", "CTO")
+
+        ok, _ = restore_snapshot(paths[0])
+
+        assert ok
+        assert _count_contrats(db / "patrimoine.db") == 1
+        assert not os.path.exists(str(db / "patrimoine.db") + ".restore")
+
+    def test_snapshot_du(self, db):
+        from services.backup import is_snapshot_due, create_snapshot
+        assert is_snapshot_due()
+        create_snapshot()
+        assert not is_snapshot_due()
@@ -0,0 +1,73 @@
+"""
+tests/test_benchmarks.py
+────────────────────────
+Tests du générateur de portefeuilles synthétiques et de la suite de benchmarks (benchmarks/).
+"""
+
+import json
+from datetime import date
+
+import pandas as pd
+
+from benchmarks.suite import run_benchmarks, write_results
+from benchmarks.synthetic import Taille, generate_portfolio
+from constants import CATEGORIES_ASSETS, CATEGORIES_AUTO
+
+FIN = date(2026, 1, 15)
+MINI = Taille(actifs=10, annees=1, emprunts=2)
+
+
+class TestGenerateur:
+
+    def test_meme_graine_memes_donnees(self):
+        a = generate_portfolio(MINI, seed=1, end=FIN)
+        b = generate_portfolio(MINI, seed=1, end=FIN)
+        for table in a:
+            if isinstance(a[table], pd.DataFrame):
+                pd.testing.assert_frame_equal(a[table], b[table])
+            else:
+                assert a[table] == b[table]
+
+    def test_graine_differente_donnees_differentes(self):
+        a = generate_portfolio(MINI, seed=1, end=FIN)
+        b = generate_portfolio(MINI, seed=2, end=FIN)
+        assert not a["prices"].equals(b["prices"])
+
+    def test_dimensions(self):
+        p = generate_portfolio(MINI, end=FIN)
+        assets = p["assets"]
+        assert len(assets) == 10
+        assert set(assets["categorie"]) == set(CATEGORIES_ASSETS)
+        assert len(p["emprunts"]) == 2
+
+        auto = assets[assets["categorie"].isin(CATEGORIES_AUTO)]
+        jours = p["historique"]["date"].nunique()
+        assert jours == 365
+        assert len(p["historique"]) == (len(assets) - len(auto)) * jours
+        assert len(p["positions"]) == len(auto) * jours
+        assert list(p["prices"].columns) == list(auto["ticker"])
+        assert p["prices"].index[-1] == pd.Timestamp("2026-01-15")
+
+    def test_dernier_releve_egal_au_montant_courant(self):
+        p = generate_portfolio(MINI, end=FIN)
+        derniers = p["historique"].groupby("asset_id")["montant"].last()
+        montants = p["assets"].set_index("id")["montant"]
+        pd.testing.assert_series_equal(derniers, montants[derniers.index], check_names=False)
+
+
+class TestSuite:
+
+    def test_resultats_json(self, tmp_path):
+        cas = ["load_assets", "_compute_raw_evolution (froid)", "load_emprunts (froid)", "refresh_auto_assets"]
+        resultats = run_benchmarks({"mini": MINI}, repetitions=2, cas=cas)
+
+        path = tmp_path / "bench.json"
+        write_results(resultats, str(path))
+        relu = json.loads(path.read_text(encoding="utf-8"))
+        echelle = relu["echelles"]["mini"]
+        assert echelle["taille"] == {"actifs": 10, "annees": 1, "emprunts": 2}
+        assert list(echelle["cas"]) == cas
+        for mesure in echelle["cas"].values():
+            assert mesure["repetitions"] == 2
+            assert 0 <= mesure["min_ms"] <= mesure["mediane_ms"] <= mesure["max_ms"]
+        assert relu["meta"]["graine"] == 42
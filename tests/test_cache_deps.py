@@ -0,0 +1,103 @@
+"""
+tests/test_cache_deps.py
+────────────────────────
+Tests de l'invalidation ciblée des caches dérivés (services/cache_deps.py)
+et du cache par actif des évolutions (services/historique.py).
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from services import cache_deps
+
+
+@pytest.fixture
+def registry():
+    """Registre isolé : les caches déclarés par les modules importés sont restaurés après le test."""
+    with patch.dict(cache_deps._registry, clear=True):
+        yield cache_deps
+
+
+def _patch_db_path(tmp_path):
+    return patch("constants.DB_PATH", str(tmp_path / "patrimoine.db"))
+
+
+class TestInvalidate:
+
+    def test_seuls_les_caches_dependants_sont_vides(self, registry):
+        assets, hist = MagicMock(), MagicMock()
+        registry.register_cache("assets", ("actifs",), clear=assets)
+        registry.register_cache("hist", ("historique",), clear=hist)
+
+        assert registry.invalidate("contrats") == []
+        assert registry.invalidate("historique") == ["hist"]
+        hist.assert_called_once()
+        assets.assert_not_called()
+
+    def test_eviction_par_actif_quand_les_ids_sont_connus(self, registry):
+        clear, evict = MagicMock(), MagicMock()
+        registry.register_cache("parts", ("historique",), clear=clear, evict=evict)
+
+        registry.invalidate("historique", asset_ids=["a1"])
+        evict.assert_called_once_with({"a1"})
+        clear.assert_not_called()
+
+        registry.invalidate("historique")
+        clear.assert_called_once()
+
+    def test_sans_table_tout_est_vide(self, registry):
+        a, b = MagicMock(), MagicMock()
+        registry.register_cache("a", ("actifs",), clear=a)
+        registry.register_cache("b", ("positions",), clear=b, evict=MagicMock())
+        registry.invalidate()
+        a.assert_called_once()
+        b.assert_called_once()
+
+
+class TestAssetManager:
+
+    def test_modifier_un_actif_sans_changer_le_montant_garde_l_historique(self, tmp_path, registry):
+        with _patch_db_path(tmp_path):
+            from services.db import init_db
+            from services.asset_manager import create_manual_asset, edit_manual_asset
+            init_db()
+            df = pd.DataFrame(columns=["id", "nom", "categorie", "montant", "ticker", "quantite", "pru", "contrat_id"])
+            df, _, _ = create_manual_asset(df, "Livret A", "Livrets", 1000.0)
+
+            assets, hist, evict = MagicMock(), MagicMock(), MagicMock()
+            registry.register_cache("assets", ("actifs",), clear=assets)
+            registry.register_cache("hist", ("historique",), clear=hist, evict=evict)
+
+            edit_manual_asset(df, 0, df.iloc[0]["id"], "Livret A bis", "Livrets", 1000.0)
+            assets.assert_called_once()
+            evict.assert_not_called()
+
+            edit_manual_asset(df, 0, df.iloc[0]["id"], "Livret A bis", "Livrets", 1500.0)
+            evict.assert_called_once_with({df.iloc[0]["id"]})
+            hist.assert_not_called()
+
+
+class TestEvolutionParActif:
+
+    def test_seul_l_actif_modifie_est_recalcule(self, tmp_path):
+        from services import historique
+        df_assets = pd.DataFrame({
+            "id": ["a", "b"], "nom": ["A", "B"], "categorie": ["Livrets", "Livrets"], "ticker": ["", ""],
+        })
+        df_hist = pd.DataFrame({
+            "asset_id": ["a", "b", "a", "b"],
+            "date": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-02-01", "2024-02-01"]),
+            "montant": [100.0, 200.0, 110.0, 210.0],
+        })
+        with _patch_db_path(tmp_path), patch.object(historique, "_manual_part",
+                                                    wraps=historique._manual_part) as compute:
+            historique._compute_raw_evolution(df_assets, df_hist, pd.DataFrame(), pd.DataFrame(), ())
+            assert compute.call_count == 2
+
+            df_hist.loc[3, "montant"] = 250.0
+            raw = historique._compute_raw_evolution(df_assets, df_hist, pd.DataFrame(), pd.DataFrame(), ())
+            assert compute.call_count == 3
+            assert compute.call_args.args[0]["id"] == "b"
+            assert raw.groupby("asset_id")["valeur"].last().to_dict() == {"a": 110.0, "b": 250.0}
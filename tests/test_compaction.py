@@ -0,0 +1,120 @@
+"""
+tests/test_compaction.py
+─────────────────────────
+Tests de la compaction de l'historique (services/compaction.py)
+et du saut des écritures sans effet (record_montant / record_position).
+"""
+
+import pandas as pd
+from datetime import date
+from unittest.mock import patch
+
+from services.historique import get_montant_at
+
+
+def _patch_db_path(tmp_path):
+    return patch("constants.DB_PATH", str(tmp_path / "patrimoine.db"))
+
+
+def _init_storage_with_asset():
+    from services.db import init_db
+    from services.db_actifs import save_assets
+    init_db()
+    save_assets(pd.DataFrame([
+        {"id": "aaa", "nom": "Livret A", "categorie": "Livrets", "montant": 100.0,
+         "ticker": "", "quantite": 0.0, "pru": 0.0, "contrat_id": ""},
+    ]))
+
+
+def _insert_raw(rows):
+    """Insère sans passer par record_montant (qui saute les doublons)."""
+    from services.db import db_connection, to_epoch_day
+    with db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO historique (asset_id, date, montant) VALUES (?, ?, ?)",
+            [(a, to_epoch_day(d), m) for a, d, m in rows],
+        )
+
+
+class TestCompactHistory:
+
+    ROWS = [
+        ("aaa", "2024-01-01", 100.0),
+        ("aaa", "2024-01-02", 100.0),
+        ("aaa", "2024-01-03", 100.0),
+        ("aaa", "2024-01-04", 150.0),
+        ("aaa", "2024-01-05", 150.0),
+        ("aaa", "2024-01-06", 100.0),
+        ("aaa", "2024-01-07", 100.0),
+    ]
+
+    def test_supprime_les_lignes_redondantes(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            _insert_raw(self.ROWS)
+            from services.compaction import compact_history
+            from services.db_historique import load_historique
+
+            report = compact_history()
+            df = load_historique()
+
+        # Conservé : le début de chaque palier (même règle qu'à l'écriture)
+        assert df["date"].dt.day.tolist() == [1, 4, 6]
+        assert report["historique"] == {"avant": 7, "apres": 3}
+        assert report["lignes_supprimees"] == 4
+        assert report["octets_gagnes"] == report["octets_avant"] - report["octets_apres"]
+
+    def test_lecture_a_date_inchangee(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            _insert_raw(self.ROWS)
+            from services.compaction import compact_history
+            from services.db_historique import load_historique
+
+            before = load_historique()
+            compact_history(vacuum=False)
+            after = load_historique()
+
+        for day in pd.date_range("2023-12-31", "2024-01-10"):
+            assert get_montant_at("aaa", day, after) == get_montant_at("aaa", day, before)
+
+    def test_idempotente(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            _insert_raw(self.ROWS)
+            from services.compaction import compact_history
+            compact_history()
+            report = compact_history()
+
+        assert report["lignes_supprimees"] == 0
+
+
+class TestRecordSansEffet:
+
+    def test_montant_identique_non_ecrit(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            from services.db_historique import record_montant, load_historique
+
+            assert record_montant("aaa", 100.0, date(2024, 1, 1)) is True
+            assert record_montant("aaa", 100.0, date(2024, 1, 2)) is False
+            assert record_montant("aaa", 120.0, date(2024, 1, 3)) is True
+            assert len(load_historique()) == 2
+
+    def test_ecrase_une_valeur_differente_le_meme_jour(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            from services.db_historique import record_montant, load_historique
+
+            record_montant("aaa", 100.0, date(2024, 1, 1))
+            assert record_montant("aaa", 110.0, date(2024, 1, 1)) is True
+            assert load_historique()["montant"].tolist() == [110.0]
+
+    def test_quantite_identique_non_ecrite(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_storage_with_asset()
+            from services.db_positions import record_position, load_positions
+
+            record_position("aaa", 5.0, date(2024, 1, 1))
+            assert record_position("aaa", 5.0, date(2024, 2, 1)) is False
+            assert len(load_positions()) == 1
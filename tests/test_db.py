@@ -0,0 +1,275 @@
+"""
+tests/test_db.py
+─────────────────
+Tests du versionnement du schéma dans services/db.py (PRAGMA user_version).
+"""
+
+import sqlite3
+
+import pytest
+import pandas as pd
+from unittest.mock import patch
+
+
+def _patch_db_path(tmp_path):
+    return patch("constants.DB_PATH", str(tmp_path / "patrimoine.db"))
+
+
+def _user_version(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _create_legacy_db(path):
+    """Base telle que créée avant les colonnes immobilier / contrat / parametres."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE contrats (id TEXT PRIMARY KEY, etablissement TEXT NOT NULL, enveloppe TEXT NOT NULL);
+        CREATE TABLE actifs (id TEXT PRIMARY KEY, type TEXT NOT NULL, nom TEXT NOT NULL,
+                             montant_actuel REAL NOT NULL DEFAULT 0);
+        CREATE TABLE emprunts (id TEXT PRIMARY KEY, nom TEXT NOT NULL, montant_emprunte REAL NOT NULL,
+                               taux_annuel REAL NOT NULL, mensualite REAL NOT NULL,
+                               duree_mois INTEGER NOT NULL, date_debut TEXT NOT NULL, date_fin TEXT);
+        CREATE TABLE actifs_immobilier (actif_id TEXT PRIMARY KEY, prix_achat REAL NOT NULL,
+                                        emprunt_id TEXT, type_bien TEXT NOT NULL);
+        CREATE TABLE historique (asset_id TEXT NOT NULL, date TEXT NOT NULL, montant REAL NOT NULL,
+                                 PRIMARY KEY (asset_id, date));
+        CREATE TABLE positions (asset_id TEXT NOT NULL, date TEXT NOT NULL, quantite REAL NOT NULL,
+                                PRIMARY KEY (asset_id, date));
+        INSERT INTO actifs (id, type, nom, montant_actuel) VALUES ('aaa', 'livret', 'Livret A', 100);
+        INSERT INTO historique VALUES ('aaa', '2024-01-01', 90), ('aaa', '2024-06-01', 100);
+    """)
+    conn.close()
+
+
+class TestInitDb:
+
+    def test_base_neuve_a_la_derniere_version(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services.db import init_db, SCHEMA_VERSION
+            report = init_db()
+
+        assert _user_version(tmp_path / "patrimoine.db") == SCHEMA_VERSION
+        assert len(report) == 1
+
+    def test_base_a_jour_ne_fait_rien(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services.db import init_db
+            init_db()
+            assert init_db() == []
+
+    def test_migre_une_base_non_versionnee(self, tmp_path):
+        path = tmp_path / "patrimoine.db"
+        _create_legacy_db(path)
+        with _patch_db_path(tmp_path):
+            from services.db import init_db, SCHEMA_VERSION, get_migration_report
+            report = init_db()
+
+            assert [m["version"] for m in report] == list(range(1, SCHEMA_VERSION + 1))
+            assert all(m["duree_ms"] >= 0 for m in get_migration_report())
+
+        conn = sqlite3.connect(path)
+        actifs_cols = [r[1] for r in conn.execute("PRAGMA table_info(actifs)")]
+        immo_cols = [r[1] for r in conn.execute("PRAGMA table_info(actifs_immobilier)")]
+        emprunt_cols = [r[1] for r in conn.execute("PRAGMA table_info(emprunts)")]
+        nom = conn.execute("SELECT nom FROM actifs WHERE id = 'aaa'").fetchone()[0]
+        conn.close()
+
+        assert "contrat_id" in actifs_cols
+        assert {"frais_notaire", "loyer_mensuel", "date_achat"} <= set(immo_cols)
+        assert "date_fin" not in emprunt_cols
+        assert nom == "Livret A"
+        assert _user_version(path) == SCHEMA_VERSION
+
+    def test_migre_les_dates_texte_en_jours(self, tmp_path):
+        path = tmp_path / "patrimoine.db"
+        _create_legacy_db(path)
+        with _patch_db_path(tmp_path):
+            from services.db import init_db
+            from services.db_historique import load_historique
+            init_db()
+            df = load_historique()
+
+        conn = sqlite3.connect(path)
+        raw = conn.execute("SELECT date, typeof(date) FROM historique ORDER BY date").fetchall()
+        ddl = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'historique'").fetchone()[0]
+        conn.close()
+
+        assert raw[0] == (19723, "integer")  # 2024-01-01
+        assert "WITHOUT ROWID" in ddl
+        assert df["date"].tolist() == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-06-01")]
+        assert df["date"].dtype == "datetime64[ns]"
+
+    def test_migration_en_echec_est_annulee(self, tmp_path):
+        path = tmp_path / "patrimoine.db"
+        _create_legacy_db(path)
+
+        def _boom(conn):
+            conn.execute("ALTER TABLE actifs ADD COLUMN temporaire TEXT")
+            raise RuntimeError("échec")
+
+        with _patch_db_path(tmp_path), patch("services.db.MIGRATIONS", [(1, "échec", _boom)]):
+            from services.db import init_db
+            with pytest.raises(RuntimeError):
+                init_db()
+
+        conn = sqlite3.connect(path)
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(actifs)")]
+        conn.close()
+        assert "temporaire" not in cols
+        assert _user_version(path) == 0
+
+
+class TestEpochDays:
+
+    def test_aller_retour(self):
+        from datetime import date
+        from services.db import to_epoch_day, epoch_days_to_datetime, datetime_to_epoch_days
+        assert to_epoch_day(date(1970, 1, 2)) == 1
+        assert to_epoch_day("2024-01-01") == to_epoch_day(pd.Timestamp("2024-01-01 15:30"))
+        days = datetime_to_epoch_days(pd.Series(pd.to_datetime(["1969-12-31", "2024-02-29"])))
+        assert days.tolist() == [-1, 19782]
+        assert list(epoch_days_to_datetime(days)) == list(pd.to_datetime(["1969-12-31", "2024-02-29"]).values)
+
+
+class TestQueryTrace:
+
+    def test_enregistre_requetes_lignes_et_appelant(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services import db
+            from services.db_contrats import add_contrat, load_contrats
+            db.init_db()
+            add_contrat("Boursorama", "PEA")
+
+            db.enable_query_trace()
+            try:
+                db.reset_query_trace()
+                db.begin_query_trace_run("test")
+                load_contrats()
+                load_contrats()
+            finally:
+                db.disable_query_trace()
+
+            requetes = db.get_query_trace_runs()[-1]["requetes"]
+            summary = db.summarize_query_trace(requetes)
+
+        select = summary[summary["sql"].str.startswith("SELECT id, etablissement")].iloc[0]
+        assert select["executions"] == 2
+        assert select["lignes"] == 2
+        assert select["appelant"].startswith("services/db_contrats.py")
+        assert select["duree_totale_ms"] >= 0
+
+    def test_inactif_par_defaut(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services import db
+            db.reset_query_trace()
+            db.init_db()
+            assert db.get_query_trace_runs() == []
+
+    def test_active_par_session(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services import db
+            db.init_db()
+            with patch("services.db.current_session_id", return_value="session-a"):
+                db.enable_query_trace()
+            try:
+                with patch("services.db.current_session_id", return_value="session-b"):
+                    assert not db.is_query_trace_enabled()
+                    conn = db.get_conn()
+                    assert type(conn) is sqlite3.Connection
+                    conn.close()
+                with patch("services.db.current_session_id", return_value="session-a"):
+                    assert db.is_query_trace_enabled()
+            finally:
+                with patch("services.db.current_session_id", return_value="session-a"):
+                    db.disable_query_trace()
+            assert not db.is_query_trace_enabled()
+
+    def test_executions_par_session(self):
+        from services import db
+
+        def session(session_id):
+            return patch("services.db.current_session_id", return_value=session_id)
+
+        for session_id in ("session-a", "session-b"):
+            with session(session_id):
+                db.begin_query_trace_run(session_id)
+        with session("session-a"):
+            assert [run["label"] for run in db.get_query_trace_runs()] == ["session-a"]
+            db.reset_query_trace()
+            assert db.get_query_trace_runs() == []
+        with session("session-b"):
+            assert [run["label"] for run in db.get_query_trace_runs()] == ["session-b"]
+            db.reset_query_trace()
+
+    def test_export_json(self):
+        import json
+        from services import db
+        db.reset_query_trace()
+        db.begin_query_trace_run("vide")
+        data = json.loads(db.export_query_trace_json())
+        assert data[0]["label"] == "vide"
+        assert data[0]["requetes"] == []
+
+
+class TestAgregats:
+
+    def _agregats(self):
+        from services.db import db_readonly
+        with db_readonly() as conn:
+            rows = conn.execute("SELECT * FROM agregats_actifs ORDER BY type, contrat_id").fetchall()
+        return [tuple(round(v, 6) if isinstance(v, float) else v for v in r) for r in rows]
+
+    def _recalcules(self):
+        from services.db import db_connection, rebuild_agregats
+        with db_connection() as conn:
+            rebuild_agregats(conn)
+        return self._agregats()
+
+    def test_triggers_identiques_au_recalcul(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            from services.db import init_db
+            from services.db_actifs import save_assets
+            from services.db_contrats import add_contrat, load_contrats, delete_contrat
+            init_db()
+            add_contrat("Bourse", "PEA")
+            pea = load_contrats().iloc[0]["id"]
+            df = pd.DataFrame([
+                {"id": "a", "nom": "ETF", "categorie": "Actions & Fonds", "montant": 1200.0,
+                 "ticker": "CW8", "quantite": 10.0, "pru": 100.0, "contrat_id": pea},
+                {"id": "b", "nom": "BTC", "categorie": "Crypto", "montant": 500.0,
+                 "ticker": "BTC", "quantite": 0.0, "pru": 0.0, "contrat_id": None},
+                {"id": "c", "nom": "Livret", "categorie": "Livrets", "montant": 3000.0,
+                 "ticker": "", "quantite": 0.0, "pru": 0.0, "contrat_id": None},
+            ])
+            save_assets(df)
+            assert self._agregats() == [
+                ("action", pea, 1, 1200.0, 1200.0, 1000.0),
+                ("crypto", "", 1, 500.0, 0.0, 0.0),
+                ("livret", "", 1, 3000.0, 0.0, 0.0),
+            ]
+
+            df.loc[1, ["quantite", "pru"]] = [0.01, 40000.0]   # coût renseigné
+            df.loc[0, "montant"] = 1300.0                       # nouveau cours
+            df.loc[2, "categorie"] = "Fonds euros"               # changement de type
+            save_assets(df)
+            assert self._agregats() == self._recalcules()
+
+            save_assets(df.drop(index=0))                       # suppression (cascade sur actifs_ticker)
+            delete_contrat(pea)
+            assert self._agregats() == self._recalcules()
+            assert [r[0] for r in self._agregats()] == ["crypto", "fonds_euro"]
+
+    def test_migration_remplit_les_agregats(self, tmp_path):
+        path = tmp_path / "patrimoine.db"
+        _create_legacy_db(path)
+        with _patch_db_path(tmp_path):
+            from services.db import init_db
+            from services.db_actifs import get_total, get_total_by_type
+            init_db()
+            assert self._agregats() == [("livret", "", 1, 100.0, 0.0, 0.0)]
+            assert get_total() == 100.0
+            assert get_total_by_type().to_dict("records") == [{"categorie": "Livrets", "montant": 100.0}]
@@ -0,0 +1,42 @@
+"""
+tests/test_downsampling.py
+──────────────────────────
+Tests de la réduction des séries avant affichage (services/downsampling.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+from services.downsampling import downsample, lttb_indices
+
+
+class TestLttb:
+
+    def test_serie_courte_inchangee(self):
+        assert list(lttb_indices(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+
+    def test_extremites_et_pics_conserves(self):
+        y = np.zeros(1000)
+        y[437] = 100.0   # pic isolé
+        y[812] = -50.0   # creux isolé
+        kept = lttb_indices(np.arange(1000), y, 50)
+        assert len(kept) == 50
+        assert kept[0] == 0 and kept[-1] == 999
+        assert 437 in kept and 812 in kept
+        assert (np.diff(kept) > 0).all()
+
+
+class TestDownsample:
+
+    def test_dataframe_colonnes_alignees(self):
+        dates = pd.date_range("2020-01-01", periods=3000, freq="D")
+        df = pd.DataFrame({"Livrets": np.linspace(0, 1000, 3000), "Crypto": np.sin(np.arange(3000))}, index=dates)
+        reduit = downsample(df, 300)
+        assert len(reduit) == 300
+        assert list(reduit.columns) == ["Livrets", "Crypto"]
+        assert reduit.index[0] == dates[0] and reduit.index[-1] == dates[-1]
+        pd.testing.assert_frame_equal(reduit, df.loc[reduit.index])
+
+    def test_serie_sous_le_seuil_renvoyee_telle_quelle(self):
+        s = pd.Series([1.0, 2.0], index=pd.to_datetime(["2024-01-01", "2024-01-02"]))
+        assert downsample(s, 100) is s
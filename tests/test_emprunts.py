@@ -0,0 +1,216 @@
+"""
+tests/test_emprunts.py
+───────────────────────
+Tests du moteur d'amortissement vectorisé de services/db_emprunts.py.
+Référence : _compute_capital_restant_du (calcul scalaire, emprunt par emprunt).
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.db_emprunts import (
+    _compute_capital_restant_du, amortization_schedule, capital_restant_du_matrix, monthly_dates,
+)
+
+
+def _mensualite(P, taux_annuel, n):
+    r = taux_annuel / 100 / 12
+    return P / n if r == 0 else P * r / (1 - (1 + r) ** -n)
+
+
+@pytest.fixture
+def df_emprunts():
+    return pd.DataFrame([
+        {"id": "immo", "montant_emprunte": 200000.0, "taux_annuel": 3.5,
+         "mensualite": round(_mensualite(200000, 3.5, 300), 2), "duree_mois": 300,
+         "date_debut": pd.Timestamp("2015-03-31")},
+        {"id": "auto", "montant_emprunte": 20000.0, "taux_annuel": 0.0,
+         "mensualite": 400.0, "duree_mois": 50, "date_debut": pd.Timestamp("2024-01-15")},
+    ])
+
+
+class TestMonthlyDates:
+
+    def test_fin_de_mois_ramenee(self):
+        dates = monthly_dates(date(2024, 1, 31), 2, first=-1)
+        assert [str(d) for d in dates] == ["2023-12-31", "2024-01-31", "2024-02-29", "2024-03-31"]
+
+
+class TestAmortizationSchedule:
+
+    def test_identique_au_calcul_scalaire(self, df_emprunts):
+        dates = monthly_dates(date(2014, 1, 1), 400)
+        crd = capital_restant_du_matrix(df_emprunts, dates)
+
+        for i, row in enumerate(df_emprunts.itertuples()):
+            for j in (0, 15, 17, 200, 399):
+                expected = _compute_capital_restant_du(
+                    row.montant_emprunte, row.taux_annuel, row.mensualite,
+                    row.date_debut, row.duree_mois, pd.Timestamp(dates[j]).date(),
+                )
+                assert crd[i, j] == pytest.approx(expected, abs=0.01)
+
+    def test_horizon_jusqu_a_extinction(self, df_emprunts):
+        schedule = amortization_schedule(df_emprunts, start=date(2026, 10, 19))
+        assert schedule["capital_restant_du"].shape == (2, len(schedule["dates"]))
+        assert schedule["capital_restant_du"][:, -1].tolist() == [0.0, 0.0]
+        assert schedule["capital_restant_du"][:, -2].sum() > 0
+
+    def test_interets_restants(self, df_emprunts):
+        start = date(2026, 10, 19)
+        schedule = amortization_schedule(df_emprunts, start=start)
+        crd = schedule["capital_restant_du"][:, 0]
+        restants = (schedule["capital_restant_du"] > 0).sum(axis=1)
+        paiements_restants = df_emprunts["mensualite"].to_numpy() * restants
+
+        # La dernière échéance solde le capital : l'écart vient de l'arrondi de la mensualité
+        np.testing.assert_allclose(schedule["interets"][:, 1:].sum(axis=1), paiements_restants - crd,
+                                   atol=0.01 * restants.max())
+        # Intérêts du mois = taux mensuel × capital restant dû du mois précédent
+        np.testing.assert_allclose(schedule["interets"][0, 1:],
+                                   0.035 / 12 * schedule["capital_restant_du"][0, :-1], atol=0.01)
+        assert schedule["interets"][1].sum() == 0.0  # taux zéro
+        np.testing.assert_allclose(schedule["capital"][:, 1:].sum(axis=1), crd, atol=0.01)
+
+    def test_date_invalide_et_vide(self, df_emprunts):
+        df = df_emprunts.assign(date_debut=[pd.NaT, pd.Timestamp("2024-01-15")])
+        schedule = amortization_schedule(df, start=date(2026, 1, 1))
+        assert schedule["capital_restant_du"][0].sum() == 0.0
+
+        vide = amortization_schedule(df.iloc[0:0])
+        assert vide["capital_restant_du"].shape[0] == 0
+
+
+class TestLoadEmprunts:
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from unittest.mock import patch
+        with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+            from services.db import init_db
+            init_db()
+            yield
+
+    def test_date_fin_et_crd(self, db):
+        from services.db_emprunts import create_emprunt, load_emprunts
+        create_emprunt("Immo", 200000, 3.5, round(_mensualite(200000, 3.5, 300), 2), 300, "2015-03-31")
+
+        df = load_emprunts(as_of_date=date(2026, 10, 19))
+        row = df.iloc[0]
+
+        assert row["date_fin"] == pd.Timestamp("2040-03-31")
+        assert row["capital_restant_du"] == pytest.approx(_compute_capital_restant_du(
+            200000, 3.5, row["mensualite"], "2015-03-31", 300, date(2026, 10, 19)), abs=0.01)
+
+    def test_memoise_jusqu_a_la_prochaine_ecriture(self, db):
+        from services.db_emprunts import create_emprunt, update_emprunt, load_emprunts, _load_emprunts_cached
+        emprunt_id = create_emprunt("Auto", 20000, 0, 400, 50, "2024-01-15")
+
+        load_emprunts()
+        hits = _load_emprunts_cached.cache_info().hits
+        df = load_emprunts()
+        df.loc[0, "nom"] = "modifié par l'appelant"
+        assert _load_emprunts_cached.cache_info().hits == hits + 1
+        assert load_emprunts().loc[0, "nom"] == "Auto"
+
+        update_emprunt(emprunt_id, "Voiture", 20000, 0, 400, 50, "2024-01-15")
+        assert load_emprunts().loc[0, "nom"] == "Voiture"
+
+
+def _simuler(P, taux_annuel, M, duree, evenements):
+    """Référence mois par mois : CRD après chaque mensualité."""
+    r = taux_annuel / 1200
+    K = duree + sum(e[3] for e in evenements if e[1] == "differe")
+    B, differe_jusqu_a, crd = P, 0, [P]
+    for k in range(0, K):
+        for ek, type_, montant, duree_e, taux, mensualite in evenements:
+            if ek != k:
+                continue
+            if type_ == "remboursement_anticipe":
+                B -= montant
+                M = mensualite or M
+            elif type_ == "differe":
+                differe_jusqu_a = k + duree_e
+            elif type_ == "revision_taux":
+                r = taux / 1200
+                n = K - max(k, differe_jusqu_a)
+                M = mensualite or B * r / (1 - (1 + r) ** -n)
+        crd[-1] = B
+        B = B if k < differe_jusqu_a else max(0.0, B * (1 + r) - M)
+        crd.append(B)
+    crd[-1] = 0.0
+    return np.round(crd, 2)
+
+
+class TestEvenements:
+    P, TAUX, DUREE = 200000.0, 3.0, 240
+    M = round(_mensualite(200000, 3.0, 240), 2)
+
+    @pytest.mark.parametrize("evenements", [
+        ((24, "remboursement_anticipe", 20000.0, None, None, None),),
+        ((24, "remboursement_anticipe", 20000.0, None, None, 900.0),),
+        ((12, "differe", None, 6, None, None),),
+        ((60, "revision_taux", None, None, 4.5, None),),
+        ((12, "differe", None, 6, None, None),
+         (30, "revision_taux", None, None, 1.5, None),
+         (48, "remboursement_anticipe", 10000.0, None, None, None)),
+    ])
+    def test_identique_a_la_simulation(self, evenements):
+        from services.db_emprunts import _loan_schedule
+        balance, _, _ = _loan_schedule(self.P, self.TAUX, self.M, self.DUREE, evenements)
+        expected = _simuler(self.P, self.TAUX, self.M, self.DUREE, evenements)
+        np.testing.assert_allclose(balance, expected, atol=0.05)
+
+    def test_remboursement_anticipe_raccourcit_la_duree(self):
+        from services.db_emprunts import _loan_schedule
+        _, interets_base, fin_base = _loan_schedule(self.P, self.TAUX, self.M, self.DUREE)
+        _, interets, fin = _loan_schedule(
+            self.P, self.TAUX, self.M, self.DUREE, ((24, "remboursement_anticipe", 20000.0, None, None, None),))
+        assert fin < fin_base == self.DUREE
+        assert interets[-1] < interets_base[-1]
+
+    def test_differe_decale_la_fin(self):
+        from services.db_emprunts import _loan_schedule
+        balance, _, fin = _loan_schedule(self.P, self.TAUX, self.M, self.DUREE, ((12, "differe", None, 6, None, None),))
+        assert fin == self.DUREE + 6
+        assert len(set(balance[12:19])) == 1
+
+
+class TestEvenementsEnBase:
+
+    @pytest.fixture
+    def emprunt_id(self, tmp_path):
+        from unittest.mock import patch
+        with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+            from services.db import init_db
+            from services.db_emprunts import create_emprunt
+            init_db()
+            yield create_emprunt("Immo", 200000, 3.0, round(_mensualite(200000, 3.0, 240), 2), 240, "2020-01-10")
+
+    def test_evenement_pris_en_compte(self, emprunt_id):
+        from services.db_emprunts import add_evenement, delete_evenement, load_evenements, load_emprunts
+        avant = load_emprunts(as_of_date=date(2026, 1, 1)).iloc[0]
+
+        evenement_id = add_evenement(emprunt_id, "remboursement_anticipe", "2022-01-10", montant=30000)
+        apres = load_emprunts(as_of_date=date(2026, 1, 1)).iloc[0]
+        assert apres["capital_restant_du"] < avant["capital_restant_du"] - 30000
+        assert apres["date_fin"] < avant["date_fin"]
+        assert apres["interets_totaux"] < avant["interets_totaux"]
+        assert load_evenements(emprunt_id)["type"].tolist() == ["remboursement_anticipe"]
+
+        delete_evenement(evenement_id)
+        assert load_emprunts(as_of_date=date(2026, 1, 1)).iloc[0]["capital_restant_du"] == avant["capital_restant_du"]
+
+    def test_validation_et_cascade(self, emprunt_id):
+        from services.db_emprunts import add_evenement, delete_emprunt, load_evenements
+        with pytest.raises(ValueError):
+            add_evenement(emprunt_id, "inconnu", "2022-01-10")
+        with pytest.raises(ValueError):
+            add_evenement(emprunt_id, "differe", "2022-01-10")
+
+        add_evenement(emprunt_id, "differe", "2022-01-10", duree_mois=3)
+        delete_emprunt(emprunt_id)
+        assert load_evenements(emprunt_id).empty
@@ -0,0 +1,97 @@
+"""
+tests/test_financial_calculations.py
+─────────────────────────────────────
+Tests des métriques locatives et du PnL calculés en lot (services/financial_calculations.py).
+"""
+
+import pytest
+import pandas as pd
+
+from services.financial_calculations import (
+    calculate_rental_metrics, calculate_rental_metrics_batch,
+    calculate_rental_yield, calculate_monthly_cashflow,
+    calculate_auto_asset_pnl, summarize_pnl,
+)
+
+
+@pytest.fixture
+def df_biens():
+    return pd.DataFrame([
+        {"id": "b1", "loyer_mensuel": 800.0, "charges_mensuelles": 50.0, "taxe_fonciere_annuelle": 1200.0,
+         "prix_achat": 150000.0, "frais_notaire": 12000.0, "montant_travaux": None, "emprunt_id": "pret"},
+        {"id": "b2", "loyer_mensuel": 0.0, "charges_mensuelles": 0.0, "taxe_fonciere_annuelle": 900.0,
+         "prix_achat": 300000.0, "frais_notaire": 0.0, "montant_travaux": 0.0, "emprunt_id": None},
+        {"id": "b3", "loyer_mensuel": 500.0, "charges_mensuelles": 0.0, "taxe_fonciere_annuelle": 0.0,
+         "prix_achat": 90000.0, "frais_notaire": 0.0, "montant_travaux": 0.0, "emprunt_id": "inconnu"},
+    ], index=[10, 20, 30])
+
+
+@pytest.fixture
+def df_emprunts():
+    return pd.DataFrame([{"id": "pret", "mensualite": 700.0}])
+
+
+class TestCalculateRentalMetricsBatch:
+
+    def test_identique_aux_formules_unitaires(self, df_biens, df_emprunts):
+        result = calculate_rental_metrics_batch(df_biens, df_emprunts)
+
+        assert list(result.index) == [10, 20, 30]
+        b1 = result.loc[10]
+        assert b1["cout_reel"] == 162000.0
+        assert b1["rendement_brut"] == pytest.approx(calculate_rental_yield(800, 50, 162000))
+        assert b1["cashflow_mensuel"] == pytest.approx(calculate_monthly_cashflow(800, 50, 1200, 700))
+        assert b1["mensualite_emprunt"] == 700.0
+
+    def test_sans_loyer_ni_emprunt_connu(self, df_biens, df_emprunts):
+        result = calculate_rental_metrics_batch(df_biens, df_emprunts)
+        assert result.loc[20, "rendement_brut"] == 0.0
+        assert result.loc[20, "cashflow_mensuel"] == pytest.approx(-75.0)
+        assert result.loc[30, "mensualite_emprunt"] == 0.0
+
+    def test_version_unitaire(self, df_biens, df_emprunts):
+        from unittest.mock import patch
+        with patch("services.financial_calculations.get_emprunts", return_value=df_emprunts):
+            metrics = calculate_rental_metrics(df_biens.loc[10])
+        assert metrics["cashflow_mensuel"] == pytest.approx(-50.0)
+        assert metrics["mensualite_emprunt"] == 700.0
+
+
+class TestSummarizePnl:
+
+    @pytest.fixture
+    def df_assets(self):
+        return pd.DataFrame([
+            {"categorie": "Actions & Fonds", "contrat_id": "pea", "montant": 1200.0, "quantite": 10.0, "pru": 100.0},
+            {"categorie": "Actions & Fonds", "contrat_id": "cto", "montant": 450.0, "quantite": 5.0, "pru": 100.0},
+            {"categorie": "Crypto", "contrat_id": "", "montant": 300.0, "quantite": 2.0, "pru": 100.0},
+            {"categorie": "Actions & Fonds", "contrat_id": "pea", "montant": 800.0, "quantite": 0.0, "pru": 0.0},
+            {"categorie": "Livrets", "contrat_id": None, "montant": 5000.0, "quantite": 0.0, "pru": 0.0},
+        ], index=[3, 1, 4, 15, 9])
+
+    def test_par_actif_identique_au_calcul_unitaire(self, df_assets):
+        par_actif = summarize_pnl(df_assets)["par_actif"]
+        assert list(par_actif.index) == list(df_assets.index)
+        for idx, row in df_assets.head(3).iterrows():
+            ref = calculate_auto_asset_pnl(row["montant"], row["pru"], row["quantite"])
+            assert par_actif.loc[idx, "valeur_achat"] == pytest.approx(ref["valeur_achat"])
+            assert par_actif.loc[idx, "pnl"] == pytest.approx(ref["pnl_absolu"])
+            assert par_actif.loc[idx, "pnl_pct"] == pytest.approx(ref["pnl_pct"])
+        assert par_actif.loc[[15, 9], "pnl"].isna().all()
+
+    def test_agregats_sur_les_actifs_avec_cout(self, df_assets):
+        res = summarize_pnl(df_assets)
+        assert res["par_categorie"].loc["Actions & Fonds", "pnl"] == pytest.approx(150.0)
+        assert res["par_categorie"].loc["Actions & Fonds", "montant"] == pytest.approx(1650.0)
+        assert "Livrets" not in res["par_categorie"].index
+        assert res["par_contrat"]["pnl"].to_dict() == pytest.approx({"cto": -50.0, "pea": 200.0})
+        assert res["global"] == pytest.approx({
+            "montant": 1950.0, "valeur_achat": 1700.0, "pnl": 250.0, "pnl_pct": 250.0 / 1700.0 * 100,
+        })
+
+    def test_sans_actif_cote(self):
+        df = pd.DataFrame([{"categorie": "Livrets", "contrat_id": "", "montant": 100.0, "quantite": 0.0, "pru": 0.0}])
+        res = summarize_pnl(df)
+        assert res["global"]["valeur_achat"] == 0.0
+        assert res["global"]["pnl_pct"] == 0.0
+        assert res["par_categorie"].empty
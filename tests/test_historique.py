@@ -104,4 +104,57 @@ class TestBuildTotalEvolution:
         )
         row = result[result["date"] == pd.Timestamp("2024-01-01")]
         assert not row.empty
-        assert row.iloc[0]["total"] == pytest.approx(204_000.0)
\ No newline at end of file
+        assert row.iloc[0]["total"] == pytest.approx(204_000.0)
+
+@pytest.fixture
+def df_emprunt_appartement():
+    """Prêt à taux zéro de l'appartement « bbb », démarré après le premier relevé."""
+    return pd.DataFrame([{
+        "id": "pret", "montant_emprunte": 150000.0, "taux_annuel": 0.0, "mensualite": 1000.0,
+        "duree_mois": 150, "date_debut": pd.Timestamp("2024-03-01"),
+    }])
+
+
+@pytest.fixture
+def df_manuels_avec_emprunt():
+    return pd.DataFrame([
+        {"id": "aaa", "nom": "Livret A",    "categorie": "Livrets",    "montant": 10000.0,  "ticker": "", "quantite": 0.0, "pru": 0.0, "contrat_id": "", "emprunt_id": None},
+        {"id": "bbb", "nom": "Appartement", "categorie": "Immobilier", "montant": 200000.0, "ticker": "", "quantite": 0.0, "pru": 0.0, "contrat_id": "", "emprunt_id": "pret"},
+    ])
+
+
+class TestBuildNetWorthEvolution:
+
+    def test_actifs_moins_capital_restant_du(self, df_manuels_avec_emprunt, df_hist_simple, df_positions_vide, df_emprunt_appartement):
+        from services.historique import build_net_worth_evolution
+        result = build_net_worth_evolution(
+            df_manuels_avec_emprunt, df_hist_simple, df_positions_vide,
+            pd.DataFrame(), ("Actions & Fonds", "Crypto"), df_emprunt_appartement,
+        ).set_index("date")
+
+        # Avant le début du prêt : aucun passif
+        assert result.loc["2024-01-01", "passifs"] == 0.0
+        # 2024-06-01 : 3 mensualités de 1000 € payées
+        assert result.loc["2024-06-01", "passifs"] == pytest.approx(147_000.0)
+        assert result.loc["2024-06-01", "net"] == pytest.approx(result.loc["2024-06-01", "actifs"] - 147_000.0)
+
+    def test_sans_emprunt(self, df_manuels_avec_emprunt, df_hist_simple, df_positions_vide, df_emprunt_appartement):
+        from services.historique import build_net_worth_evolution
+        result = build_net_worth_evolution(
+            df_manuels_avec_emprunt, df_hist_simple, df_positions_vide,
+            pd.DataFrame(), ("Actions & Fonds", "Crypto"), df_emprunt_appartement.iloc[0:0],
+        )
+        assert (result["net"] == result["actifs"]).all()
+
+
+class TestBuildPropertyEquityEvolution:
+
+    def test_valeur_nette_du_bien(self, df_manuels_avec_emprunt, df_hist_simple, df_emprunt_appartement):
+        from services.historique import build_property_equity_evolution
+        result = build_property_equity_evolution(df_manuels_avec_emprunt, df_hist_simple, df_emprunt_appartement)
+
+        assert set(result["asset_id"]) == {"bbb"}
+        last = result.iloc[-1]
+        assert last["date"] == pd.Timestamp("2024-12-01")
+        assert last["crd"] == pytest.approx(141_000.0)
+        assert last["equity"] == pytest.approx(200_000.0 - 141_000.0)
@@ -0,0 +1,172 @@
+"""
+tests/test_import_historique.py
+────────────────────────────────
+Tests de l'import en masse dans services/import_historique.py.
+
+La base SQLite est redirigée vers tmp_path, les fichiers importés
+sont écrits dans tmp_path également.
+"""
+
+import json
+
+import pytest
+import pandas as pd
+from unittest.mock import patch
+
+
+def _patch_db_path(tmp_path):
+    return patch("constants.DB_PATH", str(tmp_path / "patrimoine.db"))
+
+
+def _init_storage_with_assets():
+    from services.db import init_db
+    from services.db_actifs import save_assets
+    init_db()
+    save_assets(pd.DataFrame([
+        {"id": "aaa", "nom": "Livret A", "categorie": "Livrets", "montant": 10000.0,
+         "ticker": "", "quantite": 0.0, "pru": 0.0, "contrat_id": ""},
+        {"id": "ccc", "nom": "Apple", "categorie": "Actions & Fonds", "montant": 1500.0,
+         "ticker": "AAPL", "quantite": 10.0, "pru": 130.0, "contrat_id": ""},
+    ]))
+
+
+class TestImportHistorique:
+
+    def test_importe_un_csv(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        csv.write_text("asset_id,date,montant\naaa,2024-01-01,9000\naaa,2024-06-01,9500\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            from services.db_historique import load_historique
+
+            report = import_historique(str(csv))
+            df = load_historique()
+
+        assert report["lues"] == 2
+        assert report["importees"] == 2
+        assert report["rejetees"] == 0
+        assert df["montant"].tolist() == [9000.0, 9500.0]
+
+    def test_normalise_les_dates_francaises(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        csv.write_text("asset_id,date,montant\naaa,31/01/2024,9000\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            from services.db_historique import load_historique
+
+            import_historique(str(csv))
+            df = load_historique()
+
+        assert df.iloc[0]["date"] == pd.Timestamp("2024-01-31")
+
+    def test_dates_ambigues_csv(self, tmp_path):
+        # ISO : année-mois-jour ; française : jour/mois/année — même si le jour est ≤ 12
+        csv = tmp_path / "historique.csv"
+        csv.write_text("asset_id,date,montant\naaa,2024-01-02,1\naaa,03/02/2024,2\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            from services.db_historique import load_historique
+
+            import_historique(str(csv))
+            df = load_historique()
+
+        assert df["date"].tolist() == [pd.Timestamp("2024-01-02"), pd.Timestamp("2024-02-03")]
+        assert df["montant"].tolist() == [1.0, 2.0]
+
+    def test_rejette_lignes_invalides(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        csv.write_text(
+            "asset_id,date,montant\n"
+            "aaa,2024-01-01,9000\n"
+            "aaa,pas-une-date,9000\n"
+            "aaa,2024-02-01,abc\n"
+            "inconnu,2024-01-01,100\n"
+        )
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            report = import_historique(str(csv))
+
+        assert report["importees"] == 1
+        assert report["rejetees"] == 3
+
+    def test_lecture_par_blocs(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        lines = ["asset_id,date,montant"] + [
+            f"aaa,{d.date().isoformat()},{i}" for i, d in enumerate(pd.date_range("2020-01-01", periods=25))
+        ]
+        csv.write_text("\n".join(lines) + "\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            from services.db_historique import load_historique
+
+            report = import_historique(str(csv), chunksize=10)
+            df = load_historique()
+
+        assert report["importees"] == 25
+        assert len(df) == 25
+
+    def test_mode_ignore_conserve_existant(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        csv.write_text("asset_id,date,montant\naaa,2024-01-01,1\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            from services.db_historique import record_montant, load_historique
+
+            record_montant("aaa", 9000.0, pd.Timestamp("2024-01-01").date())
+            report = import_historique(str(csv), on_conflict="ignore")
+            df = load_historique()
+
+        assert report["ignorees"] == 1
+        assert df.iloc[0]["montant"] == 9000.0
+
+    def test_colonnes_manquantes(self, tmp_path):
+        csv = tmp_path / "historique.csv"
+        csv.write_text("asset_id,date\naaa,2024-01-01\n")
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_historique
+            with pytest.raises(ValueError):
+                import_historique(str(csv))
+
+
+class TestImportPositions:
+
+    def test_importe_un_json(self, tmp_path):
+        src = tmp_path / "positions.json"
+        src.write_text(json.dumps([
+            {"asset_id": "ccc", "date": "2024-01-01", "quantite": 5},
+            {"asset_id": "ccc", "date": "2024-06-01", "quantite": 10},
+        ]))
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_positions
+            from services.db_positions import load_positions
+
+            report = import_positions(str(src))
+            df = load_positions()
+
+        assert report["importees"] == 2
+        assert df["quantite"].tolist() == [5.0, 10.0]
+
+    def test_dates_ambigues_json(self, tmp_path):
+        src = tmp_path / "positions.json"
+        src.write_text(json.dumps([
+            {"asset_id": "ccc", "date": "2024-01-02", "quantite": 5},
+            {"asset_id": "ccc", "date": "03/02/2024", "quantite": 10},
+        ]))
+        with _patch_db_path(tmp_path):
+            _init_storage_with_assets()
+            from services.import_historique import import_positions
+            from services.db_positions import load_positions
+
+            import_positions(str(src))
+            df = load_positions()
+
+        assert df["date"].tolist() == [pd.Timestamp("2024-01-02"), pd.Timestamp("2024-02-03")]
+        assert df["quantite"].tolist() == [5.0, 10.0]
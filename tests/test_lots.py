@@ -0,0 +1,196 @@
+"""
+tests/test_lots.py
+──────────────────
+Tests des lots FIFO dérivés des positions (services/lots.py, services/db_lots.py).
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from services.lots import apply_movement, fifo_lots
+
+
+def _patch_db_path(tmp_path):
+    return patch("constants.DB_PATH", str(tmp_path / "patrimoine.db"))
+
+
+def _init_actif(asset_id="etf", pru=10.0):
+    from services.db import init_db, db_connection
+    init_db()
+    with db_connection() as conn:
+        conn.execute("INSERT INTO actifs (id, type, nom) VALUES (?, 'action', 'ETF')", (asset_id,))
+        conn.execute("INSERT INTO actifs_ticker (actif_id, ticker, quantite, pru) VALUES (?, 'ETF', 0, ?)",
+                     (asset_id, pru))
+
+
+def _lots_cessions(asset_id="etf"):
+    from services.db_lots import load_lots, load_cessions
+    lots = load_lots(asset_id)[["date", "quantite", "quantite_restante", "prix_unitaire"]]
+    cessions = load_cessions(asset_id)[["date", "quantite", "prix_achat", "prix_vente", "plus_value"]]
+    return lots.to_dict("records"), cessions.to_dict("records")
+
+
+class TestFifoLots:
+
+    def test_achats_puis_vente_consomme_les_plus_anciens(self):
+        lots, cessions = fifo_lots([(1, 10, 100.0), (2, 15, 120.0), (3, 7, 150.0)])
+
+        assert [(l["quantite"], l["quantite_restante"]) for l in lots] == [(10, 2), (5, 5)]
+        assert [(c["quantite"], c["prix_achat"]) for c in cessions] == [(8, 100.0)]
+        assert cessions[0]["plus_value"] == pytest.approx(8 * 50.0)
+
+    def test_vente_sur_plusieurs_lots(self):
+        lots, cessions = fifo_lots([(1, 10, 100.0), (2, 15, 120.0), (3, 2, 130.0)])
+
+        assert [c["quantite"] for c in cessions] == [10, 3]
+        assert sum(c["plus_value"] for c in cessions) == pytest.approx(10 * 30.0 + 3 * 10.0)
+        assert [c["lot"] for c in cessions] == lots
+        assert lots[1]["quantite_restante"] == 2
+
+    def test_prix_inconnu_retient_le_prix_par_defaut(self):
+        lots, _ = fifo_lots([(1, 4, None)], prix_defaut=25.0)
+        assert lots[0]["prix_unitaire"] == 25.0
+
+    def test_quantites_fractionnaires(self):
+        lots, cessions = fifo_lots([(1, 0.1, 100.0), (2, 0.3, 100.0), (3, 0.0, 100.0)])
+        assert all(l["quantite_restante"] == 0.0 for l in lots)
+        assert sum(c["quantite"] for c in cessions) == pytest.approx(0.3)
+
+    def test_variation_nulle_ignoree(self):
+        lots = [{"date": 1, "quantite": 5, "quantite_restante": 5, "prix_unitaire": 1.0}]
+        assert apply_movement(lots, 2, 0.0, 3.0) == (None, [])
+
+
+class TestLotsEnBase:
+
+    def test_incremental_identique_a_la_reconstruction(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.positions import record_position
+            from services.lots import rebuild_lots
+
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 15, date(2024, 2, 1), prix_unitaire=120.0)
+            record_position("etf", 7, date(2024, 3, 1), prix_unitaire=150.0)
+            incremental = _lots_cessions()
+
+            rebuild_lots("etf")
+            assert _lots_cessions() == incremental
+            lots, cessions = incremental
+            assert [l["quantite_restante"] for l in lots] == [2.0, 5.0]
+            assert [c["plus_value"] for c in cessions] == [400.0]
+
+    def test_mise_a_jour_incrementale_sans_relecture(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.positions import record_position
+
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            with patch("services.lots.rebuild_lots") as rebuild:
+                record_position("etf", 12, date(2024, 2, 1), prix_unitaire=110.0)
+                record_position("etf", 4, date(2024, 3, 1), prix_unitaire=90.0)
+            rebuild.assert_not_called()
+            lots, cessions = _lots_cessions()
+            assert [l["quantite_restante"] for l in lots] == [2.0, 2.0]
+            assert [c["plus_value"] for c in cessions] == [-80.0]
+
+    def test_position_retroactive_reconstruit(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.positions import record_position
+
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 5, date(2024, 3, 1), prix_unitaire=150.0)
+            # Achat oublié, saisi après coup : la vente consomme désormais aussi ce lot
+            record_position("etf", 20, date(2024, 2, 1), prix_unitaire=120.0)
+
+            lots, cessions = _lots_cessions()
+            assert [l["quantite_restante"] for l in lots] == [0.0, 5.0]
+            assert [(c["quantite"], c["plus_value"]) for c in cessions] == [(10, 500.0), (5, 150.0)]
+
+    def test_positions_anterieures_construites_a_la_lecture(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif(pru=80.0)
+            from services.db import db_connection, to_epoch_day
+            from services.lots import get_lots, summarize_lots
+            with db_connection() as conn:
+                conn.execute("INSERT INTO positions (asset_id, date, quantite) VALUES ('etf', ?, 3)",
+                             (to_epoch_day(date(2023, 5, 1)),))
+
+            lots, cessions = get_lots("etf", prix_actuel=100.0)
+            summary = summarize_lots(lots, cessions)
+            assert summary == {"quantite_restante": 3.0, "cout_restant": 240.0,
+                               "plus_value_realisee": 0.0, "plus_value_latente": 60.0}
+
+    def test_suppression_des_positions_supprime_les_lots(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.positions import record_position, delete_asset_positions
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 5, date(2024, 2, 1), prix_unitaire=110.0)
+
+            delete_asset_positions("etf")
+            assert _lots_cessions() == ([], [])
+
+    def test_import_de_positions_reconstruit_les_lots(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif(pru=50.0)
+            from services.import_historique import import_positions
+            source = tmp_path / "positions.csv"
+            source.write_text("asset_id,date,quantite\netf,2024-01-01,4\netf,2024-02-01,6\netf,2024-03-01,1\n")
+
+            import_positions(str(source))
+            lots, cessions = _lots_cessions()
+            assert [l["quantite_restante"] for l in lots] == [0.0, 1.0]
+            assert [c["quantite"] for c in cessions] == [4.0, 1.0]
+
+
+class TestPrixMouvement:
+    """Prix des mouvements saisis depuis l'UI (services/asset_manager.py)."""
+
+    ROW = {"id": "etf", "ticker": "ETF", "quantite": 20.0, "pru": 110.0, "montant": 2400.0}
+
+    def test_position_avant_une_date(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.positions import get_position_before, record_position
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 20, date(2024, 3, 1), prix_unitaire=120.0)
+
+            assert get_position_before("etf", date(2023, 12, 1)) == (0.0, True)
+            assert get_position_before("etf", date(2024, 2, 1)) == (10.0, True)
+            assert get_position_before("etf", date(2024, 3, 1)) == (10.0, False)
+            assert get_position_before("etf", date(2024, 4, 1)) == (20.0, False)
+
+    def test_mouvement_retroactif_part_de_la_quantite_a_sa_date(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.asset_manager import _prix_mouvement
+            from services.positions import record_position
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 20, date(2024, 3, 1), prix_unitaire=120.0)
+
+            row = pd.Series(self.ROW)
+            with patch("services.asset_manager.get_price_at", return_value=105.0) as price_at:
+                # 10 → 15 au 1er février : achat de 5 au cours du jour, le PRU actuel ne s'y rapporte pas
+                assert _prix_mouvement(row, 15.0, 110.0, date(2024, 2, 1)) == 105.0
+                price_at.assert_called_once_with("ETF", date(2024, 2, 1))
+                # Même quantité qu'à cette date : aucun mouvement
+                assert _prix_mouvement(row, 10.0, 110.0, date(2024, 2, 1)) is None
+
+    def test_mouvement_le_plus_recent_deduit_du_pru(self, tmp_path):
+        with _patch_db_path(tmp_path):
+            _init_actif()
+            from services.asset_manager import _prix_mouvement
+            from services.positions import record_position
+            record_position("etf", 10, date(2024, 1, 1), prix_unitaire=100.0)
+            record_position("etf", 20, date(2024, 3, 1), prix_unitaire=120.0)
+
+            row = pd.Series(self.ROW)
+            with patch("services.asset_manager.get_price_at") as price_at:
+                # 20 → 30 : (115 × 30 − 110 × 20) / 10
+                assert _prix_mouvement(row, 30.0, 115.0, date(2024, 4, 1)) == 125.0
+                price_at.assert_not_called()
@@ -0,0 +1,105 @@
+"""
+tests/test_price_providers.py
+─────────────────────────────
+Tests du fournisseur de cours local (services/price_providers.py) et du pricer
+servi par ce fournisseur : conversion en EUR, lots de tickers, nouvelles tentatives.
+"""
+
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from services import pricer
+from services.price_providers import LocalPriceProvider, get_provider, set_provider, write_price_files
+
+DATES = pd.bdate_range("2025-01-01", "2025-03-31")
+
+
+@pytest.fixture
+def prix_dir(tmp_path):
+    closes = pd.DataFrame({
+        "AAA.PA": [100.0 + i for i in range(len(DATES))],
+        "BTC-USD": [50_000.0] * len(DATES),
+        "USDEUR=X": [0.9] * len(DATES),
+    }, index=DATES)
+    write_price_files(str(tmp_path), closes, {
+        "AAA.PA": {"currency": "EUR", "longName": "Action A"},
+        "BTC-USD": {"currency": "USD", "longName": "Bitcoin"},
+    })
+    return str(tmp_path)
+
+
+@pytest.fixture
+def fournisseur(prix_dir):
+    """Installe un fournisseur local le temps du test, puis rétablit le précédent."""
+    previous = set_provider(LocalPriceProvider(prix_dir))
+    yield get_provider()
+    set_provider(previous)
+
+
+class TestLocalPriceProvider:
+
+    def test_periodes(self, prix_dir):
+        provider = LocalPriceProvider(prix_dir)
+        assert len(provider.history(["AAA.PA"], "5d")) == 5
+        assert len(provider.history(["AAA.PA"], "max")) == len(DATES)
+        un_mois = provider.history(["AAA.PA"], "1mo")
+        assert un_mois.index[0] > pd.Timestamp("2025-02-28")
+        assert un_mois.index[-1] == DATES[-1]
+
+    def test_as_of_rejoue_une_date_passee(self, prix_dir):
+        provider = LocalPriceProvider(prix_dir, as_of="2025-01-10")
+        assert provider.last_price("AAA.PA") == 107.0
+        assert provider.history(["AAA.PA"], "1d").index[-1] == pd.Timestamp("2025-01-10")
+
+    def test_metadonnees_et_tickers_inconnus(self, prix_dir):
+        provider = LocalPriceProvider(prix_dir, failing_tickers={"AAA.PA"})
+        assert provider.currency("BTC-USD") == "USD"
+        assert provider.info("BTC-USD")["longName"] == "Bitcoin"
+        assert list(provider.history(["AAA.PA", "BTC-USD", "ZZZ"], "1d").columns) == ["BTC-USD"]
+        assert provider.last_price("AAA.PA") is None
+        assert provider.info("AAA.PA") == {}
+
+    def test_pannes_et_compteurs(self, prix_dir):
+        provider = LocalPriceProvider(prix_dir, failure_rate=1.0)
+        with pytest.raises(ConnectionError):
+            provider.history(["AAA.PA", "BTC-USD"], "1d")
+        assert provider.stats == {"appels": {"history": 1}, "tickers": 2, "pannes": 1}
+
+
+class TestPricerLocal:
+
+    def test_historique_converti_en_eur(self, fournisseur):
+        prices = pricer.fetch_historical_prices(("AAA.PA", "BTC-USD"), "1mo")
+        assert prices["BTC-USD"].iloc[-1] == pytest.approx(45_000.0)
+        assert prices["AAA.PA"].iloc[-1] == 100.0 + len(DATES) - 1
+
+    def test_rafraichissement(self, fournisseur):
+        df = pd.DataFrame([
+            {"id": "a", "nom": "A", "categorie": "Actions & Fonds", "montant": 0.0, "ticker": "AAA.PA", "quantite": 2.0},
+            {"id": "b", "nom": "B", "categorie": "Crypto", "montant": 0.0, "ticker": "BTC-USD", "quantite": 0.1},
+            {"id": "c", "nom": "C", "categorie": "Crypto", "montant": 0.0, "ticker": "ZZZ", "quantite": 1.0},
+        ])
+        df, errors = pricer.refresh_auto_assets(df, {"Actions & Fonds", "Crypto"})
+        assert df["montant"].tolist()[:2] == [2 * (100.0 + len(DATES) - 1), 4500.0]
+        assert errors == ["ZZZ"]
+        # Un seul téléchargement pour tous les tickers, un pour les taux de change
+        assert fournisseur.stats["appels"]["history"] == 2
+
+    def test_nouvelle_tentative_apres_panne(self, fournisseur):
+        with patch.object(pricer, "PRICER_RETRY_DELAY_SECONDS", 0.0), \
+                patch.object(fournisseur, "_call", side_effect=[ConnectionError(), None, None]):
+            quotes = pricer.get_prices_bulk(["AAA.PA"])
+        assert quotes["AAA.PA"]["price"] == 100.0 + len(DATES) - 1
+
+    def test_pannes_persistantes(self, fournisseur):
+        fournisseur.failure_rate = 1.0
+        with patch.object(pricer, "PRICER_RETRY_DELAY_SECONDS", 0.0):
+            assert pricer.get_prices_bulk(["AAA.PA"]) == {"AAA.PA": None}
+        assert fournisseur.stats["appels"]["history"] == pricer.PRICER_RETRIES + 1
+
+    def test_changer_de_fournisseur_vide_le_cache(self, fournisseur, prix_dir):
+        assert not pricer.fetch_historical_prices(("AAA.PA",), "5d").empty
+        set_provider(LocalPriceProvider(prix_dir, failing_tickers={"AAA.PA"}))
+        assert pricer.fetch_historical_prices(("AAA.PA",), "5d").empty
@@ -0,0 +1,119 @@
+"""
+tests/test_profiler.py
+──────────────────────
+Tests du profilage du rendu (services/profiler.py) : sections, état des caches,
+persistance des dernières exécutions.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services import profiler
+
+
+@pytest.fixture
+def prof(tmp_path):
+    with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")), \
+            patch.dict(profiler._state, {"sessions": set(), "charge": False}):
+        profiler._runs.clear()
+        profiler._local.run = None
+        profiler.enable_profiler()
+        yield profiler
+        profiler.disable_profiler()
+        profiler._runs.clear()
+
+
+class TestSpans:
+
+    def test_sections_imbriquees(self, prof):
+        prof.begin_profile_run("Synthèse")
+        with prof.span("page"):
+            with prof.span("graphique"):
+                pass
+        sections = prof.summarize_profile_run(prof.get_profile_runs()[-1])
+        assert list(sections["section"]) == ["page", "graphique"]
+        assert list(sections["profondeur"]) == [0, 1]
+        assert (sections["duree_ms"] >= 0).all()
+
+    def test_calcul_refait_marque_les_sections_ouvertes(self, prof):
+        @prof.profiled("cache")
+        def lecture(miss):
+            if miss:
+                prof.note_cache_miss("fetch_historical_prices")
+
+        prof.begin_profile_run()
+        with prof.span("page"):
+            lecture(False)
+            lecture(True)
+        sections = prof.get_profile_runs()[-1]["sections"]
+        assert [(s["section"], s["cache"]) for s in sections] == [("cache", "hit"), ("cache", "miss"), ("page", "miss")]
+        assert sections[-1]["calculs"] == ["fetch_historical_prices"]
+
+    def test_sans_profilage_aucun_enregistrement(self, prof):
+        prof.disable_profiler()
+        prof.begin_profile_run()
+        with prof.span("page"):
+            prof.note_cache_miss("x")
+        assert prof.get_profile_runs() == []
+
+    def test_active_par_session(self, prof):
+        prof.disable_profiler()
+        with patch("services.profiler.current_session_id", return_value="session-a"):
+            prof.enable_profiler()
+        with patch("services.profiler.current_session_id", return_value="session-b"):
+            assert not prof.is_profiler_enabled()
+            prof.begin_profile_run("autre session")
+            with prof.span("page"):
+                pass
+        assert prof.get_profile_runs() == []
+        with patch("services.profiler.current_session_id", return_value="session-a"):
+            assert prof.is_profiler_enabled()
+            prof.disable_profiler()
+
+    def test_sessions_fermees_oubliees(self, prof):
+        prof.disable_profiler()
+        prof._state["sessions"].update({"ouverte", "fermee"})
+        runtime = MagicMock()
+        runtime.is_active_session.side_effect = lambda session_id: session_id == "ouverte"
+        with patch("streamlit.runtime.Runtime.exists", return_value=True), \
+                patch("streamlit.runtime.Runtime.instance", return_value=runtime):
+            prof.disable_profiler()
+        assert prof._state["sessions"] == {"ouverte"}
+
+    def test_rerun_de_fragment_ouvre_sa_propre_execution(self, prof):
+        with prof.span("graphe_historique.render"):
+            pass
+        runs = prof.get_profile_runs()
+        assert [r["label"] for r in runs] == ["fragment"]
+
+
+class TestPersistance:
+
+    def test_executions_ecrites_puis_rechargees(self, prof, tmp_path):
+        prof.begin_profile_run("Synthèse")
+        with prof.span("page"):
+            pass
+        prof.begin_profile_run("Actifs")  # écrit l'exécution précédente
+
+        path = tmp_path / "profils_rendu.json"
+        assert [r["label"] for r in json.loads(path.read_text(encoding="utf-8"))] == ["Synthèse"]
+
+        prof._runs.clear()
+        prof._state["charge"] = False
+        prof.enable_profiler()
+        assert [r["label"] for r in prof.get_profile_runs()] == ["Synthèse"]
+
+    def test_nombre_d_executions_borne(self, prof):
+        for i in range(prof.PROFILER_RUNS + 5):
+            prof.begin_profile_run(str(i))
+        assert len(prof.get_profile_runs()) == prof.PROFILER_RUNS
+
+    def test_comparaison_par_section(self, prof):
+        for label, duree in (("A", 10.0), ("B", 30.0)):
+            prof._runs.append({"debut": "2026-01-01T10:00:00", "label": label, "sections": [
+                {"section": "page", "debut_ms": 0.0, "duree_ms": duree, "profondeur": 0, "cache": "hit", "calculs": []},
+            ]})
+        comparaison = prof.compare_profile_runs(prof.get_profile_runs())
+        assert comparaison.loc["page"].tolist() == [10.0, 30.0]
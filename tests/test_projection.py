@@ -0,0 +1,135 @@
+"""
+tests/test_projection.py
+────────────────────────
+Tests de la projection Monte Carlo du patrimoine net (services/projection.py).
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import projection
+from services.projection import monthly_returns, project_net_worth
+
+
+START = date(2025, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def _vider_cache():
+    projection._market_percentiles.clear()
+    yield
+    projection._market_percentiles.clear()
+
+
+def _prix_mensuels(rendements: dict[str, list[float]]) -> pd.DataFrame:
+    """Cours de fin de mois reproduisant exactement les rendements donnés."""
+    n = len(next(iter(rendements.values())))
+    index = pd.date_range("2020-01-31", periods=n + 1, freq="ME")
+    return pd.DataFrame(
+        {t: 100 * np.cumprod([1.0] + [1 + r for r in rs]) for t, rs in rendements.items()},
+        index=index,
+    )
+
+
+@pytest.fixture
+def df_actifs():
+    return pd.DataFrame([
+        {"categorie": "Actions & Fonds", "ticker": "ETF", "montant": 10000.0},
+        {"categorie": "Crypto", "ticker": "BTC-USD", "montant": 2000.0},
+        {"categorie": "Livrets", "ticker": "", "montant": 5000.0},
+    ])
+
+
+class TestMonthlyReturns:
+
+    def test_rendements_fin_de_mois(self):
+        prix = _prix_mensuels({"ETF": [0.01] * 24})
+        result = monthly_returns(prix)
+        assert len(result) == 24
+        assert np.allclose(result["ETF"], 0.01)
+
+    def test_historique_trop_court_ecarte(self):
+        prix = _prix_mensuels({"ETF": [0.01] * 24, "NEW": [0.02] * 24})
+        prix.loc[prix.index[:-6], "NEW"] = np.nan
+        assert list(monthly_returns(prix).columns) == ["ETF"]
+
+    def test_mois_avant_la_premiere_cotation_non_remplis(self):
+        prix = _prix_mensuels({"ETF": [0.01] * 24, "NEW": [0.02] * 24})
+        prix.loc[prix.index[:-13], "NEW"] = np.nan
+        result = monthly_returns(prix)
+        assert result["NEW"].isna().sum() == 12
+        assert np.allclose(result["NEW"].dropna(), 0.02)
+
+    def test_vide(self):
+        assert monthly_returns(pd.DataFrame()).empty
+
+
+class TestProjectNetWorth:
+
+    def test_rendement_constant_sans_dispersion(self, df_actifs):
+        # Un seul rendement historique possible : toutes les trajectoires sont identiques
+        prix = _prix_mensuels({"ETF": [0.01] * 24, "BTC-USD": [0.0] * 24})
+        result = project_net_worth(df_actifs, prix, annees=2, n_paths=200, start=START)
+
+        assert list(result.columns) == ["date", "p5", "p25", "p50", "p75", "p95", "deterministe"]
+        assert len(result) == 3
+        livret = 5000.0 * 1.03 ** np.arange(3)
+        attendu = 10000.0 * 1.01 ** (12 * np.arange(3)) + 2000.0 + livret
+        for col in ("p5", "p50", "p95"):
+            assert np.allclose(result[col], attendu)
+        assert np.allclose(result["deterministe"], 12000.0 + livret)
+
+    def test_percentiles_ordonnes(self, df_actifs):
+        rng = np.random.default_rng(0)
+        prix = _prix_mensuels({"ETF": list(rng.normal(0.005, 0.04, 60)),
+                               "BTC-USD": list(rng.normal(0.01, 0.15, 60))})
+        result = project_net_worth(df_actifs, prix, annees=10, n_paths=2000, start=START)
+
+        bandes = result[["p5", "p25", "p50", "p75", "p95"]].to_numpy()
+        assert np.all(np.diff(bandes, axis=1) >= 0)
+        assert np.allclose(bandes[0], 17000.0)
+        assert bandes[-1, 4] > bandes[-1, 0]
+
+    def test_epargne_et_emprunt(self):
+        df = pd.DataFrame(columns=["categorie", "ticker", "montant"])
+        emprunts = pd.DataFrame([{
+            "montant_emprunte": 12000.0, "taux_annuel": 0.0, "mensualite": 1000.0,
+            "duree_mois": 12, "date_debut": "2025-01-01",
+        }])
+        result = project_net_worth(df, pd.DataFrame(), emprunts, annees=1, epargne_mensuelle=100.0,
+                                   n_paths=10, start=START)
+
+        r = 1.03 ** (1 / 12) - 1
+        epargne = 100.0 * ((1 + r) ** 12 - 1) / r
+        assert result["p50"].tolist() == pytest.approx([-12000.0, epargne])
+
+    def test_tickers_d_anciennetes_differentes(self):
+        # 20 ans d'historique à côté de 2 ans : le jeune ticker ne tire que ses propres mois
+        prix = _prix_mensuels({"ANCIEN": [0.0] * 239, "JEUNE": [0.045] * 239})
+        prix.loc[prix.index[:-25], "JEUNE"] = np.nan
+        df = pd.DataFrame([
+            {"categorie": "Actions & Fonds", "ticker": "ANCIEN", "montant": 10000.0},
+            {"categorie": "Crypto", "ticker": "JEUNE", "montant": 1000.0},
+        ])
+        result = project_net_worth(df, prix, annees=3, n_paths=500, start=START)
+
+        attendu = 10000.0 + 1000.0 * 1.045 ** (12 * np.arange(4))
+        for col in ("p5", "p50", "p95"):
+            assert np.allclose(result[col], attendu)
+
+    def test_pool_identique_au_calcul_local(self, df_actifs):
+        rng = np.random.default_rng(1)
+        prix = _prix_mensuels({"ETF": list(rng.normal(0.005, 0.04, 60)),
+                               "BTC-USD": list(rng.normal(0.01, 0.15, 60))})
+
+        with patch.object(projection, "PROJECTION_CHUNK_PATHS", 100):
+            pool = project_net_worth(df_actifs, prix, annees=5, n_paths=350, start=START)
+            projection._market_percentiles.clear()
+            with patch.object(projection, "_get_pool", side_effect=OSError):
+                local = project_net_worth(df_actifs, prix, annees=5, n_paths=350, start=START)
+
+        pd.testing.assert_frame_equal(pool, local)
@@ -0,0 +1,67 @@
+"""
+tests/test_repository.py
+─────────────────────────
+Tests du cache par rerun des tables de référence (services/repository.py).
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def db(tmp_path):
+    with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+        from services.db import init_db
+        from services.repository import begin_request
+        init_db()
+        begin_request()
+        yield
+
+
+class TestRepository:
+
+    def test_une_lecture_par_rerun(self, db):
+        from services import repository
+        from services.db_contrats import add_contrat
+        _, _, contrat_id = add_contrat("Boursorama", "PEA")
+
+        with patch("services.repository.load_contrats", wraps=repository.load_contrats) as loader:
+            for _ in range(5):
+                repository.get_contrats()
+                assert repository.get_contrat(contrat_id)["enveloppe"] == "PEA"
+            assert loader.call_count == 1
+
+            repository.begin_request()
+            repository.get_contrats()
+            assert loader.call_count == 2
+
+    def test_ecriture_invalide(self, db):
+        from services import repository
+        from services.db_contrats import add_contrat, update_contrat
+        from services.db_emprunts import create_emprunt, delete_emprunt
+        _, _, contrat_id = add_contrat("Boursorama", "PEA")
+        assert repository.get_contrat(contrat_id)["etablissement"] == "Boursorama"
+
+        update_contrat(contrat_id, "Degiro", "CTO")
+        assert repository.get_contrat(contrat_id)["etablissement"] == "Degiro"
+
+        emprunt_id = create_emprunt("Auto", 20000, 0, 400, 50, "2024-01-15")
+        assert repository.get_emprunt(emprunt_id)["mensualite"] == 400
+        delete_emprunt(emprunt_id)
+        assert repository.get_emprunt(emprunt_id) is None
+        assert repository.get_total_emprunts() == 0.0
+
+    def test_id_vide_ou_inconnu(self, db):
+        from services import repository
+        assert repository.get_emprunt(None) is None
+        assert repository.get_emprunt(float("nan")) is None
+        assert repository.get_contrat("") is None
+        assert repository.get_contrat("inconnu") is None
+
+    def test_mensualite_pret_lie(self, db):
+        from services.db_emprunts import create_emprunt
+        from services.financial_calculations import get_loan_monthly_payment
+        emprunt_id = create_emprunt("Immo", 200000, 3.5, 1001.25, 300, "2015-03-31")
+        assert get_loan_monthly_payment(emprunt_id) == 1001.25
+        assert get_loan_monthly_payment("inconnu") == 0.0
@@ -0,0 +1,87 @@
+"""
+tests/test_session_data.py
+──────────────────────────
+Tests des données de travail de la session (services/session_data.py) :
+mises à jour en mémoire après les écritures de la session, relecture en cas de conflit.
+"""
+
+import threading
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+
+@pytest.fixture
+def session(tmp_path):
+    with patch("constants.DB_PATH", str(tmp_path / "patrimoine.db")):
+        from services.db import init_db
+        from services import session_data
+        init_db()
+        st.session_state.pop(session_data._STATE_KEY, None)
+        yield session_data
+        st.session_state.pop(session_data._STATE_KEY, None)
+
+
+def _empty_assets():
+    return pd.DataFrame(columns=["id", "nom", "categorie", "montant", "ticker", "quantite", "pru", "contrat_id"])
+
+
+def _in_other_thread(fn):
+    t = threading.Thread(target=fn)
+    t.start()
+    t.join()
+
+
+class TestSessionData:
+
+    def test_table_lue_une_seule_fois(self, session):
+        with patch("services.db_historique.load_historique", return_value=pd.DataFrame()) as load:
+            session.get_table("historique")
+            session.get_table("historique")
+        load.assert_called_once()
+
+    def test_ecriture_de_la_session_appliquee_sans_relecture(self, session):
+        from services import db_historique
+        from services.asset_manager import create_manual_asset, update_at_date
+        df, _, _ = create_manual_asset(_empty_assets(), "Livret A", "Livrets", 1000.0)
+        session.apply_assets(df)
+        asset_id = df.iloc[0]["id"]
+        session.get_table("actifs")
+        session.get_table("historique")
+
+        with patch("services.assets.load_assets") as load_assets, \
+                patch.object(db_historique, "load_historique", wraps=db_historique.load_historique) as load_hist:
+            df, _, _ = update_at_date(session.get_table("actifs"), asset_id, "Livrets", date(2020, 1, 1), montant=500.0)
+            assert session.apply_assets(df)
+            assets = session.get_table("actifs")
+            hist = session.get_table("historique")
+
+        load_assets.assert_not_called()
+        load_hist.assert_called_once_with([asset_id])  # seules les lignes de l'actif touché
+        assert assets.iloc[0]["montant"] == 500.0
+        assert sorted(hist["montant"]) == [500.0, 1000.0]
+
+    def test_ecriture_d_une_autre_session_force_la_relecture(self, session):
+        from services.asset_manager import create_manual_asset
+        from services.historique import record_montant
+        df, _, _ = create_manual_asset(_empty_assets(), "Livret A", "Livrets", 1000.0)
+        session.apply_assets(df)
+        asset_id = df.iloc[0]["id"]
+        assert len(session.get_table("historique")) == 1
+
+        _in_other_thread(lambda: record_montant(asset_id, 2000.0, date(2020, 1, 1)))
+        assert sorted(session.get_table("historique")["montant"]) == [1000.0, 2000.0]
+
+    def test_conflit_pendant_l_ecriture_abandonne_la_copie(self, session):
+        from services.asset_manager import create_manual_asset
+        from services.db_actifs import save_assets
+        df, _, _ = create_manual_asset(_empty_assets(), "Livret A", "Livrets", 1000.0)
+        session.apply_assets(df)
+        session.get_table("actifs")
+
+        _in_other_thread(lambda: save_assets(df.assign(nom="Renommé ailleurs")))
+        assert not session.apply_assets(df)
+        assert session.get_table("actifs").iloc[0]["nom"] == "Renommé ailleurs"
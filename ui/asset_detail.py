@@ -10,33 +10,37 @@ import streamlit as st
 from constants import TYPE_BIEN_OPTIONS
 import pandas as pd
 import plotly.graph_objects as go
-import yfinance as yf
+from services import cache_deps
+from services.price_providers import get_provider
 from services.pricer import fetch_historical_prices, get_price, get_name
-from services.db_emprunts import load_emprunts
+from services.repository import get_emprunt
+from services.lots import get_lots, summarize_lots
 from ui.asset_form import set_dialog_edit
+from ui.charts import interactive_enabled, prepare, line_trace, show
+from services.profiler import note_cache_miss, profiled
 from constants import PERIOD_OPTIONS, PERIOD_DEFAULT, PLOTLY_LAYOUT, CATEGORIES_AUTO, CACHE_TTL_SECONDS
 from services.financial_calculations import calculate_rental_metrics, calculate_investment_performance, calculate_auto_asset_pnl
 
 @st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
 def get_asset_info(ticker: str) -> dict:
     """
-    Récupère les informations détaillées d'un actif depuis yfinance.
+    Récupère les informations détaillées d'un actif auprès du fournisseur de cours.
     Retourne un dict avec les infos principales ou None si erreur.
     """
+    note_cache_miss("get_asset_info")
     try:
-        t = yf.Ticker(ticker)
-        info = t.info
-        fast = t.fast_info
-        
+        provider = get_provider()
+        info = provider.info(ticker)
+
         # Prix actuel
-        current_price = fast.last_price if fast.last_price else None
-        
+        current_price = provider.last_price(ticker) or None
+
 
         return {
             "ticker": ticker,
             "name": info.get("longName") or info.get("shortName") or ticker,
             "current_price": current_price,
-            "currency": fast.currency or info.get("currency", "EUR"),
+            "currency": provider.currency(ticker) or info.get("currency", "EUR"),
             "market_cap": info.get("marketCap") or info.get("totalAssets"),
             "volume": info.get("volume"),
             "sector": info.get("sector") or info.get("category"),
@@ -49,9 +53,14 @@ def get_asset_info(ticker: str) -> dict:
         return None
 
 
-def render_price_chart(historical_data: pd.DataFrame, ticker: str, pru: float = None):
+cache_deps.register_cache("infos_actif", ("cours",), clear=get_asset_info.clear)
+
+
+def render_price_chart(historical_data: pd.DataFrame, ticker: str, pru: float = None,
+                       interactive: bool = False, initial_period: str | None = None):
     """
     Affiche le graphique historique des prix.
+    En mode interactif, initial_period fixe la période visible à l'ouverture.
     """
     if historical_data.empty:
         st.warning("Aucune donnée historique disponible")
@@ -64,10 +73,10 @@ def render_price_chart(historical_data: pd.DataFrame, ticker: str, pru: float =
     fig = go.Figure()
     
     # Graphique des prix
+    prix = prepare(historical_data[ticker].dropna(), interactive)
     fig.add_trace(
-        go.Scatter(
-            x=historical_data.index,
-            y=historical_data[ticker],
+        line_trace(
+            prix.index, prix.values, interactive,
             mode='lines',
             name='Prix',
             line=dict(color='#85357d', width=2)
@@ -96,26 +105,31 @@ def render_price_chart(historical_data: pd.DataFrame, ticker: str, pru: float =
         tickformat=",.0f"
     )
     
-    st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
+    show(fig, interactive, range_selector=initial_period is not None, initial_period=initial_period)
 
 @st.fragment
 def _render_chart_section(ticker: str, pru: float = None):
-    # Sélecteur de période format radio (comme dans l'onglet Historique)
-    selected_period = st.radio(
-        "Période",
-        options=list(PERIOD_OPTIONS.keys()),
-        index=list(PERIOD_OPTIONS.keys()).index(PERIOD_DEFAULT),
-        horizontal=True,
-        key="asset_detail_period_selector",
-        label_visibility="collapsed"
-    )
+    # En mode interactif, tout l'historique est chargé et la période se choisit dans le graphique
+    interactive = interactive_enabled()
+    if interactive:
+        selected_period = "Max"
+    else:
+        # Sélecteur de période format radio (comme dans l'onglet Historique)
+        selected_period = st.radio(
+            "Période",
+            options=list(PERIOD_OPTIONS.keys()),
+            index=list(PERIOD_OPTIONS.keys()).index(PERIOD_DEFAULT),
+            horizontal=True,
+            key="asset_detail_period_selector",
+            label_visibility="collapsed"
+        )
     period = PERIOD_OPTIONS[selected_period][0]
     
     with st.spinner("Chargement des données historiques..."):
         historical_data = fetch_historical_prices((ticker,), period)
     
     if not historical_data.empty:
-        render_price_chart(historical_data, ticker, pru)
+        render_price_chart(historical_data, ticker, pru, interactive, PERIOD_DEFAULT if interactive else None)
     else:
         st.warning("Aucune donnée historique disponible pour cette période")
 
@@ -173,18 +187,6 @@ def render_asset_info(asset_info: dict):
 def _render_immo_detail(asset: pd.Series):
     """Page de détail pour un bien immobilier."""
 
-    # Recharger les données fraîches depuis la base pour éviter les problèmes de cache
-    from services.assets import get_assets
-    fresh_df = get_assets()
-    fresh_asset_row = fresh_df[fresh_df["id"] == asset["id"]]
-    
-    if fresh_asset_row.empty:
-        st.error(f"Actif avec ID {asset['id']} introuvable")
-        return
-    
-    asset = fresh_asset_row.iloc[0]
-
-
     # ── Bouton retour + titre ─────────────────────────────────────────────────
     with st.container(horizontal=True, vertical_alignment="bottom"):
         if st.button("← Retour", key="btn_back_immo", type="secondary"):
@@ -268,10 +270,8 @@ def _render_immo_detail(asset: pd.Series):
     # ── Bloc 3 : Emprunt lié ──────────────────────────────────────────────────
     emprunt_id = asset.get("emprunt_id")
     if emprunt_id and not pd.isna(emprunt_id):
-        df_emprunts = load_emprunts()
-        emp = df_emprunts[df_emprunts["id"] == str(emprunt_id)]
-        if not emp.empty:
-            e = emp.iloc[0]
+        e = get_emprunt(emprunt_id)
+        if e is not None:
             st.subheader("Emprunt lié", anchor=False)
             with st.container(border=True):
                 c1, c2, c3, c4 = st.columns(4)
@@ -326,6 +326,7 @@ def _render_immo_detail(asset: pd.Series):
 
 
 
+@profiled("asset_detail.render_asset_detail")
 def render_asset_detail(asset_id: str, df: pd.DataFrame):
     """
     Point d'entrée principal pour afficher la page de détail d'un actif.
@@ -417,6 +418,43 @@ def render_asset_detail(asset_id: str, df: pd.DataFrame):
             delta=f"{sign}{pnl:,.2f} €"
         )
 
+    _render_lots(asset)
+
+
+def _render_lots(asset: pd.Series):
+    """Lots FIFO ouverts (plus-value latente) et cessions (plus-value réalisée)."""
+    quantite = float(asset.get("quantite") or 0)
+    prix_actuel = float(asset["montant"]) / quantite if quantite > 0 else None
+    lots, cessions = get_lots(asset["id"], prix_actuel)
+    if lots.empty and cessions.empty:
+        return
+
+    summary = summarize_lots(lots, cessions)
+    st.subheader("Lots (FIFO)", anchor=False)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Base de coût FIFO", f"{summary['cout_restant']:,.2f} €")
+    latente = summary["plus_value_latente"]
+    col2.metric("Plus-value latente", f"{'+' if latente >= 0 else ''}{latente:,.2f} €")
+    realisee = summary["plus_value_realisee"]
+    col3.metric("Plus-value réalisée", f"{'+' if realisee >= 0 else ''}{realisee:,.2f} €")
+
+    ouverts = lots[lots["quantite_restante"] > 0]
+    if not ouverts.empty:
+        columns = {"date": "Date d'achat", "quantite": "Quantité achetée", "quantite_restante": "Quantité restante",
+                   "prix_unitaire": "Prix unitaire", "plus_value_latente": "Plus-value latente"}
+        table = ouverts[[c for c in columns if c in ouverts.columns]].rename(columns=columns)
+        table["Date d'achat"] = table["Date d'achat"].dt.strftime("%d/%m/%Y")
+        st.dataframe(table, hide_index=True, width="stretch")
+
+    if not cessions.empty:
+        st.caption("Cessions")
+        columns = {"date": "Date de vente", "quantite": "Quantité", "prix_achat": "Prix d'achat",
+                   "prix_vente": "Prix de vente", "plus_value": "Plus-value"}
+        table = cessions[list(columns)].rename(columns=columns)
+        table["Date de vente"] = table["Date de vente"].dt.strftime("%d/%m/%Y")
+        st.dataframe(table, hide_index=True, width="stretch")
+
 
 def set_asset_detail(asset_id: str):
     """
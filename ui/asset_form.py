@@ -12,13 +12,14 @@ Points d'entrée publics :
     set_dialog_edit(asset_id)
     set_dialog_delete(asset_id)
     set_dialog_update(asset_id)
-    render_active_dialog(df, invalidate_cache_fn, flash_fn)
+    render_active_dialog(df, flash_fn)
 """
 import streamlit as st
 import pandas as pd
 from datetime import date
 
 from services.asset_manager import remove_asset, update_at_date
+from services.session_data import apply_assets
 from constants import CATEGORIES_AUTO
 
 from ui.forms._shared import close_dialog
@@ -66,17 +67,17 @@ def _find_row_by_id(df: pd.DataFrame, asset_id: str):
 # ── Modales (@st.dialog doit rester dans ce fichier) ─────────────────────────
 
 @st.dialog("Ajouter un actif", dismissible=False, width="large")
-def _dialog_create(df, invalidate_cache_fn, flash_fn, categorie: str):
+def _dialog_create(df, flash_fn, categorie: str):
     st.markdown(f"## {categorie}")
     form_module = _FORM_MAP.get(categorie)
     if form_module is None:
         st.error(f"Catégorie inconnue : {categorie}")
         return
-    form_module.render_form(df, "create", None, None, invalidate_cache_fn, flash_fn, categorie)
+    form_module.render_form(df, "create", None, None, flash_fn, categorie)
 
 
 @st.dialog("Modifier un actif", dismissible=False, width="large")
-def _dialog_edit(df, asset_id, invalidate_cache_fn, flash_fn):
+def _dialog_edit(df, asset_id, flash_fn):
     try:
         idx, row = _find_row_by_id(df, asset_id)
     except ValueError as e:
@@ -91,11 +92,11 @@ def _dialog_edit(df, asset_id, invalidate_cache_fn, flash_fn):
     if form_module is None:
         st.error(f"Catégorie inconnue : {row['categorie']}")
         return
-    form_module.render_form(df, "edit", idx, row, invalidate_cache_fn, flash_fn)
+    form_module.render_form(df, "edit", idx, row, flash_fn)
 
 
 @st.dialog("Supprimer un actif", dismissible=False)
-def _dialog_delete(df, asset_id, invalidate_cache_fn, flash_fn):
+def _dialog_delete(df, asset_id, flash_fn):
     try:
         idx, row = _find_row_by_id(df, asset_id)
     except ValueError as e:
@@ -112,14 +113,14 @@ def _dialog_delete(df, asset_id, invalidate_cache_fn, flash_fn):
         st.rerun()
     if c2.button("Confirmer", type="primary", width="stretch", key="_delete_confirm"):
         df, msg, msg_type = remove_asset(df, idx, row["id"])
+        apply_assets(df)
         flash_fn(msg, msg_type)
         close_dialog()
-        invalidate_cache_fn()
         st.rerun()
 
 
 @st.dialog("Mettre à jour un montant", dismissible=False)
-def _dialog_update(df, asset_id, invalidate_cache_fn, flash_fn):
+def _dialog_update(df, asset_id, flash_fn):
     try:
         idx, row = _find_row_by_id(df, asset_id)
     except ValueError as e:
@@ -178,25 +179,28 @@ def _dialog_update(df, asset_id, invalidate_cache_fn, flash_fn):
                 df, msg, msg_type = update_at_date(df, asset_id, row["categorie"], op_date=op_date, quantite=quantite, pru=pru)
         else:
             df, msg, msg_type = update_at_date(df, asset_id, row["categorie"], op_date=op_date, montant=montant)
+        apply_assets(df)
         flash_fn(msg, msg_type)
         close_dialog()
-        invalidate_cache_fn()
         st.rerun()
 
 
 # ── Point d'entrée public ─────────────────────────────────────────────────────
 
-def render_active_dialog(df: pd.DataFrame, invalidate_cache_fn, flash_fn):
+def render_active_dialog(df: pd.DataFrame, flash_fn):
     dialog = st.session_state.get("_dialog")
     if not dialog:
         return
 
+    # asset_manager modifie le DataFrame en place : la copie de travail de la
+    # session ne change qu'une fois l'écriture réussie (apply_assets)
+    df = df.copy()
     dtype = dialog["type"]
     if dtype == "create":
-        _dialog_create(df, invalidate_cache_fn, flash_fn, categorie=dialog.get("categorie", "Actions & Fonds"))
+        _dialog_create(df, flash_fn, categorie=dialog.get("categorie", "Actions & Fonds"))
     elif dtype == "edit":
-        _dialog_edit(df, dialog["asset_id"], invalidate_cache_fn, flash_fn)
+        _dialog_edit(df, dialog["asset_id"], flash_fn)
     elif dtype == "delete":
-        _dialog_delete(df, dialog["asset_id"], invalidate_cache_fn, flash_fn)
+        _dialog_delete(df, dialog["asset_id"], flash_fn)
     elif dtype == "update":
-        _dialog_update(df, dialog["asset_id"], invalidate_cache_fn, flash_fn)
\ No newline at end of file
+        _dialog_update(df, dialog["asset_id"], flash_fn)
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+ui/charts.py
+────────────
+Mode d'affichage des graphiques d'évolution (patrimoine, prix d'un actif, CRD).
+
+    - statique (défaut)  : image figée, la période est choisie côté serveur ;
+    - interactif         : tout l'historique est envoyé une fois, réduit à
+                           CHART_MAX_POINTS points par courbe, en WebGL au-delà
+                           de CHART_WEBGL_MIN_POINTS ; zoom, survol et boutons
+                           de période se font dans le navigateur, sans rerun.
+
+Le mode est un paramètre utilisateur (Paramètres → Mon profil).
+
+Fonctions publiques :
+    interactive_enabled() → bool
+    prepare(data, interactive) → data réduite si besoin
+    line_trace(x, y, interactive, **kwargs) → go.Scatter | go.Scattergl
+    stacked_area_traces(df, colors, interactive) → list[trace]
+    show(fig, interactive, range_selector=False, initial_period=None)
+"""
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from constants import CHART_MAX_POINTS, CHART_WEBGL_MIN_POINTS, PERIOD_OPTIONS
+from services.db_parametres import get_parametre
+from services.downsampling import downsample
+
+PARAM_INTERACTIF = "graphiques_interactifs"
+
+
+def interactive_enabled() -> bool:
+    return get_parametre(PARAM_INTERACTIF, "False") == "True"
+
+
+def prepare(data: pd.Series | pd.DataFrame, interactive: bool) -> pd.Series | pd.DataFrame:
+    """Réduit la série à CHART_MAX_POINTS en mode interactif (inchangée sinon)."""
+    return downsample(data, CHART_MAX_POINTS) if interactive else data
+
+
+def line_trace(x, y, interactive: bool, **kwargs):
+    """Courbe : WebGL (Scattergl) pour les longues séries en mode interactif."""
+    if interactive and len(x) >= CHART_WEBGL_MIN_POINTS:
+        return go.Scattergl(x=x, y=y, **kwargs)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def stacked_area_traces(df: pd.DataFrame, colors: dict[str, str], interactive: bool) -> list:
+    """
+    Aires empilées, une par colonne de df (index = dates).
+    Scattergl ne gère pas stackgroup : en WebGL, l'empilement est précalculé
+    (sommes cumulées, remplissage jusqu'à la courbe précédente) et le survol
+    affiche la valeur propre de chaque catégorie.
+    """
+    webgl = interactive and len(df) >= CHART_WEBGL_MIN_POINTS
+    traces = []
+    cumul = pd.Series(0.0, index=df.index)
+    for i, serie in enumerate(df.columns):
+        color = colors.get(serie, "#CCCCCC")
+        style = dict(mode="lines", name=serie, line=dict(color=color, width=1), fillcolor=color)
+        if not webgl:
+            traces.append(go.Scatter(x=df.index, y=df[serie], stackgroup="patrimoine", **style))
+            continue
+        cumul = cumul + df[serie].fillna(0.0)
+        traces.append(go.Scattergl(
+            x=df.index, y=cumul, customdata=df[serie],
+            fill="tozeroy" if i == 0 else "tonexty",
+            hovertemplate="%{customdata:,.0f} €",
+            **style,
+        ))
+    return traces
+
+
+def _range_buttons() -> list[dict]:
+    buttons = []
+    for label, (_, nb_jours) in PERIOD_OPTIONS.items():
+        if nb_jours is None:
+            buttons.append(dict(label=label, step="all"))
+        else:
+            buttons.append(dict(label=label, count=nb_jours, step="day", stepmode="backward"))
+    return buttons
+
+
+def show(fig: go.Figure, interactive: bool, range_selector: bool = False, initial_period: str | None = None):
+    """
+    Affiche la figure. En mode interactif :
+        range_selector : boutons de période (PERIOD_OPTIONS) au-dessus du graphique
+        initial_period : période visible à l'ouverture (l'historique complet reste chargé)
+    """
+    if not interactive:
+        st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
+        return
+
+    fig.update_layout(hovermode="x unified", dragmode="zoom")
+    if range_selector:
+        fig.update_xaxes(rangeselector=dict(
+            buttons=_range_buttons(),
+            bgcolor="#141519", activecolor="#1F2937", font=dict(color="#E8EAF0", size=11),
+            x=1, xanchor="right", y=1.02, yanchor="bottom",
+        ))
+        fig.update_layout(margin=dict(t=36))
+    nb_jours = PERIOD_OPTIONS.get(initial_period, (None, None))[1]
+    fins = [pd.Timestamp(max(t.x)) for t in fig.data if t.x is not None and len(t.x)]
+    if nb_jours is not None and fins:
+        fin = max(fins)
+        fig.update_xaxes(range=[fin - pd.Timedelta(days=nb_jours), fin])
+    st.plotly_chart(fig, width="stretch", config={"displayModeBar": False, "scrollZoom": True})
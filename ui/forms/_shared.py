@@ -42,13 +42,13 @@ def contrat_fields(row=None):
     Si l'utilisateur choisit '+ Nouveau contrat...', affiche des champs de création.
     Retourne contrat_id (str) ou None si nouveau contrat en cours de saisie.
     """
-    from services.db_contrats import load_contrats
+    from services.repository import get_contrats
     from constants import ENVELOPPES
 
     initial_contrat_id = str(row.get("contrat_id", "") or "").strip() if row is not None else ""
     NOUVEAU_CONTRAT = "+ Nouveau contrat..."
 
-    df_contrats = load_contrats()
+    df_contrats = get_contrats()
     contrat_options = []
     contrat_id_to_display = {}
 
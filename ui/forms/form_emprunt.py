@@ -18,7 +18,11 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 
-from services.db_emprunts import load_emprunts, create_emprunt, update_emprunt, delete_emprunt
+from services.db_emprunts import (
+    create_emprunt, update_emprunt, delete_emprunt, load_evenements, add_evenement, delete_evenement,
+)
+from services.repository import get_emprunt
+from constants import EVENEMENT_EMPRUNT_TYPES
 
 
 # ── Gestion de l'état ─────────────────────────────────────────────────────────
@@ -52,12 +56,11 @@ def _date_to_str(d) -> str:
     return pd.Timestamp(d).strftime("%Y-%m-%d")
 
 
-def _find_emprunt(emprunt_id: str) -> pd.Series:
-    df = load_emprunts()
-    row = df[df["id"] == emprunt_id]
-    if row.empty:
+def _find_emprunt(emprunt_id: str) -> dict:
+    row = get_emprunt(emprunt_id)
+    if row is None:
         raise ValueError("Emprunt introuvable.")
-    return row.iloc[0]
+    return row
 
 
 def _format_duree(duree_mois: int) -> str:
@@ -72,7 +75,7 @@ def _format_duree(duree_mois: int) -> str:
 
 # ── Formulaire (champs communs create / edit) ─────────────────────────────────
 
-def _form_fields(edit_row: pd.Series | None, flash_fn) -> bool:
+def _form_fields(edit_row: dict | None, flash_fn) -> bool:
     nom = st.text_input(
         "Nom de l'emprunt *",
         value=str(edit_row["nom"]) if edit_row is not None else "",
@@ -167,6 +170,68 @@ def _form_fields(edit_row: pd.Series | None, flash_fn) -> bool:
     return False
 
 
+# ── Événements (remboursement anticipé, différé, révision de taux) ────────────
+
+def _describe_evenement(evt: pd.Series) -> str:
+    if evt["type"] == "remboursement_anticipe":
+        detail = f"{evt['montant']:,.0f} €"
+    elif evt["type"] == "differe":
+        detail = f"{int(evt['duree_mois'])} mois"
+    else:
+        detail = f"{evt['taux_annuel']:.2f} %"
+    if pd.notna(evt["mensualite"]):
+        detail += f" · mensualité {evt['mensualite']:,.0f} €"
+    return f"**{EVENEMENT_EMPRUNT_TYPES[evt['type']]}** · {evt['date']:%d/%m/%Y} · {detail}"
+
+
+def _render_evenements(emprunt_id: str, flash_fn) -> None:
+    st.markdown("**Événements**")
+    st.caption("Modifient l'échéancier à partir de leur date : capital restant dû, fin du prêt et intérêts.")
+
+    for _, evt in load_evenements(emprunt_id).iterrows():
+        c1, c2 = st.columns([10, 1], vertical_alignment="center")
+        c1.markdown(_describe_evenement(evt))
+        if c2.button("", icon=":material/delete:", key=f"_emprunt_form_evt_del_{evt['id']}", help="Supprimer"):
+            delete_evenement(evt["id"])
+            flash_fn("Événement supprimé.", "success")
+            st.rerun()
+
+    with st.expander("Ajouter un événement", icon=":material/add:"):
+        type_evt = st.selectbox(
+            "Type",
+            options=list(EVENEMENT_EMPRUNT_TYPES),
+            format_func=EVENEMENT_EMPRUNT_TYPES.get,
+            key="_emprunt_form_evt_type",
+        )
+        c1, c2, c3 = st.columns(3)
+        date_evt = c1.date_input("Date", value=date.today(), key="_emprunt_form_evt_date")
+        montant = duree = taux = None
+        if type_evt == "remboursement_anticipe":
+            montant = c2.number_input("Capital remboursé (€)", min_value=0.0, step=1000.0, key="_emprunt_form_evt_montant")
+        elif type_evt == "differe":
+            duree = c2.number_input("Durée (mois)", min_value=1, max_value=60, value=6, key="_emprunt_form_evt_duree")
+        else:
+            taux = c2.number_input("Nouveau taux (%)", min_value=0.0, step=0.1, format="%.2f", key="_emprunt_form_evt_taux")
+        mensualite = None
+        if type_evt != "differe":
+            mensualite = c3.number_input(
+                "Nouvelle mensualité (€)",
+                min_value=0.0,
+                step=50.0,
+                key="_emprunt_form_evt_mensualite",
+                help="Laisser à 0 : durée réduite (remboursement anticipé) ou mensualité recalculée (révision).",
+            )
+        if st.button("Ajouter", type="primary", key="_emprunt_form_evt_add"):
+            try:
+                add_evenement(emprunt_id, type_evt, date_evt, montant=montant, duree_mois=duree,
+                              taux_annuel=taux, mensualite=mensualite or None)
+            except ValueError as e:
+                flash_fn(str(e), "error")
+            else:
+                flash_fn("Événement ajouté.", "success")
+            st.rerun()
+
+
 # ── Modales ───────────────────────────────────────────────────────────────────
 
 @st.dialog("Ajouter un emprunt", dismissible=False, width="large")
@@ -187,6 +252,8 @@ def _dialog_edit(emprunt_id: str, flash_fn):
         return
     st.markdown(f"### {row['nom']}")
     _form_fields(row, flash_fn)
+    st.divider()
+    _render_evenements(emprunt_id, flash_fn)
 
 
 @st.dialog("Supprimer l'emprunt", dismissible=False)
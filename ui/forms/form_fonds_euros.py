@@ -4,16 +4,17 @@ ui/forms/form_fonds_euros.py
 Formulaire création / édition d'un fonds euros.
 Catégorie fixée : "Fonds euros".
 
-Point d'entrée : render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn)
+Point d'entrée : render_form(df, mode, idx, row, flash_fn)
 """
 import streamlit as st
 from services.asset_manager import create_manual_asset, edit_manual_asset
+from services.session_data import apply_assets
 from ui.forms._shared import close_dialog, contrat_fields, resolve_contrat_id
 
 CATEGORIE = "Fonds euros"
 
 
-def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie=None):
+def render_form(df, mode, idx, row, flash_fn, categorie=None):
     initial_nom     = row["nom"]            if mode == "edit" else ""
     initial_montant = float(row["montant"]) if mode == "edit" else 0.0
     categorie       = row["categorie"]      if mode == "edit" else CATEGORIE
@@ -38,9 +39,9 @@ def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie=Non
                 df, msg, msg_type = create_manual_asset(df, nom.strip(), categorie, montant, contrat_id=final_contrat_id)
             else:
                 df, msg, msg_type = edit_manual_asset(df, idx, row["id"], nom.strip(), categorie, montant, contrat_id=final_contrat_id)
+            apply_assets(df)
             flash_fn(msg, msg_type)
             close_dialog()
-            invalidate_cache_fn()
             st.rerun()
 
     return df
\ No newline at end of file
@@ -5,20 +5,21 @@ Formulaire création / édition d'un bien immobilier.
 Catégorie fixée : "Immobilier".
 Pas de contrat (l'immo n'est pas dans une enveloppe fiscale).
 
-Point d'entrée : render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn)
+Point d'entrée : render_form(df, mode, idx, row, flash_fn)
 """
 import streamlit as st
 import pandas as pd
 from datetime import datetime
 from services.asset_manager import create_manual_asset, edit_manual_asset
-from services.db_emprunts import load_emprunts
+from services.session_data import apply_assets
+from services.repository import get_emprunts
 from ui.forms._shared import close_dialog
 from constants import TYPE_BIEN_OPTIONS
 
 CATEGORIE = "Immobilier"
 
 
-def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie=None):
+def render_form(df, mode, idx, row, flash_fn, categorie=None):
     initial_nom     = row["nom"]            if mode == "edit" else ""
     initial_montant = float(row["montant"]) if mode == "edit" else 0.0
 
@@ -124,7 +125,7 @@ def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie=Non
 
 
     # ── Emprunt lié ──────────────────────────────────────────────────────────
-    df_emprunts = load_emprunts()
+    df_emprunts = get_emprunts()
     emprunt_options = ["Aucun"] + [r["nom"] for _, r in df_emprunts.iterrows()]
 
     current_emprunt_id = None
@@ -210,9 +211,9 @@ def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie=Non
                 df, msg, msg_type = create_manual_asset(df, nom.strip(), CATEGORIE, montant, immo_params=immo_params)
             else:
                 df, msg, msg_type = edit_manual_asset(df, idx, row["id"], nom.strip(), CATEGORIE, montant, immo_params=immo_params)
+            apply_assets(df)
             flash_fn(msg, msg_type)
             close_dialog()
-            invalidate_cache_fn()
             st.rerun()
 
     return df
\ No newline at end of file
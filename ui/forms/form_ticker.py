@@ -4,14 +4,15 @@ ui/forms/form_ticker.py
 Formulaire création / édition d'un actif à ticker (Actions & Fonds, Crypto).
 La catégorie est fixée en amont par le popover.
 
-Point d'entrée : render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie)
+Point d'entrée : render_form(df, mode, idx, row, flash_fn, categorie)
 """
 import streamlit as st
 from services.asset_manager import create_auto_asset, edit_auto_asset
+from services.session_data import apply_assets
 from ui.forms._shared import close_dialog, contrat_fields, resolve_contrat_id, ticker_picker, cancel_button
 
 
-def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie: str = "Actions & Fonds"):
+def render_form(df, mode, idx, row, flash_fn, categorie: str = "Actions & Fonds"):
     if mode == "edit":
         categorie = row["categorie"]
 
@@ -62,9 +63,9 @@ def render_form(df, mode, idx, row, invalidate_cache_fn, flash_fn, categorie: st
                 quantite_current = float(row.get("quantite") or 0.0)
                 with st.spinner("Synchronisation du prix…"):
                     df, msg, msg_type = edit_auto_asset(df, idx, row["id"], effective_ticker, ticker_current, quantite, quantite_current, pru, categorie, contrat_id=final_contrat_id)
+            apply_assets(df)
             flash_fn(msg, msg_type)
             close_dialog()
-            invalidate_cache_fn()
             st.rerun()
 
     return df
\ No newline at end of file
@@ -2,7 +2,12 @@
 ui/graphe_historique.py
 ───────────────────────
 Affiche l'historique du patrimoine : sélecteur de période, courbes d'évolution
-du patrimoine total et par catégorie.
+du patrimoine total et par catégorie, ou du patrimoine net (actifs − emprunts).
+
+En mode interactif (ui/charts.py), tout l'historique est chargé une fois et la
+période se choisit dans le graphique, sans rerun. Seule la comparaison avec un
+indice garde le sélecteur de période : les variations y sont rebasées au
+début de la période.
 
 Point d'entrée unique : render(df, df_hist, df_positions)
 """
@@ -10,14 +15,21 @@ Point d'entrée unique : render(df, df_hist, df_positions)
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from services.historique import build_category_evolution, _compute_raw_evolution
+from services.historique import (
+    EVOLUTION_COLUMNS, build_category_evolution, build_net_worth_evolution, build_property_equity_evolution,
+    _compute_raw_evolution,
+)
+from services.repository import get_emprunts
 from services.pricer import fetch_historical_prices
+from services.profiler import profiled
+from ui.charts import interactive_enabled, prepare, line_trace, stacked_area_traces, show
 from constants import CATEGORIES_AUTO, CATEGORY_COLOR_MAP, PLOTLY_LAYOUT, PERIOD_OPTIONS, PERIOD_DEFAULT, BENCHMARK_OPTIONS, BENCHMARK_COLOR
 
 
 # ── Point d'entrée public ─────────────────────────────────────────────────────
 
 @st.fragment
+@profiled("graphe_historique.render")
 def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
     auto_tickers = sorted(
         df[df["categorie"].isin(CATEGORIES_AUTO) & (df["ticker"] != "")]["ticker"]
@@ -31,8 +43,16 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
 
     st.subheader("Évolution", anchor=False)
 
+    # Seules les colonnes lues par les évolutions entrent dans la clé de leur cache :
+    # modifier un loyer ou un PRU ne reconstruit pas l'historique.
+    df_evo = df[EVOLUTION_COLUMNS]
+
     # ── Traitement des données avant création des widgets ───────────────────────────────
-    default_period = PERIOD_DEFAULT
+    interactive = interactive_enabled()
+    # En interactif, le navigateur choisit la période : sélecteur masqué, sauf pour la
+    # comparaison avec un indice (lu dans l'état du widget, affiché plus bas).
+    period_in_chart = interactive and BENCHMARK_OPTIONS.get(st.session_state.get("benchmark_selector")) is None
+    default_period = "Max" if period_in_chart else PERIOD_DEFAULT
     yf_period, nb_jours = PERIOD_OPTIONS[default_period]
     
     start_date = None
@@ -41,20 +61,22 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
 
     with st.spinner("Reconstruction de l'historique…"):
         df_prices = fetch_historical_prices(tuple(auto_tickers), yf_period) if auto_tickers else pd.DataFrame()
-        cat_evo = build_category_evolution(df, df_hist, df_positions, df_prices, tuple(CATEGORIES_AUTO))
+        cat_evo = build_category_evolution(df_evo, df_hist, df_positions, df_prices, tuple(CATEGORIES_AUTO))
 
     # ── Sélecteurs période + catégorie + benchmark ───────────────────────────────────────
     col_left, col_right = st.columns([0.8, 0.2])
     
     with col_left:
         with st.container(horizontal=True):
-            period_label = st.radio(
-                "Période",
-                options=list(PERIOD_OPTIONS.keys()),
-                index=list(PERIOD_OPTIONS.keys()).index(PERIOD_DEFAULT),
-                horizontal=True,
-                key="period_selector",
-            )
+            period_label = default_period
+            if not period_in_chart:
+                period_label = st.radio(
+                    "Période",
+                    options=list(PERIOD_OPTIONS.keys()),
+                    index=list(PERIOD_OPTIONS.keys()).index(PERIOD_DEFAULT),
+                    horizontal=True,
+                    key="period_selector",
+                )
     
             CATEGORIES_EXCLUES_GRAPHE = {"Immobilier"}
             options_cat = [c for c in cat_evo.columns if c not in CATEGORIES_EXCLUES_GRAPHE] if not cat_evo.empty else []
@@ -74,6 +96,11 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
             key="benchmark_selector",
             help="Comparer avec un indice de référence en pourcentage de variation"
         )
+        vue_nette = st.toggle(
+            "Patrimoine net",
+            key="net_worth_toggle",
+            help="Actifs moins capital restant dû des emprunts, et valeur nette de chaque bien immobilier.",
+        )
 
     # Si la période a changé, retraiter les données
     if period_label != default_period:
@@ -85,7 +112,20 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
 
         with st.spinner("Reconstruction de l'historique…"):
             df_prices = fetch_historical_prices(tuple(auto_tickers), yf_period) if auto_tickers else pd.DataFrame()
-            cat_evo = build_category_evolution(df, df_hist, df_positions, df_prices, tuple(CATEGORIES_AUTO))
+            cat_evo = build_category_evolution(df_evo, df_hist, df_positions, df_prices, tuple(CATEGORIES_AUTO))
+
+    # Période visible à l'ouverture quand l'historique complet est envoyé au navigateur
+    initial_period = PERIOD_DEFAULT if period_in_chart else None
+
+    if vue_nette:
+        df_emprunts = get_emprunts()
+        net_evo = build_net_worth_evolution(df_evo, df_hist, df_positions, df_prices, tuple(CATEGORIES_AUTO), df_emprunts)
+        equity = build_property_equity_evolution(df, df_hist, df_emprunts)
+        if start_date is not None:
+            net_evo = net_evo[net_evo["date"] >= start_date]
+            equity = equity[equity["date"] >= start_date]
+        _render_net_worth_chart(net_evo, equity, interactive, initial_period)
+        return
 
     benchmark_ticker = BENCHMARK_OPTIONS[benchmark_label]
 
@@ -104,7 +144,8 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
     # Aucune sélection = toutes les catégories
     active_cats = selected_cats if selected_cats else options_cat
 
-    _render_chart(active_cats, cat_evo, df_benchmark, benchmark_ticker, benchmark_label, df, df_positions, start_date)
+    _render_chart(active_cats, cat_evo, df_benchmark, benchmark_ticker, benchmark_label, df, df_positions,
+                  interactive, initial_period)
 
 
 def _render_chart(
@@ -115,7 +156,8 @@ def _render_chart(
     benchmark_label: str,
     df: pd.DataFrame,
     df_positions: pd.DataFrame,
-    start_date: pd.Timestamp | None,
+    interactive: bool,
+    initial_period: str | None,
 ):
     fig = go.Figure()
 
@@ -185,16 +227,16 @@ def _render_chart(
         # ── Mode comparaison : deux courbes en % de variation ─────────────────
         portfolio_color = CATEGORY_COLOR_MAP.get(active_cats[0], "#6366F1") if active_cats else "#6366F1"
 
-        fig.add_trace(go.Scatter(
-            x=portfolio_pct.index,
-            y=portfolio_pct.values,
+        portfolio_pct = prepare(portfolio_pct, interactive)
+        bench_pct = prepare(bench_pct, interactive)
+        fig.add_trace(line_trace(
+            portfolio_pct.index, portfolio_pct.values, interactive,
             mode="lines",
             name="Mon portfolio" + f" {portfolio_final:+.1f}%",
             line=dict(color=portfolio_color, width=2),
         ))
-        fig.add_trace(go.Scatter(
-            x=bench_pct.index,
-            y=bench_pct.values,
+        fig.add_trace(line_trace(
+            bench_pct.index, bench_pct.values, interactive,
             mode="lines",
             name=benchmark_label + " : "+ f"{bench_final:+.1f}%",
             line=dict(color=BENCHMARK_COLOR, width=2, dash="dot"),
@@ -212,17 +254,8 @@ def _render_chart(
     else:
         # ── Mode normal : aires empilées en € ─────────────────────────────────
         if active_cats and not cat_evo.empty:
-            for serie in active_cats:
-                if serie not in cat_evo.columns:
-                    continue
-                color = CATEGORY_COLOR_MAP.get(serie, "#CCCCCC")
-                fig.add_trace(go.Scatter(
-                    x=cat_evo.index, y=cat_evo[serie],
-                    mode="lines", name=serie,
-                    stackgroup="patrimoine",
-                    line=dict(color=color, width=1),
-                    fillcolor=color,
-                ))
+            series = prepare(cat_evo[[c for c in active_cats if c in cat_evo.columns]], interactive)
+            fig.add_traces(stacked_area_traces(series, CATEGORY_COLOR_MAP, interactive))
 
         fig.update_layout(
             **PLOTLY_LAYOUT,
@@ -232,4 +265,42 @@ def _render_chart(
         )
         fig.update_yaxes(ticksuffix=" €", tickformat=",.0f")
 
-    st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
\ No newline at end of file
+    show(fig, interactive, range_selector=interactive and initial_period is not None, initial_period=initial_period)
+
+def _render_net_worth_chart(net_evo: pd.DataFrame, equity: pd.DataFrame, interactive: bool, initial_period: str | None):
+    """Patrimoine net (aire) et valeur nette de chaque bien immobilier (pointillés)."""
+    if net_evo.empty:
+        st.caption("Pas encore d'historique.")
+        return
+
+    net_evo = prepare(net_evo.set_index("date"), interactive)
+    fig = go.Figure()
+    fig.add_trace(line_trace(
+        net_evo.index, net_evo["net"], interactive,
+        mode="lines", name="Patrimoine net",
+        fill="tozeroy",
+        line=dict(color="#6366F1", width=2),
+    ))
+    if (net_evo["passifs"] > 0).any():
+        fig.add_trace(line_trace(
+            net_evo.index, net_evo["passifs"], interactive,
+            mode="lines", name="Capital restant dû",
+            line=dict(color=CATEGORY_COLOR_MAP.get("Emprunts", "#75cbd1"), width=1),
+        ))
+    color = CATEGORY_COLOR_MAP.get("Immobilier", "#CCCCCC")
+    for nom, serie in equity.groupby("nom"):
+        serie = prepare(serie.set_index("date")["equity"], interactive)
+        fig.add_trace(line_trace(
+            serie.index, serie.values, interactive,
+            mode="lines", name=f"{nom} (net)",
+            line=dict(color=color, width=1, dash="dot"),
+        ))
+
+    fig.update_layout(
+        **PLOTLY_LAYOUT,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0,
+                    bgcolor="rgba(0,0,0,0)", font=dict(color="#E8EAF0", size=12)),
+    )
+    fig.update_yaxes(ticksuffix=" €", tickformat=",.0f")
+    show(fig, interactive, range_selector=interactive and initial_period is not None, initial_period=initial_period)
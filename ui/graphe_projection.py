@@ -0,0 +1,108 @@
+"""
+ui/graphe_projection.py
+───────────────────────
+Projection Monte Carlo du patrimoine net : choix de l'horizon, éventail des
+percentiles (P5–P95) autour de la médiane.
+
+Point d'entrée unique : render(df)
+"""
+
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from services.projection import project_net_worth
+from services.repository import get_emprunts
+from services.pricer import fetch_historical_prices
+from services.db_parametres import get_parametre
+from services.profiler import profiled
+from constants import (
+    CATEGORIES_AUTO, PLOTLY_LAYOUT, PROJECTION_HORIZONS, PROJECTION_HORIZON_DEFAULT,
+    PROJECTION_HISTORY_PERIOD, PROJECTION_PATHS, PROJECTION_TAUX_EPARGNE_DEFAUT,
+)
+
+_BAND_COLOR = "99, 102, 241"  # #6366F1
+
+
+def _epargne_mensuelle() -> float:
+    """Revenu mensuel net × taux d'épargne (paramètres du profil)."""
+    revenu = get_parametre("revenu_mensuel_net")
+    taux = get_parametre("taux_epargne", PROJECTION_TAUX_EPARGNE_DEFAUT)
+    try:
+        return float(revenu or 0) * float(taux) / 100
+    except ValueError:
+        return 0.0
+
+
+# ── Point d'entrée public ─────────────────────────────────────────────────────
+
+@st.fragment
+@profiled("graphe_projection.render")
+def render(df: pd.DataFrame):
+    st.subheader("Projection", anchor=False)
+
+    col_left, col_right = st.columns([0.8, 0.2])
+    with col_left:
+        annees = st.select_slider(
+            "Horizon (années)",
+            options=list(PROJECTION_HORIZONS),
+            value=PROJECTION_HORIZON_DEFAULT,
+            key="projection_horizon",
+        )
+    with col_right:
+        show = st.toggle("Simuler", key="projection_toggle",
+                         help=f"{PROJECTION_PATHS:,} trajectoires tirées dans l'historique des cours.")
+    if not show:
+        return
+
+    epargne = _epargne_mensuelle()
+    auto_tickers = sorted(
+        df[df["categorie"].isin(CATEGORIES_AUTO) & (df["ticker"] != "")]["ticker"]
+        .dropna().unique().tolist()
+    )
+    with st.spinner("Simulation en cours…"):
+        df_prices = (
+            fetch_historical_prices(tuple(auto_tickers), PROJECTION_HISTORY_PERIOD)
+            if auto_tickers else pd.DataFrame()
+        )
+        bands = project_net_worth(df, df_prices, get_emprunts(), annees=annees, epargne_mensuelle=epargne)
+
+    _render_fan_chart(bands)
+
+    final = bands.iloc[-1]
+    st.caption(
+        f"Dans {annees} ans : médiane {final['p50']:,.0f} € "
+        f"(90 % des scénarios entre {final['p5']:,.0f} € et {final['p95']:,.0f} €) — "
+        f"épargne de {epargne:,.0f} € / mois."
+    )
+
+
+def _render_fan_chart(bands: pd.DataFrame):
+    fig = go.Figure()
+    # Bandes P5–P95 puis P25–P75 : la borne basse est tracée d'abord, la haute remplit jusqu'à elle
+    for low, high, alpha, name in (("p5", "p95", 0.15, "5 – 95 %"), ("p25", "p75", 0.3, "25 – 75 %")):
+        fig.add_trace(go.Scatter(
+            x=bands["date"], y=bands[low], mode="lines",
+            line=dict(width=0), showlegend=False,
+        ))
+        fig.add_trace(go.Scatter(
+            x=bands["date"], y=bands[high], mode="lines", name=name,
+            line=dict(width=0), fill="tonexty",
+            fillcolor=f"rgba({_BAND_COLOR}, {alpha})",
+        ))
+    fig.add_trace(go.Scatter(
+        x=bands["date"], y=bands["p50"], mode="lines", name="Médiane",
+        line=dict(color=f"rgb({_BAND_COLOR})", width=2),
+    ))
+    fig.add_trace(go.Scatter(
+        x=bands["date"], y=bands["deterministe"], mode="lines", name="Sans rendement de marché",
+        line=dict(color="#9CA3AF", width=1, dash="dot"),
+    ))
+
+    fig.update_layout(
+        **PLOTLY_LAYOUT,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0,
+                    bgcolor="rgba(0,0,0,0)", font=dict(color="#E8EAF0", size=12)),
+    )
+    fig.update_yaxes(ticksuffix=" €", tickformat=",.0f")
+    st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
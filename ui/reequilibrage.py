@@ -0,0 +1,102 @@
+"""
+ui/reequilibrage.py
+───────────────────
+Allocation cible et rééquilibrage : un curseur par catégorie, une cible
+optionnelle par contrat, un apport éventuel, puis les achats / ventes proposés.
+
+Le calcul (services/allocation.py) est refait à chaque mouvement de curseur,
+dans un fragment : seul ce bloc est réexécuté.
+
+Point d'entrée unique : render(df)
+"""
+
+import streamlit as st
+import pandas as pd
+from services.allocation import propose_rebalancing, rebalancing_categories, HORS_CONTRAT
+from services.db_allocations import load_allocation_targets, save_allocation_targets
+from services.repository import get_contrats
+
+
+def _current_weights(df: pd.DataFrame, categories: list[str]) -> dict[str, float]:
+    montants = df[df["categorie"].isin(categories)].groupby("categorie")["montant"].sum()
+    total = montants.sum()
+    return {c: float(montants.get(c, 0.0)) / total * 100 if total > 0 else 0.0 for c in categories}
+
+
+# ── Point d'entrée public ─────────────────────────────────────────────────────
+
+@st.fragment
+def render(df: pd.DataFrame):
+    categories = rebalancing_categories()
+    if df[df["categorie"].isin(categories)].empty:
+        return
+
+    df_contrats = get_contrats()
+    cibles_enregistrees = load_allocation_targets("categorie")
+    cibles = cibles_enregistrees or _current_weights(df, categories)
+    cibles_contrats = load_allocation_targets("contrat")
+
+    with st.expander("Allocation cible", icon=":material/balance:"):
+        affiches = {c: int(round(cibles.get(c, 0))) for c in categories}
+        poids = {
+            c: st.slider(c, 0, 100, affiches[c], step=1, format="%d %%", key=f"alloc_cat_{c}")
+            for c in categories
+        }
+        # Curseurs non déplacés : les cibles enregistrées telles quelles ou, sans cible,
+        # aucune (l'allocation actuelle est conservée) — pas l'arrondi au pourcent des
+        # poids actuels, qui proposerait des mouvements alors que rien n'est configuré.
+        intacts = poids == affiches
+        poids_calcul = cibles_enregistrees if intacts else poids
+        somme = sum(poids.values())
+        if somme != 100 and not (intacts and not cibles_enregistrees):
+            st.caption(f":orange[Somme des cibles : {somme} % — les poids sont ramenés à 100 %.]")
+
+        poids_contrats = {}
+        if not df_contrats.empty:
+            st.caption("Part visée par contrat (vide = au prorata de son montant actuel)")
+            cols = st.columns(min(len(df_contrats), 3))
+            for i, contrat in enumerate(df_contrats.itertuples()):
+                valeur = cols[i % len(cols)].number_input(
+                    f"{contrat.etablissement} — {contrat.enveloppe} (%)",
+                    min_value=0.0, max_value=100.0, step=1.0,
+                    value=cibles_contrats.get(contrat.id),
+                    key=f"alloc_contrat_{contrat.id}",
+                )
+                if valeur is not None:
+                    poids_contrats[contrat.id] = valeur
+
+        apport = st.number_input("Apport à investir (€)", min_value=0.0, value=0.0, step=100.0, key="alloc_apport")
+
+        result = propose_rebalancing(df, df_contrats, poids_calcul, poids_contrats, apport)
+        _render_result(result, df_contrats)
+
+        if st.button("Enregistrer les cibles", type="primary", key="btn_alloc_save"):
+            save_allocation_targets("categorie", poids)
+            save_allocation_targets("contrat", poids_contrats)
+            st.toast("Allocation cible enregistrée.", icon="✅")
+
+
+def _render_result(result: dict, df_contrats: pd.DataFrame):
+    if not result["converge"]:
+        st.caption(":orange[Les contraintes des enveloppes ne permettent pas d'atteindre exactement ces cibles "
+                   "sans déplacer d'argent entre contrats : la proposition s'en approche au mieux.]")
+
+    par_cat = result["par_categorie"].rename(columns={
+        "categorie": "Catégorie", "actuel": "Actuel (€)", "cible": "Cible (€)", "propose": "Proposé (€)",
+    })
+    st.dataframe(par_cat.round(0), hide_index=True, width="stretch")
+
+    mouvements = result["mouvements"]
+    if mouvements.empty:
+        st.caption("Aucun mouvement nécessaire.")
+        return
+
+    noms = {c.id: f"{c.etablissement} — {c.enveloppe}" for c in df_contrats.itertuples()}
+    noms[HORS_CONTRAT] = "Hors contrat"
+    table = pd.DataFrame({
+        "Contrat": mouvements["contrat_id"].map(lambda c: noms.get(c, c)),
+        "Catégorie": mouvements["categorie"],
+        "Opération": mouvements["mouvement"].map(lambda m: "Achat" if m > 0 else "Vente"),
+        "Montant (€)": mouvements["mouvement"].abs().round(0),
+    })
+    st.dataframe(table, hide_index=True, width="stretch")
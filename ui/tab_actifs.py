@@ -12,35 +12,51 @@ from constants import TYPE_BIEN_OPTIONS
 import pandas as pd
 from datetime import datetime
 from services.asset_manager import refresh_prices
+from services.session_data import apply_assets
 from ui.asset_form import set_dialog_create, set_dialog_edit, set_dialog_delete, set_dialog_update
 from ui.asset_detail import set_asset_detail, is_asset_detail_active, get_current_asset_id
-from constants import CATEGORIES_ASSETS, CATEGORIES_AUTO, CATEGORY_COLOR_MAP
-from services.db_contrats import load_contrats
-from services.db_emprunts import load_emprunts
-from services.financial_calculations import calculate_rental_metrics, calculate_auto_asset_pnl
+from constants import ACTIFS_PAGE_SIZE, CATEGORIES_ASSETS, CATEGORIES_AUTO, CATEGORY_COLOR_MAP
+from services.repository import get_contrats
+from services.financial_calculations import calculate_rental_metrics_batch, summarize_pnl
+from services.profiler import profiled
+
+
+# ── Métriques des lignes ──────────────────────────────────────────────────────
+
+def _row_metrics(df: pd.DataFrame, pnl: pd.DataFrame) -> pd.DataFrame:
+    """
+    Valeurs affichées sur chaque ligne, calculées en une passe pour tous les actifs.
+    pnl : PnL par actif (summarize_pnl(df)["par_actif"]).
+    Retourne un DataFrame de même index : contrat | prix | pnl | pnl_pct
+    (pnl / pnl_pct = NaN hors actifs cotés avec quantité et PRU).
+    """
+    df_contrats = get_contrats()
+    libelles = (
+        (df_contrats["etablissement"] + " — " + df_contrats["enveloppe"]).set_axis(df_contrats["id"].astype(str))
+        if not df_contrats.empty else pd.Series(dtype=str)
+    )
+    contrat_id = df["contrat_id"].fillna("").astype(str).str.strip()
+    contrat = contrat_id.map(libelles).fillna("Contrat inconnu").where(contrat_id != "", "")
+
+    montant = pd.to_numeric(df["montant"], errors="coerce").fillna(0.0)
+    quantite = pd.to_numeric(df["quantite"], errors="coerce").fillna(0.0)
+
+    return pd.DataFrame({
+        "contrat": contrat,
+        "prix": (montant / quantite.where(quantite > 0)).fillna(0.0),
+        "pnl": pnl["pnl"],
+        "pnl_pct": pnl["pnl_pct"],
+    }, index=df.index)
 
 
 # ── Ligne d'actif ─────────────────────────────────────────────────────────────
 
-def _render_asset_row(row: pd.Series, df_contrats: pd.DataFrame = None, df_emprunts: pd.DataFrame = None):    
+def _render_asset_row(row: pd.Series, metrics: pd.Series, rental_metrics: dict | None = None):
     is_auto_row = row["categorie"] in CATEGORIES_AUTO
     cols = st.columns([4, 1, 1, 2, 0.5], vertical_alignment="center")
 
     # ── Colonne nom + infos discrètes ─────────────────────────────────────────
-    contrat_id_val = row.get("contrat_id", "")
-    contrat_id = "" if pd.isna(contrat_id_val) else str(contrat_id_val).strip()
-    
-    # Récupérer les infos du contrat si disponible
-    contrat_info = ""
-    if contrat_id and df_contrats is not None:
-        contrat_match = df_contrats[df_contrats["id"] == contrat_id]
-        if not contrat_match.empty:
-            contrat_row = contrat_match.iloc[0]
-            contrat_info = f"{contrat_row['etablissement']} — {contrat_row['enveloppe']}"
-        else:
-            contrat_info = "Contrat inconnu"
-
-    meta_str = contrat_info
+    meta_str = metrics["contrat"]
 
     if is_auto_row and row.get("ticker"):
         error_tickers = st.session_state.get("sync_error_tickers", set())
@@ -89,8 +105,8 @@ def _render_asset_row(row: pd.Series, df_contrats: pd.DataFrame = None, df_empru
             cols[0].caption(meta_str)
         if row["categorie"] == "Immobilier":
             # ── Métriques locatives ───────────────────────────────────────────
-            if row.get("usage") == "locatif":
-                metrics = calculate_rental_metrics(row)
+            if row.get("usage") == "locatif" and rental_metrics is not None:
+                metrics = rental_metrics
                 
                 loc_parts = []
                 if row.get("loyer_mensuel", 0) > 0 and metrics["cout_reel"] > 0:
@@ -110,8 +126,7 @@ def _render_asset_row(row: pd.Series, df_contrats: pd.DataFrame = None, df_empru
 
     # ── Prix actuel de l'actif ────────────────────────────────────────────────
     if is_auto_row:
-        prix_par_part = row["montant"] / row["quantite"] if row.get("quantite", 0) > 0 else 0
-        cols[2].caption(f'Prix : {prix_par_part:,.2f} €')
+        cols[2].caption(f'Prix : {metrics["prix"]:,.2f} €')
 
     # ── PnL (actifs auto avec PRU) ────────────────────────────────────────────
     with cols[3].container(horizontal=True, width="content", vertical_alignment="center"):
@@ -126,10 +141,9 @@ def _render_asset_row(row: pd.Series, df_contrats: pd.DataFrame = None, df_empru
                 st.rerun()
         st.markdown(f"**{row['montant']:,.2f} €**")
 
-    if is_auto_row and row.get("quantite", 0) > 0 and row.get("pru", 0) > 0:
-        pnl_metrics = calculate_auto_asset_pnl(row["montant"], row["pru"], row["quantite"])
-        pnl = pnl_metrics["pnl_absolu"]
-        pnl_pct = pnl_metrics["pnl_pct"]
+    if pd.notna(metrics["pnl"]):
+        pnl = metrics["pnl"]
+        pnl_pct = metrics["pnl_pct"]
         sign_color = "green" if pnl >= 0 else "red"
         sign = "+" if pnl >= 0 else ""
         sign_icon = ":material/trending_up:" if pnl >= 0 else ":material/trending_down:"
@@ -147,9 +161,63 @@ def _render_asset_row(row: pd.Series, df_contrats: pd.DataFrame = None, df_empru
             st.rerun()
 
 
+# ── Catégorie repliable et paginée ────────────────────────────────────────────
+# Seules les lignes de la page visible sont rendues ; l'état (repliée, page)
+# est gardé par catégorie dans st.session_state. Les boutons le modifient par
+# callback, avant la réexécution du fragment de la page Actifs : pas de rerun.
+
+def _set_state(key: str, value):
+    st.session_state[key] = value
+
+
+@profiled("tab_actifs._render_category")
+def _render_category(categorie: str, df_cat: pd.DataFrame, metrics: pd.DataFrame, rental: dict):
+    key_replie = f"actifs_replie_{categorie}"
+    key_page = f"actifs_page_{categorie}"
+    replie = st.session_state.get(key_replie, False)
+    category_color = CATEGORY_COLOR_MAP.get(categorie, "#CCCCCC")
+
+    with st.container(horizontal=True, vertical_alignment="center"):
+        st.button(
+            "",
+            icon=":material/chevron_right:" if replie else ":material/expand_more:",
+            key=f"btn_replier_{categorie}",
+            help="Déplier" if replie else "Replier",
+            type="tertiary",
+            on_click=_set_state, args=(key_replie, not replie),
+        )
+        st.markdown(
+            f"<span style='color:{category_color}; font-size:0.85em;'>●</span> "
+            f"<span style='color:{category_color}; font-size:0.85em; text-transform:uppercase; letter-spacing:0.08em;'>{categorie}</span> "
+            f"<span style='color:grey; font-size:0.85em;'>· {len(df_cat)} · {df_cat['montant'].sum():,.2f} €</span>",
+            unsafe_allow_html=True,
+        )
+    if replie:
+        return
+
+    nb_pages = max(-(-len(df_cat) // ACTIFS_PAGE_SIZE), 1)
+    page = min(st.session_state.get(key_page, 0), nb_pages - 1)
+    debut = page * ACTIFS_PAGE_SIZE
+    visibles = df_cat.iloc[debut:debut + ACTIFS_PAGE_SIZE]
+
+    for idx, row in visibles.iterrows():
+        with st.container(border=True, vertical_alignment="center"):
+            _render_asset_row(row, metrics.loc[idx], rental.get(idx))
+
+    if nb_pages > 1:
+        with st.container(horizontal=True, vertical_alignment="center", horizontal_alignment="center"):
+            st.button("", icon=":material/chevron_left:", key=f"btn_page_prev_{categorie}",
+                      disabled=page == 0, type="tertiary", help="Page précédente",
+                      on_click=_set_state, args=(key_page, page - 1))
+            st.caption(f"{debut + 1}–{debut + len(visibles)} sur {len(df_cat)}")
+            st.button("", icon=":material/chevron_right:", key=f"btn_page_next_{categorie}",
+                      disabled=page == nb_pages - 1, type="tertiary", help="Page suivante",
+                      on_click=_set_state, args=(key_page, page + 1))
+
+
 # ── Point d'entrée public ─────────────────────────────────────────────────────
 
-def render(df: pd.DataFrame, invalidate_cache_fn, flash_fn) -> pd.DataFrame:
+def render(df: pd.DataFrame, flash_fn) -> pd.DataFrame:
     from services.assets import compute_total
     from ui.asset_detail import render_asset_detail, is_asset_detail_active, get_current_asset_id
 
@@ -159,10 +227,6 @@ def render(df: pd.DataFrame, invalidate_cache_fn, flash_fn) -> pd.DataFrame:
         render_asset_detail(asset_id, df)
         return df
 
-    # Charger les contrats une seule fois pour éviter les requêtes multiples
-    df_contrats = load_contrats()
-    df_emprunts = load_emprunts()
-
     has_auto_assets = (
         not df.empty
         and df["categorie"].isin(CATEGORIES_AUTO).any()
@@ -179,23 +243,14 @@ def render(df: pd.DataFrame, invalidate_cache_fn, flash_fn) -> pd.DataFrame:
     total = compute_total(df)
 
     # PnL global sur les actifs cotés uniquement (ceux avec PRU)
-    df_auto = df[df["categorie"].isin(CATEGORIES_AUTO)]
-    has_pnl = not df_auto.empty and (df_auto["pru"] > 0).any() and (df_auto["quantite"] > 0).any()
+    pnl = summarize_pnl(df)
+    pnl_global = pnl["global"]
 
     with st.container(vertical_alignment="center"):
-        if has_pnl:
-            pnl_global = 0.0
-            valeur_achat_totale = 0.0
-            
-            for _, asset in df_auto.iterrows():
-                if asset.get("pru", 0) > 0 and asset.get("quantite", 0) > 0:
-                    pnl_metrics = calculate_auto_asset_pnl(asset["montant"], asset["pru"], asset["quantite"])
-                    pnl_global += pnl_metrics["pnl_absolu"]
-                    valeur_achat_totale += pnl_metrics["valeur_achat"]
-            
-            pnl_pct = (pnl_global / valeur_achat_totale * 100) if valeur_achat_totale else 0
-            sign = "+" if pnl_global >= 0 else ""
-            st.metric(label="Total actifs", value=f"{total:,.2f} €",delta=f"{sign}{pnl_global:,.2f} € ({sign}{pnl_pct:.1f}%)")
+        if pnl_global["valeur_achat"] > 0:
+            sign = "+" if pnl_global["pnl"] >= 0 else ""
+            st.metric(label="Total actifs", value=f"{total:,.2f} €",
+                      delta=f"{sign}{pnl_global['pnl']:,.2f} € ({sign}{pnl_global['pnl_pct']:.1f}%)")
         else:
             st.metric(label="Total actifs", value=f"{total:,.2f} €")
 
@@ -217,12 +272,12 @@ def render(df: pd.DataFrame, invalidate_cache_fn, flash_fn) -> pd.DataFrame:
                 ):
                     with st.spinner("Récupération des prix…"):
                         df, msg, msg_type = refresh_prices(df)
+                    apply_assets(df)
                     flash_fn(msg, msg_type)
                     st.session_state["sync_time"] = datetime.now().strftime("%H:%M")
                     st.session_state["sync_error_tickers"] = set(
                         msg.replace("Tickers introuvables : ", "").split(", ")
                     ) if msg_type == "warning" else set()
-                    invalidate_cache_fn()
                     st.rerun()
                 if "sync_time" in st.session_state:
                     st.caption(f"Prix synchronisés à {st.session_state['sync_time']}")
@@ -234,18 +289,12 @@ def render(df: pd.DataFrame, invalidate_cache_fn, flash_fn) -> pd.DataFrame:
 
     else:
         categories_presentes = [c for c in CATEGORIES_ASSETS if c in df["categorie"].values]
+        # Métriques des lignes et métriques locatives de tous les actifs en un seul calcul
+        metrics = _row_metrics(df, pnl["par_actif"])
+        rental = calculate_rental_metrics_batch(df[df["categorie"] == "Immobilier"]).to_dict("index")
 
         for categorie in categories_presentes:
-            category_color = CATEGORY_COLOR_MAP.get(categorie, "#CCCCCC")
-            st.markdown(
-                f"<span style='color:{category_color}; font-size:0.85em;'>●</span> "
-                f"<span style='color:{category_color}; font-size:0.85em; text-transform:uppercase; letter-spacing:0.08em;'>{categorie}</span>",
-                unsafe_allow_html=True,
-            )
-            df_cat = df[df["categorie"] == categorie]
-            for _, row in df_cat.iterrows():
-                with st.container(border=True, vertical_alignment="center"):
-                    _render_asset_row(row, df_contrats=df_contrats, df_emprunts=df_emprunts)
+            _render_category(categorie, df[df["categorie"] == categorie], metrics, rental)
             st.space(size="small")
 
     return df
\ No newline at end of file
@@ -7,12 +7,15 @@ Onglet Passifs : liste des emprunts, ajout / modification / suppression (modales
 import streamlit as st
 import pandas as pd
 
-from services.db_emprunts import load_emprunts, get_total_emprunts
+from services.db_emprunts import amortization_schedule
+from services.repository import get_emprunts
 from ui.forms.form_emprunt import set_emprunt_dialog_edit, set_emprunt_dialog_delete, render_emprunt_dialog
 from ui.forms._shared import _format_duree
 import plotly.graph_objects as go
 from datetime import date
 from constants import PLOTLY_LAYOUT
+from ui.charts import interactive_enabled, line_trace, show
+from services.profiler import profiled
 
 
 repartition_columns = [6, 3, 1, 2, 2, 2, 0.5, 0.5]
@@ -20,46 +23,28 @@ repartition_columns = [6, 3, 1, 2, 2, 2, 0.5, 0.5]
 
 def _build_crd_evolution(df: pd.DataFrame) -> pd.DataFrame:
     """Calcule le CRD total mois par mois jusqu'à extinction du dernier emprunt."""
-    from services.db_emprunts import _compute_capital_restant_du
-
     if df.empty:
         return pd.DataFrame()
 
-    # Trouver la date de fin la plus lointaine
-    today = date.today().replace(day=1)
-    max_mois = int(df["duree_mois"].max())
-
-    rows = []
-    for i in range(max_mois + 1):
-        d = (pd.Timestamp(today) + pd.DateOffset(months=i)).date()
-        total = sum(
-            _compute_capital_restant_du(
-                row["montant_emprunte"],
-                row["taux_annuel"],
-                row["mensualite"],
-                row["date_debut"],
-                int(row["duree_mois"]),
-                as_of_date=d,
-            )
-            for _, row in df.iterrows()
-        )
-        rows.append({"date": d, "crd": total})
-        if total == 0.0:
-            break
-
-    return pd.DataFrame(rows)
+    schedule = amortization_schedule(df, start=date.today().replace(day=1))
+    return pd.DataFrame({
+        "date": pd.to_datetime(schedule["dates"]),
+        "crd": schedule["capital_restant_du"].sum(axis=0),
+    })
 
 
+@profiled("tab_emprunts._render_crd_chart")
 def _render_crd_chart(df: pd.DataFrame) -> None:
     df_evo = _build_crd_evolution(df)
     if df_evo.empty:
         return
 
+    interactive = interactive_enabled()
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_evo["date"],
-        y=df_evo["crd"],
+    fig.add_trace(line_trace(
+        df_evo["date"], df_evo["crd"], interactive,
         mode="lines",
+        name="Capital restant dû",
         fill="tozeroy",
         line=dict(color="#75cbd1", width=2),
         fillcolor="rgba(117, 203, 209, 0.15)",
@@ -70,7 +55,7 @@ def _render_crd_chart(df: pd.DataFrame) -> None:
     )
     
     fig.update_yaxes(ticksuffix=" €", tickformat=",.0f")
-    st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
+    show(fig, interactive)
 
 def _render_emprunt_row(row: pd.Series):
 
@@ -115,7 +100,7 @@ def _render_emprunt_row(row: pd.Series):
         st.rerun()
 
 # Barre de progression + détail coût total
-    interets_totaux = row["mensualite"] * row["duree_mois"] - montant_emprunte
+    interets_totaux = float(row["interets_totaux"])
     cout_total = montant_emprunte + interets_totaux
 
     if crd is not None and not (isinstance(crd, float) and pd.isna(crd)) and montant_emprunte > 0:
@@ -131,30 +116,16 @@ def _render_emprunt_row(row: pd.Series):
             st.caption(f"Coût total {cout_total:,.0f} €")
 
 
-def _compute_interets_restants(row: pd.Series) -> float:
-    """Intérêts restant à payer = paiements futurs - capital restant dû."""
-    from datetime import date as date_type
-    crd = row.get("capital_restant_du") or 0.0
-    if not row.get("date_debut") or pd.isna(row["date_debut"]):
-        return 0.0
-    debut = pd.Timestamp(row["date_debut"]).date()
-    today = date_type.today()
-    months_elapsed = (today.year - debut.year) * 12 + (today.month - debut.month)
-    if debut.day > today.day:
-        months_elapsed -= 1
-    months_elapsed = max(0, min(months_elapsed, int(row["duree_mois"])))
-    months_remaining = int(row["duree_mois"]) - months_elapsed
-    return max(0.0, float(row["mensualite"]) * months_remaining - float(crd))
-
-
 def render(flash_fn) -> None:
-    df = load_emprunts()
-    total_crd = get_total_emprunts()
+    df = get_emprunts()
+    schedule = amortization_schedule(df)
 
 # ── Métriques clés ─────────────────────────────────────────────────────────
     total_mensualites = float(df["mensualite"].sum()) if not df.empty else 0.0
     total_emprunte = float(df["montant_emprunte"].sum()) if not df.empty else 0.0
-    total_interets_restants = float(df.apply(_compute_interets_restants, axis=1).sum()) if not df.empty else 0.0
+    # Colonne 0 = aujourd'hui ; les intérêts restants sont ceux des échéances suivantes
+    total_crd = float(schedule["capital_restant_du"][:, 0].sum()) if not df.empty else 0.0
+    total_interets_restants = float(schedule["interets"][:, 1:].sum())
 
     from services.db_parametres import get_parametre
     revenu = get_parametre("revenu_mensuel_net")
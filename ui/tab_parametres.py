@@ -8,12 +8,14 @@ Point d'entrée unique : render(df, invalidate_cache_fn)
 
 import streamlit as st
 import pandas as pd
-from services.db_contrats import load_contrats, add_contrat, update_contrat, delete_contrat
+from services.db_contrats import add_contrat, update_contrat, delete_contrat
+from services.repository import get_contrats
 from services.db import reset_all_data
+from constants import PROJECTION_TAUX_EPARGNE_DEFAUT
 
 
 
-def _render_contrats(df_assets: pd.DataFrame, invalidate_cache_fn=None):
+def _render_contrats(df_assets: pd.DataFrame):
     """Interface de gestion des contrats (établissement + enveloppe)."""
     st.subheader("Mes contrats", anchor=False)
     st.caption("Un contrat combine un établissement (ex: Boursorama) avec une enveloppe (ex: PEA).")
@@ -45,7 +47,7 @@ def _render_contrats(df_assets: pd.DataFrame, invalidate_cache_fn=None):
                     st.toast("L'établissement et l'enveloppe sont obligatoires.", icon="⚠️")
     
     # ── Liste des contrats existants ───────────────────────────────────────────
-    df_contrats = load_contrats()
+    df_contrats = get_contrats()
     
     if df_contrats.empty:
         st.caption("Aucun contrat pour l'instant.")
@@ -93,8 +95,6 @@ def _render_contrats(df_assets: pd.DataFrame, invalidate_cache_fn=None):
                                 st.toast(msg, icon="✅" if ok else "⚠️")
                                 st.session_state.pop(editing_key, None)
                                 if ok:
-                                    if invalidate_cache_fn:
-                                        invalidate_cache_fn()
                                     st.rerun()
                             else:
                                 st.toast("L'établissement et l'enveloppe sont obligatoires.", icon="⚠️")
@@ -135,10 +135,114 @@ def _render_contrats(df_assets: pd.DataFrame, invalidate_cache_fn=None):
                         st.session_state[deleting_key] = contrat_id
                         st.rerun()
 
+def _render_import(flash_fn):
+    """Import en masse d'un historique de montants ou de positions (CSV / JSON)."""
+    from services.import_historique import import_table
+
+    with st.expander("Importer un historique", icon=":material/upload_file:"):
+        st.caption("Colonnes attendues : `asset_id`, `date` et `montant` (historique) ou `quantite` (positions).")
+        col1, col2 = st.columns(2)
+        with col1:
+            table = st.radio(
+                "Données",
+                options=["historique", "positions"],
+                format_func=lambda t: "Montants (historique)" if t == "historique" else "Quantités (positions)",
+                horizontal=True,
+                key="import_table",
+            )
+        with col2:
+            on_conflict = st.radio(
+                "Si une date existe déjà",
+                options=["replace", "ignore"],
+                format_func=lambda m: "Écraser" if m == "replace" else "Conserver l'existant",
+                horizontal=True,
+                key="import_conflict",
+            )
+        fichier = st.file_uploader("Fichier", type=["csv", "json", "jsonl"], key="import_file")
+        if st.button("Importer", type="primary", disabled=fichier is None, key="btn_import"):
+            try:
+                with st.spinner("Import en cours…"):
+                    report = import_table(table, fichier, on_conflict=on_conflict)
+            except ValueError as e:
+                flash_fn(f"Import impossible : {e}", "error")
+            else:
+                msg = f"{report['importees']} ligne(s) importée(s) sur {report['lues']}"
+                if report["rejetees"]:
+                    msg += f", {report['rejetees']} rejetée(s)"
+                flash_fn(msg, "warning" if report["rejetees"] else "success")
+            st.rerun()
+
+
+def _render_compaction(flash_fn):
+    """Suppression des lignes d'historique / positions qui répètent la valeur précédente."""
+    from services.compaction import compact_history
+
+    with st.expander("Compacter l'historique", icon=":material/compress:"):
+        st.caption(
+            "Supprime les relevés identiques au précédent pour un même actif. "
+            "Les valeurs affichées à chaque date restent inchangées."
+        )
+        if st.button("Compacter", key="btn_compact_history"):
+            with st.spinner("Compaction en cours…"):
+                report = compact_history()
+            if report["lignes_supprimees"]:
+                flash_fn(
+                    f"{report['lignes_supprimees']} ligne(s) supprimée(s), "
+                    f"{report['octets_gagnes'] / 1024:,.0f} Ko libérés."
+                )
+            else:
+                flash_fn("Aucune ligne redondante.", "info")
+            st.rerun()
+
+
+def _render_sauvegardes(snapshots: list[dict], invalidate_cache_fn, flash_fn):
+    """Snapshots de la base : création manuelle, liste et restauration."""
+    from services.backup import create_snapshot, restore_snapshot
+
+    with st.expander("Sauvegardes", icon=":material/backup:"):
+        st.caption(
+            "Une sauvegarde automatique est faite au plus une fois par jour. "
+            "Restaurer remplace toutes les données actuelles, qui sont sauvegardées juste avant."
+        )
+        col1, col2 = st.columns([3, 2], vertical_alignment="bottom")
+        with col2:
+            compact = st.checkbox("Compacter", key="backup_compact", help="Fichier plus petit (VACUUM INTO).")
+        with col1:
+            if st.button("Sauvegarder maintenant", icon=":material/save:", key="btn_backup_now"):
+                with st.spinner("Sauvegarde en cours…"):
+                    path = create_snapshot(compact=compact)
+                flash_fn(f"Sauvegarde créée : {path}")
+                st.rerun()
+
+        for snapshot in snapshots:
+            col_nom, col_taille, col_action = st.columns([5, 2, 2], vertical_alignment="center")
+            col_nom.markdown(f"**{snapshot['date']:%d/%m/%Y %H:%M}** · `{snapshot['nom']}`")
+            col_taille.caption(f"{snapshot['taille'] / 1024:,.0f} Ko")
+            with col_action.popover("Restaurer", icon=":material/restore:"):
+                st.warning("Les données actuelles seront remplacées.", icon=":material/warning:")
+                if st.button("Confirmer", type="primary", key=f"btn_restore_{snapshot['nom']}"):
+                    with st.spinner("Restauration en cours…"):
+                        ok, msg = restore_snapshot(snapshot["chemin"])
+                    flash_fn(msg, "success" if ok else "error")
+                    if ok:
+                        invalidate_cache_fn()
+                    st.rerun()
+
+
 def render_delete_data(df: pd.DataFrame, invalidate_cache_fn, flash_fn):
+    from services.backup import list_snapshots, create_snapshot
+
+    # Les sauvegardes restent accessibles après une réinitialisation
+    snapshots = list_snapshots()
+    if df.empty and not snapshots:
+        return
+    st.subheader("Mes données", anchor=False)
+    _render_sauvegardes(snapshots, invalidate_cache_fn, flash_fn)
+
     # ── Réinitialisation (visible uniquement si données perso) ────────────
     if not df.empty:
-        st.subheader("Mes données", anchor=False)
+        _render_import(flash_fn)
+        _render_compaction(flash_fn)
 
         with st.expander("Supprimer mes données", icon = ":material/delete:"):
             st.warning("Supprime définitivement toutes vos données. Irréversible !", icon=":material/warning:")
@@ -155,14 +259,15 @@ def render_delete_data(df: pd.DataFrame, invalidate_cache_fn, flash_fn):
                 width="stretch",
                 key="btn_reset_all",
             ):
+                create_snapshot(label="avant-suppression")
                 msg = reset_all_data()
                 flash_fn(msg)
-                st.cache_data.clear()
                 invalidate_cache_fn()
                 st.rerun()
 
 def _render_profil(invalidate_cache_fn=None, flash_fn=None):
     from services.db_parametres import get_parametre, set_parametre
+    from ui.charts import PARAM_INTERACTIF, interactive_enabled
 
     with st.expander("Mon profil",icon = ":material/person:"):
         with st.form("form_profil", border=False, enter_to_submit=False):
@@ -178,14 +283,152 @@ def _render_profil(invalidate_cache_fn=None, flash_fn=None):
                 help="Utilisé pour calculer ton taux d'endettement dans l'onglet Passifs. *Seuil bancaire habituel : 35 %*.",
             )
 
+            taux_actuel = get_parametre("taux_epargne", PROJECTION_TAUX_EPARGNE_DEFAUT)
+            taux_epargne = st.number_input(
+                "Taux d'épargne (%)",
+                min_value=0.0,
+                max_value=100.0,
+                value=float(taux_actuel),
+                step=1.0,
+                key="param_taux_epargne",
+                help="Part du revenu mensuel net épargnée chaque mois, utilisée par la projection de la Synthèse.",
+            )
+
+            graphiques_interactifs = st.toggle(
+                "Graphiques interactifs",
+                value=interactive_enabled(),
+                key="param_graphiques_interactifs",
+                help="Zoom, survol et choix de la période directement dans les graphiques d'évolution, "
+                     "de prix et de capital restant dû. Tout l'historique est chargé une fois.",
+            )
+
             submitted = st.form_submit_button("Enregistrer", type="primary")
             if submitted:
                 set_parametre("revenu_mensuel_net", revenu)
+                set_parametre("taux_epargne", taux_epargne)
+                set_parametre(PARAM_INTERACTIF, graphiques_interactifs)
                 if flash_fn:
-                    flash_fn("Revenu enregistré.")
+                    flash_fn("Profil enregistré.")
                 st.rerun()
 
 
+def _persist_dev_flag(widget_key: str, flag_key: str):
+    """
+    Recopie un interrupteur développeur dans une clé hors widget, lue par app.py :
+    l'état d'un widget est supprimé dès qu'une page ne l'affiche plus.
+    Relance toute l'app (le fragment de la page ne repasse pas par app.py).
+    """
+    st.session_state[flag_key] = st.session_state[widget_key]
+    st.rerun(scope="app")
+
+
+def _render_outils_dev():
+    """Traçage des requêtes SQL par rerun + rapport des migrations."""
+    from services.db import get_query_trace_runs, summarize_query_trace, export_query_trace_json, get_migration_report
+
+    with st.expander("Outils développeur", icon=":material/code:"):
+        st.toggle(
+            "Tracer les requêtes SQL",
+            value=st.session_state.get("_dev_trace_sql", False),
+            key="dev_trace_sql",
+            on_change=_persist_dev_flag,
+            args=("dev_trace_sql", "_dev_trace_sql"),
+            help="Enregistre chaque requête (texte, durée, lignes, appelant) à chaque rechargement de la page.",
+        )
+
+        runs = get_query_trace_runs()
+        if st.session_state.get("_dev_trace_sql") and runs:
+            labels = [f"{run['debut']} · {len(run['requetes'])} requêtes" for run in runs]
+            run_idx = st.selectbox(
+                "Exécution",
+                options=list(range(len(runs))),
+                index=len(runs) - 1,
+                format_func=lambda i: labels[i],
+                key="dev_trace_run",
+            )
+            requetes = runs[min(run_idx, len(runs) - 1)]["requetes"]
+            summary = summarize_query_trace(requetes)
+
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Requêtes", len(requetes))
+            c2.metric("Requêtes distinctes", len(summary))
+            c3.metric("Durée totale", f"{summary['duree_totale_ms'].sum():,.1f} ms")
+            st.dataframe(summary, hide_index=True, width="stretch")
+            st.download_button(
+                "Exporter en JSON",
+                data=export_query_trace_json(),
+                file_name="requetes_sql.json",
+                mime="application/json",
+                icon=":material/download:",
+                key="dev_trace_export",
+            )
+
+        st.toggle(
+            "Profiler le rendu",
+            value=st.session_state.get("_dev_profiler", False),
+            key="dev_profiler",
+            on_change=_persist_dev_flag,
+            args=("dev_profiler", "_dev_profiler"),
+            help="Chronomètre chaque section de la page (données, calculs, graphiques) à chaque rechargement, "
+                 "et indique si ses calculs ont été servis par le cache.",
+        )
+        if st.session_state.get("_dev_profiler"):
+            _render_profiler()
+
+        migrations = get_migration_report()
+        if migrations:
+            st.caption("Migrations appliquées au démarrage")
+            st.dataframe(pd.DataFrame(migrations), hide_index=True, width="stretch")
+
+
+def _render_profiler():
+    """Cascade des sections d'une exécution et comparaison des dernières exécutions."""
+    import plotly.graph_objects as go
+    from services.profiler import get_profile_runs, summarize_profile_run, compare_profile_runs, reset_profile_runs
+    from constants import PLOTLY_LAYOUT
+
+    # L'exécution en cours (celle qui affiche ce panneau) n'est pas terminée : elle est exclue
+    runs = [run for run in get_profile_runs()[:-1] if run["sections"]]
+    if not runs:
+        st.caption("Aucune exécution profilée pour l'instant : recharge une page.")
+        return
+
+    labels = [f"{run['debut']} · {run['label'] or '—'} · {len(run['sections'])} sections" for run in runs]
+    run_idx = st.selectbox(
+        "Exécution profilée",
+        options=list(range(len(runs))),
+        index=len(runs) - 1,
+        format_func=lambda i: labels[i],
+        key="dev_profiler_run",
+    )
+    sections = summarize_profile_run(runs[min(run_idx, len(runs) - 1)])
+
+    # Cascade : une barre par section, de son début à sa fin, décalée selon l'imbrication
+    noms = [f"{'  ' * p}{s}" for s, p in zip(sections["section"], sections["profondeur"])]
+    fig = go.Figure(go.Bar(
+        y=noms,
+        x=sections["duree_ms"],
+        base=sections["debut_ms"],
+        orientation="h",
+        marker_color=sections["cache"].map({"hit": "#22C55E", "miss": "#F59E0B"}),
+        text=[f"{d:,.1f} ms" + (f" · {c}" if c else "") for d, c in zip(sections["duree_ms"], sections["calculs"])],
+        textposition="outside",
+    ))
+    fig.update_layout(**PLOTLY_LAYOUT)
+    fig.update_layout(height=max(200, 24 * len(sections) + 40), bargap=0.3)
+    fig.update_yaxes(autorange="reversed")
+    fig.update_xaxes(ticksuffix=" ms")
+    st.caption(":green[■] caches servis · :orange[■] au moins un calcul refait")
+    st.plotly_chart(fig, width="stretch", config={"staticPlot": True})
+    st.dataframe(sections, hide_index=True, width="stretch")
+
+    st.caption("Durée par section (ms) sur les dernières exécutions")
+    st.dataframe(compare_profile_runs(runs).round(1), width="stretch")
+    if st.button("Effacer les profils", icon=":material/delete:", key="dev_profiler_reset"):
+        reset_profile_runs()
+        st.rerun()
+
+
 # ── Point d'entrée public ─────────────────────────────────────────────────────
 def render(df: pd.DataFrame, invalidate_cache_fn=None, flash_fn=None):
     # ── Section Profil ───────────────────────────────────────────────────────
@@ -194,9 +437,14 @@ def render(df: pd.DataFrame, invalidate_cache_fn=None, flash_fn=None):
     st.divider()
 
     # ── Section Contrats ─────────────────────────────────────────────────────
-    _render_contrats(df, invalidate_cache_fn)
+    _render_contrats(df)
     
     st.divider()
     
     # ── Section Suppression données ──────────────────────────────────────────
     render_delete_data(df, invalidate_cache_fn, flash_fn or st.toast)
+
+    st.divider()
+
+    # ── Section Outils développeur ───────────────────────────────────────────
+    _render_outils_dev()
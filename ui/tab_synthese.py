@@ -6,18 +6,22 @@ Onglet principal "Synthèse" : vue globale du patrimoine.
 - Répartition des actifs par catégorie (métriques + camembert)
 - Répartition par enveloppe fiscale
 - Résumé des passifs (emprunts)
+- Allocation cible et rééquilibrage
+- Projection Monte Carlo du patrimoine net
 
 Point d'entrée unique : render(df)
 """
 
 import streamlit as st
 import pandas as pd
-from services.assets import compute_by_category, compute_total
-from services.db_emprunts import get_total_emprunts, load_emprunts
-from services.db_contrats import load_contrats
-from constants import CATEGORY_COLOR_MAP, CATEGORIES_AUTO, PLOTLY_LAYOUT
+from services.assets import totals_by_category, totals_by_contrat
+from services.repository import get_total_emprunts, get_emprunts, get_contrats, get_agregats
+from services.profiler import profiled
+from constants import CATEGORY_COLOR_MAP, PLOTLY_LAYOUT
 from ui.asset_form import set_dialog_create
 from ui.graphe_historique import render as render_historique
+from ui.graphe_projection import render as render_projection
+from ui.reequilibrage import render as render_reequilibrage
 
 
 repartition_columns = [5, 1, 1, 2]
@@ -25,11 +29,8 @@ repartition_columns = [5, 1, 1, 2]
 
 # ── Métriques clés ────────────────────────────────────────────────────────────
 
-def _render_kpis(df: pd.DataFrame):
-    if df.empty:
-        return
-
-    total_actifs = compute_total(df) if not df.empty else 0.0
+@profiled("tab_synthese._render_kpis")
+def _render_kpis(total_actifs: float):
     total_passifs = get_total_emprunts()
     patrimoine_net = total_actifs - total_passifs
 
@@ -41,30 +42,18 @@ def _render_kpis(df: pd.DataFrame):
 
 # ── Répartition actifs par catégorie (cartes) ────────────────────────────────
 
-def _render_actifs(df: pd.DataFrame):
-    stats = compute_by_category(df)
+@profiled("tab_synthese._render_actifs")
+def _render_actifs(stats: pd.DataFrame):
     if stats.empty:
         return
 
     st.subheader("Actifs", anchor=False)
 
-    # Calcul du PnL par catégorie (uniquement pour les catégories auto)
-    pnl_by_cat: dict[str, float] = {}
-    for categorie in CATEGORIES_AUTO:
-        df_cat = df[df["categorie"] == categorie]
-        if df_cat.empty:
-            continue
-        valeur_actuelle = df_cat["montant"].sum()
-        valeur_achat = (df_cat["pru"] * df_cat["quantite"]).sum()
-        if valeur_achat > 0:
-            pnl_by_cat[categorie] = valeur_actuelle - valeur_achat
-
-    # Liste
+    # Liste (PnL : actifs cotés avec PRU uniquement)
 
     for _, row in stats.iterrows():
         categorie = row["categorie"]
         color = CATEGORY_COLOR_MAP.get(categorie, "#CCCCCC")
-        pnl = pnl_by_cat.get(categorie)
 
         with st.container(border=True):
             cols = st.columns(repartition_columns)
@@ -84,12 +73,9 @@ def _render_actifs(df: pd.DataFrame):
             cols[2].write(f"{row['montant']:,.2f} €")
 
             # PnL (uniquement si disponible)
-            if pnl is not None:
-                # Calcul du pourcentage
-                df_cat = df[df["categorie"] == categorie]
-                valeur_achat = (df_cat["pru"] * df_cat["quantite"]).sum()
-                pourcentage = (pnl / valeur_achat * 100) if valeur_achat > 0 else 0.0
-                
+            if pd.notna(row["pnl"]):
+                pnl, pourcentage = row["pnl"], row["pnl_pct"]
+
                 sign = "+" if pnl >= 0 else ""
                 sign_pct = "+" if pourcentage >= 0 else ""
                 badge_color = "green" if pnl >= 0 else "red"
@@ -101,44 +87,23 @@ def _render_actifs(df: pd.DataFrame):
 
 # ── Répartition par contrat ───────────────────────────────────────────
 
-def _render_contrats(df: pd.DataFrame):
-    df_contrats_assets = df[df["contrat_id"].notna() & (df["contrat_id"].str.strip() != "")]
-    if df_contrats_assets.empty:
+@profiled("tab_synthese._render_contrats")
+def _render_contrats():
+    totaux = totals_by_contrat(get_agregats(), get_contrats())
+    if totaux.empty:
         return
 
-    # Récupérer les informations des contrats
-    try:
-        df_contrats = load_contrats()
-        
-        # Joindre les données
-        df_merged = df_contrats_assets.merge(
-            df_contrats, 
-            left_on="contrat_id", 
-            right_on="id", 
-            how="left"
-        )
-        
-        # Grouper par contrat (établissement + enveloppe)
-        df_merged["contrat_display"] = df_merged["etablissement"] + " — " + df_merged["enveloppe"]
-        
-        totaux = (
-            df_merged.groupby("contrat_display")["montant"]
-            .sum()
-            .sort_values(ascending=False)
-        )
-        
-        st.subheader("Actifs par contrat", anchor=False)
-        with st.container(horizontal=False):
-            for contrat, montant in totaux.items():
-                st.metric(label=contrat, value=f"{montant:,.2f} €", border=True)
-                
-    except Exception as e:
-        st.subheader("Actifs par contrat", anchor=False)
-        st.caption("Impossible d'afficher les contrats")
+    st.subheader("Actifs par contrat", anchor=False)
+    with st.container(horizontal=False):
+        for contrat in totaux.itertuples():
+            delta = f"{'+' if contrat.pnl >= 0 else ''}{contrat.pnl:,.2f} €" if pd.notna(contrat.pnl) else None
+            label = contrat.contrat if isinstance(contrat.contrat, str) else "Contrat inconnu"
+            st.metric(label=label, value=f"{contrat.montant:,.2f} €", delta=delta, border=True)
 
 
 # ── Résumé des passifs ────────────────────────────────────────────────────────
 
+@profiled("tab_synthese._render_passifs")
 def _render_passifs(df_emprunts: pd.DataFrame, total_actifs: float):
     if df_emprunts.empty:
         return
@@ -177,7 +142,9 @@ def _render_passifs(df_emprunts: pd.DataFrame, total_actifs: float):
 # ── Point d'entrée public ─────────────────────────────────────────────────────
 
 def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
-    total_actifs = compute_total(df) if not df.empty else 0.0
+    # Totaux lus dans les agrégats SQL (O(catégories × contrats)), pas dans df
+    stats = totals_by_category(get_agregats())
+    total_actifs = float(stats["montant"].sum()) if not stats.empty else 0.0
 
     if df.empty:
         with st.container(border=True):
@@ -194,10 +161,13 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
         col_principal, col_sidebar = st.columns([3, 1], gap="large")
         with col_principal:
             # ── Actifs
-            _render_actifs(df)
+            _render_actifs(stats)
+
+            # ── Allocation cible / rééquilibrage
+            render_reequilibrage(df)
 
             # ── Passifs
-            df_emprunts = load_emprunts()
+            df_emprunts = get_emprunts()
             if not df_emprunts.empty:
                 st.space()
                 _render_passifs(df_emprunts, total_actifs)
@@ -205,14 +175,18 @@ def render(df: pd.DataFrame, df_hist: pd.DataFrame, df_positions: pd.DataFrame):
             # ── Évolution historique
             render_historique(df, df_hist, df_positions)
 
+            # ── Projection
+            st.space()
+            render_projection(df)
+
         with col_sidebar:
             with st.container(border=False):
                 # ── KPIs
                 st.subheader("Patrimoine")
-                _render_kpis(df)
+                _render_kpis(total_actifs)
 
                 # ── Contrats
                 st.space()
-                _render_contrats(df)
+                _render_contrats()
 
  
\ No newline at end of file